@@ -0,0 +1,58 @@
+<?php
+/**
+ * OPcache 狀態端點（tests/monitor/opcache_status.py 取樣命中率、記憶體與重啟次數）
+ *
+ * 由 nginx 內部 server（config/nginx/internal.conf，不對外發佈）的 location = /opcache-status 直接指定為 SCRIPT_FILENAME，
+ * 掛載在 open_basedir（/var/www/html）內但以 . 開頭，直接以網址存取會被 location ~ /\. 拒絕。
+ * OPcache 的共享記憶體屬於 php-fpm master，任何 worker 讀到的都是同一份狀態。
+ *
+ * ?scripts=1  附上每個已快取腳本的命中次數與記憶體（產生 opcache.preload 清單用）
+ * ?files=1    附上 WordPress 目錄下的 .php 檔案數（估計 max_accelerated_files 是否足夠）
+ */
+
+header('Content-Type: application/json');
+header('Cache-Control: no-store');
+
+if (!function_exists('opcache_get_status')) {
+    http_response_code(503);
+    echo json_encode(['error' => 'OPcache 未載入']);
+    return;
+}
+
+$with_scripts = !empty($_GET['scripts']);
+$status = opcache_get_status($with_scripts);
+if ($status === false) {
+    http_response_code(503);
+    echo json_encode(['error' => 'OPcache 未啟用']);
+    return;
+}
+
+$configuration = opcache_get_configuration();
+$status['directives'] = $configuration['directives'];
+
+if ($with_scripts) {
+    $scripts = [];
+    foreach ($status['scripts'] as $path => $script) {
+        $scripts[$path] = [
+            'hits' => $script['hits'],
+            'memory_consumption' => $script['memory_consumption'],
+            'last_used_timestamp' => $script['last_used_timestamp'],
+        ];
+    }
+    $status['scripts'] = $scripts;
+}
+
+if (!empty($_GET['files'])) {
+    $count = 0;
+    $files = new RecursiveIteratorIterator(
+        new RecursiveDirectoryIterator('/var/www/html', FilesystemIterator::SKIP_DOTS)
+    );
+    foreach ($files as $file) {
+        if ($file->getExtension() === 'php') {
+            $count++;
+        }
+    }
+    $status['php_files'] = $count;
+}
+
+echo json_encode($status);
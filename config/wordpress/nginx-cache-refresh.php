@@ -0,0 +1,117 @@
+<?php
+/**
+ * Plugin Name: Nginx Cache Refresh
+ * Description: 文章或留言變更時重新產生 nginx 頁面快取中的文章、首頁與文章列表頁
+ *
+ * 掛載為 wp-content/mu-plugins/nginx-cache-refresh.php（見 docker-compose.yml）。
+ * 開源版 nginx 沒有 purge 指令：對 nginx 的內部 server（config/nginx/internal.conf，埠 8081 不對外發佈）
+ * 送出匿名請求，該 server 一律略過快取讀取（fastcgi_cache_bypass 1），新的回應取代原本的快取項目；
+ * 已取消發布或刪除的文章會以 404 取代。公開的 server 沒有任何略過快取或限流的標頭。
+ * 分類、標籤等其他列表頁不重新產生，依微快取的 TTL（60 秒）過期。
+ * 快取鍵包含 scheme，請求以 X-Forwarded-Proto 帶上 home_url() 的 scheme（HTTPS 網站更新的是 HTTPS 的快取項目）。
+ *
+ * WordPress 的 404 帶有 no-cache 標頭，nginx 不會寫入快取；匿名的 404 另外送出 X-Accel-Expires
+ * （優先於 Cache-Control / Expires），刪除文章後的 404 才會取代原本的快取項目。
+ *
+ * 請求在回應送出後（fastcgi_finish_request）才發出，不延遲後台操作。
+ * 環境變數：NGINX_CACHE_REFRESH_HOST（nginx 內部 server 的主機與埠，預設 nginx:8081；設為 off 停用）
+ */
+
+defined('ABSPATH') || exit;
+
+final class Nginx_Cache_Refresh
+{
+    /** 匿名 404 的快取時間（秒），與 fastcgi-cache.conf 的 fastcgi_cache_valid 404 相同 */
+    const NOT_FOUND_TTL = 10;
+
+    /** 本次請求中需要重新產生的網址（去除重複，shutdown 時送出） */
+    private static $urls = [];
+
+    public static function register()
+    {
+        add_filter('nocache_headers', [__CLASS__, 'cache_not_found']);
+        if (getenv('NGINX_CACHE_REFRESH_HOST') === 'off') {
+            return;
+        }
+        // 變更前的網址（取消發布、移到回收桶、修改代稱時舊網址的快取也要更新）
+        add_action('pre_post_update', [__CLASS__, 'queue_post'], 10, 1);
+        add_action('before_delete_post', [__CLASS__, 'queue_post'], 10, 1);
+        // 變更後的網址
+        add_action('transition_post_status', [__CLASS__, 'transition'], 10, 3);
+        // 留言通過審核、刪除時文章的留言數改變
+        add_action('wp_update_comment_count', [__CLASS__, 'queue_post'], 10, 1);
+        add_action('shutdown', [__CLASS__, 'send'], 100);
+    }
+
+    public static function cache_not_found($headers)
+    {
+        global $wp_query;
+        // 只有匿名的 404（WP::handle_404）；登入使用者與 Authorization 請求由 $skip_cache 略過快取
+        if ($wp_query instanceof WP_Query && $wp_query->is_404() && !is_user_logged_in()) {
+            $headers['X-Accel-Expires'] = self::NOT_FOUND_TTL;
+        }
+        return $headers;
+    }
+
+    public static function transition($new_status, $old_status, $post)
+    {
+        if ($new_status === 'publish' || $old_status === 'publish') {
+            self::queue_post($post);
+        }
+    }
+
+    public static function queue_post($post)
+    {
+        $post = get_post($post);
+        if (!$post || $post->post_status !== 'publish' || !is_post_type_viewable($post->post_type)) {
+            return;
+        }
+        self::$urls[get_permalink($post)] = true;
+        self::$urls[home_url('/')] = true;
+        if ($post->post_type === 'post' && get_option('show_on_front') === 'page' && get_option('page_for_posts')) {
+            self::$urls[get_permalink(get_option('page_for_posts'))] = true;
+        }
+        $archive = get_post_type_archive_link($post->post_type);
+        if ($archive) {
+            self::$urls[$archive] = true;
+        }
+    }
+
+    public static function send()
+    {
+        if (!self::$urls) {
+            return;
+        }
+        $host = getenv('NGINX_CACHE_REFRESH_HOST') ?: 'nginx:8081';
+        $scheme = wp_parse_url(home_url('/'), PHP_URL_SCHEME) ?: 'http';
+        if (function_exists('fastcgi_finish_request')) {
+            fastcgi_finish_request();
+        }
+        foreach (array_keys(self::$urls) as $url) {
+            $parts = wp_parse_url($url);
+            // 有 query string 的網址不會被快取（$skip_cache）
+            if (empty($parts['host']) || isset($parts['query'])) {
+                continue;
+            }
+            $path = isset($parts['path']) ? $parts['path'] : '/';
+            $response = wp_remote_get('http://' . $host . $path, [
+                'headers' => ['Host' => $parts['host'], 'X-Forwarded-Proto' => $scheme],
+                'timeout' => 10,
+                'redirection' => 0,
+                'cookies' => [],
+            ]);
+            if (is_wp_error($response)) {
+                error_log('nginx-cache-refresh: ' . $url . ': ' . $response->get_error_message());
+                continue;
+            }
+            // 2xx 與 404（已刪除的文章）都已寫入快取；其他狀態（例如 5xx）代表快取項目沒有更新
+            $status = (int) wp_remote_retrieve_response_code($response);
+            if (($status < 200 || $status >= 300) && $status !== 404) {
+                error_log('nginx-cache-refresh: ' . $url . ': HTTP ' . $status);
+            }
+        }
+        self::$urls = [];
+    }
+}
+
+Nginx_Cache_Refresh::register();
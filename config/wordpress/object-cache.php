@@ -0,0 +1,507 @@
+<?php
+/**
+ * Redis 物件快取 drop-in（掛載為 wp-content/object-cache.php，見 docker-compose.yml）
+ *
+ * 只在設定 WP_REDIS_HOST 環境變數時啟用（WP_REDIS_HOST=redis docker compose --profile objectcache up -d），
+ * 否則不定義任何函式，WordPress 改用內建的非持久快取（wp-includes/cache.php）。
+ * 以 socket 實作 RESP 協定，不需要 phpredis 擴充套件（官方 wordpress 映像沒有）或下載外掛，可完全離線使用。
+ * 連不上 Redis 或讀寫失敗時，該請求剩下的操作退回非持久快取，不影響網站。
+ *
+ * 環境變數：WP_REDIS_HOST、WP_REDIS_PORT（6379）、WP_REDIS_DATABASE（0）、WP_REDIS_PASSWORD、
+ * WP_REDIS_PREFIX（預設為資料庫名稱加資料表前綴）、WP_REDIS_TIMEOUT（秒，預設 1）、WP_REDIS_MAXTTL（秒，0 不限制）
+ */
+
+// 頂層宣告的函式與類別在 include 時即生效，必須放在條件區塊內才能不啟用
+if (getenv('WP_REDIS_HOST')) {
+
+    class WP_Object_Cache
+    {
+        public $cache_hits = 0;
+        public $cache_misses = 0;
+        public $redis_calls = 0;
+
+        /** 本次請求的快取（完整鍵 => 值），持久群組的值同時寫入 Redis */
+        private $cache = [];
+        private $global_groups = [];
+        private $non_persistent_groups = [];
+        private $blog_prefix = '';
+        private $prefix;
+        private $max_ttl;
+        private $socket = null;
+        private $failed = false;
+
+        public function __construct()
+        {
+            $table_prefix = isset($GLOBALS['table_prefix']) ? $GLOBALS['table_prefix'] : 'wp_';
+            $database = defined('DB_NAME') ? DB_NAME : 'wordpress';
+            $this->prefix = getenv('WP_REDIS_PREFIX') ?: $database . ':' . $table_prefix;
+            $this->max_ttl = (int) getenv('WP_REDIS_MAXTTL');
+            $this->blog_prefix = is_multisite() ? get_current_blog_id() . ':' : '';
+        }
+
+        public function __destruct()
+        {
+            $this->close();
+        }
+
+        private function connect()
+        {
+            if ($this->socket !== null) {
+                return true;
+            }
+            if ($this->failed) {
+                return false;
+            }
+            $timeout = (float) (getenv('WP_REDIS_TIMEOUT') ?: 1);
+            $port = (int) (getenv('WP_REDIS_PORT') ?: 6379);
+            $socket = @fsockopen(getenv('WP_REDIS_HOST'), $port, $errno, $errstr, $timeout);
+            if (!$socket) {
+                return $this->fail("無法連線 Redis: {$errstr}");
+            }
+            stream_set_timeout($socket, (int) $timeout, (int) (fmod($timeout, 1) * 1e6));
+            $this->socket = $socket;
+            $password = getenv('WP_REDIS_PASSWORD');
+            if ($password !== false && $password !== '' && $this->command(['AUTH', $password]) !== 'OK') {
+                return $this->fail('Redis AUTH 失敗');
+            }
+            $database = (int) getenv('WP_REDIS_DATABASE');
+            if ($database && $this->command(['SELECT', $database]) !== 'OK') {
+                return $this->fail('Redis SELECT 失敗');
+            }
+            return $this->socket !== null;
+        }
+
+        private function fail($message)
+        {
+            if (!$this->failed) {
+                error_log("object-cache.php: {$message}，本次請求改用非持久快取");
+            }
+            $this->failed = true;
+            if ($this->socket !== null) {
+                @fclose($this->socket);
+                $this->socket = null;
+            }
+            return false;
+        }
+
+        /** 送出一個命令並讀取回應；連線或協定錯誤時回傳 null 並停止使用 Redis */
+        private function command(array $args)
+        {
+            if ($this->socket === null && !$this->connect()) {
+                return null;
+            }
+            $payload = '*' . count($args) . "\r\n";
+            foreach ($args as $arg) {
+                $arg = (string) $arg;
+                $payload .= '$' . strlen($arg) . "\r\n" . $arg . "\r\n";
+            }
+            $this->redis_calls++;
+            for ($written = 0; $written < strlen($payload); $written += $bytes) {
+                $bytes = @fwrite($this->socket, substr($payload, $written));
+                if (!$bytes) {
+                    return $this->fail('寫入 Redis 失敗') ?: null;
+                }
+            }
+            return $this->reply();
+        }
+
+        private function reply()
+        {
+            // 多筆回應讀到一半失敗時，連線已關閉
+            if ($this->socket === null) {
+                return null;
+            }
+            $line = fgets($this->socket);
+            if ($line === false || strlen($line) < 3) {
+                return $this->fail('讀取 Redis 回應失敗') ?: null;
+            }
+            $type = $line[0];
+            $data = substr($line, 1, -2);
+            switch ($type) {
+                case '+':
+                    return $data;
+                case ':':
+                    return (int) $data;
+                case '$':
+                    $length = (int) $data;
+                    if ($length < 0) {
+                        return false;
+                    }
+                    $buffer = '';
+                    while (strlen($buffer) < $length + 2) {
+                        $chunk = fread($this->socket, $length + 2 - strlen($buffer));
+                        if ($chunk === false || $chunk === '') {
+                            return $this->fail('讀取 Redis 回應失敗') ?: null;
+                        }
+                        $buffer .= $chunk;
+                    }
+                    return substr($buffer, 0, $length);
+                case '*':
+                    $items = [];
+                    for ($i = 0, $count = (int) $data; $i < $count; $i++) {
+                        $items[] = $this->reply();
+                    }
+                    return $items;
+                default:
+                    return $this->fail("Redis 錯誤: {$data}") ?: null;
+            }
+        }
+
+        private function key($key, $group)
+        {
+            if (empty($group)) {
+                $group = 'default';
+            }
+            $blog = isset($this->global_groups[$group]) ? '' : $this->blog_prefix;
+            return "{$this->prefix}:{$blog}{$group}:{$key}";
+        }
+
+        private function persistent($group)
+        {
+            return !isset($this->non_persistent_groups[empty($group) ? 'default' : $group]) && !$this->failed;
+        }
+
+        private function ttl($expire)
+        {
+            $expire = (int) $expire;
+            if ($this->max_ttl && (!$expire || $expire > $this->max_ttl)) {
+                return $this->max_ttl;
+            }
+            return $expire;
+        }
+
+        private static function copy($data)
+        {
+            return is_object($data) ? clone $data : $data;
+        }
+
+        /** 寫入 Redis：mode 為 NX（add）、XX（replace）或空字串（set） */
+        private function store($key, $data, $group, $expire, $mode = '')
+        {
+            $id = $this->key($key, $group);
+            if ($this->persistent($group)) {
+                $args = ['SET', $id, serialize($data)];
+                if ($ttl = $this->ttl($expire)) {
+                    array_push($args, 'EX', $ttl);
+                }
+                if ($mode) {
+                    $args[] = $mode;
+                }
+                $reply = $this->command($args);
+                if ($reply === false) {
+                    return false;
+                }
+            } elseif ($mode === 'NX' && array_key_exists($id, $this->cache)) {
+                return false;
+            } elseif ($mode === 'XX' && !array_key_exists($id, $this->cache)) {
+                return false;
+            }
+            $this->cache[$id] = self::copy($data);
+            return true;
+        }
+
+        public function add($key, $data, $group = 'default', $expire = 0)
+        {
+            if (wp_suspend_cache_addition() || array_key_exists($this->key($key, $group), $this->cache)) {
+                return false;
+            }
+            return $this->store($key, $data, $group, $expire, 'NX');
+        }
+
+        public function add_multiple(array $data, $group = '', $expire = 0)
+        {
+            $values = [];
+            foreach ($data as $key => $value) {
+                $values[$key] = $this->add($key, $value, $group, $expire);
+            }
+            return $values;
+        }
+
+        public function replace($key, $data, $group = 'default', $expire = 0)
+        {
+            return $this->store($key, $data, $group, $expire, 'XX');
+        }
+
+        public function set($key, $data, $group = 'default', $expire = 0)
+        {
+            return $this->store($key, $data, $group, $expire);
+        }
+
+        public function set_multiple(array $data, $group = '', $expire = 0)
+        {
+            $values = [];
+            foreach ($data as $key => $value) {
+                $values[$key] = $this->set($key, $value, $group, $expire);
+            }
+            return $values;
+        }
+
+        public function get($key, $group = 'default', $force = false, &$found = null)
+        {
+            $id = $this->key($key, $group);
+            if (array_key_exists($id, $this->cache) && (!$force || !$this->persistent($group))) {
+                $found = true;
+                $this->cache_hits++;
+                return self::copy($this->cache[$id]);
+            }
+            $value = $this->persistent($group) ? $this->command(['GET', $id]) : false;
+            if (!is_string($value)) {
+                $found = false;
+                $this->cache_misses++;
+                return false;
+            }
+            $found = true;
+            $this->cache_hits++;
+            $this->cache[$id] = unserialize($value);
+            return self::copy($this->cache[$id]);
+        }
+
+        public function get_multiple($keys, $group = 'default', $force = false)
+        {
+            $values = [];
+            $missing = [];
+            foreach ($keys as $key) {
+                $id = $this->key($key, $group);
+                if (array_key_exists($id, $this->cache) && (!$force || !$this->persistent($group))) {
+                    $values[$key] = self::copy($this->cache[$id]);
+                    $this->cache_hits++;
+                } else {
+                    $missing[$key] = $id;
+                    $values[$key] = false;
+                }
+            }
+            if ($missing && $this->persistent($group)) {
+                $replies = $this->command(array_merge(['MGET'], array_values($missing)));
+                foreach (array_keys($missing) as $i => $key) {
+                    if (is_array($replies) && is_string($replies[$i])) {
+                        $this->cache[$missing[$key]] = unserialize($replies[$i]);
+                        $values[$key] = self::copy($this->cache[$missing[$key]]);
+                        $this->cache_hits++;
+                    } else {
+                        $this->cache_misses++;
+                    }
+                }
+            } else {
+                $this->cache_misses += count($missing);
+            }
+            return $values;
+        }
+
+        public function delete($key, $group = 'default')
+        {
+            $id = $this->key($key, $group);
+            $existed = array_key_exists($id, $this->cache);
+            unset($this->cache[$id]);
+            if ($this->persistent($group)) {
+                return (bool) $this->command(['DEL', $id]) || $existed;
+            }
+            return $existed;
+        }
+
+        public function delete_multiple(array $keys, $group = '')
+        {
+            $values = [];
+            foreach ($keys as $key) {
+                $values[$key] = $this->delete($key, $group);
+            }
+            return $values;
+        }
+
+        /** 與內建快取相同：非數值視為 0，結果不小於 0（讀取後寫回，不是原子操作） */
+        public function incr($key, $offset = 1, $group = 'default')
+        {
+            $value = $this->get($key, $group, false, $found);
+            if (!$found) {
+                return false;
+            }
+            $value = max(0, (is_numeric($value) ? $value : 0) + (int) $offset);
+            $this->set($key, $value, $group);
+            return $value;
+        }
+
+        public function decr($key, $offset = 1, $group = 'default')
+        {
+            return $this->incr($key, -(int) $offset, $group);
+        }
+
+        /** 以 SCAN 刪除符合 pattern 的鍵（只清除本站的前綴，不使用 FLUSHDB） */
+        private function delete_matching($pattern)
+        {
+            $cursor = '0';
+            do {
+                $reply = $this->command(['SCAN', $cursor, 'MATCH', $pattern, 'COUNT', 1000]);
+                if (!is_array($reply)) {
+                    return false;
+                }
+                list($cursor, $keys) = $reply;
+                if ($keys) {
+                    $this->command(array_merge(['DEL'], $keys));
+                }
+            } while ($cursor !== '0');
+            return true;
+        }
+
+        public function flush()
+        {
+            $this->cache = [];
+            return !$this->failed && $this->delete_matching("{$this->prefix}:*");
+        }
+
+        public function flush_runtime()
+        {
+            $this->cache = [];
+            return true;
+        }
+
+        public function flush_group($group)
+        {
+            $prefix = $this->key('', $group);
+            foreach (array_keys($this->cache) as $id) {
+                if (strpos($id, $prefix) === 0) {
+                    unset($this->cache[$id]);
+                }
+            }
+            return !$this->persistent($group) || $this->delete_matching("{$prefix}*");
+        }
+
+        public function add_global_groups($groups)
+        {
+            $this->global_groups += array_fill_keys((array) $groups, true);
+        }
+
+        public function add_non_persistent_groups($groups)
+        {
+            $this->non_persistent_groups += array_fill_keys((array) $groups, true);
+        }
+
+        public function switch_to_blog($blog_id)
+        {
+            $this->blog_prefix = is_multisite() ? (int) $blog_id . ':' : '';
+        }
+
+        public function close()
+        {
+            if ($this->socket !== null) {
+                @fclose($this->socket);
+                $this->socket = null;
+            }
+            return true;
+        }
+
+        public function stats()
+        {
+            echo '<p>';
+            echo "<strong>Cache Hits:</strong> {$this->cache_hits}<br />";
+            echo "<strong>Cache Misses:</strong> {$this->cache_misses}<br />";
+            echo "<strong>Redis Calls:</strong> {$this->redis_calls}<br />";
+            echo '</p>';
+        }
+    }
+
+    function wp_cache_init()
+    {
+        $GLOBALS['wp_object_cache'] = new WP_Object_Cache();
+    }
+
+    function wp_cache_add($key, $data, $group = '', $expire = 0)
+    {
+        return $GLOBALS['wp_object_cache']->add($key, $data, $group, (int) $expire);
+    }
+
+    function wp_cache_add_multiple(array $data, $group = '', $expire = 0)
+    {
+        return $GLOBALS['wp_object_cache']->add_multiple($data, $group, (int) $expire);
+    }
+
+    function wp_cache_replace($key, $data, $group = '', $expire = 0)
+    {
+        return $GLOBALS['wp_object_cache']->replace($key, $data, $group, (int) $expire);
+    }
+
+    function wp_cache_set($key, $data, $group = '', $expire = 0)
+    {
+        return $GLOBALS['wp_object_cache']->set($key, $data, $group, (int) $expire);
+    }
+
+    function wp_cache_set_multiple(array $data, $group = '', $expire = 0)
+    {
+        return $GLOBALS['wp_object_cache']->set_multiple($data, $group, (int) $expire);
+    }
+
+    function wp_cache_get($key, $group = '', $force = false, &$found = null)
+    {
+        return $GLOBALS['wp_object_cache']->get($key, $group, $force, $found);
+    }
+
+    function wp_cache_get_multiple($keys, $group = '', $force = false)
+    {
+        return $GLOBALS['wp_object_cache']->get_multiple($keys, $group, $force);
+    }
+
+    function wp_cache_delete($key, $group = '')
+    {
+        return $GLOBALS['wp_object_cache']->delete($key, $group);
+    }
+
+    function wp_cache_delete_multiple(array $keys, $group = '')
+    {
+        return $GLOBALS['wp_object_cache']->delete_multiple($keys, $group);
+    }
+
+    function wp_cache_incr($key, $offset = 1, $group = '')
+    {
+        return $GLOBALS['wp_object_cache']->incr($key, $offset, $group);
+    }
+
+    function wp_cache_decr($key, $offset = 1, $group = '')
+    {
+        return $GLOBALS['wp_object_cache']->decr($key, $offset, $group);
+    }
+
+    function wp_cache_flush()
+    {
+        return $GLOBALS['wp_object_cache']->flush();
+    }
+
+    function wp_cache_flush_runtime()
+    {
+        return $GLOBALS['wp_object_cache']->flush_runtime();
+    }
+
+    function wp_cache_flush_group($group)
+    {
+        return $GLOBALS['wp_object_cache']->flush_group($group);
+    }
+
+    function wp_cache_supports($feature)
+    {
+        return in_array($feature, ['add_multiple', 'set_multiple', 'get_multiple', 'delete_multiple',
+                                   'flush_runtime', 'flush_group'], true);
+    }
+
+    function wp_cache_close()
+    {
+        return $GLOBALS['wp_object_cache']->close();
+    }
+
+    function wp_cache_add_global_groups($groups)
+    {
+        $GLOBALS['wp_object_cache']->add_global_groups($groups);
+    }
+
+    function wp_cache_add_non_persistent_groups($groups)
+    {
+        $GLOBALS['wp_object_cache']->add_non_persistent_groups($groups);
+    }
+
+    function wp_cache_switch_to_blog($blog_id)
+    {
+        $GLOBALS['wp_object_cache']->switch_to_blog($blog_id);
+    }
+
+    function wp_cache_reset()
+    {
+        _deprecated_function(__FUNCTION__, '3.5.0', 'wp_cache_switch_to_blog()');
+        $GLOBALS['wp_object_cache']->flush_runtime();
+    }
+}
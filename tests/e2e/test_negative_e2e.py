@@ -9,6 +9,8 @@ import requests
 import time
 from typing import Dict
 
+from tests import http_session
+
 
 class TestWordPressNegativeCases(unittest.TestCase):
     """WordPress 負面測試類"""
@@ -25,7 +27,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
                 "pwd": "wrong_password",
                 "wp-submit": "Log In"
             }
-            response = requests.post(
+            response = http_session.post(
                 f"{self.BASE_URL}/wp-login.php",
                 data=login_data,
                 timeout=self.TIMEOUT,
@@ -51,7 +53,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
         """測試未授權的 API 訪問（負面測試）"""
         try:
             # 嘗試訪問需要認證的 API 端點
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-json/wp/v2/users/me",
                 timeout=self.TIMEOUT
             )
@@ -71,7 +73,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
             large_file = b"x" * (65 * 1024 * 1024)  # 65MB，超過 64MB 限制
             files = {"file": ("large_file.txt", large_file)}
             
-            response = requests.post(
+            response = http_session.post(
                 f"{self.BASE_URL}/wp-admin/admin-ajax.php",
                 files=files,
                 timeout=30
@@ -94,7 +96,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
                 "action": "test",
                 "_wpnonce": "invalid_nonce_12345"
             }
-            response = requests.post(
+            response = http_session.post(
                 f"{self.BASE_URL}/wp-admin/admin-ajax.php",
                 data=data,
                 timeout=self.TIMEOUT
@@ -114,7 +116,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
         """測試 CSRF 防護（負面測試）"""
         try:
             # 嘗試跨站請求（沒有正確的 referer）
-            response = requests.post(
+            response = http_session.post(
                 f"{self.BASE_URL}/wp-admin/admin-ajax.php",
                 data={"action": "test"},
                 headers={"Referer": "http://evil-site.com"},
@@ -132,7 +134,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
         """測試超時處理（負面測試）"""
         try:
             # 發送一個可能導致超時的請求
-            response = requests.get(
+            response = http_session.get(
                 self.BASE_URL,
                 timeout=0.001  # 極短的超時時間
             )
@@ -147,7 +149,7 @@ class TestWordPressNegativeCases(unittest.TestCase):
     def test_malformed_json_request(self):
         """測試格式錯誤的 JSON 請求（負面測試）"""
         try:
-            response = requests.post(
+            response = http_session.post(
                 f"{self.BASE_URL}/wp-json/wp/v2",
                 json={"invalid": "json", "unclosed": True},  # 故意不完整
                 headers={"Content-Type": "application/json"},
@@ -173,7 +175,7 @@ class TestSecurityNegativeCases(unittest.TestCase):
         """測試目錄列表是否被禁用（負面測試）"""
         try:
             # 嘗試訪問目錄（應該返回 403 或 404，不應該列出目錄內容）
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-content/",
                 timeout=self.TIMEOUT,
                 allow_redirects=False
@@ -191,7 +193,7 @@ class TestSecurityNegativeCases(unittest.TestCase):
     def test_server_info_disclosure(self):
         """測試伺服器資訊洩露（負面測試）"""
         try:
-            response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+            response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
             headers = response.headers
             
             # Server 標頭不應該包含版本資訊
@@ -215,7 +217,7 @@ class TestSecurityNegativeCases(unittest.TestCase):
         """測試 HTTP 方法覆蓋攻擊（負面測試）"""
         try:
             # 嘗試使用 X-HTTP-Method-Override 標頭
-            response = requests.post(
+            response = http_session.post(
                 self.BASE_URL,
                 headers={"X-HTTP-Method-Override": "DELETE"},
                 timeout=self.TIMEOUT
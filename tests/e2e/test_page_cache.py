@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+E2E Tests for the Nginx Page Cache
+端到端測試：頁面微快取（config/nginx/fastcgi-cache.conf）的命中、略過規則、登入內容不外洩，
+以及文章更新後由 mu-plugin（config/wordpress/nginx-cache-refresh.php）重新產生快取
+
+登入相關的測試需要管理員帳號（WP_TEST_ADMIN_USER / WP_TEST_ADMIN_PASSWORD），未設定時略過；
+會建立並刪除一篇測試文章，需要啟用固定網址（plain 網址有 query string，不會被快取）。
+設定 WP_TEST_APP_PASSWORD（管理員的 Application Password）時，Authorization 測試會確認驗證成功的回應也不被快取。
+"""
+
+import os
+import time
+import unittest
+import uuid
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from tests import http_session
+from tests.performance.cache_bench import CACHE_HEADER, SERVED_FROM_CACHE
+
+ADMIN_USER = os.environ.get("WP_TEST_ADMIN_USER")
+ADMIN_PASSWORD = os.environ.get("WP_TEST_ADMIN_PASSWORD")
+APP_PASSWORD = os.environ.get("WP_TEST_APP_PASSWORD")
+# 登入後頁面才有的內容（管理工具列）
+LOGGED_IN_MARKER = "wpadminbar"
+
+
+def cache_status(response: requests.Response) -> Optional[str]:
+    value = response.headers.get(CACHE_HEADER)
+    return value.strip().upper() if value else None
+
+
+class TestPageCache(unittest.TestCase):
+    """頁面快取命中與略過規則測試類"""
+
+    BASE_URL = http_session.BASE_URL
+    TIMEOUT = 30
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return http_session.get(f"{self.BASE_URL}{path}", timeout=self.TIMEOUT, allow_redirects=False, **kwargs)
+
+    def cached_path(self) -> str:
+        """每次使用新的網址（404 頁面快取 10 秒），不受其他測試與先前的快取影響"""
+        path = f"/page-cache-e2e-{uuid.uuid4().hex[:12]}/"
+        try:
+            response = self.get(path)
+        except requests.exceptions.RequestException as e:
+            self.skipTest(f"無法連接到 Nginx: {e}")
+        if cache_status(response) is None:
+            self.skipTest(f"回應沒有 {CACHE_HEADER} 標頭，fastcgi_cache 未啟用")
+        if response.status_code != 404:
+            self.skipTest(f"WordPress 可能尚未安裝（狀態碼: {response.status_code}）")
+        self.assertEqual(cache_status(response), "MISS")
+        return path
+
+    def test_anonymous_hit(self):
+        """測試匿名請求第二次由快取回應，且快取的回應仍帶有安全標頭"""
+        path = self.cached_path()
+        response = self.get(path)
+        self.assertIn(cache_status(response), SERVED_FROM_CACHE)
+        for header in ("X-Frame-Options", "X-Content-Type-Options", "Content-Security-Policy"):
+            self.assertIn(header, response.headers, f"快取的回應缺少 {header}")
+
+    def test_skip_cache_rules(self):
+        """測試登入、留言者與 no-cache cookie、query string 與後台都略過快取"""
+        path = self.cached_path()
+        for cookie in ("wordpress_logged_in_0123abcd=admin%7C0", "comment_author_0123abcd=guest",
+                       "wordpress_no_cache=1", "wp-postpass_0123abcd=x"):
+            with self.subTest(cookie=cookie):
+                self.assertEqual(cache_status(self.get(path, headers={'Cookie': cookie})), "BYPASS")
+        self.assertEqual(cache_status(self.get(f"{path}?preview=true")), "BYPASS")
+        self.assertEqual(cache_status(self.get("/wp-admin/admin-ajax.php")), "BYPASS")
+        # 其他 cookie（例如分析工具）不影響快取
+        self.assertIn(cache_status(self.get(path, headers={'Cookie': "_ga=GA1.1.1"})), SERVED_FROM_CACHE)
+
+    def test_authorization_not_cached(self):
+        """測試帶有 Authorization 的 REST 請求（Application Passwords，沒有 cookie）略過快取，匿名請求看不到驗證後的回應"""
+        self.cached_path()
+        path = "/wp-json/wp/v2/users/me"
+        authorized = self.get(path, auth=(ADMIN_USER or "admin", APP_PASSWORD or "invalid-app-password"))
+        self.assertEqual(cache_status(authorized), "BYPASS")
+        if APP_PASSWORD:
+            self.assertEqual(authorized.status_code, 200, "Application Password 驗證失敗")
+        for _ in range(2):
+            anonymous = self.get(path)
+            self.assertEqual(anonymous.status_code, 401, "匿名請求收到驗證後的回應")
+            self.assertNotIn(cache_status(anonymous), SERVED_FROM_CACHE)
+
+
+@unittest.skipUnless(ADMIN_USER and ADMIN_PASSWORD, "未設定 WP_TEST_ADMIN_USER / WP_TEST_ADMIN_PASSWORD")
+class TestLoggedInPageCache(unittest.TestCase):
+    """登入使用者與文章更新測試類（整個類別只登入一次，避免觸發 login 限流）"""
+
+    BASE_URL = http_session.BASE_URL
+    TIMEOUT = 30
+    # 微快取 TTL 為 60 秒，在此時間內看到新內容代表快取已重新產生
+    REFRESH_TIMEOUT = 10
+
+    @classmethod
+    def setUpClass(cls):
+        cls.session = requests.Session()
+        cls.session.cookies.set("wordpress_test_cookie", "WP Cookie check")
+        response = cls.session.post(f"{cls.BASE_URL}/wp-login.php", timeout=cls.TIMEOUT, allow_redirects=False,
+                                    data={'log': ADMIN_USER, 'pwd': ADMIN_PASSWORD, 'testcookie': "1",
+                                          'redirect_to': f"{cls.BASE_URL}/wp-admin/"})
+        if not any(name.startswith("wordpress_logged_in") for name in cls.session.cookies.keys()):
+            raise unittest.SkipTest(f"無法登入 WordPress（狀態碼: {response.status_code}）")
+        nonce = cls.session.get(f"{cls.BASE_URL}/wp-admin/admin-ajax.php", params={'action': "rest-nonce"},
+                                timeout=cls.TIMEOUT)
+        cls.session.headers['X-WP-Nonce'] = nonce.text.strip()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.session.close()
+
+    def anonymous(self, path: str) -> requests.Response:
+        return http_session.get(f"{self.BASE_URL}{path}", timeout=self.TIMEOUT, allow_redirects=False)
+
+    def test_logged_in_content_not_cached(self):
+        """測試登入後的頁面不會被快取，之後的匿名請求看不到登入內容"""
+        response = self.session.get(f"{self.BASE_URL}/", timeout=self.TIMEOUT)
+        self.assertEqual(cache_status(response), "BYPASS")
+        self.assertIn(LOGGED_IN_MARKER, response.text)
+        for _ in range(2):
+            anonymous = self.anonymous("/")
+            self.assertNotIn(LOGGED_IN_MARKER, anonymous.text, "匿名請求收到登入使用者的頁面")
+            self.assertNotIn(ADMIN_USER, anonymous.headers.get("Set-Cookie", ""))
+
+    def wait_for(self, path: str, predicate) -> requests.Response:
+        deadline = time.monotonic() + self.REFRESH_TIMEOUT
+        while True:
+            response = self.anonymous(path)
+            if predicate(response) or time.monotonic() > deadline:
+                return response
+            time.sleep(0.5)
+
+    def test_refresh_on_post_update(self):
+        """測試文章更新與刪除後，匿名請求在快取過期前就看到新內容"""
+        title = f"Page cache e2e {uuid.uuid4().hex[:8]}"
+        created = self.session.post(f"{self.BASE_URL}/wp-json/wp/v2/posts", timeout=self.TIMEOUT,
+                                    json={'title': title, 'content': "before", 'status': "publish"})
+        if created.status_code != 201:
+            self.skipTest(f"無法以 REST API 建立文章（狀態碼: {created.status_code}）")
+        post = created.json()
+        endpoint = f"{self.BASE_URL}/wp-json/wp/v2/posts/{post['id']}"
+        try:
+            link = urlsplit(post['link'])
+            if link.query:
+                self.skipTest("未啟用固定網址，文章網址有 query string 不會被快取")
+            path = link.path
+            self.anonymous(path)
+            self.assertIn(cache_status(self.anonymous(path)), SERVED_FROM_CACHE)
+
+            self.session.post(endpoint, json={'content': "after-update"}, timeout=self.TIMEOUT).raise_for_status()
+            response = self.wait_for(path, lambda r: "after-update" in r.text)
+            self.assertIn("after-update", response.text, f"{self.REFRESH_TIMEOUT} 秒內快取沒有重新產生")
+        finally:
+            self.session.delete(endpoint, params={'force': "true"}, timeout=self.TIMEOUT)
+        response = self.wait_for(path, lambda r: r.status_code == 404)
+        self.assertEqual(response.status_code, 404, "刪除的文章仍由快取回應")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
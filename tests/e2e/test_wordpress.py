@@ -10,6 +10,9 @@ import time
 import subprocess
 from typing import Dict, Optional
 
+from tests import http_session
+from tests.readiness import ServicesNotReady, format_results, wait_until_ready
+
 
 class TestWordPressInstallation(unittest.TestCase):
     """WordPress 安裝測試類"""
@@ -24,23 +27,19 @@ class TestWordPressInstallation(unittest.TestCase):
         cls.wait_for_services()
 
     @classmethod
-    def wait_for_services(cls, max_attempts: int = 30):
-        """等待服務啟動"""
-        for attempt in range(max_attempts):
-            try:
-                response = requests.get(f"{cls.BASE_URL}/health", timeout=5)
-                if response.status_code == 200:
-                    print("服務已啟動")
-                    return
-            except requests.exceptions.RequestException:
-                pass
-            time.sleep(2)
-        raise Exception("服務啟動超時")
+    def wait_for_services(cls, timeout: float = 60):
+        """等待 nginx 與 PHP-FPM 就緒（指數退避，就緒即返回）"""
+        try:
+            results = wait_until_ready(cls.BASE_URL, timeout, include_mysql=False)
+        except ServicesNotReady as e:
+            raise Exception("服務啟動超時") from e
+        print("服務已啟動")
+        print(format_results(results))
 
     def test_nginx_health_endpoint(self):
         """測試 Nginx 健康檢查端點"""
         try:
-            response = requests.get(f"{self.BASE_URL}/health", timeout=10)
+            response = http_session.get(f"{self.BASE_URL}/health", timeout=10)
             self.assertEqual(
                 response.status_code,
                 200,
@@ -53,7 +52,7 @@ class TestWordPressInstallation(unittest.TestCase):
     def test_wordpress_homepage_accessible(self):
         """測試 WordPress 首頁是否可以訪問"""
         try:
-            response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+            response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
             self.assertEqual(
                 response.status_code,
                 200,
@@ -71,7 +70,7 @@ class TestWordPressInstallation(unittest.TestCase):
     def test_wordpress_installation_page(self):
         """測試 WordPress 安裝頁面"""
         try:
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-admin/install.php",
                 timeout=self.TIMEOUT
             )
@@ -86,7 +85,7 @@ class TestWordPressInstallation(unittest.TestCase):
     def test_wordpress_api_endpoint(self):
         """測試 WordPress REST API 端點"""
         try:
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-json/wp/v2",
                 timeout=self.TIMEOUT
             )
@@ -119,7 +118,7 @@ class TestWordPressInstallation(unittest.TestCase):
         
         for static_file in static_files:
             try:
-                response = requests.get(
+                response = http_session.get(
                     f"{self.BASE_URL}{static_file}",
                     timeout=self.TIMEOUT
                 )
@@ -134,7 +133,7 @@ class TestWordPressInstallation(unittest.TestCase):
     def test_php_execution(self):
         """測試 PHP 檔案是否可以正常執行"""
         try:
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-admin/load-styles.php",
                 timeout=self.TIMEOUT
             )
@@ -151,7 +150,7 @@ class TestWordPressInstallation(unittest.TestCase):
         """測試資料庫連接（通過 WordPress 配置檢查）"""
         try:
             # 檢查 wp-config.php 是否被正確保護
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-config.php",
                 timeout=self.TIMEOUT,
                 allow_redirects=False
@@ -176,7 +175,7 @@ class TestWordPressFunctionality(unittest.TestCase):
     def test_wordpress_version(self):
         """測試 WordPress 版本資訊"""
         try:
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/wp-json/wp/v2",
                 timeout=self.TIMEOUT
             )
@@ -190,7 +189,7 @@ class TestWordPressFunctionality(unittest.TestCase):
     def test_cors_headers(self):
         """測試 CORS 標頭配置"""
         try:
-            response = requests.options(
+            response = http_session.options(
                 self.BASE_URL,
                 timeout=self.TIMEOUT
             )
@@ -204,7 +203,7 @@ class TestWordPressFunctionality(unittest.TestCase):
         """測試響應時間"""
         try:
             start_time = time.time()
-            response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+            response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
             end_time = time.time()
             
             response_time = end_time - start_time
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Session
+所有測試套件共用的 HTTP 連線池：重用 keep-alive 連線，可依主機調整池大小或強制新連線
+
+環境變數：
+  WP_TEST_BASE_URL           性能測試的目標網址（預設 http://localhost，替身伺服器見 tests/performance/standin.py）
+  WP_TEST_INTERNAL_URL       nginx 內部 server 的網址（狀態頁；預設 http://127.0.0.1:8081，由 docker-compose.bench.yml 發佈）
+  WP_TEST_POOL_MAXSIZE       每個主機的連線池大小（預設 10）
+  WP_TEST_FRESH_CONNECTIONS  設為 1 時每個請求都建立新連線（Connection: close）
+"""
+
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+BASE_URL = os.environ.get("WP_TEST_BASE_URL", "http://localhost")
+INTERNAL_URL = os.environ.get("WP_TEST_INTERNAL_URL", "http://127.0.0.1:8081")
+DEFAULT_POOL_MAXSIZE = int(os.environ.get("WP_TEST_POOL_MAXSIZE", "10"))
+FRESH_CONNECTIONS = os.environ.get("WP_TEST_FRESH_CONNECTIONS", "0") == "1"
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_settings = {
+    'pool_maxsize': DEFAULT_POOL_MAXSIZE,
+    'fresh_connections': FRESH_CONNECTIONS,
+    'host_pool_sizes': {},
+}
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def create_session(
+    pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    fresh_connections: bool = False,
+    host_pool_sizes: Optional[Dict[str, int]] = None,
+) -> requests.Session:
+    """
+    建立新的 Session
+
+    host_pool_sizes 以 "http://host:port" 為鍵，為個別主機指定連線池大小；
+    fresh_connections 為 True 時送出 Connection: close，每個請求都重新握手。
+    """
+    session = requests.Session()
+    # 不保存伺服器設定的 cookie，避免測試之間互相影響（與模組層級 requests.get 行為一致）
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(pool_connections=10, pool_maxsize=pool_maxsize, pool_block=False)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    for url, size in (host_pool_sizes or {}).items():
+        session.mount(_origin(url), HTTPAdapter(pool_connections=1, pool_maxsize=size))
+    if fresh_connections:
+        session.headers['Connection'] = 'close'
+    return session
+
+
+def configure(
+    pool_maxsize: Optional[int] = None,
+    fresh_connections: Optional[bool] = None,
+    host_pool_sizes: Optional[Dict[str, int]] = None,
+):
+    """調整共用 Session 的設定，下一個請求起生效"""
+    global _session
+    with _lock:
+        if pool_maxsize is not None:
+            _settings['pool_maxsize'] = pool_maxsize
+        if fresh_connections is not None:
+            _settings['fresh_connections'] = fresh_connections
+        if host_pool_sizes is not None:
+            _settings['host_pool_sizes'] = dict(host_pool_sizes)
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def settings() -> Dict:
+    """目前共用 Session 的設定"""
+    with _lock:
+        return dict(_settings)
+
+
+def get_session() -> requests.Session:
+    """取得共用 Session（第一次使用時建立）"""
+    global _session
+    with _lock:
+        if _session is None:
+            _session = create_session(**_settings)
+        return _session
+
+
+def request(method: str, url: str, **kwargs) -> requests.Response:
+    return get_session().request(method, url, **kwargs)
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return get_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> requests.Response:
+    return get_session().post(url, **kwargs)
+
+
+def options(url: str, **kwargs) -> requests.Response:
+    return get_session().options(url, **kwargs)
+
+
+def head(url: str, **kwargs) -> requests.Response:
+    return get_session().head(url, **kwargs)
@@ -0,0 +1,4 @@
+"""
+Monitoring Package
+監控工具：在測試與負載期間採集容器、服務與日誌數據
+"""
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Compose Resource Limits
+讀取 docker-compose.yml 各服務的 deploy.resources.limits（cpus、memory），
+供調校工具在沒有啟動容器時估算 CPU 與記憶體預算（執行中的容器以 resource_sampler 讀取 cgroup），
+以及設定檔的 bind mount（tuning_sweep 以覆蓋檔將產生的設定掛載到相同路徑）與各服務的清單設定（ports 等）
+
+只解析本專案 compose 檔案使用的區塊縮排格式，不依賴 PyYAML。
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+COMPOSE_FILE = os.path.join(REPO_ROOT, "docker-compose.yml")
+BENCH_COMPOSE_FILE = os.path.join(REPO_ROOT, "docker-compose.bench.yml")
+
+MEMORY_UNITS = {'': 1, 'b': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3}
+
+
+@dataclass(frozen=True)
+class ServiceLimits:
+    """一個服務的資源上限（未設定為 None）"""
+
+    cpus: Optional[float] = None
+    memory: Optional[int] = None
+
+
+def parse_memory(value: str) -> int:
+    """將 compose 的記憶體字串（512M、1G、128m）轉為位元組"""
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([bkmg]?)b?\s*', value.lower())
+    if not match:
+        raise ValueError(f"無法解析記憶體大小: {value}")
+    return int(float(match.group(1)) * MEMORY_UNITS[match.group(2)])
+
+
+def _indent(line: str) -> int:
+    return len(line) - len(line.lstrip(' '))
+
+
+def _service_lines(compose: str) -> Iterator[Tuple[str, int, str]]:
+    """逐行回傳 services 下各服務的 (服務名稱, 縮排, 去除縮排的內容)，服務名稱那一行的內容為空字串"""
+    lines = [line.split(' #')[0].rstrip() for line in compose.splitlines()]
+    lines = [line for line in lines if line.strip() and not line.lstrip().startswith('#')]
+    in_services = False
+    service_indent = None
+    service = None
+    for line in lines:
+        indent = _indent(line)
+        if indent == 0:
+            in_services = line.strip().partition(':')[0] == "services"
+            service_indent = service = None
+            continue
+        if not in_services:
+            continue
+        if service_indent is None or indent == service_indent:
+            service_indent = indent
+            service = line.strip().partition(':')[0]
+            yield service, indent, ""
+        elif indent > service_indent:
+            yield service, indent, line.strip()
+
+
+def parse_limits(compose: str) -> Dict[str, ServiceLimits]:
+    """回傳 {服務名稱: ServiceLimits}（只包含 services 下的服務）"""
+    limits: Dict[str, ServiceLimits] = {}
+    path = []
+    for service, indent, line in _service_lines(compose):
+        if not line:
+            limits[service] = ServiceLimits()
+            path = []
+            continue
+        key, _, value = line.partition(':')
+        value = value.strip().strip("'\"")
+        # 以縮排追蹤目前的鍵路徑（deploy → resources → limits）
+        while path and path[-1][0] >= indent:
+            path.pop()
+        keys = [name for _, name in path]
+        if keys == ["deploy", "resources", "limits"] and value:
+            current = limits[service]
+            if key == "cpus":
+                limits[service] = ServiceLimits(float(value), current.memory)
+            elif key == "memory":
+                limits[service] = ServiceLimits(current.cpus, parse_memory(value))
+        if not value:
+            path.append((indent, key))
+    return limits
+
+
+def parse_mounts(compose: str) -> Dict[str, Tuple[str, str]]:
+    """回傳 {專案內的相對路徑: (服務名稱, 容器內路徑)}（只包含 ./ 開頭的 bind mount）"""
+    mounts = {}
+    for service, _, line in _service_lines(compose):
+        match = re.fullmatch(r'-\s*["\']?\./([^:"\']+):([^:"\']+)(?::\w+)?["\']?', line)
+        if match:
+            mounts[match.group(1)] = (service, match.group(2))
+    return mounts
+
+
+def parse_lists(compose: str, key: str) -> Dict[str, List[str]]:
+    """回傳各服務第一層 key（ports 等）下的清單項目 {服務名稱: [值]}（沒有設定的服務不包含在內）"""
+    lists: Dict[str, List[str]] = {}
+    child_indent = None
+    in_list = False
+    for service, indent, line in _service_lines(compose):
+        if not line:
+            child_indent = None
+            in_list = False
+            continue
+        if child_indent is None:
+            child_indent = indent
+        if indent == child_indent:
+            in_list = line.partition(':')[0] == key
+            if in_list:
+                lists[service] = []
+        elif in_list and line.startswith('-'):
+            lists[service].append(line[1:].strip().strip("'\""))
+    return lists
+
+
+def load_limits(path: str = COMPOSE_FILE) -> Dict[str, ServiceLimits]:
+    with open(path, encoding="utf-8") as f:
+        return parse_limits(f.read())
+
+
+def load_mounts(path: str = COMPOSE_FILE) -> Dict[str, Tuple[str, str]]:
+    with open(path, encoding="utf-8") as f:
+        return parse_mounts(f.read())
+
+
+def load_lists(key: str, path: str = COMPOSE_FILE) -> Dict[str, List[str]]:
+    with open(path, encoding="utf-8") as f:
+        return parse_lists(f.read(), key)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Docker Engine API Client
+透過 Docker socket 直接呼叫 Engine API，不需要為每次查詢 fork docker CLI
+"""
+
+import http.client
+import io
+import json
+import os
+import socket
+import tarfile
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import quote
+
+DOCKER_SOCKET = os.environ.get("DOCKER_SOCKET", "/var/run/docker.sock")
+
+
+class DockerAPIError(Exception):
+    """Docker API 無法連線或回傳錯誤"""
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class DockerAPI:
+    """Docker Engine API 的最小客戶端"""
+
+    def __init__(self, socket_path: str = DOCKER_SOCKET, timeout: float = 10):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _open(self, path: str, timeout: float = None, method: str = "GET", body: bytes = None,
+              headers: Dict[str, str] = None) -> http.client.HTTPResponse:
+        connection = _UnixHTTPConnection(self.socket_path, timeout or self.timeout)
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+        except OSError as e:
+            connection.close()
+            raise DockerAPIError(f"無法連接 Docker socket {self.socket_path}: {e}") from e
+        if response.status not in (200, 204):
+            body = response.read().decode(errors="replace")
+            connection.close()
+            raise DockerAPIError(f"Docker API {path} 回傳 {response.status}: {body.strip()}")
+        return response
+
+    def get(self, path: str) -> Dict:
+        """發送 GET 請求並解析 JSON"""
+        response = self._open(path)
+        try:
+            return json.loads(response.read())
+        finally:
+            response.close()
+
+    def post(self, path: str, body: bytes = None, method: str = "POST", content_type: str = "application/json"):
+        """發送 POST / PUT 請求（不解析回應）"""
+        response = self._open(path, method=method, body=body, headers={'Content-Type': content_type})
+        try:
+            response.read()
+        finally:
+            response.close()
+
+    def inspect(self, container: str) -> Dict:
+        """等同 docker inspect"""
+        return self.get(f"/containers/{quote(container)}/json")
+
+    def stats_stream(self, container: str) -> Iterator[Dict]:
+        """等同 docker stats（串流），daemon 約每秒推送一筆"""
+        response = self._open(f"/containers/{quote(container)}/stats?stream=true", timeout=30)
+        try:
+            for line in response:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        finally:
+            response.close()
+
+    def top(self, container: str) -> List[Tuple[int, str]]:
+        """等同 docker top：回傳 [(主機 PID, 命令列)]"""
+        result = self.get(f"/containers/{quote(container)}/top")
+        titles = result.get('Titles') or []
+        pid_column = titles.index('PID')
+        command_column = next(i for i, title in enumerate(titles) if title in ('CMD', 'COMMAND'))
+        return [(int(row[pid_column]), row[command_column]) for row in result.get('Processes') or []]
+
+    def put_file(self, container: str, directory: str, name: str, content: bytes, mode: int = 0o644):
+        """等同 docker cp：將單一檔案寫入容器的 directory"""
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as archive:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            info.mode = mode
+            archive.addfile(info, io.BytesIO(content))
+        self.post(f"/containers/{quote(container)}/archive?path={quote(directory)}", buffer.getvalue(),
+                  method="PUT", content_type="application/x-tar")
+
+    def kill(self, container: str, signal: str = "SIGKILL"):
+        """等同 docker kill --signal（送給容器的主進程）"""
+        self.post(f"/containers/{quote(container)}/kill?signal={quote(signal)}")
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+PHP-FPM Worker Memory Sampler
+PHP-FPM worker 記憶體取樣：以 Docker API（docker top）找出容器內 php-fpm 進程的主機 PID，
+讀取 /proc/<pid>/smaps_rollup 取得每個進程的 RSS、PSS 與私有記憶體（USS）
+
+RSS 重複計算共用頁面（OPcache 共享記憶體、php 執行檔），加總會高估；PSS 將共用頁面分攤給各進程，
+加總即為 pool 實際佔用。每多一個 worker 增加的是它的 USS，其餘（master 與共用頁面）只算一次，
+因此 pool 記憶體 ≈ base + max_children × worker USS。
+讀不到主機 /proc（例如 Docker Desktop）時改以容器記憶體用量平均分攤估計（會高估每個 worker）。
+
+用法：
+    with WorkerMemorySampler("wordpress_app", interval=1) as sampler:
+        run_load()
+    print(format_report(sampler.summary()))
+
+    python3 -m tests.monitor.fpm_memory --duration 30     # 取樣期間另外施加負載
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from tests.monitor.docker_api import DockerAPI, DockerAPIError
+from tests.monitor.resource_sampler import parse_stats_json
+from tests.performance.timing import now_ns
+
+CONTAINER = "wordpress_app"
+MB = 1024 ** 2
+SMAPS = "smaps"
+CGROUP = "cgroup"
+
+
+def parse_smaps_rollup(text: str) -> Dict[str, int]:
+    """解析 /proc/<pid>/smaps_rollup，回傳各欄位的位元組數"""
+    values = {}
+    for line in text.splitlines():
+        key, sep, rest = line.partition(':')
+        parts = rest.split()
+        if sep and len(parts) == 2 and parts[1] == 'kB':
+            values[key.strip()] = int(parts[0]) * 1024
+    return values
+
+
+def fpm_role(command: str) -> Optional[str]:
+    """由命令列判斷 php-fpm 進程角色：master、worker 或 None（不是 php-fpm）"""
+    if not command.startswith("php-fpm"):
+        return None
+    if "master process" in command:
+        return "master"
+    return "worker" if "pool " in command else None
+
+
+@dataclass
+class ProcessMemory:
+    """單一進程的記憶體（位元組）"""
+
+    pid: int
+    role: str
+    rss: int
+    pss: int
+    uss: int
+
+
+@dataclass
+class MemorySnapshot:
+    """某時間點所有 php-fpm 進程的記憶體"""
+
+    t_ns: int
+    processes: List[ProcessMemory] = field(default_factory=list)
+
+    @property
+    def workers(self) -> List[ProcessMemory]:
+        return [process for process in self.processes if process.role == "worker"]
+
+    @property
+    def total_pss(self) -> int:
+        return sum(process.pss for process in self.processes)
+
+    @property
+    def base(self) -> int:
+        """與 worker 數量無關的部分：master 與共用頁面（只算一次）"""
+        return self.total_pss - sum(worker.uss for worker in self.workers)
+
+
+def _percentile(values: List[int], percent: float) -> int:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)] if ordered else 0
+
+
+@dataclass
+class MemorySummary:
+    """取樣期間的 worker 記憶體（各 worker 取其峰值，再取分佈）"""
+
+    samples: int
+    source: str
+    peak_workers: int = 0
+    worker_uss_p50: int = 0
+    worker_uss_p95: int = 0
+    worker_uss_max: int = 0
+    worker_pss_max: int = 0
+    worker_rss_max: int = 0
+    base: int = 0
+    peak_total: int = 0
+
+    @property
+    def estimated(self) -> bool:
+        return self.source != SMAPS
+
+    def pool_bytes(self, workers: int) -> int:
+        """workers 個 worker 都達到 p95 峰值時的 pool 記憶體"""
+        return self.base + workers * self.worker_uss_p95
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+
+def summarize(snapshots: List[MemorySnapshot], source: str = SMAPS) -> MemorySummary:
+    summary = MemorySummary(len(snapshots), source)
+    peaks: Dict[int, ProcessMemory] = {}
+    for snapshot in snapshots:
+        summary.peak_workers = max(summary.peak_workers, len(snapshot.workers))
+        summary.base = max(summary.base, snapshot.base)
+        summary.peak_total = max(summary.peak_total, snapshot.total_pss)
+        for worker in snapshot.workers:
+            peak = peaks.get(worker.pid)
+            if peak is None or worker.uss > peak.uss:
+                peaks[worker.pid] = worker
+    if peaks:
+        uss = [worker.uss for worker in peaks.values()]
+        summary.worker_uss_p50 = _percentile(uss, 50)
+        summary.worker_uss_p95 = _percentile(uss, 95)
+        summary.worker_uss_max = max(uss)
+        summary.worker_pss_max = max(worker.pss for worker in peaks.values())
+        summary.worker_rss_max = max(worker.rss for worker in peaks.values())
+    return summary
+
+
+class WorkerMemorySampler:
+    """
+    背景取樣 php-fpm 進程記憶體
+
+    worker 會因 pm.max_requests 回收或 dynamic / ondemand 增減，每次取樣重新列出進程。
+    """
+
+    def __init__(self, container: str = CONTAINER, interval: float = 1.0, docker: Optional[DockerAPI] = None,
+                 proc_root: str = "/proc"):
+        self.container = container
+        self.interval = interval
+        self.docker = docker or DockerAPI()
+        self.proc_root = proc_root
+        self.source = SMAPS
+        self.snapshots: List[MemorySnapshot] = []
+        self.errors = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _read_smaps(self, pid: int) -> Dict[str, int]:
+        with open(os.path.join(self.proc_root, str(pid), "smaps_rollup")) as f:
+            return parse_smaps_rollup(f.read())
+
+    def snapshot(self) -> MemorySnapshot:
+        snapshot = MemorySnapshot(now_ns())
+        processes = [(pid, fpm_role(command)) for pid, command in self.docker.top(self.container)]
+        processes = [(pid, role) for pid, role in processes if role is not None]
+        if self.source == SMAPS:
+            try:
+                for pid, role in processes:
+                    try:
+                        values = self._read_smaps(pid)
+                    except FileNotFoundError:
+                        # 取樣期間被回收的 worker
+                        continue
+                    uss = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+                    snapshot.processes.append(ProcessMemory(pid, role, values.get('Rss', 0),
+                                                            values.get('Pss', 0), uss))
+                return snapshot
+            except OSError:
+                self.source = CGROUP
+                snapshot.processes = []
+        if processes:
+            stats = self.docker.get(f"/containers/{self.container}/stats?stream=false")
+            share = parse_stats_json(stats).memory_bytes // len(processes)
+            snapshot.processes = [ProcessMemory(pid, role, share, share, share) for pid, role in processes]
+        return snapshot
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.snapshots.append(self.snapshot())
+            except (DockerAPIError, OSError, ValueError):
+                self.errors += 1
+
+    def start(self) -> "WorkerMemorySampler":
+        self.snapshots.append(self.snapshot())
+        self._thread = threading.Thread(target=self._run, name="fpm-memory", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.docker.timeout)
+
+    def __enter__(self) -> "WorkerMemorySampler":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def summary(self) -> MemorySummary:
+        return summarize(self.snapshots, self.source)
+
+
+def format_report(summary: MemorySummary) -> str:
+    source = "smaps_rollup" if not summary.estimated else "容器記憶體平均分攤（估計值）"
+    return "\n".join([
+        f"PHP-FPM 記憶體（{summary.samples} 次取樣，來源: {source}）",
+        f"  worker 峰值 USS: p50 {summary.worker_uss_p50 / MB:.1f}MB  p95 {summary.worker_uss_p95 / MB:.1f}MB  "
+        f"max {summary.worker_uss_max / MB:.1f}MB（PSS max {summary.worker_pss_max / MB:.1f}MB，"
+        f"RSS max {summary.worker_rss_max / MB:.1f}MB）",
+        f"  master 與共用頁面: {summary.base / MB:.1f}MB，pool 峰值 {summary.peak_total / MB:.1f}MB"
+        f"（{summary.peak_workers} 個 worker）",
+    ])
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="取樣 PHP-FPM worker 記憶體（RSS / PSS / USS）")
+    parser.add_argument("--container", default=CONTAINER, help="WordPress 容器名稱")
+    parser.add_argument("--interval", type=float, default=1.0, help="取樣間隔秒數")
+    parser.add_argument("--duration", type=float, default=10, help="取樣秒數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    try:
+        with WorkerMemorySampler(args.container, args.interval) as sampler:
+            time.sleep(args.duration)
+    except DockerAPIError as e:
+        print(f"無法讀取容器進程: {e}", file=sys.stderr)
+        return 1
+    summary = sampler.summary()
+    print(json.dumps(summary.to_dict(), indent=2) if args.json else format_report(summary))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+"""
+PHP-FPM Status Poller
+PHP-FPM 狀態頁取樣：負載測試期間定期讀取 pm.status_path（/fpm-status?json），
+記錄 active / idle 進程、listen queue、max children reached 與 slow requests，
+並與客戶端延遲依時間對齊，判斷 pm.max_children 是否為實際的瓶頸
+
+狀態頁由 nginx 內部 server（config/nginx/internal.conf，不對外發佈）的 location = /fpm-status
+轉到 pm.status_listen（9001）的獨立 pool；www pool 的 worker 全部忙碌時仍可回應，不會與負載一起排隊。
+主機上取樣需以 docker-compose.bench.yml 將內部 server 發佈到 127.0.0.1（WP_TEST_INTERNAL_URL）。
+替身伺服器（tests/performance/standin.py）以相同欄位模擬 FaultProfile.workers 的 worker 池。
+
+用法：
+    timeline = LatencyTimeline()
+    with FpmStatusPoller(interval=0.5) as poller:
+        run_open_loop(url, rate, duration, on_response=timeline)
+    print(format_report(poller.analyze(timeline)))
+
+    python3 -m tests.monitor.fpm_status --duration 60     # 持續取樣並輸出每次的狀態
+"""
+
+import argparse
+import bisect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+
+from tests import http_session
+from tests.performance.timing import now_ns
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PHP_FPM_CONF = os.path.join(REPO_ROOT, "config", "php", "php-fpm.conf")
+STATUS_PATH = "/fpm-status"
+# 排隊或 worker 全忙的取樣比例超過此值，且排隊時延遲明顯較高，判定 max_children 為瓶頸
+SATURATED_SAMPLE_RATIO = 0.05
+LATENCY_INFLATION = 2.0
+
+# 狀態頁欄位 → FpmStatus 屬性
+FIELDS = {
+    'pool': 'pool',
+    'process manager': 'process_manager',
+    'accepted conn': 'accepted_conn',
+    'listen queue': 'listen_queue',
+    'max listen queue': 'max_listen_queue',
+    'listen queue len': 'listen_queue_len',
+    'idle processes': 'idle',
+    'active processes': 'active',
+    'total processes': 'total',
+    'max active processes': 'max_active',
+    'max children reached': 'max_children_reached',
+    'slow requests': 'slow_requests',
+}
+
+
+class FpmStatusUnavailable(Exception):
+    """狀態頁無法讀取（未設定 pm.status_path、location 不允許此來源或服務未啟動）"""
+
+
+def load_pool_config(path: str = PHP_FPM_CONF, pool: str = "www") -> Dict[str, str]:
+    """
+    讀取 php-fpm.conf 中指定 pool 的設定（去除 ; 註解）
+
+    倉庫的 php-fpm.conf 掛載為 php-fpm.d/zz-custom.conf，在映像的 www.conf 之後載入，即為實際生效的設定。
+    """
+    config: Dict[str, str] = {}
+    current = None
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split(';', 1)[0].strip()
+            section = re.fullmatch(r'\[(.+)\]', line)
+            if section:
+                current = section.group(1)
+            elif current == pool and '=' in line:
+                key, _, value = line.partition('=')
+                config[key.strip()] = value.strip()
+    return config
+
+
+@dataclass
+class FpmStatus:
+    """一次狀態頁取樣"""
+
+    t_ns: int
+    pool: str = ""
+    process_manager: str = ""
+    accepted_conn: int = 0
+    listen_queue: int = 0
+    max_listen_queue: int = 0
+    listen_queue_len: int = 0
+    idle: int = 0
+    active: int = 0
+    total: int = 0
+    max_active: int = 0
+    max_children_reached: int = 0
+    slow_requests: int = 0
+
+
+def parse_status(text: str, t_ns: int = 0) -> FpmStatus:
+    """解析 ?json 或純文字格式的狀態頁"""
+    try:
+        values = json.loads(text)
+    except ValueError:
+        values = {}
+        for line in text.splitlines():
+            key, sep, value = line.partition(':')
+            if sep:
+                values[key.strip()] = value.strip()
+    if not isinstance(values, dict) or 'accepted conn' not in values:
+        raise ValueError("不是 PHP-FPM 狀態頁")
+    status = FpmStatus(t_ns)
+    for key, attribute in FIELDS.items():
+        if key in values:
+            default = getattr(status, attribute)
+            setattr(status, attribute, values[key] if isinstance(default, str) else int(values[key]))
+    return status
+
+
+class LatencyTimeline:
+    """
+    記錄每個回應完成的時間與延遲，供與狀態頁取樣依時間對齊
+
+    可直接作為 run_open_loop / ScenarioRunner 的 on_response。
+    """
+
+    def __init__(self):
+        self.points: List[Tuple[int, float]] = []
+
+    def __call__(self, method: str, path: str, status: int, headers, latency_ms: float):
+        if status != 429:
+            self.points.append((now_ns(), latency_ms))
+
+
+def _percentile(values: Sequence[float], percent: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+
+def _correlation(xs: Sequence[float], ys: Sequence[float]) -> Optional[float]:
+    if len(xs) < 3:
+        return None
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    var_x = sum((x - mean_x) ** 2 for x in xs)
+    var_y = sum((y - mean_y) ** 2 for y in ys)
+    return cov / (var_x * var_y) ** 0.5 if var_x and var_y else None
+
+
+@dataclass
+class FpmAnalysis:
+    """取樣期間的 pool 飽和程度與延遲關聯"""
+
+    samples: int
+    max_children: Optional[int]
+    duration: float = 0.0
+    accepted: int = 0
+    peak_active: int = 0
+    peak_listen_queue: int = 0
+    max_children_reached: int = 0
+    slow_requests: int = 0
+    # worker 全忙或有請求排隊的取樣比例
+    saturated_ratio: float = 0.0
+    # 處理期間（送出到完成）pool 曾飽和 / 未曾飽和的請求 p99
+    p99_saturated: Optional[float] = None
+    p99_unsaturated: Optional[float] = None
+    queue_latency_correlation: Optional[float] = None
+    windows: List[Dict] = field(default_factory=list)
+
+    @property
+    def throughput(self) -> float:
+        return self.accepted / self.duration if self.duration else 0.0
+
+    @property
+    def bottleneck(self) -> bool:
+        """max_children 是否為實際的限制：pool 經常飽和，且飽和時延遲明顯較高（沒有客戶端延遲時只看飽和）"""
+        saturated = self.max_children_reached > 0 or self.saturated_ratio >= SATURATED_SAMPLE_RATIO
+        if not saturated:
+            return False
+        if self.p99_saturated is None or not self.p99_unsaturated:
+            return True
+        return self.p99_saturated >= self.p99_unsaturated * LATENCY_INFLATION
+
+    def to_dict(self) -> Dict:
+        result = asdict(self)
+        result.update(throughput=self.throughput, bottleneck=self.bottleneck)
+        return result
+
+
+def analyze(samples: Sequence[FpmStatus], timeline: Optional[LatencyTimeline] = None,
+            max_children: Optional[int] = None) -> FpmAnalysis:
+    """
+    彙總取樣；提供 timeline 時將客戶端延遲與 pool 狀態依時間對齊
+
+    請求依處理期間內的取樣（含送出前最後一次）是否飽和分組比較 p99：延遲落後於排隊，
+    listen queue 清空後才完成的請求仍屬於飽和組。windows 另列出各取樣區間完成的請求 p99 與排隊長度。
+    """
+    analysis = FpmAnalysis(len(samples), max_children)
+    if not samples:
+        return analysis
+    first, last = samples[0], samples[-1]
+    analysis.duration = (last.t_ns - first.t_ns) / 1e9
+    analysis.accepted = last.accepted_conn - first.accepted_conn
+    analysis.peak_active = max(sample.active for sample in samples)
+    analysis.peak_listen_queue = max(max(sample.listen_queue for sample in samples),
+                                     last.max_listen_queue if last.max_listen_queue > first.max_listen_queue else 0)
+    analysis.max_children_reached = last.max_children_reached - first.max_children_reached
+    analysis.slow_requests = last.slow_requests - first.slow_requests
+
+    def saturated(sample: FpmStatus) -> bool:
+        full = max_children is not None and sample.active >= max_children
+        return sample.listen_queue > 0 or full
+
+    analysis.saturated_ratio = sum(saturated(sample) for sample in samples) / len(samples)
+    if timeline is None or len(samples) < 2:
+        return analysis
+
+    points = sorted(timeline.points)
+    times = [sample.t_ns for sample in samples]
+    # 飽和取樣數的前綴和：任一區間內是否有飽和取樣
+    prefix = [0]
+    for sample in samples:
+        prefix.append(prefix[-1] + saturated(sample))
+    saturated_latencies, unsaturated_latencies = [], []
+    for end, latency in points:
+        lo = max(bisect.bisect_right(times, end - latency * 1e6) - 1, 0)
+        hi = bisect.bisect_right(times, end)
+        (saturated_latencies if prefix[hi] > prefix[lo] else unsaturated_latencies).append(latency)
+    if saturated_latencies:
+        analysis.p99_saturated = _percentile(saturated_latencies, 99)
+    if unsaturated_latencies:
+        analysis.p99_unsaturated = _percentile(unsaturated_latencies, 99)
+
+    index = 0
+    queues, p99s = [], []
+    for previous, sample in zip(samples, samples[1:]):
+        latencies = []
+        while index < len(points) and points[index][0] <= sample.t_ns:
+            if points[index][0] > previous.t_ns:
+                latencies.append(points[index][1])
+            index += 1
+        if not latencies:
+            continue
+        p99 = _percentile(latencies, 99)
+        # 區間兩端的排隊長度取較大者（短暫排隊也會拉高該區間的延遲）
+        queue = max(previous.listen_queue, sample.listen_queue)
+        is_saturated = saturated(previous) or saturated(sample)
+        analysis.windows.append({
+            't': (sample.t_ns - first.t_ns) / 1e9, 'requests': len(latencies), 'p99': p99,
+            'active': sample.active, 'listen_queue': queue, 'saturated': is_saturated,
+        })
+        queues.append(queue)
+        p99s.append(p99)
+    analysis.queue_latency_correlation = _correlation(queues, p99s)
+    return analysis
+
+
+class FpmStatusPoller:
+    """
+    背景狀態頁取樣器
+
+    start() 先讀取一次，無法讀取時拋出 FpmStatusUnavailable（呼叫端可略過）；
+    之後每 interval 秒取樣一次，取樣失敗只計入 errors（負載過高時可能逾時）。
+    """
+
+    def __init__(self, base_url: str = http_session.INTERNAL_URL, interval: float = 0.5, timeout: float = 2,
+                 path: str = STATUS_PATH, max_children: Optional[int] = None):
+        self.url = f"{base_url.rstrip('/')}{path}?json"
+        self.interval = interval
+        self.timeout = timeout
+        if max_children is None:
+            try:
+                max_children = int(load_pool_config().get('pm.max_children', 0)) or None
+            except (OSError, ValueError):
+                max_children = None
+        self.max_children = max_children
+        self.samples: List[FpmStatus] = []
+        self.errors = 0
+        self._session = http_session.create_session(pool_maxsize=1)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self) -> FpmStatus:
+        response = self._session.get(self.url, timeout=self.timeout)
+        if response.status_code != 200:
+            raise FpmStatusUnavailable(f"{self.url} 回應 {response.status_code}")
+        try:
+            return parse_status(response.text, now_ns())
+        except ValueError as e:
+            raise FpmStatusUnavailable(f"{self.url}: {e}") from e
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.samples.append(self.poll())
+            except (requests.exceptions.RequestException, FpmStatusUnavailable):
+                self.errors += 1
+
+    def start(self) -> "FpmStatusPoller":
+        try:
+            self.samples.append(self.poll())
+        except requests.exceptions.RequestException as e:
+            raise FpmStatusUnavailable(f"{self.url}: {e}") from e
+        self._thread = threading.Thread(target=self._run, name="fpm-status", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.timeout + 1)
+        # 結束時再取樣一次，讓累計計數涵蓋整個測試
+        try:
+            self.samples.append(self.poll())
+        except (requests.exceptions.RequestException, FpmStatusUnavailable):
+            self.errors += 1
+        self._session.close()
+
+    def __enter__(self) -> "FpmStatusPoller":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def analyze(self, timeline: Optional[LatencyTimeline] = None) -> FpmAnalysis:
+        return analyze(self.samples, timeline, self.max_children)
+
+
+def format_report(analysis: FpmAnalysis) -> str:
+    limit = f" / pm.max_children {analysis.max_children}" if analysis.max_children else ""
+    lines = [
+        f"PHP-FPM（{analysis.samples} 次取樣，{analysis.duration:.1f} 秒）: "
+        f"處理 {analysis.accepted} 個請求（{analysis.throughput:.1f} req/s）",
+        f"  active 峰值 {analysis.peak_active}{limit}，listen queue 峰值 {analysis.peak_listen_queue}，"
+        f"飽和取樣 {analysis.saturated_ratio * 100:.0f}%",
+        f"  max children reached +{analysis.max_children_reached}，slow requests +{analysis.slow_requests}",
+    ]
+    if analysis.p99_saturated is not None or analysis.p99_unsaturated is not None:
+        def fmt(value: Optional[float]) -> str:
+            return f"{value:.1f}ms" if value is not None else "-"
+
+        correlation = analysis.queue_latency_correlation
+        lines.append(f"  p99：處理期間 pool 曾飽和的請求 {fmt(analysis.p99_saturated)}，"
+                     f"其餘 {fmt(analysis.p99_unsaturated)}"
+                     + (f"，listen queue 與 p99 相關係數 {correlation:.2f}" if correlation is not None else ""))
+    if analysis.bottleneck:
+        lines.append("  ⚠️ pm.max_children 是實際的限制：請求在 listen queue 等待空閒 worker")
+    elif analysis.max_children_reached or analysis.saturated_ratio:
+        lines.append("  pool 曾短暫飽和，但延遲沒有明顯增加")
+    else:
+        lines.append("  pool 未飽和，max_children 不是限制")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="取樣 PHP-FPM 狀態頁（/fpm-status）")
+    parser.add_argument("--internal-url", default=http_session.INTERNAL_URL,
+                        help="nginx 內部 server 的網址（預設 WP_TEST_INTERNAL_URL）")
+    parser.add_argument("--interval", type=float, default=1.0, help="取樣間隔秒數")
+    parser.add_argument("--duration", type=float, default=30, help="取樣秒數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出彙總")
+    args = parser.parse_args(argv)
+
+    poller = FpmStatusPoller(args.internal_url, interval=args.interval)
+    try:
+        poller.start()
+    except FpmStatusUnavailable as e:
+        print(f"無法讀取 PHP-FPM 狀態頁: {e}", file=sys.stderr)
+        return 1
+    start = now_ns()
+    shown = 0
+    try:
+        while (now_ns() - start) / 1e9 < args.duration:
+            time.sleep(args.interval)
+            for sample in poller.samples[shown:]:
+                if not args.json:
+                    print(f"{(sample.t_ns - start) / 1e9:6.1f}s  active {sample.active:>3}  idle {sample.idle:>3}  "
+                          f"queue {sample.listen_queue:>3}  reached {sample.max_children_reached:>3}  "
+                          f"slow {sample.slow_requests:>3}")
+            shown = len(poller.samples)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.stop()
+    analysis = poller.analyze()
+    print(json.dumps(analysis.to_dict(), ensure_ascii=False, indent=2) if args.json else format_report(analysis))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
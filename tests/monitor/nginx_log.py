@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Nginx Access Log Analyzer
+串流解析 nginx access log（生成器管線，固定記憶體），
+依 location 與路由彙總請求速率、狀態碼（特別是 limit_req 的 429）、傳送位元組與延遲分佈
+
+支援 config/nginx/nginx.conf 的 main 格式與加上
+$request_time / $upstream_response_time 的 timed 格式。
+
+用法：
+    python3 -m tests.monitor.nginx_log /var/log/nginx/access.log
+    docker compose logs --no-log-prefix nginx | python3 -m tests.monitor.nginx_log -
+    python3 -m tests.monitor.nginx_log access.log.1.gz --routes --json
+"""
+
+import argparse
+import functools
+import gzip
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.rate_limit import RateLimitConfig
+
+LINE_PATTERN = re.compile(
+    r'(?P<remote_addr>\S+) - (?P<remote_user>\S+) \[(?P<time_local>[^\]]+)\] '
+    r'"(?P<request>(?:[^"\\]|\\.)*)" (?P<status>\d{3}) (?P<bytes>\d+|-) '
+    r'"(?P<referer>(?:[^"\\]|\\.)*)" "(?P<user_agent>(?:[^"\\]|\\.)*)"'
+    r'(?: "(?P<forwarded_for>[^"]*)")?'
+    r'(?: rt=(?P<request_time>[\d.]+|-))?'
+    r'(?: urt="(?P<upstream_time>[^"]*)")?'
+)
+
+# config/nginx/default.conf 各 location（RateLimitConfig 解析後的 Location.name）的分類名稱；
+# 比對順序不在此重複，由 RateLimitConfig.match 依 nginx 規則判斷
+LOCATION_NAMES = {
+    "/health": "health",
+    r"~ ^/wp-login\.php$": "wp-login",
+    "= /xmlrpc.php": "xmlrpc",
+    "~ ^/wp-json/": "wp-json",
+    r"~* wp-config\.php": "denied",
+    r"~* wp-includes/.*\.php$": "denied",
+    "/": "general",
+    r"~ \.php$": "php",
+    r"~* \.(jpg|jpeg|png|gif|ico|css|js|svg|woff|woff2|ttf|eot)$": "static",
+    r"~ /\.": "denied",
+    r"~* /(?:uploads|files)/.*\.php$": "denied",
+    r"~* wp-admin/.*\.php$": "php",
+}
+
+REQUEST_TIME_HIGHEST_MS = 300_000
+# 路由數量多，使用 2 位有效數字以降低每個路由的直方圖大小
+ROUTE_SIGNIFICANT_DIGITS = 2
+
+ROUTE_ID_PATTERN = re.compile(r'/\d+(?=/|$)')
+OTHER_ROUTE = "(其他)"
+
+
+@dataclass
+class LogEntry:
+    """一筆解析後的 access log"""
+
+    remote_addr: str
+    timestamp: float
+    method: str
+    path: str
+    status: int
+    bytes_sent: int
+    request_time: Optional[float] = None
+    upstream_time: Optional[float] = None
+
+    @property
+    def location(self) -> str:
+        return classify_location(self.path)
+
+    @property
+    def route(self) -> str:
+        return normalize_route(self.path)
+
+
+@functools.lru_cache(maxsize=None)
+def server_locations() -> RateLimitConfig:
+    """default.conf 的 location 區塊（與速率限制模型共用同一份解析）"""
+    return RateLimitConfig.load()
+
+
+def classify_location(path: str) -> str:
+    """判斷請求路徑會進入 default.conf 的哪個 location（未列在 LOCATION_NAMES 的 location 以原始名稱回報）"""
+    location = server_locations().match(path)
+    if location is None:
+        return "general"
+    return LOCATION_NAMES.get(location.name, location.name)
+
+
+def normalize_route(path: str) -> str:
+    """路由鍵：去掉查詢字串，數字 ID 合併為 :id（搜尋請求保留為 /?s=）"""
+    path, _, query = path.partition('?')
+    route = ROUTE_ID_PATTERN.sub('/:id', path)
+    if query.startswith('s=') or '&s=' in query:
+        route += '?s='
+    return route
+
+
+def _sum_upstream_times(value: Optional[str]) -> Optional[float]:
+    """$upstream_response_time 可能是 "0.010, 0.020" 或 "-"，重試時取總和"""
+    if not value or value == '-':
+        return None
+    total = 0.0
+    for part in re.split(r'[,:]\s*', value):
+        part = part.strip()
+        if part and part != '-':
+            total += float(part)
+    return total
+
+
+class _TimestampParser:
+    """同一秒的時間字串會重複出現，快取上一個結果以避免重複 strptime"""
+
+    def __init__(self):
+        self._last_text = None
+        self._last_value = 0.0
+
+    def __call__(self, text: str) -> float:
+        if text != self._last_text:
+            self._last_value = datetime.strptime(text, "%d/%b/%Y:%H:%M:%S %z").timestamp()
+            self._last_text = text
+        return self._last_value
+
+
+def read_lines(paths: Iterable[str]) -> Iterator[str]:
+    """逐行讀取多個檔案（支援 .gz 與 "-" 代表 stdin）"""
+    for path in paths:
+        if path == '-':
+            yield from sys.stdin
+        elif path.endswith('.gz'):
+            with gzip.open(path, 'rt', errors='replace') as f:
+                yield from f
+        else:
+            with open(path, 'r', errors='replace') as f:
+                yield from f
+
+
+def parse_lines(lines: Iterable[str], unparsed: Optional[List[int]] = None) -> Iterator[LogEntry]:
+    """將 log 行解析為 LogEntry，無法解析的行計入 unparsed[0]"""
+    parse_time = _TimestampParser()
+    for line in lines:
+        match = LINE_PATTERN.search(line)
+        if match is None:
+            if unparsed is not None:
+                unparsed[0] += 1
+            continue
+        method, _, rest = match.group('request').partition(' ')
+        path = rest.rsplit(' ', 1)[0] if ' ' in rest else rest
+        request_time = match.group('request_time')
+        try:
+            timestamp = parse_time(match.group('time_local'))
+        except ValueError:
+            if unparsed is not None:
+                unparsed[0] += 1
+            continue
+        yield LogEntry(
+            remote_addr=match.group('remote_addr'),
+            timestamp=timestamp,
+            method=method,
+            path=path or '/',
+            status=int(match.group('status')),
+            bytes_sent=0 if match.group('bytes') == '-' else int(match.group('bytes')),
+            request_time=float(request_time) if request_time and request_time != '-' else None,
+            upstream_time=_sum_upstream_times(match.group('upstream_time')),
+        )
+
+
+@dataclass
+class GroupStats:
+    """一個 location 或路由的彙總（大小固定，與請求數無關）"""
+
+    requests: int = 0
+    bytes_sent: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+    first_ts: Optional[float] = None
+    last_ts: Optional[float] = None
+    peak_rps: int = 0
+    significant_digits: int = 3
+    request_time: Optional[LatencyHistogram] = None
+    upstream_time: Optional[LatencyHistogram] = None
+    _current_second: int = field(default=-1, repr=False)
+    _current_count: int = field(default=0, repr=False)
+
+    def __post_init__(self):
+        # 上限對應 fastcgi_read_timeout 300
+        if self.request_time is None:
+            self.request_time = LatencyHistogram(REQUEST_TIME_HIGHEST_MS, self.significant_digits)
+        if self.upstream_time is None:
+            self.upstream_time = LatencyHistogram(REQUEST_TIME_HIGHEST_MS, self.significant_digits)
+
+    def add(self, entry: LogEntry):
+        self.requests += 1
+        self.bytes_sent += entry.bytes_sent
+        self.statuses[entry.status] = self.statuses.get(entry.status, 0) + 1
+        if self.first_ts is None or entry.timestamp < self.first_ts:
+            self.first_ts = entry.timestamp
+        if self.last_ts is None or entry.timestamp > self.last_ts:
+            self.last_ts = entry.timestamp
+
+        second = int(entry.timestamp)
+        if second == self._current_second:
+            self._current_count += 1
+        else:
+            self._current_second = second
+            self._current_count = 1
+        self.peak_rps = max(self.peak_rps, self._current_count)
+
+        if entry.request_time is not None:
+            self.request_time.record(entry.request_time * 1000)
+        if entry.upstream_time is not None:
+            self.upstream_time.record(entry.upstream_time * 1000)
+
+    @property
+    def throttled(self) -> int:
+        return self.statuses.get(429, 0)
+
+    @property
+    def avg_rps(self) -> float:
+        if self.first_ts is None or self.last_ts == self.first_ts:
+            return float(self.requests)
+        return self.requests / (self.last_ts - self.first_ts)
+
+    def to_dict(self) -> Dict:
+        status_classes = {}
+        for status, count in self.statuses.items():
+            key = f"{status // 100}xx"
+            status_classes[key] = status_classes.get(key, 0) + count
+        result = {
+            'requests': self.requests,
+            'avg_rps': round(self.avg_rps, 3),
+            'peak_rps': self.peak_rps,
+            'bytes_sent': self.bytes_sent,
+            'status_classes': status_classes,
+            'throttled_429': self.throttled,
+        }
+        if self.request_time.count:
+            result['request_time_ms'] = self.request_time.summary()
+        if self.upstream_time.count:
+            result['upstream_time_ms'] = self.upstream_time.summary()
+        return result
+
+
+class AccessLogAnalyzer:
+    """依 location 與路由彙總 LogEntry；路由數量有上限，以維持固定記憶體"""
+
+    def __init__(self, max_routes: int = 200):
+        self.max_routes = max_routes
+        self.total = GroupStats()
+        self.locations: Dict[str, GroupStats] = {}
+        self.routes: Dict[str, GroupStats] = {}
+        self.unparsed = [0]
+
+    def add(self, entry: LogEntry):
+        self.total.add(entry)
+        self.locations.setdefault(entry.location, GroupStats()).add(entry)
+        route = entry.route
+        if route not in self.routes and len(self.routes) >= self.max_routes:
+            route = OTHER_ROUTE
+        if route not in self.routes:
+            self.routes[route] = GroupStats(significant_digits=ROUTE_SIGNIFICANT_DIGITS)
+        self.routes[route].add(entry)
+
+    def consume(self, lines: Iterable[str]) -> "AccessLogAnalyzer":
+        for entry in parse_lines(lines, self.unparsed):
+            self.add(entry)
+        return self
+
+    def to_dict(self, include_routes: bool = False) -> Dict:
+        result = {
+            'total': self.total.to_dict(),
+            'unparsed_lines': self.unparsed[0],
+            'locations': {name: s.to_dict() for name, s in sorted(self.locations.items())},
+        }
+        if include_routes:
+            ranked = sorted(self.routes.items(), key=lambda item: item[1].requests, reverse=True)
+            result['routes'] = {name: s.to_dict() for name, s in ranked}
+        return result
+
+
+def _format_table(title: str, groups: Dict[str, GroupStats], limit: Optional[int] = None) -> List[str]:
+    lines = [
+        title,
+        f"  {'名稱':<28}{'請求':>9}{'平均 rps':>10}{'峰值 rps':>10}{'429':>7}{'5xx':>6}"
+        f"{'MB':>9}{'p50':>10}{'p99':>10}{'上游 p99':>11}",
+    ]
+    ranked = sorted(groups.items(), key=lambda item: item[1].requests, reverse=True)
+    for name, s in ranked[:limit]:
+        server_errors = sum(c for status, c in s.statuses.items() if status >= 500)
+        p50 = f"{s.request_time.percentile(50):.1f}ms" if s.request_time.count else "-"
+        p99 = f"{s.request_time.percentile(99):.1f}ms" if s.request_time.count else "-"
+        upstream = f"{s.upstream_time.percentile(99):.1f}ms" if s.upstream_time.count else "-"
+        lines.append(
+            f"  {name[:28]:<28}{s.requests:>9}{s.avg_rps:>10.2f}{s.peak_rps:>10}{s.throttled:>7}"
+            f"{server_errors:>6}{s.bytes_sent / 1024 / 1024:>9.1f}{p50:>10}{p99:>10}{upstream:>11}"
+        )
+    return lines
+
+
+def format_report(analyzer: AccessLogAnalyzer, include_routes: bool = False, top: int = 20) -> str:
+    lines = [f"總請求數: {analyzer.total.requests}  無法解析: {analyzer.unparsed[0]}"]
+    lines += _format_table("依 location:", analyzer.locations)
+    if include_routes:
+        lines += _format_table(f"依路由（前 {top}）:", analyzer.routes, top)
+    if not analyzer.total.request_time.count:
+        lines.append("提示: log 不含 $request_time，請使用 nginx.conf 的 timed log_format 取得延遲分佈")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="nginx access log 分析")
+    parser.add_argument("paths", nargs="+", help="log 檔案（.gz 亦可），- 代表 stdin")
+    parser.add_argument("--routes", action="store_true", help="同時輸出各路由的統計")
+    parser.add_argument("--top", type=int, default=20, help="輸出前 N 個路由（預設 20）")
+    parser.add_argument("--max-routes", type=int, default=200, help="追蹤的路由數上限（預設 200）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    analyzer = AccessLogAnalyzer(max_routes=args.max_routes).consume(read_lines(args.paths))
+    if args.json:
+        print(json.dumps(analyzer.to_dict(include_routes=args.routes), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(analyzer, include_routes=args.routes, top=args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,425 @@
+#!/usr/bin/env python3
+"""
+OPcache Status Collector
+OPcache 狀態取樣：負載測試期間定期讀取 /opcache-status（config/php/opcache-status.php），
+記錄命中率、共享記憶體、key slot 與重啟次數，判斷 php.ini 的 OPcache 設定是否足夠，
+並依實際的命中次數產生 opcache.preload 清單
+
+max_accelerated_files 會進位到質數（10000 → 16229 個 key slot），每個腳本可能佔用多個 key（相對路徑），
+slot 用完時 cache_full 為真、新的腳本不再快取；浪費的記憶體超過 max_wasted_percentage 時才會重啟
+（hash_restarts），否則只是持續 miss。共享記憶體不足則是 oom_restarts。
+
+狀態端點在 nginx 內部 server（config/nginx/internal.conf，不對外發佈；主機上取樣需以 docker-compose.bench.yml 發佈，
+WP_TEST_INTERNAL_URL），由 www pool 的 worker 執行，pool 飽和時取樣會排隊或逾時（計入 errors）。
+
+用法：
+    with OpcacheStatusPoller(interval=1) as poller:
+        run_load()
+    print(format_report(poller.analyze()))
+
+    python3 -m tests.monitor.opcache_status                          # 目前的狀態與建議
+    python3 -m tests.monitor.opcache_status --duration 60            # 持續取樣（期間另外施加負載）
+    python3 -m tests.monitor.opcache_status --preload preload.php    # 依命中次數產生 opcache.preload 清單
+"""
+
+import argparse
+import json
+import math
+import re
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+import requests
+
+from tests import http_session
+from tests.performance.timing import now_ns
+
+STATUS_PATH = "/opcache-status"
+MB = 1024 ** 2
+# PHP 將 max_accelerated_files 進位到下列質數之一（Zend/zend_accelerator_hash.c）
+PRIME_NUMBERS = (5, 11, 19, 53, 107, 223, 463, 983, 1979, 3907, 7963, 16229, 32531, 65407, 130987, 262237,
+                 524521, 1048793)
+# key slot 或共享記憶體的使用比例超過此值即視為不足
+USAGE_LIMIT = 0.9
+# 建議值相對於實際需求的餘裕（外掛與主題更新會增加檔案）
+HEADROOM = 1.5
+MEMORY_STEP = 32 * MB
+# 負載期間的命中率低於此值（且沒有重啟）表示 cache 尚未暖機或有腳本無法快取
+HIT_RATIO_TARGET = 0.99
+# 預載的腳本常駐共享記憶體，最多使用 memory_consumption 的比例
+PRELOAD_MEMORY_RATIO = 0.25
+PRELOAD_MIN_HITS = 10
+# 不預載：後台與只在特定請求載入的檔案、快取與上傳目錄、設定檔與狀態端點本身
+PRELOAD_EXCLUDE = re.compile(
+    r"/wp-admin/|/wp-content/(cache|uploads|upgrade)/|/wp-config\.php$|/\.opcache-status\.php$"
+)
+
+
+class OpcacheStatusUnavailable(Exception):
+    """狀態端點無法讀取（未掛載 opcache-status.php、location 不允許此來源或 OPcache 未啟用）"""
+
+
+def key_slots(max_accelerated_files: int) -> int:
+    """max_accelerated_files 實際的 key slot 數"""
+    return next((prime for prime in PRIME_NUMBERS if prime >= max_accelerated_files), PRIME_NUMBERS[-1])
+
+
+@dataclass
+class ScriptStats:
+    """單一已快取腳本"""
+
+    hits: int
+    memory: int
+    last_used: int = 0
+
+
+@dataclass
+class OpcacheStatus:
+    """一次狀態取樣（記憶體為位元組，wasted_percentage 為百分比）"""
+
+    t_ns: int
+    enabled: bool = True
+    cache_full: bool = False
+    restart_pending: bool = False
+    used_memory: int = 0
+    free_memory: int = 0
+    wasted_memory: int = 0
+    wasted_percentage: float = 0.0
+    interned_used: int = 0
+    interned_size: int = 0
+    cached_scripts: int = 0
+    cached_keys: int = 0
+    max_cached_keys: int = 0
+    hits: int = 0
+    misses: int = 0
+    oom_restarts: int = 0
+    hash_restarts: int = 0
+    manual_restarts: int = 0
+    php_files: Optional[int] = None
+    directives: Dict[str, object] = field(default_factory=dict)
+    scripts: Dict[str, ScriptStats] = field(default_factory=dict)
+
+    @property
+    def memory_size(self) -> int:
+        return self.used_memory + self.free_memory + self.wasted_memory
+
+
+def parse_status(text: str, t_ns: int = 0) -> OpcacheStatus:
+    """解析 opcache-status.php 的 JSON（opcache_get_status 加上 directives）"""
+    values = json.loads(text)
+    if not isinstance(values, dict):
+        raise ValueError("不是 OPcache 狀態")
+    if 'error' in values:
+        raise ValueError(values['error'])
+    if 'opcache_statistics' not in values:
+        raise ValueError("不是 OPcache 狀態")
+    memory = values.get('memory_usage', {})
+    interned = values.get('interned_strings_usage', {})
+    statistics = values['opcache_statistics']
+    status = OpcacheStatus(
+        t_ns,
+        enabled=bool(values.get('opcache_enabled', True)),
+        cache_full=bool(values.get('cache_full', False)),
+        restart_pending=bool(values.get('restart_pending', False)),
+        used_memory=int(memory.get('used_memory', 0)),
+        free_memory=int(memory.get('free_memory', 0)),
+        wasted_memory=int(memory.get('wasted_memory', 0)),
+        wasted_percentage=float(memory.get('current_wasted_percentage', 0)),
+        interned_used=int(interned.get('used_memory', 0)),
+        interned_size=int(interned.get('buffer_size', 0)),
+        directives=values.get('directives', {}),
+        php_files=values.get('php_files'),
+    )
+    for key, attribute in (('num_cached_scripts', 'cached_scripts'), ('num_cached_keys', 'cached_keys'),
+                           ('max_cached_keys', 'max_cached_keys'), ('hits', 'hits'), ('misses', 'misses'),
+                           ('oom_restarts', 'oom_restarts'), ('hash_restarts', 'hash_restarts'),
+                           ('manual_restarts', 'manual_restarts')):
+        setattr(status, attribute, int(statistics.get(key, 0)))
+    for path, script in (values.get('scripts') or {}).items():
+        status.scripts[path] = ScriptStats(int(script.get('hits', 0)), int(script.get('memory_consumption', 0)),
+                                           int(script.get('last_used_timestamp', 0)))
+    return status
+
+
+@dataclass
+class OpcacheAnalysis:
+    """取樣期間的彙總（計數為期間的增量），findings 為發現的問題，recommendations 為建議的 php.ini 設定"""
+
+    samples: int
+    duration: float = 0.0
+    hits: int = 0
+    misses: int = 0
+    memory_size: int = 0
+    peak_used: int = 0
+    min_free: int = 0
+    peak_wasted_percentage: float = 0.0
+    max_wasted_percentage: float = 0.0
+    peak_cached_scripts: int = 0
+    peak_cached_keys: int = 0
+    max_cached_keys: int = 0
+    max_accelerated_files: int = 0
+    interned_used: int = 0
+    interned_size: int = 0
+    oom_restarts: int = 0
+    hash_restarts: int = 0
+    manual_restarts: int = 0
+    cache_full: bool = False
+    php_files: Optional[int] = None
+    findings: List[str] = field(default_factory=list)
+    recommendations: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def hit_ratio(self) -> Optional[float]:
+        total = self.hits + self.misses
+        return self.hits / total if total else None
+
+    @property
+    def keys_exhausted(self) -> bool:
+        return bool(self.max_cached_keys) and self.peak_cached_keys >= self.max_cached_keys * USAGE_LIMIT
+
+    @property
+    def memory_exhausted(self) -> bool:
+        return bool(self.memory_size) and self.min_free <= self.memory_size * (1 - USAGE_LIMIT)
+
+    def to_dict(self) -> Dict:
+        return {**asdict(self), 'hit_ratio': self.hit_ratio}
+
+
+def analyze(samples: Sequence[OpcacheStatus]) -> OpcacheAnalysis:
+    analysis = OpcacheAnalysis(len(samples))
+    if not samples:
+        return analysis
+    first, last = samples[0], samples[-1]
+    analysis.duration = (last.t_ns - first.t_ns) / 1e9
+    # 重啟會把 hits / misses 歸零，增量改以重啟後的值計算
+    restarted = any(later.hits < earlier.hits for earlier, later in zip(samples, samples[1:]))
+    analysis.hits = last.hits if restarted else last.hits - first.hits
+    analysis.misses = last.misses if restarted else last.misses - first.misses
+    analysis.oom_restarts = last.oom_restarts - first.oom_restarts
+    analysis.hash_restarts = last.hash_restarts - first.hash_restarts
+    analysis.manual_restarts = last.manual_restarts - first.manual_restarts
+    analysis.memory_size = last.memory_size
+    analysis.peak_used = max(sample.used_memory for sample in samples)
+    analysis.min_free = min(sample.free_memory for sample in samples)
+    analysis.peak_wasted_percentage = max(sample.wasted_percentage for sample in samples)
+    analysis.peak_cached_scripts = max(sample.cached_scripts for sample in samples)
+    analysis.peak_cached_keys = max(sample.cached_keys for sample in samples)
+    analysis.max_cached_keys = last.max_cached_keys
+    analysis.interned_used = max(sample.interned_used for sample in samples)
+    analysis.interned_size = last.interned_size
+    analysis.cache_full = any(sample.cache_full for sample in samples)
+    analysis.php_files = next((sample.php_files for sample in samples if sample.php_files is not None), None)
+    directives = last.directives
+    analysis.max_accelerated_files = int(directives.get('opcache.max_accelerated_files', 0))
+    analysis.max_wasted_percentage = float(directives.get('opcache.max_wasted_percentage', 0.05)) * 100
+
+    findings, recommendations = analysis.findings, analysis.recommendations
+    needed = max(analysis.peak_cached_keys, analysis.php_files or 0)
+    files_exceed = analysis.php_files is not None and analysis.php_files > analysis.max_cached_keys * USAGE_LIMIT
+    if analysis.hash_restarts or analysis.keys_exhausted or files_exceed:
+        findings.append(
+            f"key slot 不足：已使用 {analysis.peak_cached_keys} / {analysis.max_cached_keys}"
+            f"（max_accelerated_files = {analysis.max_accelerated_files}）"
+            + (f"，WordPress 目錄有 {analysis.php_files} 個 .php 檔" if analysis.php_files is not None else "")
+            + (f"，期間 hash 重啟 {analysis.hash_restarts} 次" if analysis.hash_restarts else "")
+        )
+        recommendations['opcache.max_accelerated_files'] = str(key_slots(math.ceil(needed * HEADROOM)))
+    if analysis.oom_restarts or analysis.memory_exhausted:
+        findings.append(
+            f"共享記憶體不足：剩餘 {analysis.min_free / MB:.1f}MB / {analysis.memory_size / MB:.0f}MB"
+            + (f"，期間記憶體不足重啟 {analysis.oom_restarts} 次" if analysis.oom_restarts else "")
+        )
+        needed_memory = (analysis.memory_size - analysis.min_free) * HEADROOM
+        recommendations['opcache.memory_consumption'] = str(math.ceil(needed_memory / MEMORY_STEP) * MEMORY_STEP // MB)
+    if analysis.cache_full and not (analysis.keys_exhausted or analysis.memory_exhausted):
+        findings.append("cache_full：新的腳本不再快取，直到浪費的記憶體超過 max_wasted_percentage 觸發重啟")
+    if analysis.max_wasted_percentage and analysis.peak_wasted_percentage >= analysis.max_wasted_percentage * 0.8:
+        findings.append(f"浪費的記憶體 {analysis.peak_wasted_percentage:.1f}% 接近 max_wasted_percentage "
+                        f"{analysis.max_wasted_percentage:.0f}%，cache 滿時會整個重啟")
+    if analysis.interned_size and analysis.interned_used >= analysis.interned_size * USAGE_LIMIT:
+        findings.append(f"interned strings 緩衝區已使用 {analysis.interned_used / MB:.1f}MB / "
+                        f"{analysis.interned_size / MB:.0f}MB")
+        recommendations['opcache.interned_strings_buffer'] = str(
+            max(math.ceil(analysis.interned_size * 2 / MB), int(directives.get('opcache.interned_strings_buffer', 8)))
+        )
+    if analysis.manual_restarts:
+        findings.append(f"期間有 {analysis.manual_restarts} 次 opcache_reset()（外掛或部署腳本清除了整個 cache）")
+    hit_ratio = analysis.hit_ratio
+    if hit_ratio is not None and hit_ratio < HIT_RATIO_TARGET:
+        findings.append(f"期間命中率 {hit_ratio:.2%}（{analysis.misses} 次 miss），"
+                        + ("重啟後重新編譯" if restarted else "cache 尚未暖機或有腳本無法快取"))
+    return analysis
+
+
+def hot_scripts(scripts: Dict[str, ScriptStats], memory_budget: int, min_hits: int = PRELOAD_MIN_HITS) -> List[str]:
+    """依命中次數由高到低選出預載的腳本，總記憶體不超過 memory_budget"""
+    selected = []
+    used = 0
+    for path, script in sorted(scripts.items(), key=lambda item: (-item[1].hits, item[0])):
+        if script.hits < min_hits:
+            break
+        if PRELOAD_EXCLUDE.search(path) or used + script.memory > memory_budget:
+            continue
+        selected.append(path)
+        used += script.memory
+    return selected
+
+
+def _php_string(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+
+def render_preload(paths: Sequence[str], scripts: Optional[Dict[str, ScriptStats]] = None) -> str:
+    """opcache.preload 腳本：只編譯不執行（opcache_compile_file），檔案不存在時略過"""
+    memory = sum(scripts[path].memory for path in paths) if scripts else 0
+    lines = [
+        "<?php",
+        f"// opcache.preload 清單：由 tests.monitor.opcache_status 依實際命中次數產生（{len(paths)} 個腳本"
+        + (f"，{memory / MB:.1f}MB" if memory else "") + "）",
+        "// 只編譯不執行；預載的檔案常駐共享記憶體，WordPress 或外掛更新後需重啟 php-fpm 才會生效",
+        "$files = [",
+        *[f"    {_php_string(path)}," for path in paths],
+        "];",
+        "foreach ($files as $file) {",
+        "    if (is_file($file)) {",
+        "        opcache_compile_file($file);",
+        "    }",
+        "}",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+class OpcacheStatusPoller:
+    """
+    背景 OPcache 狀態取樣器
+
+    start() 讀取一次並計算 WordPress 目錄的 .php 檔案數，無法讀取時拋出 OpcacheStatusUnavailable；
+    之後每 interval 秒取樣一次，stop() 最後一次取樣附上各腳本的命中次數（產生預載清單用）。
+    """
+
+    def __init__(self, base_url: str = http_session.INTERNAL_URL, interval: float = 1.0, timeout: float = 5,
+                 path: str = STATUS_PATH):
+        self.url = f"{base_url.rstrip('/')}{path}"
+        self.interval = interval
+        self.timeout = timeout
+        self.samples: List[OpcacheStatus] = []
+        self.errors = 0
+        self._session = http_session.create_session(pool_maxsize=1)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def poll(self, scripts: bool = False, files: bool = False) -> OpcacheStatus:
+        params = {name: 1 for name, wanted in (('scripts', scripts), ('files', files)) if wanted}
+        response = self._session.get(self.url, params=params, timeout=self.timeout)
+        if response.status_code != 200:
+            raise OpcacheStatusUnavailable(f"{self.url} 回應 {response.status_code}")
+        try:
+            return parse_status(response.text, now_ns())
+        except ValueError as e:
+            raise OpcacheStatusUnavailable(f"{self.url}: {e}") from e
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.samples.append(self.poll())
+            except (requests.exceptions.RequestException, OpcacheStatusUnavailable):
+                self.errors += 1
+
+    def start(self) -> "OpcacheStatusPoller":
+        try:
+            self.samples.append(self.poll(files=True))
+        except requests.exceptions.RequestException as e:
+            raise OpcacheStatusUnavailable(f"{self.url}: {e}") from e
+        self._thread = threading.Thread(target=self._run, name="opcache-status", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + self.timeout + 1)
+        try:
+            self.samples.append(self.poll(scripts=True))
+        except (requests.exceptions.RequestException, OpcacheStatusUnavailable):
+            self.errors += 1
+        self._session.close()
+
+    def __enter__(self) -> "OpcacheStatusPoller":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def scripts(self) -> Dict[str, ScriptStats]:
+        return next((sample.scripts for sample in reversed(self.samples) if sample.scripts), {})
+
+    def analyze(self) -> OpcacheAnalysis:
+        return analyze(self.samples)
+
+
+def format_report(analysis: OpcacheAnalysis) -> str:
+    hit_ratio = analysis.hit_ratio
+    lines = [
+        f"OPcache（{analysis.samples} 次取樣，{analysis.duration:.1f} 秒）: "
+        f"命中率 {hit_ratio:.2%}（{analysis.hits} hits / {analysis.misses} misses）" if hit_ratio is not None
+        else f"OPcache（{analysis.samples} 次取樣，{analysis.duration:.1f} 秒）: 期間沒有執行 PHP",
+        f"  記憶體: 使用峰值 {analysis.peak_used / MB:.1f}MB，剩餘最低 {analysis.min_free / MB:.1f}MB / "
+        f"{analysis.memory_size / MB:.0f}MB，浪費 {analysis.peak_wasted_percentage:.1f}%"
+        f"（上限 {analysis.max_wasted_percentage:.0f}%）",
+        f"  腳本 {analysis.peak_cached_scripts}，key {analysis.peak_cached_keys} / {analysis.max_cached_keys}"
+        f"（max_accelerated_files = {analysis.max_accelerated_files}）"
+        + (f"，WordPress 目錄 {analysis.php_files} 個 .php 檔" if analysis.php_files is not None else ""),
+        f"  interned strings {analysis.interned_used / MB:.1f}MB / {analysis.interned_size / MB:.0f}MB，"
+        f"重啟: 記憶體不足 +{analysis.oom_restarts}，hash +{analysis.hash_restarts}，手動 +{analysis.manual_restarts}",
+    ]
+    lines += [f"  ⚠️ {finding}" for finding in analysis.findings]
+    if analysis.recommendations:
+        lines.append("  建議的 php.ini 設定:")
+        lines += [f"    {key} = {value}" for key, value in analysis.recommendations.items()]
+    elif not analysis.findings:
+        lines.append("  OPcache 設定足夠")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="取樣 OPcache 狀態（/opcache-status）並產生預載清單")
+    parser.add_argument("--internal-url", default=http_session.INTERNAL_URL,
+                        help="nginx 內部 server 的網址（預設 WP_TEST_INTERNAL_URL）")
+    parser.add_argument("--interval", type=float, default=1.0, help="取樣間隔秒數")
+    parser.add_argument("--duration", type=float, default=0, help="取樣秒數（0 只讀取目前狀態）")
+    parser.add_argument("--preload", default=None, help="將 opcache.preload 清單寫入此檔案")
+    parser.add_argument("--min-hits", type=int, default=PRELOAD_MIN_HITS, help="預載腳本的最低命中次數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出彙總")
+    args = parser.parse_args(argv)
+
+    poller = OpcacheStatusPoller(args.internal_url, interval=args.interval)
+    try:
+        poller.start()
+    except OpcacheStatusUnavailable as e:
+        print(f"無法讀取 OPcache 狀態: {e}", file=sys.stderr)
+        return 1
+    try:
+        time.sleep(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        poller.stop()
+    analysis = poller.analyze()
+    print(json.dumps(analysis.to_dict(), ensure_ascii=False, indent=2) if args.json else format_report(analysis))
+
+    if args.preload:
+        scripts = poller.scripts
+        budget = int(poller.samples[-1].directives.get('opcache.memory_consumption', 0) * PRELOAD_MEMORY_RATIO)
+        paths = hot_scripts(scripts, budget, args.min_hits)
+        with open(args.preload, "w", encoding="utf-8") as f:
+            f.write(render_preload(paths, scripts))
+        print(f"預載清單: {args.preload}（{len(paths)} / {len(scripts)} 個腳本）", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
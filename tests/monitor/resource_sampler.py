@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Container Resource Sampler
+背景採集容器 CPU、記憶體、區塊 IO、網路計數器的時間序列
+
+優先直接讀取容器的 cgroup v2 檔案（可任意採樣間隔）；
+無法存取 cgroup 時（例如 Docker Desktop）改用 Docker stats 串流。
+時間戳使用 perf_counter_ns，與負載測試的延遲數據共用同一時鐘。
+"""
+
+import os
+import threading
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional, Tuple
+
+from tests.monitor.docker_api import DockerAPI, DockerAPIError
+from tests.performance.timing import now_ns
+
+CONTAINERS = ["wordpress_db", "wordpress_app", "wordpress_nginx"]
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+# 達到限制的比例視為瓶頸
+SATURATION_THRESHOLD = 0.9
+
+
+@dataclass
+class ResourceSample:
+    """單一容器在某時間點的資源使用"""
+
+    container: str
+    t_ns: int
+    cpu_percent: float
+    memory_bytes: int
+    memory_limit: int
+    block_read: int
+    block_write: int
+    net_rx: int
+    net_tx: int
+
+    @property
+    def memory_percent(self) -> float:
+        return self.memory_bytes / self.memory_limit * 100 if self.memory_limit else 0.0
+
+
+@dataclass
+class RawCounters:
+    """累計計數器（CPU 以奈秒計）"""
+
+    cpu_ns: int
+    memory_bytes: int
+    memory_limit: int
+    block_read: int
+    block_write: int
+    net_rx: int
+    net_tx: int
+
+
+def parse_stats_json(stats: Dict) -> RawCounters:
+    """解析 Docker stats API 回傳的一筆 JSON"""
+    memory = stats.get('memory_stats') or {}
+    usage = memory.get('usage', 0)
+    # 與 docker stats CLI 相同：扣除可回收的檔案快取
+    usage -= (memory.get('stats') or {}).get('inactive_file', 0)
+
+    block_read = block_write = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = entry.get('op', '').lower()
+        if op == 'read':
+            block_read += entry.get('value', 0)
+        elif op == 'write':
+            block_write += entry.get('value', 0)
+
+    networks = (stats.get('networks') or {}).values()
+    return RawCounters(
+        cpu_ns=((stats.get('cpu_stats') or {}).get('cpu_usage') or {}).get('total_usage', 0),
+        memory_bytes=max(usage, 0),
+        memory_limit=memory.get('limit', 0),
+        block_read=block_read,
+        block_write=block_write,
+        net_rx=sum(n.get('rx_bytes', 0) for n in networks),
+        net_tx=sum(n.get('tx_bytes', 0) for n in networks),
+    )
+
+
+def parse_net_dev(text: str) -> Tuple[int, int]:
+    """解析 /proc/<pid>/net/dev，回傳 (rx_bytes, tx_bytes)，不含 lo"""
+    rx = tx = 0
+    for line in text.splitlines()[2:]:
+        name, _, data = line.partition(':')
+        if name.strip() == 'lo':
+            continue
+        fields = data.split()
+        if len(fields) >= 9:
+            rx += int(fields[0])
+            tx += int(fields[8])
+    return rx, tx
+
+
+class CgroupReader:
+    """直接讀取容器 cgroup v2 檔案"""
+
+    def __init__(self, cgroup_path: str, pid: int, proc_root: str = "/proc"):
+        self.cgroup_path = cgroup_path
+        self.net_dev_path = os.path.join(proc_root, str(pid), "net", "dev")
+
+    @classmethod
+    def for_pid(cls, pid: int, cgroup_root: str = CGROUP_ROOT, proc_root: str = "/proc") -> Optional["CgroupReader"]:
+        """由容器主進程 PID 找出 cgroup v2 路徑，找不到時回傳 None"""
+        try:
+            with open(os.path.join(proc_root, str(pid), "cgroup")) as f:
+                for line in f:
+                    if line.startswith("0::"):
+                        path = os.path.join(cgroup_root, line[3:].strip().lstrip('/'))
+                        if os.path.exists(os.path.join(path, "cpu.stat")):
+                            return cls(path, pid, proc_root)
+        except OSError:
+            pass
+        return None
+
+    def _read(self, name: str) -> str:
+        with open(os.path.join(self.cgroup_path, name)) as f:
+            return f.read()
+
+    def read(self) -> RawCounters:
+        cpu_usec = 0
+        for line in self._read("cpu.stat").splitlines():
+            key, _, value = line.partition(' ')
+            if key == 'usage_usec':
+                cpu_usec = int(value)
+
+        memory_limit = self._read("memory.max").strip()
+        memory_stat = dict(line.split() for line in self._read("memory.stat").splitlines() if line)
+        memory = int(self._read("memory.current")) - int(memory_stat.get('inactive_file', 0))
+
+        block_read = block_write = 0
+        for line in self._read("io.stat").splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key == 'rbytes':
+                    block_read += int(value)
+                elif key == 'wbytes':
+                    block_write += int(value)
+
+        try:
+            with open(self.net_dev_path) as f:
+                net_rx, net_tx = parse_net_dev(f.read())
+        except OSError:
+            net_rx = net_tx = 0
+
+        return RawCounters(
+            cpu_ns=cpu_usec * 1000,
+            memory_bytes=max(memory, 0),
+            memory_limit=0 if memory_limit == 'max' else int(memory_limit),
+            block_read=block_read,
+            block_write=block_write,
+            net_rx=net_rx,
+            net_tx=net_tx,
+        )
+
+
+class ResourceSampler:
+    """
+    背景資源採樣器
+
+    用法：
+        with ResourceSampler(interval=0.5) as sampler:
+            run_load()
+        print(sampler.summary())
+    """
+
+    def __init__(self, containers: Optional[List[str]] = None, interval: float = 1.0, docker: DockerAPI = None):
+        self.containers = containers or list(CONTAINERS)
+        self.interval = interval
+        self.docker = docker or DockerAPI()
+        self.samples: Dict[str, List[ResourceSample]] = {c: [] for c in self.containers}
+        self.cpu_limits: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _cpu_limit(self, info: Dict) -> float:
+        """容器可用 CPU 數（未限制時為主機 CPU 數）"""
+        host_config = info.get('HostConfig') or {}
+        if host_config.get('NanoCpus'):
+            return host_config['NanoCpus'] / 1e9
+        if host_config.get('CpuQuota') and host_config.get('CpuPeriod'):
+            return host_config['CpuQuota'] / host_config['CpuPeriod']
+        return float(os.cpu_count() or 1)
+
+    def _record(self, container: str, previous, current: RawCounters, t_ns: int):
+        prev_counters, prev_t_ns = previous
+        wall_ns = t_ns - prev_t_ns
+        cpu_percent = (current.cpu_ns - prev_counters.cpu_ns) / wall_ns * 100 if wall_ns > 0 else 0.0
+        self.samples[container].append(ResourceSample(
+            container=container,
+            t_ns=t_ns,
+            cpu_percent=max(cpu_percent, 0.0),
+            memory_bytes=current.memory_bytes,
+            memory_limit=current.memory_limit,
+            block_read=current.block_read,
+            block_write=current.block_write,
+            net_rx=current.net_rx,
+            net_tx=current.net_tx,
+        ))
+
+    def _poll_cgroup(self, container: str, reader: CgroupReader):
+        try:
+            previous = (reader.read(), now_ns())
+            while not self._stop.wait(self.interval):
+                current = reader.read()
+                t_ns = now_ns()
+                self._record(container, previous, current, t_ns)
+                previous = (current, t_ns)
+        except (OSError, ValueError) as e:
+            self.errors[container] = str(e)
+
+    def _follow_stream(self, container: str):
+        previous = None
+        last_recorded = 0
+        try:
+            for stats in self.docker.stats_stream(container):
+                if self._stop.is_set():
+                    return
+                t_ns = now_ns()
+                current = parse_stats_json(stats)
+                if previous is not None and t_ns - last_recorded >= self.interval * 1e9 * 0.9:
+                    self._record(container, previous, current, t_ns)
+                    last_recorded = t_ns
+                previous = (current, t_ns)
+        except (DockerAPIError, OSError, ValueError) as e:
+            if not self._stop.is_set():
+                self.errors[container] = str(e)
+
+    def start(self):
+        """啟動採樣（每個容器一個執行緒）"""
+        for container in self.containers:
+            try:
+                info = self.docker.inspect(container)
+            except DockerAPIError:
+                self.stop()
+                raise
+            self.cpu_limits[container] = self._cpu_limit(info)
+            reader = CgroupReader.for_pid((info.get('State') or {}).get('Pid', 0))
+            if reader is not None:
+                target, args = self._poll_cgroup, (container, reader)
+            else:
+                target, args = self._follow_stream, (container,)
+            thread = threading.Thread(target=target, args=args, name=f"sampler-{container}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        """停止採樣"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=self.interval + 2)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def series(self, container: str, start_ns: int = 0) -> List[Dict]:
+        """容器的時間序列，t 為相對 start_ns 的秒數（例如負載測試開始時間）"""
+        rows = []
+        for sample in self.samples[container]:
+            row = asdict(sample)
+            row['t'] = (sample.t_ns - start_ns) / 1e9 if start_ns else sample.t_ns / 1e9
+            rows.append(row)
+        return rows
+
+    def summary(self) -> Dict[str, Dict]:
+        """每個容器的峰值，以及 CPU/記憶體是否接近限制"""
+        result = {}
+        for container, samples in self.samples.items():
+            if not samples:
+                continue
+            cpu_limit = self.cpu_limits.get(container, 1.0)
+            peak_cpu = max(s.cpu_percent for s in samples)
+            peak_memory = max(samples, key=lambda s: s.memory_bytes)
+            first, last = samples[0], samples[-1]
+            result[container] = {
+                'samples': len(samples),
+                'cpu_limit': cpu_limit,
+                'peak_cpu_percent': peak_cpu,
+                'avg_cpu_percent': sum(s.cpu_percent for s in samples) / len(samples),
+                'peak_memory_bytes': peak_memory.memory_bytes,
+                'memory_limit': peak_memory.memory_limit,
+                'block_read': last.block_read - first.block_read,
+                'block_write': last.block_write - first.block_write,
+                'net_rx': last.net_rx - first.net_rx,
+                'net_tx': last.net_tx - first.net_tx,
+                'cpu_saturated': peak_cpu >= cpu_limit * 100 * SATURATION_THRESHOLD,
+                'memory_saturated': peak_memory.memory_percent >= SATURATION_THRESHOLD * 100,
+            }
+        return result
+
+
+def format_summary(summary: Dict[str, Dict]) -> str:
+    """將 summary() 轉成可讀文字"""
+    lines = []
+    for container, s in summary.items():
+        limit_mb = s['memory_limit'] / 1024 / 1024
+        lines.append(f"{container}:")
+        lines.append(
+            f"  CPU: 峰值 {s['peak_cpu_percent']:.1f}% / 平均 {s['avg_cpu_percent']:.1f}%"
+            f"（限制 {s['cpu_limit'] * 100:.0f}%）{' ⚠️ 達到限制' if s['cpu_saturated'] else ''}"
+        )
+        lines.append(
+            f"  記憶體: 峰值 {s['peak_memory_bytes'] / 1024 / 1024:.1f}MiB / {limit_mb:.0f}MiB"
+            f"{' ⚠️ 達到限制' if s['memory_saturated'] else ''}"
+        )
+        lines.append(f"  區塊 IO: 讀 {s['block_read']} B / 寫 {s['block_write']} B")
+        lines.append(f"  網路: 收 {s['net_rx']} B / 送 {s['net_tx']} B")
+    return "\n".join(lines)
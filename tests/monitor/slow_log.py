@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+MySQL Slow Query Log Digest
+串流解析 MySQL 慢查詢日誌，將查詢正規化為指紋（去除字面值），
+依指紋彙總次數、總/平均/p95 時間、檢查與回傳的列數並排名
+
+日誌位置見 config/mysql/my.cnf（slow_query_log_file、long_query_time）。
+不需要將日誌傳出主機，直接從 db 容器串流：
+    docker compose exec -T db cat /var/log/mysql/slow-query.log | python3 -m tests.monitor.slow_log -
+    python3 -m tests.monitor.slow_log slow-query.log --sort rows_examined --top 10
+"""
+
+import argparse
+import json
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from tests.monitor.nginx_log import read_lines
+from tests.performance.histogram import LatencyHistogram
+
+# 一小時；慢查詢最少 long_query_time 秒，2 位有效數字已足夠
+QUERY_TIME_HIGHEST_MS = 3_600_000
+FINGERPRINT_SIGNIFICANT_DIGITS = 2
+EXAMPLE_MAX_LENGTH = 500
+OTHER_FINGERPRINT = "(其他)"
+
+HEADER_PATTERN = re.compile(r'^# (?:Time|User@Host|Query_time):')
+USER_HOST_PATTERN = re.compile(r'^# User@Host: (?P<user>[^\[\s]*)\[[^\]]*\] @ (?P<host>\S*) ?\[(?P<ip>[^\]]*)\]')
+METRIC_PATTERN = re.compile(r'(\w+): (\S+)')
+USE_PATTERN = re.compile(r'^use `?(?P<database>[^`;\s]+)`?;$', re.I)
+SET_TIMESTAMP_PATTERN = re.compile(r'^SET timestamp=(?P<timestamp>\d+);$')
+# mysqld 每次啟動時寫入的檔頭
+SERVER_HEADER_PATTERN = re.compile(r'^(?:\S+mysqld, Version: |Tcp port: |Time\s+Id\s+Command\s+Argument)')
+
+# 依序套用的指紋規則（與 pt-query-digest 的 fingerprint 類似）
+FINGERPRINT_RULES = [
+    (re.compile(r'/\*.*?\*/', re.S), ' '),
+    (re.compile(r"'(?:[^'\\]|\\.|'')*'"), '?'),
+    (re.compile(r'"(?:[^"\\]|\\.|"")*"'), '?'),
+    (re.compile(r'(?:-- |#)[^\n]*'), ' '),
+    (re.compile(r'\b0x[0-9a-f]+\b', re.I), '?'),
+    (re.compile(r'(?<![\w.`])-?\d+(?:\.\d+)?(?:e[+-]?\d+)?\b', re.I), '?'),
+    (re.compile(r'\s+'), ' '),
+]
+IN_LIST_PATTERN = re.compile(r'\b(in|values)\s*\(\s*\?(?:\s*,\s*\?)*\s*\)(?:\s*,\s*\(\s*\?(?:\s*,\s*\?)*\s*\))*')
+LIMIT_PATTERN = re.compile(r'\blimit \?(?:\s*,\s*\?| offset \?)?')
+
+# 依資料表名稱推測查詢來源（scripts/install-wp-plugins.sh 安裝的外掛）
+TABLE_SOURCES = [
+    (re.compile(r'rank_math'), "rank-math"),
+    (re.compile(r'_wf[a-z]'), "wordfence"),
+    (re.compile(r'wpmailsmtp_'), "wp-mail-smtp"),
+    (re.compile(r'actionscheduler_'), "action-scheduler"),
+    (re.compile(r'_(?:options|posts|postmeta|terms|term_taxonomy|term_relationships|users|usermeta|comments)\b'),
+     "wordpress"),
+]
+
+
+@dataclass
+class SlowQuery:
+    """一筆慢查詢記錄"""
+
+    sql: str
+    query_time: float = 0.0
+    lock_time: float = 0.0
+    rows_sent: int = 0
+    rows_examined: int = 0
+    user: str = ""
+    host: str = ""
+    database: Optional[str] = None
+    timestamp: Optional[int] = None
+
+    @property
+    def fingerprint(self) -> str:
+        return fingerprint(self.sql)
+
+
+def fingerprint(sql: str) -> str:
+    """將查詢正規化為指紋：去除註解與字面值，IN/VALUES 清單合併為 (?+)"""
+    text = sql.strip()
+    for pattern, replacement in FINGERPRINT_RULES:
+        text = pattern.sub(replacement, text)
+    text = text.strip().rstrip(';').strip().lower()
+    text = IN_LIST_PATTERN.sub(lambda m: f"{m.group(1)}(?+)", text)
+    return LIMIT_PATTERN.sub('limit ?', text)
+
+
+def guess_source(fingerprint_text: str) -> str:
+    """依查詢的資料表推測來源外掛，無法判斷時為 other"""
+    for pattern, source in TABLE_SOURCES:
+        if pattern.search(fingerprint_text):
+            return source
+    return "other"
+
+
+def _apply_metrics(entry: SlowQuery, line: str):
+    metrics = dict(METRIC_PATTERN.findall(line))
+    entry.query_time = float(metrics.get('Query_time', 0))
+    entry.lock_time = float(metrics.get('Lock_time', 0))
+    entry.rows_sent = int(metrics.get('Rows_sent', 0))
+    entry.rows_examined = int(metrics.get('Rows_examined', 0))
+
+
+def parse_entries(lines: Iterable[str]) -> Iterator[SlowQuery]:
+    """
+    將慢查詢日誌行解析為 SlowQuery
+
+    每筆記錄由 "# Time" / "# User@Host" / "# Query_time" 標頭開始，
+    接著是 use 與 SET timestamp，其餘行為查詢本體（可跨多行）。
+    """
+    entry: Optional[SlowQuery] = None
+    sql_lines: List[str] = []
+    database = None
+
+    def finish() -> Optional[SlowQuery]:
+        if entry is None or not sql_lines:
+            return None
+        entry.sql = "\n".join(sql_lines)
+        return entry
+
+    for raw in lines:
+        line = raw.rstrip('\n')
+        if not line.strip() or SERVER_HEADER_PATTERN.match(line):
+            continue
+        if HEADER_PATTERN.match(line):
+            # 新記錄的標頭出現在查詢本體之後
+            if sql_lines:
+                completed = finish()
+                if completed is not None:
+                    yield completed
+                entry, sql_lines = None, []
+            if entry is None:
+                entry = SlowQuery(sql="", database=database)
+            if line.startswith('# User@Host:'):
+                match = USER_HOST_PATTERN.match(line)
+                if match:
+                    entry.user = match.group('user')
+                    entry.host = match.group('ip') or match.group('host')
+            elif line.startswith('# Query_time:'):
+                _apply_metrics(entry, line)
+            continue
+        if entry is None:
+            continue
+        if not sql_lines:
+            use = USE_PATTERN.match(line)
+            if use:
+                # 同一連線的後續記錄不會重複 use，沿用上一個資料庫
+                database = entry.database = use.group('database')
+                continue
+            timestamp = SET_TIMESTAMP_PATTERN.match(line)
+            if timestamp:
+                entry.timestamp = int(timestamp.group('timestamp'))
+                continue
+        sql_lines.append(line)
+
+    completed = finish()
+    if completed is not None:
+        yield completed
+
+
+@dataclass
+class FingerprintStats:
+    """一個查詢指紋的彙總"""
+
+    fingerprint: str
+    count: int = 0
+    total_time: float = 0.0
+    total_lock_time: float = 0.0
+    rows_sent: int = 0
+    rows_examined: int = 0
+    max_rows_examined: int = 0
+    example: str = ""
+    example_time: float = 0.0
+    first_seen: Optional[int] = None
+    last_seen: Optional[int] = None
+    databases: Dict[str, int] = field(default_factory=dict)
+    query_time: LatencyHistogram = field(
+        default_factory=lambda: LatencyHistogram(QUERY_TIME_HIGHEST_MS, FINGERPRINT_SIGNIFICANT_DIGITS)
+    )
+
+    def add(self, entry: SlowQuery):
+        self.count += 1
+        self.total_time += entry.query_time
+        self.total_lock_time += entry.lock_time
+        self.rows_sent += entry.rows_sent
+        self.rows_examined += entry.rows_examined
+        self.max_rows_examined = max(self.max_rows_examined, entry.rows_examined)
+        self.query_time.record(entry.query_time * 1000)
+        # 保留最慢的一筆作為範例，方便直接 EXPLAIN
+        if entry.query_time >= self.example_time or not self.example:
+            self.example = entry.sql[:EXAMPLE_MAX_LENGTH]
+            self.example_time = entry.query_time
+        if entry.timestamp is not None:
+            if self.first_seen is None or entry.timestamp < self.first_seen:
+                self.first_seen = entry.timestamp
+            if self.last_seen is None or entry.timestamp > self.last_seen:
+                self.last_seen = entry.timestamp
+        if entry.database:
+            self.databases[entry.database] = self.databases.get(entry.database, 0) + 1
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.count if self.count else 0.0
+
+    @property
+    def p95_time(self) -> float:
+        return self.query_time.percentile(95) / 1000
+
+    @property
+    def examined_per_sent(self) -> Optional[float]:
+        """每回傳一列需檢查的列數，數值越大越可能缺少索引"""
+        if not self.rows_sent:
+            return None
+        return self.rows_examined / self.rows_sent
+
+    @property
+    def source(self) -> str:
+        return guess_source(self.fingerprint)
+
+    def to_dict(self) -> Dict:
+        return {
+            'fingerprint': self.fingerprint,
+            'source': self.source,
+            'count': self.count,
+            'total_time': round(self.total_time, 6),
+            'avg_time': round(self.avg_time, 6),
+            'p95_time': round(self.p95_time, 6),
+            'max_time': round(self.query_time.max / 1000, 6),
+            'lock_time': round(self.total_lock_time, 6),
+            'rows_sent': self.rows_sent,
+            'rows_examined': self.rows_examined,
+            'max_rows_examined': self.max_rows_examined,
+            'examined_per_sent': self.examined_per_sent,
+            'first_seen': self.first_seen,
+            'last_seen': self.last_seen,
+            'databases': self.databases,
+            'example': self.example,
+        }
+
+
+SORT_KEYS = {
+    'total_time': lambda s: s.total_time,
+    'count': lambda s: s.count,
+    'avg_time': lambda s: s.avg_time,
+    'p95_time': lambda s: s.p95_time,
+    'rows_examined': lambda s: s.rows_examined,
+}
+
+
+class SlowLogDigest:
+    """依指紋彙總 SlowQuery；指紋數量有上限，以維持固定記憶體"""
+
+    def __init__(self, max_fingerprints: int = 500):
+        self.max_fingerprints = max_fingerprints
+        self.fingerprints: Dict[str, FingerprintStats] = {}
+        self.total = FingerprintStats("(全部)")
+
+    def add(self, entry: SlowQuery):
+        self.total.add(entry)
+        key = entry.fingerprint
+        if key not in self.fingerprints and len(self.fingerprints) >= self.max_fingerprints:
+            key = OTHER_FINGERPRINT
+        if key not in self.fingerprints:
+            self.fingerprints[key] = FingerprintStats(key)
+        self.fingerprints[key].add(entry)
+
+    def consume(self, lines: Iterable[str]) -> "SlowLogDigest":
+        for entry in parse_entries(lines):
+            self.add(entry)
+        return self
+
+    def ranked(self, sort: str = 'total_time', top: Optional[int] = None) -> List[FingerprintStats]:
+        """依 sort 欄位由大到小排名"""
+        ranked = sorted(self.fingerprints.values(), key=SORT_KEYS[sort], reverse=True)
+        return ranked[:top]
+
+    def by_source(self) -> Dict[str, Dict[str, float]]:
+        """依來源外掛彙總次數與總時間"""
+        result: Dict[str, Dict[str, float]] = {}
+        for stats in self.fingerprints.values():
+            source = result.setdefault(stats.source, {'count': 0, 'total_time': 0.0})
+            source['count'] += stats.count
+            source['total_time'] += stats.total_time
+        return dict(sorted(result.items(), key=lambda item: item[1]['total_time'], reverse=True))
+
+    def to_dict(self, sort: str = 'total_time', top: Optional[int] = None) -> Dict:
+        return {
+            'queries': self.total.count,
+            'fingerprints': len(self.fingerprints),
+            'total_time': round(self.total.total_time, 6),
+            'sources': self.by_source(),
+            'ranked': [stats.to_dict() for stats in self.ranked(sort, top)],
+        }
+
+
+def format_report(digest: SlowLogDigest, sort: str = 'total_time', top: int = 20) -> str:
+    total_time = digest.total.total_time
+    lines = [
+        f"慢查詢: {digest.total.count} 筆  指紋: {len(digest.fingerprints)}  總時間: {total_time:.1f} 秒",
+        "依來源:",
+    ]
+    for source, s in digest.by_source().items():
+        share = s['total_time'] / total_time * 100 if total_time else 0
+        lines.append(f"  {source:<20}{s['count']:>8} 次{s['total_time']:>10.1f} 秒{share:>7.1f}%")
+
+    lines.append(f"排名（依 {sort}，前 {top}）:")
+    for rank, stats in enumerate(digest.ranked(sort, top), 1):
+        ratio = f"{stats.examined_per_sent:.0f}" if stats.examined_per_sent is not None else "-"
+        lines.append(
+            f"#{rank:<3} {stats.source:<18}次數 {stats.count}  總 {stats.total_time:.2f}s  "
+            f"平均 {stats.avg_time:.2f}s  p95 {stats.p95_time:.2f}s  "
+            f"檢查/回傳 {stats.rows_examined}/{stats.rows_sent}（{ratio}）"
+        )
+        lines.append(f"     {stats.fingerprint[:200]}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="MySQL 慢查詢日誌彙總")
+    parser.add_argument("paths", nargs="+", help="慢查詢日誌（.gz 亦可），- 代表 stdin")
+    parser.add_argument("--sort", choices=sorted(SORT_KEYS), default='total_time', help="排名依據（預設 total_time）")
+    parser.add_argument("--top", type=int, default=20, help="輸出前 N 個指紋（預設 20）")
+    parser.add_argument("--max-fingerprints", type=int, default=500, help="追蹤的指紋數上限（預設 500）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    digest = SlowLogDigest(max_fingerprints=args.max_fingerprints).consume(read_lines(args.paths))
+    if args.json:
+        print(json.dumps(digest.to_dict(args.sort, args.top), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(digest, args.sort, args.top))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Compose Resource Limits Tests
+compose 資源上限解析測試
+"""
+
+import unittest
+
+from tests.monitor.compose_limits import (
+    ServiceLimits, load_limits, load_lists, load_mounts, parse_limits, parse_lists, parse_memory, parse_mounts,
+)
+
+COMPOSE = """services:
+  # 網頁伺服器
+  nginx:
+    image: nginx:1.26-alpine
+    ports:
+      - "80:80"
+    deploy:
+      resources:
+        limits:
+          cpus: '0.5'
+          memory: 128M
+        reservations:
+          cpus: '0.1'
+          memory: 64M
+  cache:
+    image: redis:7-alpine
+    volumes:
+      - ./config/redis.conf:/usr/local/etc/redis/redis.conf:ro
+      - cache_data:/data
+
+volumes:
+  data:
+"""
+
+
+class TestComposeLimits(unittest.TestCase):
+    """資源上限解析測試類"""
+
+    def test_parse_limits(self):
+        """測試只讀取 limits（不含 reservations），未設定的服務為 None"""
+        limits = parse_limits(COMPOSE)
+        self.assertEqual(limits, {'nginx': ServiceLimits(0.5, 128 * 1024 ** 2), 'cache': ServiceLimits()})
+
+    def test_parse_memory(self):
+        """測試記憶體單位"""
+        self.assertEqual(parse_memory("512M"), 512 * 1024 ** 2)
+        self.assertEqual(parse_memory("1g"), 1024 ** 3)
+        self.assertEqual(parse_memory("1.5G"), int(1.5 * 1024 ** 3))
+        with self.assertRaises(ValueError):
+            parse_memory("lots")
+
+    def test_repo_compose(self):
+        """測試 docker-compose.yml 的 nginx 與 wordpress 上限"""
+        limits = load_limits()
+        self.assertEqual(limits['nginx'].cpus, 0.5)
+        self.assertEqual(limits['wordpress'].memory, 512 * 1024 ** 2)
+
+    def test_parse_mounts(self):
+        """測試只讀取 ./ 開頭的 bind mount（不含具名 volume）"""
+        self.assertEqual(parse_mounts(COMPOSE), {'config/redis.conf': ('cache', '/usr/local/etc/redis/redis.conf')})
+        self.assertEqual(load_mounts()['config/php/php-fpm.conf'], ('wordpress', '/usr/local/etc/php-fpm.d/zz-custom.conf'))
+
+    def test_parse_lists(self):
+        """測試只讀取服務第一層的清單（不含巢狀的鍵與其他服務）"""
+        self.assertEqual(parse_lists(COMPOSE, "ports"), {'nginx': ["80:80"]})
+        self.assertEqual(parse_lists(COMPOSE, "volumes")['cache'][1], "cache_data:/data")
+        self.assertEqual(parse_lists(COMPOSE, "limits"), {})
+        self.assertIn("${NGINX_HTTP_PORT:-80}:80", load_lists("ports")['nginx'])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
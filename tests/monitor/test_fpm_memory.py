@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+PHP-FPM Worker Memory Tests
+PHP-FPM worker 記憶體測試：smaps_rollup 解析、進程角色判斷、取樣與彙總，以及讀不到 /proc 時的估計
+"""
+
+import os
+import tempfile
+import unittest
+
+from tests.monitor.fpm_memory import (
+    CGROUP, MB, SMAPS, WorkerMemorySampler, format_report, fpm_role, parse_smaps_rollup,
+)
+
+
+def smaps(rss_mb: int, pss_mb: int, private_mb: int) -> str:
+    return (f"55d0c0a00000-7ffd6a5f1000 ---p 00000000 00:00 0                          [rollup]\n"
+            f"Rss:            {rss_mb * 1024} kB\nPss:            {pss_mb * 1024} kB\n"
+            f"Shared_Clean:   {(rss_mb - private_mb) * 1024} kB\nShared_Dirty:          0 kB\n"
+            f"Private_Clean:        512 kB\nPrivate_Dirty:  {private_mb * 1024 - 512} kB\nSwap:                  0 kB\n")
+
+
+class FakeDocker:
+    """只提供 top 與 stats 的 Docker API"""
+
+    timeout = 1
+
+    def __init__(self, processes, memory_bytes=0):
+        self.processes = processes
+        self.memory_bytes = memory_bytes
+
+    def top(self, container):
+        return self.processes
+
+    def get(self, path):
+        return {'memory_stats': {'usage': self.memory_bytes, 'limit': 512 * MB}}
+
+
+class TestParsing(unittest.TestCase):
+    """smaps_rollup 與進程判斷測試類"""
+
+    def test_parse_smaps_rollup(self):
+        """測試欄位轉為位元組並略過標題行"""
+        values = parse_smaps_rollup(smaps(60, 30, 20))
+        self.assertEqual(values['Rss'], 60 * MB)
+        self.assertEqual(values['Pss'], 30 * MB)
+        self.assertEqual(values['Private_Clean'] + values['Private_Dirty'], 20 * MB)
+
+    def test_fpm_role(self):
+        """測試由命令列區分 master 與 worker"""
+        self.assertEqual(fpm_role("php-fpm: master process (/usr/local/etc/php-fpm.conf)"), "master")
+        self.assertEqual(fpm_role("php-fpm: pool www"), "worker")
+        self.assertIsNone(fpm_role("/bin/sh -c ps aux"))
+
+
+class TestWorkerMemorySampler(unittest.TestCase):
+    """取樣與彙總測試類"""
+
+    def _proc(self, root, pid, text):
+        os.makedirs(os.path.join(root, str(pid)))
+        with open(os.path.join(root, str(pid), "smaps_rollup"), "w") as f:
+            f.write(text)
+
+    def test_smaps_snapshots(self):
+        """測試每個 worker 取峰值、回收的 worker 略過，base 為 master 與共用頁面"""
+        with tempfile.TemporaryDirectory() as root:
+            self._proc(root, 10, smaps(150, 20, 8))
+            self._proc(root, 11, smaps(160, 50, 30))
+            self._proc(root, 12, smaps(170, 60, 40))
+            docker = FakeDocker([(10, "php-fpm: master process (/usr/local/etc/php-fpm.conf)"),
+                                 (11, "php-fpm: pool www"), (12, "php-fpm: pool www"), (13, "php-fpm: pool www")])
+            sampler = WorkerMemorySampler(docker=docker, proc_root=root)
+            sampler.snapshots.append(sampler.snapshot())
+            with open(os.path.join(root, "11", "smaps_rollup"), "w") as f:
+                f.write(smaps(180, 70, 50))
+            sampler.snapshots.append(sampler.snapshot())
+
+        first = sampler.snapshots[0]
+        self.assertEqual(len(first.workers), 2)
+        self.assertEqual(first.total_pss, 130 * MB)
+        self.assertEqual(first.base, 60 * MB)
+        summary = sampler.summary()
+        self.assertEqual(summary.source, SMAPS)
+        self.assertEqual((summary.worker_uss_max, summary.worker_uss_p50), (50 * MB, 50 * MB))
+        self.assertEqual((summary.worker_pss_max, summary.worker_rss_max), (70 * MB, 180 * MB))
+        self.assertEqual(summary.peak_total, 150 * MB)
+        self.assertIn("smaps_rollup", format_report(summary))
+
+    def test_cgroup_fallback(self):
+        """測試讀不到主機 /proc 時以容器記憶體平均分攤"""
+        with tempfile.NamedTemporaryFile() as not_a_directory:
+            docker = FakeDocker([(1, "php-fpm: master process"), (2, "php-fpm: pool www"),
+                                 (3, "php-fpm: pool www"), (4, "php-fpm: pool www")], memory_bytes=200 * MB)
+            sampler = WorkerMemorySampler(docker=docker, proc_root=not_a_directory.name)
+            snapshot = sampler.snapshot()
+        self.assertEqual(sampler.source, CGROUP)
+        self.assertEqual([process.uss for process in snapshot.workers], [50 * MB] * 3)
+        self.assertTrue(sampler.summary().estimated)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
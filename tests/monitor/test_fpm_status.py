@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+PHP-FPM Status Poller Tests
+PHP-FPM 狀態頁測試：JSON 與純文字格式解析、pool 設定讀取、飽和判斷，以及對替身伺服器的取樣
+"""
+
+import os
+import unittest
+
+from tests.monitor.compose_limits import BENCH_COMPOSE_FILE, REPO_ROOT, load_lists, load_mounts
+from tests.monitor.fpm_status import (
+    FpmStatus, FpmStatusPoller, FpmStatusUnavailable, LatencyTimeline, analyze, format_report, load_pool_config, parse_status,
+)
+from tests.performance.loadgen import run_open_loop
+from tests.performance.standin import FaultProfile, StandInServer
+
+STATUS_TEXT = """pool:                 www
+process manager:      dynamic
+start time:           17/Oct/2026:10:00:00 +0000
+start since:          120
+accepted conn:        5321
+listen queue:         3
+max listen queue:     12
+listen queue len:     511
+idle processes:       0
+active processes:     20
+total processes:      20
+max active processes: 20
+max children reached: 4
+slow requests:        1
+"""
+
+MS = 1_000_000
+
+
+def _samples(queues, active, max_children=4):
+    """每 100ms 一次取樣；有排隊的取樣視為 pool 飽和"""
+    reached = 0
+    samples = []
+    for i, (queue, busy) in enumerate(zip(queues, active)):
+        reached += bool(queue)
+        samples.append(FpmStatus(i * 100 * MS, accepted_conn=i * 10, listen_queue=queue, active=busy,
+                                 idle=max_children - busy, total=max_children, max_children_reached=reached))
+    return samples
+
+
+class TestParseStatus(unittest.TestCase):
+    """狀態頁解析測試類"""
+
+    def test_text_and_json(self):
+        """測試純文字與 ?json 格式得到相同的欄位"""
+        status = parse_status(STATUS_TEXT)
+        self.assertEqual((status.pool, status.process_manager), ("www", "dynamic"))
+        self.assertEqual((status.accepted_conn, status.listen_queue, status.max_listen_queue), (5321, 3, 12))
+        self.assertEqual((status.idle, status.active, status.max_children_reached, status.slow_requests),
+                         (0, 20, 4, 1))
+        json_status = parse_status('{"pool":"www","process manager":"dynamic","accepted conn":5321,'
+                                   '"listen queue":3,"active processes":20,"max children reached":4}')
+        self.assertEqual((json_status.accepted_conn, json_status.active, json_status.max_children_reached),
+                         (5321, 20, 4))
+
+    def test_not_status_page(self):
+        """測試 WordPress 頁面（location 未生效時）不被當成狀態頁"""
+        with self.assertRaises(ValueError):
+            parse_status("<!DOCTYPE html><html></html>")
+
+    def test_repo_pool_config(self):
+        """測試讀取 php-fpm.conf 的 www pool 設定"""
+        config = load_pool_config()
+        self.assertEqual(config['pm.status_path'], "/fpm-status")
+        self.assertGreater(int(config['pm.max_children']), 0)
+
+    def test_slowlog_bench_only(self):
+        """測試 slowlog 與 SYS_PTRACE 只在 docker-compose.bench.yml 啟用（master 以 ptrace 讀取 worker 的堆疊）"""
+        self.assertNotIn('slowlog', load_pool_config())
+        self.assertNotIn('wordpress', load_lists("cap_add"))
+        self.assertEqual(load_lists("cap_add", BENCH_COMPOSE_FILE)['wordpress'], ["SYS_PTRACE"])
+        service, target = load_mounts(BENCH_COMPOSE_FILE)['config/php/php-fpm-slowlog.conf']
+        self.assertEqual((service, os.path.basename(target)), ("wordpress", "zz-slowlog.conf"))
+        self.assertLess("zz-custom.conf", os.path.basename(target))
+        slowlog = load_pool_config(os.path.join(REPO_ROOT, "config", "php", "php-fpm-slowlog.conf"))
+        self.assertEqual(slowlog['request_slowlog_timeout'], "5s")
+
+
+class TestAnalyze(unittest.TestCase):
+    """飽和判斷測試類"""
+
+    def _timeline(self, latencies):
+        timeline = LatencyTimeline()
+        timeline.points = [((i + 1) * 100 * MS - MS, latency) for i, latency in enumerate(latencies)]
+        return timeline
+
+    def test_queue_inflates_latency(self):
+        """測試排隊時延遲明顯較高，判定 max_children 為瓶頸"""
+        queues = [0, 0, 0, 5, 8, 6, 0, 0]
+        samples = _samples(queues, [2, 3, 4, 4, 4, 4, 3, 2])
+        analysis = analyze(samples, self._timeline([10, 10, 10, 200, 300, 250, 10, 10]), max_children=4)
+        self.assertEqual((analysis.peak_listen_queue, analysis.peak_active, analysis.max_children_reached),
+                         (8, 4, 3))
+        self.assertEqual(analysis.accepted, 70)
+        self.assertGreater(analysis.queue_latency_correlation, 0.7)
+        self.assertGreater(analysis.p99_saturated, analysis.p99_unsaturated * 2)
+        self.assertTrue(analysis.bottleneck)
+        self.assertIn("pm.max_children 是實際的限制", format_report(analysis))
+
+    def test_saturated_without_latency_impact(self):
+        """測試 pool 全忙但延遲沒有增加時不判定為瓶頸"""
+        samples = _samples([0] * 8, [1, 1, 4, 4, 4, 1, 1, 1])
+        analysis = analyze(samples, self._timeline([10] * 8), max_children=4)
+        self.assertEqual(analysis.saturated_ratio, 3 / 8)
+        self.assertFalse(analysis.bottleneck)
+
+    def test_idle_pool(self):
+        """測試沒有排隊也沒有全忙時不是瓶頸"""
+        analysis = analyze(_samples([0] * 4, [1] * 4), max_children=4)
+        self.assertEqual(analysis.saturated_ratio, 0)
+        self.assertFalse(analysis.bottleneck)
+        self.assertIn("max_children 不是限制", format_report(analysis))
+
+
+class TestFpmStatusPoller(unittest.TestCase):
+    """對替身伺服器的取樣測試類"""
+
+    def test_standin_saturation(self):
+        """測試到達率超過 workers / latency 時取樣到排隊與 max children reached"""
+        timeline = LatencyTimeline()
+        with StandInServer(FaultProfile(latency_ms=50, workers=2)) as server:
+            with FpmStatusPoller(server.internal_url, interval=0.1, max_children=2) as poller:
+                run_open_loop(f"{server.base_url}/", rate=80, duration=1.5, on_response=timeline)
+        analysis = poller.analyze(timeline)
+        self.assertEqual(poller.errors, 0)
+        self.assertGreaterEqual(analysis.accepted, 120)
+        self.assertEqual(analysis.peak_active, 2)
+        self.assertGreater(analysis.peak_listen_queue, 10)
+        self.assertGreater(analysis.max_children_reached, 0)
+        self.assertTrue(analysis.bottleneck, format_report(analysis))
+
+    def test_public_server_has_no_status(self):
+        """測試狀態頁只在內部 server 提供，公開的 server 由 WordPress 回應一般頁面"""
+        with StandInServer() as server:
+            with self.assertRaises(FpmStatusUnavailable):
+                FpmStatusPoller(server.base_url).poll()
+            self.assertEqual(FpmStatusPoller(server.internal_url).poll().pool, "www")
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
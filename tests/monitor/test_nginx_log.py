@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Nginx Access Log Analyzer Tests
+access log 分析測試：main/timed 格式解析、location 分類與彙總
+"""
+
+import unittest
+
+from tests.monitor.nginx_log import (
+    LOCATION_NAMES,
+    AccessLogAnalyzer,
+    classify_location,
+    normalize_route,
+    parse_lines,
+    server_locations,
+)
+
+MAIN_LINE = ('172.18.0.1 - - [17/Oct/2026:10:00:00 +0000] "GET /wp-login.php HTTP/1.1" 429 162 '
+             '"-" "python-requests/2.31.0" "-"')
+TIMED_LINES = [
+    '172.18.0.1 - - [17/Oct/2026:10:00:00 +0000] "GET /?s=hello HTTP/1.1" 200 5120 "-" "curl/8.0" "-" '
+    'rt=0.250 urt="0.248"',
+    '172.18.0.1 - - [17/Oct/2026:10:00:00 +0000] "GET /2026/10/17/hello-world/ HTTP/1.1" 200 8000 "-" '
+    '"curl/8.0" "-" rt=0.120 urt="0.100, 0.015"',
+    '172.18.0.1 - - [17/Oct/2026:10:00:01 +0000] "GET /wp-json/wp/v2/posts/12 HTTP/1.1" 200 900 "-" '
+    '"curl/8.0" "-" rt=0.050 urt="0.049"',
+    '172.18.0.1 - - [17/Oct/2026:10:00:02 +0000] "GET /wp-includes/js/jquery/jquery.min.js HTTP/1.1" '
+    '200 30000 "-" "curl/8.0" "-" rt=0.001 urt="-"',
+]
+
+
+class TestNginxLogParsing(unittest.TestCase):
+    """access log 解析測試類"""
+
+    def test_parse_main_format(self):
+        """測試 main 格式（無延遲欄位）"""
+        entry = next(parse_lines([MAIN_LINE]))
+        self.assertEqual(entry.status, 429)
+        self.assertEqual(entry.path, "/wp-login.php")
+        self.assertIsNone(entry.request_time)
+
+    def test_parse_timed_format(self):
+        """測試 timed 格式，重試時上游時間取總和"""
+        entries = list(parse_lines(TIMED_LINES))
+        self.assertEqual(len(entries), 4)
+        self.assertAlmostEqual(entries[0].request_time, 0.25)
+        self.assertAlmostEqual(entries[1].upstream_time, 0.115)
+        self.assertIsNone(entries[3].upstream_time)
+
+    def test_unparsed_lines_counted(self):
+        """測試無法解析的行被計數而不中斷"""
+        unparsed = [0]
+        entries = list(parse_lines(["garbage", MAIN_LINE], unparsed))
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(unparsed[0], 1)
+
+    def test_classify_location(self):
+        """測試 location 分類與 default.conf 比對順序一致"""
+        cases = {
+            "/health": "health",
+            "/wp-login.php": "wp-login",
+            "/xmlrpc.php": "xmlrpc",
+            "/wp-json/wp/v2/posts?page=2": "wp-json",
+            "/wp-config.php": "denied",
+            "/wp-includes/version.php": "denied",
+            "/wp-admin/admin-ajax.php": "php",
+            "/wp-content/themes/twentytwentyfour/style.css": "static",
+            "/.env": "denied",
+            "/?s=test": "general",
+            "/sample-page/": "general",
+        }
+        for path, expected in cases.items():
+            self.assertEqual(classify_location(path), expected, path)
+
+    def test_every_location_classified(self):
+        """測試 default.conf 的每個 location 都有分類名稱，且分類表沒有 default.conf 已刪除的 location"""
+        names = [location.name for location in server_locations().locations]
+        self.assertEqual(set(names) - set(LOCATION_NAMES), set(), "default.conf 新增的 location 未加入 LOCATION_NAMES")
+        self.assertEqual(set(LOCATION_NAMES) - set(names), set())
+
+    def test_normalize_route(self):
+        """測試路由正規化"""
+        self.assertEqual(normalize_route("/wp-json/wp/v2/posts/12?_embed"), "/wp-json/wp/v2/posts/:id")
+        self.assertEqual(normalize_route("/?s=hello"), "/?s=")
+
+
+class TestAccessLogAnalyzer(unittest.TestCase):
+    """access log 彙總測試類"""
+
+    def test_aggregate_by_location(self):
+        """測試依 location 彙總請求、429 與延遲"""
+        analyzer = AccessLogAnalyzer().consume([MAIN_LINE] + TIMED_LINES)
+        result = analyzer.to_dict(include_routes=True)
+
+        self.assertEqual(result['total']['requests'], 5)
+        self.assertEqual(result['locations']['wp-login']['throttled_429'], 1)
+        self.assertEqual(result['locations']['general']['requests'], 2)
+        self.assertEqual(result['locations']['general']['peak_rps'], 2)
+        self.assertAlmostEqual(result['locations']['general']['request_time_ms']['max'], 250, delta=1)
+        self.assertIn('/?s=', result['routes'])
+
+    def test_route_limit(self):
+        """測試路由數量超過上限時合併為其他"""
+        lines = [
+            f'10.0.0.1 - - [17/Oct/2026:10:00:00 +0000] "GET /page-{i}/ HTTP/1.1" 200 10 "-" "x" "-"'
+            for i in range(10)
+        ]
+        analyzer = AccessLogAnalyzer(max_routes=3).consume(lines)
+        self.assertEqual(len(analyzer.routes), 4)
+        self.assertEqual(analyzer.routes["(其他)"].requests, 7)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
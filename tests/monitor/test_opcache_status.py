@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+OPcache Status Collector Tests
+OPcache 狀態取樣測試：狀態解析、key slot 與記憶體不足的判斷、預載清單，以及對替身伺服器的取樣
+"""
+
+import json
+import os
+import unittest
+
+import requests
+
+from tests.monitor.compose_limits import REPO_ROOT
+from tests.monitor.nginx_log import classify_location
+from tests.monitor.opcache_status import (
+    MB, OpcacheStatus, OpcacheStatusPoller, ScriptStats, analyze, format_report, hot_scripts, key_slots,
+    parse_status, render_preload,
+)
+from tests.performance.standin import OpcacheModel, StandInServer
+
+DIRECTIVES = {'opcache.memory_consumption': 128 * MB, 'opcache.max_accelerated_files': 10000,
+              'opcache.max_wasted_percentage': 0.05, 'opcache.interned_strings_buffer': 8}
+
+
+def sample(t: float, hits: int, misses: int = 0, keys: int = 3000, free_mb: float = 60, hash_restarts: int = 0,
+           oom_restarts: int = 0, cache_full: bool = False, wasted: float = 0.5,
+           php_files=None) -> OpcacheStatus:
+    return OpcacheStatus(int(t * 1e9), cache_full=cache_full, used_memory=int((128 - free_mb) * MB),
+                         free_memory=int(free_mb * MB), wasted_percentage=wasted, interned_used=4 * MB,
+                         interned_size=8 * MB, cached_scripts=keys, cached_keys=keys, max_cached_keys=16229,
+                         hits=hits, misses=misses, hash_restarts=hash_restarts, oom_restarts=oom_restarts,
+                         php_files=php_files, directives=DIRECTIVES)
+
+
+class TestParseStatus(unittest.TestCase):
+    """狀態解析測試類"""
+
+    def test_parse_status(self):
+        """測試讀取 opcache_get_status 的巢狀欄位與各腳本的命中次數"""
+        status = OpcacheModel(max_files=10000).status(scripts=True)
+        status['opcache_statistics'].update(hits=120, misses=8, hash_restarts=2)
+        status['scripts'] = {"/var/www/html/index.php": {'hits': 40, 'memory_consumption': 2048,
+                                                          'last_used_timestamp': 1}}
+        parsed = parse_status(json.dumps(status), 5)
+        self.assertEqual((parsed.hits, parsed.misses, parsed.hash_restarts), (120, 8, 2))
+        self.assertEqual(parsed.max_cached_keys, 16229)
+        self.assertEqual(parsed.memory_size, 128 * MB)
+        self.assertEqual(parsed.scripts["/var/www/html/index.php"], ScriptStats(40, 2048, 1))
+        with self.assertRaises(ValueError):
+            parse_status(json.dumps({'error': "OPcache 未啟用"}))
+
+    def test_key_slots(self):
+        """測試 max_accelerated_files 進位到質數"""
+        self.assertEqual(key_slots(10000), 16229)
+        self.assertEqual(key_slots(16229), 16229)
+        self.assertEqual(key_slots(4000), 7963)
+
+    def test_status_location(self):
+        """測試 /opcache-status 只在內部 server 提供，公開的 server 落到 location /（由 WordPress 回應）"""
+        self.assertEqual(classify_location("/opcache-status?scripts=1"), "general")
+        for name in ("default.conf", "default-80-redirect.conf", "default-ssl.conf"):
+            with open(os.path.join(REPO_ROOT, "config", "nginx", name), encoding="utf-8") as f:
+                self.assertNotIn("/opcache-status", f.read(), name)
+        with open(os.path.join(REPO_ROOT, "config", "nginx", "internal.conf"), encoding="utf-8") as f:
+            self.assertIn("location = /opcache-status {", f.read())
+
+
+class TestAnalyze(unittest.TestCase):
+    """設定是否足夠的判斷測試類"""
+
+    def test_healthy(self):
+        """測試 key slot 與記憶體充足、命中率高時沒有建議"""
+        analysis = analyze([sample(0, 1000, 50), sample(10, 101000, 60)])
+        self.assertEqual((analysis.hits, analysis.misses), (100000, 10))
+        self.assertEqual(analysis.findings, [])
+        self.assertIn("OPcache 設定足夠", format_report(analysis))
+
+    def test_key_slots_exhausted(self):
+        """測試外掛檔案超過 key slot 時建議提高 max_accelerated_files"""
+        analysis = analyze([sample(0, 1000, keys=15000, php_files=21000),
+                            sample(10, 500, 900, keys=16229, cache_full=True, hash_restarts=1)])
+        self.assertTrue(analysis.keys_exhausted)
+        self.assertEqual(analysis.hash_restarts, 1)
+        # 重啟後 hits 歸零，以重啟後的值計算
+        self.assertEqual((analysis.hits, analysis.misses), (500, 900))
+        self.assertEqual(analysis.recommendations, {'opcache.max_accelerated_files': "32531"})
+        self.assertIn("21000 個 .php 檔", analysis.findings[0])
+        self.assertTrue(any("重啟後重新編譯" in finding for finding in analysis.findings))
+
+    def test_memory_exhausted(self):
+        """測試共享記憶體不足時建議提高 memory_consumption"""
+        analysis = analyze([sample(0, 1000, free_mb=10), sample(10, 2000, free_mb=4, oom_restarts=1, wasted=4.5)])
+        self.assertTrue(analysis.memory_exhausted)
+        # (128M − 4M) × 1.5 進位到 32M
+        self.assertEqual(analysis.recommendations, {'opcache.memory_consumption': "192"})
+        self.assertTrue(any("max_wasted_percentage" in finding for finding in analysis.findings))
+
+
+class TestPreload(unittest.TestCase):
+    """預載清單測試類"""
+
+    def test_hot_scripts(self):
+        """測試依命中次數選擇、排除後台與低命中腳本，並遵守記憶體預算"""
+        scripts = {
+            "/var/www/html/wp-includes/plugin.php": ScriptStats(900, 2 * MB),
+            "/var/www/html/wp-admin/admin-ajax.php": ScriptStats(800, 1 * MB),
+            "/var/www/html/wp-includes/big.php": ScriptStats(700, 5 * MB),
+            "/var/www/html/wp-includes/query.php": ScriptStats(600, 1 * MB),
+            "/var/www/html/wp-includes/rare.php": ScriptStats(3, 1 * MB),
+        }
+        paths = hot_scripts(scripts, memory_budget=4 * MB)
+        self.assertEqual(paths, ["/var/www/html/wp-includes/plugin.php", "/var/www/html/wp-includes/query.php"])
+        text = render_preload(paths + ["/var/www/html/it's.php"], None)
+        self.assertTrue(text.startswith("<?php\n"))
+        self.assertIn("    '/var/www/html/wp-includes/plugin.php',\n", text)
+        self.assertIn("'/var/www/html/it\\'s.php'", text)
+        self.assertIn("opcache_compile_file($file);", text)
+
+
+class TestOpcacheStatusPoller(unittest.TestCase):
+    """對替身伺服器的取樣測試類"""
+
+    def test_standin_cache_full(self):
+        """測試 key slot 不足時新的腳本持續 miss，並回報檔案數與建議值"""
+        with StandInServer() as server:
+            server.opcache = OpcacheModel(max_files=5, php_files=12000)
+            with OpcacheStatusPoller(server.internal_url, interval=0.1) as poller:
+                for path in ["/", "/wp-json/wp/v2/posts", "/?p=1", "/wp-admin/admin-ajax.php"] * 5:
+                    requests.get(f"{server.base_url}{path}", timeout=5)
+        analysis = poller.analyze()
+        self.assertEqual(poller.errors, 0)
+        self.assertEqual(analysis.php_files, 12000)
+        self.assertTrue(analysis.cache_full)
+        self.assertLess(analysis.hit_ratio, 0.99)
+        self.assertEqual(analysis.recommendations['opcache.max_accelerated_files'], "32531")
+        self.assertEqual(len(poller.scripts), key_slots(5))
+        self.assertTrue(hot_scripts(poller.scripts, 128 * MB))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Resource Sampler Tests
+資源採樣器測試：Docker stats 與 cgroup v2 計數器解析
+"""
+
+import os
+import tempfile
+import unittest
+
+from tests.monitor.resource_sampler import CgroupReader, parse_net_dev, parse_stats_json
+
+NET_DEV = """Inter-|   Receive                                                |  Transmit
+ face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed
+    lo:     100       1    0    0    0     0          0         0      100       1    0    0    0     0       0          0
+  eth0:    5000      40    0    0    0     0          0         0     7000      50    0    0    0     0       0          0
+"""
+
+
+class TestResourceParsing(unittest.TestCase):
+    """資源計數器解析測試類"""
+
+    def test_parse_stats_json(self):
+        """測試解析 Docker stats API JSON"""
+        counters = parse_stats_json({
+            'cpu_stats': {'cpu_usage': {'total_usage': 2_000_000_000}},
+            'memory_stats': {'usage': 300 * 1024 * 1024, 'limit': 512 * 1024 * 1024,
+                             'stats': {'inactive_file': 100 * 1024 * 1024}},
+            'blkio_stats': {'io_service_bytes_recursive': [
+                {'op': 'read', 'value': 10}, {'op': 'write', 'value': 20}, {'op': 'total', 'value': 30},
+            ]},
+            'networks': {'eth0': {'rx_bytes': 5, 'tx_bytes': 7}},
+        })
+        self.assertEqual(counters.cpu_ns, 2_000_000_000)
+        self.assertEqual(counters.memory_bytes, 200 * 1024 * 1024)
+        self.assertEqual(counters.memory_limit, 512 * 1024 * 1024)
+        self.assertEqual((counters.block_read, counters.block_write), (10, 20))
+        self.assertEqual((counters.net_rx, counters.net_tx), (5, 7))
+
+    def test_parse_net_dev_excludes_loopback(self):
+        """測試 /proc/net/dev 解析不含 lo"""
+        self.assertEqual(parse_net_dev(NET_DEV), (5000, 7000))
+
+    def test_cgroup_reader(self):
+        """測試直接讀取 cgroup v2 檔案"""
+        with tempfile.TemporaryDirectory() as root:
+            cgroup = os.path.join(root, "cgroup", "system.slice", "docker-abc.scope")
+            os.makedirs(cgroup)
+            os.makedirs(os.path.join(root, "proc", "42", "net"))
+            files = {
+                os.path.join(root, "proc", "42", "cgroup"): "0::/system.slice/docker-abc.scope\n",
+                os.path.join(root, "proc", "42", "net", "dev"): NET_DEV,
+                os.path.join(cgroup, "cpu.stat"): "usage_usec 1500\nuser_usec 1000\nsystem_usec 500\n",
+                os.path.join(cgroup, "memory.current"): "4096\n",
+                os.path.join(cgroup, "memory.max"): "134217728\n",
+                os.path.join(cgroup, "memory.stat"): "anon 3000\ninactive_file 1024\n",
+                os.path.join(cgroup, "io.stat"): "8:0 rbytes=100 wbytes=200 rios=1 wios=2\n",
+            }
+            for path, content in files.items():
+                with open(path, "w") as f:
+                    f.write(content)
+
+            reader = CgroupReader.for_pid(42, cgroup_root=os.path.join(root, "cgroup"),
+                                          proc_root=os.path.join(root, "proc"))
+            self.assertIsNotNone(reader, "找不到 cgroup 路徑")
+            counters = reader.read()
+            self.assertEqual(counters.cpu_ns, 1_500_000)
+            self.assertEqual(counters.memory_bytes, 3072)
+            self.assertEqual(counters.memory_limit, 134217728)
+            self.assertEqual((counters.block_read, counters.block_write), (100, 200))
+            self.assertEqual((counters.net_rx, counters.net_tx), (5000, 7000))
+
+    def test_missing_cgroup_returns_none(self):
+        """測試找不到 cgroup 時回傳 None（改用 stats 串流）"""
+        with tempfile.TemporaryDirectory() as root:
+            self.assertIsNone(CgroupReader.for_pid(999999, proc_root=root))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
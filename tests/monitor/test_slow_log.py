@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+MySQL Slow Query Log Digest Tests
+慢查詢日誌彙總測試：指紋正規化、日誌解析與排名
+"""
+
+import unittest
+
+from tests.monitor.slow_log import SlowLogDigest, fingerprint, guess_source, parse_entries
+
+SLOW_LOG = """/usr/sbin/mysqld, Version: 8.0.36 (MySQL Community Server - GPL). started with:
+Tcp port: 3306  Unix socket: /var/run/mysqld/mysqld.sock
+Time                 Id Command    Argument
+# Time: 2026-10-17T10:00:00.000000Z
+# User@Host: wordpress[wordpress] @ wordpress_app.wordpress_network [172.18.0.3]  Id:    12
+# Query_time: 3.000000  Lock_time: 0.000100 Rows_sent: 10  Rows_examined: 500000
+use wordpress;
+SET timestamp=1760695200;
+SELECT object_id FROM wp_rank_math_internal_meta
+WHERE object_id IN (1, 2, 3) AND incoming_link_count = 0;
+# Time: 2026-10-17T10:00:05.000000Z
+# User@Host: wordpress[wordpress] @ wordpress_app.wordpress_network [172.18.0.3]  Id:    12
+# Query_time: 5.000000  Lock_time: 0.000100 Rows_sent: 2  Rows_examined: 900000
+SET timestamp=1760695205;
+SELECT object_id FROM wp_rank_math_internal_meta WHERE object_id IN (7) AND incoming_link_count = 0;
+# Time: 2026-10-17T10:00:09.000000Z
+# User@Host: wordpress[wordpress] @ wordpress_app.wordpress_network [172.18.0.3]  Id:    15
+# Query_time: 2.500000  Lock_time: 0.000000 Rows_sent: 1  Rows_examined: 1
+SET timestamp=1760695209;
+SELECT * FROM wp_wfconfig WHERE name = 'scanStartAttempt';
+"""
+
+
+class TestFingerprint(unittest.TestCase):
+    """指紋正規化測試類"""
+
+    def test_strip_literals(self):
+        """測試字串、數字、十六進位字面值被替換"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM wp_posts WHERE ID = 42 AND post_title = 'It''s' AND guid = 0x1F"),
+            "select * from wp_posts where id = ? and post_title = ? and guid = ?",
+        )
+
+    def test_collapse_lists_and_limits(self):
+        """測試 IN、VALUES 清單與 LIMIT 合併"""
+        self.assertEqual(
+            fingerprint("SELECT a FROM t WHERE id IN (1,2, 3) LIMIT 10, 20;"),
+            "select a from t where id in(?+) limit ?",
+        )
+        self.assertEqual(
+            fingerprint("INSERT INTO wp_wfhits (a, b) VALUES (1, 'x'), (2, 'y')"),
+            "insert into wp_wfhits (a, b) values(?+)",
+        )
+
+    def test_keep_identifiers_with_digits(self):
+        """測試含數字的資料表名稱不被替換（多站台 wp_2_posts）"""
+        self.assertIn("wp_2_posts", fingerprint("SELECT 1 FROM wp_2_posts /* comment 5 */"))
+
+    def test_guess_source(self):
+        """測試依資料表推測來源外掛"""
+        self.assertEqual(guess_source("select * from wp_rank_math_analytics_gsc"), "rank-math")
+        self.assertEqual(guess_source("select * from wp_wflogins where ip = ?"), "wordfence")
+        self.assertEqual(guess_source("select * from wp_options where autoload = ?"), "wordpress")
+        self.assertEqual(guess_source("select ?"), "other")
+
+
+class TestSlowLogDigest(unittest.TestCase):
+    """慢查詢解析與彙總測試類"""
+
+    def test_parse_entries(self):
+        """測試多行查詢、use 與 timestamp 解析，並略過 mysqld 檔頭"""
+        entries = list(parse_entries(SLOW_LOG.splitlines(True)))
+        self.assertEqual(len(entries), 3)
+        first = entries[0]
+        self.assertEqual(first.database, "wordpress")
+        self.assertEqual(first.timestamp, 1760695200)
+        self.assertEqual(first.host, "172.18.0.3")
+        self.assertEqual(first.rows_examined, 500000)
+        self.assertIn("incoming_link_count", first.sql)
+        self.assertEqual(entries[1].database, "wordpress")
+
+    def test_aggregate_and_rank(self):
+        """測試同一指紋合併，並依總時間排名"""
+        digest = SlowLogDigest().consume(SLOW_LOG.splitlines(True))
+        self.assertEqual(len(digest.fingerprints), 2)
+
+        top = digest.ranked('total_time')[0]
+        self.assertEqual(top.source, "rank-math")
+        self.assertEqual(top.count, 2)
+        self.assertAlmostEqual(top.total_time, 8.0)
+        self.assertAlmostEqual(top.p95_time, 5.0, delta=0.05)
+        self.assertEqual(top.rows_examined, 1400000)
+        self.assertEqual(top.examined_per_sent, 1400000 / 12)
+        self.assertIn("IN (7)", top.example)
+
+        self.assertEqual(digest.ranked('avg_time', 1)[0].source, "rank-math")
+        self.assertEqual(list(digest.by_source()), ["rank-math", "wordfence"])
+
+    def test_fingerprint_limit(self):
+        """測試指紋數超過上限時合併為其他"""
+        lines = []
+        for i in range(5):
+            lines += ["# Query_time: 2.0  Lock_time: 0.0 Rows_sent: 0  Rows_examined: 0",
+                      f"SELECT * FROM table_{chr(97 + i)};"]
+        digest = SlowLogDigest(max_fingerprints=2).consume(lines)
+        self.assertEqual(digest.fingerprints["(其他)"].count, 3)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,4 @@
+"""
+Performance Test Package
+性能測試套件與共用的負載產生工具
+"""
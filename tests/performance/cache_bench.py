@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+FastCGI Cache Benchmark
+FastCGI 快取效益測試：讀取每個回應的 X-Cache（$upstream_cache_status），
+依網址類別統計 HIT/MISS/BYPASS/STALE 比例、命中與未命中的延遲，並以時間序列描述快取暖機
+
+skip_cache_reason() 與 config/nginx/fastcgi-cache.conf 的 $skip_cache 規則相同（fastcgi_cache_bypass /
+fastcgi_no_cache），依規則應該被快取卻回應 BYPASS 的類別會被標示，
+用來發現 skip_cache 觸發過於頻繁。回應沒有 X-Cache 時記為 NONE（快取未啟用）。
+
+用法：
+    python3 -m tests.performance.cache_bench --users 2000 --arrival-rate 50
+    python3 -m tests.performance.cache_bench --journey browse --window 2 --json
+"""
+
+import argparse
+import json
+import math
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from tests import http_session
+from tests.monitor.nginx_log import classify_location
+from tests.performance import results_store
+from tests.performance.clients import MODES, SOURCE, ClientPool
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.scenarios import DEFAULT_JOURNEYS, ScenarioRunner
+from tests.performance.timing import now_ns
+
+CACHE_HEADER = "X-Cache"
+NO_CACHE = "NONE"
+# 由 nginx 直接以快取內容回應，不等待 PHP-FPM
+SERVED_FROM_CACHE = ("HIT", "STALE", "UPDATING")
+
+# 應被快取的類別中 BYPASS 超過此比例時提示
+BYPASS_ALERT_RATIO = 0.05
+THROTTLE_STATUS = 429
+
+SKIP_CACHE_URI = re.compile(r'/wp-admin/|/xmlrpc\.php|wp-.*\.php|/feed/|index\.php|sitemap(_index)?\.xml')
+SKIP_CACHE_COOKIE = re.compile(r'comment_author|wordpress_[a-f0-9]+|wp-postpass|wordpress_no_cache|wordpress_logged_in')
+
+
+def skip_cache_reason(method: str, uri: str, cookie: str = "", authorization: str = "") -> Optional[str]:
+    """依 $skip_cache 規則判斷請求是否略過快取，回傳原因（None 表示應被快取）"""
+    if method == "POST":
+        return "POST"
+    path, _, query = uri.partition('?')
+    if query:
+        return "query string"
+    if SKIP_CACHE_URI.search(path):
+        return "uri"
+    if cookie and SKIP_CACHE_COOKIE.search(cookie):
+        return "cookie"
+    # Application Passwords 等以 Authorization 驗證的請求沒有 cookie，回應仍是登入使用者的內容
+    if authorization:
+        return "authorization"
+    return None
+
+
+def url_class(path: str) -> str:
+    """網址類別：快取規則與 location 不同的幾類分開統計"""
+    route, _, query = path.partition('?')
+    location = classify_location(route)
+    if location in ("static", "health", "denied"):
+        return location
+    if query.startswith('s=') or '&s=' in query:
+        return "search"
+    if location in ("wp-json", "wp-login", "xmlrpc"):
+        return location
+    if route.startswith("/wp-admin/"):
+        return "admin"
+    if "/feed" in route:
+        return "feed"
+    if route == "/":
+        return "home" if not query else "query"
+    return "query" if query else "page"
+
+
+@dataclass
+class CacheClassStats:
+    """單一網址類別的快取狀態與延遲"""
+
+    statuses: Dict[str, int] = field(default_factory=dict)
+    hit_histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    miss_histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # 依 skip_cache 規則應被快取的請求數，以及其中回應 BYPASS 的數量
+    cacheable: int = 0
+    unexpected_bypass: int = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(self.statuses.values())
+
+    def ratio(self, status: str) -> float:
+        return self.statuses.get(status, 0) / self.requests if self.requests else 0.0
+
+    @property
+    def hit_ratio(self) -> float:
+        return sum(self.ratio(status) for status in SERVED_FROM_CACHE)
+
+    @property
+    def unexpected_bypass_ratio(self) -> float:
+        return self.unexpected_bypass / self.cacheable if self.cacheable else 0.0
+
+    @property
+    def latency_reduction(self) -> Optional[float]:
+        """命中相對於未命中的 p50 降幅（0.4 = 快 40%）；任一方沒有樣本時為 None"""
+        if not self.hit_histogram.count or not self.miss_histogram.count:
+            return None
+        miss = self.miss_histogram.percentile(50)
+        return 1 - self.hit_histogram.percentile(50) / miss if miss else None
+
+
+@dataclass
+class WarmupFit:
+    """
+    暖機曲線 hit_ratio(t) ≈ steady × (1 − e^(−t/tau)) 的擬合結果
+
+    t90 為命中率達到穩定值 90% 的秒數；資料不足以擬合時 tau 與 t90 為 None。
+    """
+
+    steady: float
+    tau: Optional[float] = None
+    t90: Optional[float] = None
+
+
+def fit_warmup(points: List[Tuple[float, float]]) -> WarmupFit:
+    """
+    以最後三分之一時間窗的平均命中率為穩定值，對 ln(1 − ratio/steady) 做通過原點的最小平方擬合
+    """
+    if not points:
+        return WarmupFit(0.0)
+    tail = points[-max(len(points) // 3, 1):]
+    steady = sum(ratio for _, ratio in tail) / len(tail)
+    if steady <= 0:
+        return WarmupFit(0.0)
+    numerator = denominator = 0.0
+    for t, ratio in points:
+        remaining = 1 - ratio / steady
+        # 達到穩定值之後的點不提供斜率資訊
+        if remaining <= 0.02 or t <= 0:
+            continue
+        numerator += t * math.log(remaining)
+        denominator += t * t
+    if not denominator or numerator >= 0:
+        return WarmupFit(steady)
+    tau = -denominator / numerator
+    return WarmupFit(steady, tau, tau * math.log(10))
+
+
+class CacheBenchmark:
+    """
+    快取命中統計：作為 ScenarioRunner 的 on_response 使用
+
+    429 在 limit_req 階段就被拒絕，沒有經過快取，不列入統計。
+    時間序列以 window 秒為單位記錄依規則應被快取的請求的 (命中數, 請求數)，
+    不受流量組合隨時間改變（例如旅程後段的搜尋）影響。
+    """
+
+    def __init__(self, window: float = 1.0, header: str = CACHE_HEADER):
+        self.window = window
+        self.header = header
+        self.classes: Dict[str, CacheClassStats] = {}
+        self.timeline: List[List[int]] = []
+        self.start_ns: Optional[int] = None
+
+    def __call__(self, method: str, path: str, status: int, headers: Mapping[str, str], latency_ms: float):
+        self.observe(method, path, status, headers, latency_ms)
+
+    def observe(self, method: str, path: str, status: int, headers: Mapping[str, str], latency_ms: float,
+                t: Optional[float] = None):
+        if status == THROTTLE_STATUS:
+            return
+        if t is None:
+            now = now_ns()
+            if self.start_ns is None:
+                self.start_ns = now
+            t = (now - self.start_ns) / 1e9
+        cache_status = (headers.get(self.header) or NO_CACHE).strip().upper()
+        name = url_class(path)
+        stats = self.classes.get(name)
+        if stats is None:
+            stats = self.classes[name] = CacheClassStats()
+        stats.statuses[cache_status] = stats.statuses.get(cache_status, 0) + 1
+        hit = cache_status in SERVED_FROM_CACHE
+        (stats.hit_histogram if hit else stats.miss_histogram).record(latency_ms)
+        if skip_cache_reason(method, path) is not None or name == "static":
+            return
+        stats.cacheable += 1
+        if cache_status == "BYPASS":
+            stats.unexpected_bypass += 1
+
+        index = int(t / self.window)
+        while len(self.timeline) <= index:
+            self.timeline.append([0, 0])
+        self.timeline[index][0] += hit
+        self.timeline[index][1] += 1
+
+    @property
+    def cache_enabled(self) -> bool:
+        """是否有任何回應帶有快取狀態"""
+        return any(status != NO_CACHE for stats in self.classes.values() for status in stats.statuses)
+
+    def hit_ratio_timeline(self) -> List[Tuple[float, float]]:
+        """每個時間窗結束時刻與命中率（沒有請求的時間窗略過）"""
+        return [((index + 1) * self.window, hits / total)
+                for index, (hits, total) in enumerate(self.timeline) if total]
+
+    def warmup(self) -> WarmupFit:
+        return fit_warmup(self.hit_ratio_timeline())
+
+    def excessive_bypass(self, threshold: float = BYPASS_ALERT_RATIO) -> List[str]:
+        """依規則應被快取、卻有超過 threshold 比例回應 BYPASS 的類別"""
+        return sorted(name for name, stats in self.classes.items()
+                      if stats.cacheable and stats.unexpected_bypass_ratio > threshold)
+
+    def overall(self) -> CacheClassStats:
+        total = CacheClassStats()
+        for stats in self.classes.values():
+            for status, count in stats.statuses.items():
+                total.statuses[status] = total.statuses.get(status, 0) + count
+            total.hit_histogram.add(stats.hit_histogram)
+            total.miss_histogram.add(stats.miss_histogram)
+            total.cacheable += stats.cacheable
+            total.unexpected_bypass += stats.unexpected_bypass
+        return total
+
+    def to_dict(self) -> Dict:
+        def describe(stats: CacheClassStats) -> Dict:
+            return {
+                'requests': stats.requests,
+                'statuses': dict(stats.statuses),
+                'hit_ratio': stats.hit_ratio,
+                'hit': stats.hit_histogram.summary(),
+                'miss': stats.miss_histogram.summary(),
+                'latency_reduction': stats.latency_reduction,
+                'unexpected_bypass_ratio': stats.unexpected_bypass_ratio,
+            }
+
+        fit = self.warmup()
+        return {
+            'cache_enabled': self.cache_enabled,
+            'classes': {name: describe(stats) for name, stats in sorted(self.classes.items())},
+            'overall': describe(self.overall()),
+            'timeline': self.hit_ratio_timeline(),
+            'warmup': {'steady': fit.steady, 'tau': fit.tau, 't90': fit.t90},
+            'excessive_bypass': self.excessive_bypass(),
+        }
+
+    def record(self, prefix: str = "cache") -> bool:
+        """將各類別命中與未命中的延遲寫入結果庫（runner 以 --record 執行時）"""
+        recorded = False
+        for name, stats in self.classes.items():
+            for outcome, histogram in (("hit", stats.hit_histogram), ("miss", stats.miss_histogram)):
+                if histogram.count:
+                    recorded = results_store.record(f"{prefix}/{name}/{outcome}", histogram=histogram,
+                                                    requests=histogram.count) or recorded
+        return recorded
+
+
+def _percent(value: float) -> str:
+    return f"{value * 100:.1f}%"
+
+
+def format_report(bench: CacheBenchmark) -> str:
+    lines = []
+    if not bench.cache_enabled:
+        lines.append(f"未偵測到 {bench.header} 標頭：fastcgi_cache 未啟用，所有請求都由 PHP-FPM 處理")
+        lines.append("")
+    lines.append(f"{'類別':<12}{'請求':>7}{'HIT':>8}{'STALE':>8}{'MISS':>8}{'BYPASS':>8}{'其他':>8}"
+                 f"{'命中p50':>10}{'未命中p50':>11}{'降幅':>8}")
+    rows = sorted(bench.classes.items()) + [("(全部)", bench.overall())]
+    for name, stats in rows:
+        main = ("HIT", "STALE", "MISS", "BYPASS")
+        other = 1 - sum(stats.ratio(status) for status in main)
+        hit_p50 = f"{stats.hit_histogram.percentile(50):.1f}" if stats.hit_histogram.count else "-"
+        miss_p50 = f"{stats.miss_histogram.percentile(50):.1f}" if stats.miss_histogram.count else "-"
+        reduction = stats.latency_reduction
+        lines.append(
+            f"{name:<12}{stats.requests:>7}" + "".join(f"{_percent(stats.ratio(s)):>8}" for s in main)
+            + f"{_percent(other):>8}{hit_p50:>10}{miss_p50:>11}"
+            + f"{(_percent(reduction) if reduction is not None else '-'):>8}"
+        )
+
+    timeline = bench.hit_ratio_timeline()
+    if timeline:
+        lines.append("")
+        lines.append("命中率時間序列: " + " ".join(f"{ratio * 100:.0f}" for _, ratio in timeline))
+        fit = bench.warmup()
+        if fit.tau is not None:
+            lines.append(f"暖機: 穩定命中率 {_percent(fit.steady)}，時間常數 {fit.tau:.1f} 秒，"
+                         f"{fit.t90:.1f} 秒達到穩定值的 90%")
+        else:
+            lines.append(f"暖機: 穩定命中率 {_percent(fit.steady)}（第一個時間窗已穩定或資料不足）")
+
+    for name in bench.excessive_bypass():
+        stats = bench.classes[name]
+        lines.append(f"⚠️  {name}: 依規則應被快取的請求有 {_percent(stats.unexpected_bypass_ratio)} 回應 BYPASS，"
+                     f"$skip_cache 觸發過於頻繁")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FastCGI 快取命中率與延遲測試")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="目標網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--users", type=int, default=1000, help="虛擬使用者總數")
+    parser.add_argument("--arrival-rate", type=float, default=50, help="每秒開始旅程的使用者數")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="think time 倍率（0 為不停頓）")
+    parser.add_argument("--journey", action="append", choices=[j.name for j in DEFAULT_JOURNEYS],
+                        help="只執行指定旅程（可重複）")
+    parser.add_argument("--window", type=float, default=1.0, help="命中率時間序列的時間窗（秒）")
+    parser.add_argument("--clients", type=int, default=1, help="虛擬客戶端位址數量")
+    parser.add_argument("--client-mode", choices=MODES, default=SOURCE)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    bench = CacheBenchmark(window=args.window)
+    journeys = [j for j in DEFAULT_JOURNEYS if not args.journey or j.name in args.journey]
+    ScenarioRunner(
+        args.base_url, journeys, users=args.users, arrival_rate=args.arrival_rate, think_scale=args.think_scale,
+        clients=ClientPool.create(args.clients, args.client_mode), rate_limits=RateLimitConfig.load(),
+        on_response=bench,
+    ).run()
+    if args.json:
+        print(json.dumps(bench.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(bench))
+
+
+if __name__ == "__main__":
+    main()
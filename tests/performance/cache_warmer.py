@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Cache Warmer
+快取預熱爬蟲：docker compose restart 後 OPcache、FastCGI 快取與 WP Super Cache 都是冷的，
+在使用者到達前依熱門程度依序請求頁面
+
+網址來源：sitemap（WordPress 核心的 /wp-sitemap.xml 或 Rank Math 的 /sitemap_index.xml）與
+REST API（/wp-json/wp/v2/posts、pages 的 link 欄位），依 access log 的請求次數排序，首頁永遠最先。
+只預熱依 $skip_cache 規則會被快取的網址。
+發送時機依 config/nginx 的 limit_req 模型控制：每個請求等到漏桶允許時才送出，預熱本身不觸發 429；
+同時請求數不超過 limit_conn。預熱結束後對最熱門的網址再請求一次，比較同一批網址預熱前後的延遲。
+
+用法：
+    python3 -m tests.performance.cache_warmer
+    python3 -m tests.performance.cache_warmer --max-urls 200 --concurrency 4 --verify 20
+    docker compose logs --no-log-prefix nginx | python3 -m tests.performance.cache_warmer --access-log -
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import xml.etree.ElementTree as ET
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+
+from tests import http_session
+from tests.monitor.nginx_log import classify_location, parse_lines, read_lines
+from tests.performance.cache_bench import CACHE_HEADER, NO_CACHE, skip_cache_reason
+from tests.performance.clients import MODES, SOURCE, ClientPool
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.loadgen import client_session
+from tests.performance.rate_limit import RateLimitConfig, RateLimiterModel
+from tests.performance.timing import NS_PER_MS, elapsed_ms, now_ns
+
+SITEMAP_PATHS = ("/wp-sitemap.xml", "/sitemap_index.xml", "/sitemap.xml")
+REST_TYPES = ("posts", "pages")
+REST_PER_PAGE = 100
+# 巢狀 sitemap 索引的最大深度
+SITEMAP_DEPTH = 3
+THROTTLE_STATUS = 429
+# 預熱網址所在的 location（由 PHP-FPM 產生、可被頁面快取）
+PAGE_LOCATIONS = ("general", "php")
+
+
+@dataclass
+class WarmTarget:
+    """一個要預熱的網址"""
+
+    path: str
+    source: str
+    hits: int = 0
+    first_ms: Optional[float] = None
+    first_cache: Optional[str] = None
+    after_ms: Optional[float] = None
+    after_cache: Optional[str] = None
+    status: Optional[int] = None
+    warmed_at: Optional[float] = None
+
+
+def to_path(url: str, base_url: str) -> Optional[str]:
+    """將同一主機的絕對網址轉為路徑（含查詢字串），其他主機回傳 None"""
+    parts = urlsplit(urljoin(base_url + "/", url))
+    if parts.netloc and parts.netloc != urlsplit(base_url).netloc:
+        return None
+    return (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+
+def parse_sitemap(text: str) -> Tuple[List[str], List[str]]:
+    """解析 sitemap，回傳 (子 sitemap 網址, 頁面網址)；無法解析時兩者皆為空"""
+    try:
+        root = ET.fromstring(text)
+    except ET.ParseError:
+        return [], []
+    locs = [element.text.strip() for element in root.iter()
+            if (element.tag == 'loc' or element.tag.endswith('}loc')) and element.text]
+    if root.tag.endswith('sitemapindex'):
+        return locs, []
+    return [], locs
+
+
+def popularity_from_log(lines: Iterable[str]) -> Counter:
+    """從 access log 統計成功 GET 的頁面路徑次數（略過靜態檔案與不會被快取的請求）"""
+    counts = Counter()
+    for entry in parse_lines(lines):
+        if entry.method != "GET" or entry.status != 200:
+            continue
+        if classify_location(entry.path) not in PAGE_LOCATIONS or skip_cache_reason("GET", entry.path):
+            continue
+        counts[entry.path] += 1
+    return counts
+
+
+def prioritize(discovered: Dict[str, str], popularity: Counter, max_urls: Optional[int] = None,
+               include_log_only: bool = True) -> List[WarmTarget]:
+    """
+    依熱門程度排序：首頁最先，其次依 access log 次數，次數相同時維持發現的順序
+
+    include_log_only 時 access log 中的熱門網址即使不在 sitemap / REST API 也會預熱（例如分類頁）。
+    """
+    candidates = dict(discovered)
+    if include_log_only:
+        for path in popularity:
+            candidates.setdefault(path, "access log")
+    candidates.setdefault("/", "home")
+    order = {path: index for index, path in enumerate(candidates)}
+    targets = [
+        WarmTarget(path, source, popularity.get(path, 0))
+        for path, source in candidates.items()
+        if path == "/" or (not skip_cache_reason("GET", path) and classify_location(path) in PAGE_LOCATIONS)
+    ]
+    targets.sort(key=lambda target: (target.path != "/", -target.hits, order[target.path]))
+    return targets[:max_urls] if max_urls else targets
+
+
+class RatePacer:
+    """
+    依 nginx 限流模型安排請求：每個虛擬客戶端一個漏桶模型，等到請求會被放行時才送出
+
+    模型從空桶開始；若同一 IP 還有其他流量而收到 429，penalize() 將該 location 的桶視為已滿再重試。
+    保留一個 burst 名額：請求到達 nginx 的間隔可能因網路與排程抖動略短於送出的間隔。
+    """
+
+    HEADROOM = 1
+
+    def __init__(self, config: RateLimitConfig, clients: int = 1):
+        self.models = [RateLimiterModel(config) for _ in range(clients)]
+        self.waited_ms = 0
+
+    async def acquire(self, client: int, uri: str):
+        model = self.models[client]
+        while True:
+            now = now_ns() // NS_PER_MS
+            wait = model.wait_ms(uri, now, self.HEADROOM)
+            if wait <= 0 and not model.admit(uri, now).throttled:
+                return
+            wait = max(wait, 1)
+            self.waited_ms += wait
+            await asyncio.sleep(wait / 1000)
+
+    def penalize(self, client: int, uri: str):
+        self.models[client].saturate(uri, now_ns() // NS_PER_MS)
+
+
+@dataclass
+class WarmResult:
+    """預熱結果"""
+
+    targets: List[WarmTarget]
+    discovered: Dict[str, int] = field(default_factory=dict)
+    elapsed: float = 0.0
+    throttled: int = 0
+    errors: int = 0
+    waited_ms: int = 0
+    verified: List[WarmTarget] = field(default_factory=list)
+
+    @property
+    def warmed(self) -> List[WarmTarget]:
+        return [target for target in self.targets if target.status is not None and target.status < 400]
+
+    def time_to_warm(self, top: Optional[int] = None) -> float:
+        """前 top 個（預設全部）網址都已請求過的秒數"""
+        selected = self.targets[:top] if top else self.targets
+        times = [target.warmed_at for target in selected if target.warmed_at is not None]
+        return max(times) if times else 0.0
+
+    def histograms(self) -> Tuple[LatencyHistogram, LatencyHistogram]:
+        """驗證網址預熱前（第一次請求）與預熱後的延遲"""
+        before, after = LatencyHistogram(), LatencyHistogram()
+        for target in self.verified:
+            if target.first_ms is not None and target.after_ms is not None:
+                before.record(target.first_ms)
+                after.record(target.after_ms)
+        return before, after
+
+
+class CacheWarmer:
+    """
+    並行預熱爬蟲
+
+    concurrency 為同時進行的請求數（每個客戶端不超過 limit_conn）；verify 為預熱後再請求一次的熱門網址數量。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        concurrency: int = 4,
+        max_urls: Optional[int] = 500,
+        verify: int = 20,
+        timeout: float = 30,
+        rate_limits: Optional[RateLimitConfig] = None,
+        clients: Optional[ClientPool] = None,
+        popularity: Optional[Counter] = None,
+        retries: int = 2,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.rate_limits = rate_limits or RateLimitConfig.load()
+        self.clients = clients or ClientPool()
+        conn_limit = self.rate_limits.conn_limit or concurrency
+        self.concurrency = max(min(concurrency, conn_limit * len(self.clients)), 1)
+        self.max_urls = max_urls
+        self.verify = verify
+        self.timeout = timeout
+        self.popularity = popularity or Counter()
+        self.retries = retries
+        self.pacer = RatePacer(self.rate_limits, len(self.clients))
+
+    async def _get(self, session: aiohttp.ClientSession, client: int, path: str,
+                   result: WarmResult) -> Optional[Tuple[int, str, float, str]]:
+        """依限流模型送出 GET，回傳 (狀態碼, 內容, 延遲毫秒, 快取狀態)；連線錯誤回傳 None"""
+        for _ in range(self.retries + 1):
+            await self.pacer.acquire(client, path)
+            start = now_ns()
+            try:
+                async with session.get(f"{self.base_url}{path}") as response:
+                    body = await response.text(errors="replace")
+                    status = response.status
+                    cache = response.headers.get(CACHE_HEADER) or NO_CACHE
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                result.errors += 1
+                return None
+            if status != THROTTLE_STATUS:
+                return status, body, elapsed_ms(start), cache
+            result.throttled += 1
+            self.pacer.penalize(client, path)
+        return None
+
+    async def _discover_sitemaps(self, session: aiohttp.ClientSession, result: WarmResult) -> List[str]:
+        pending = [(path, 0) for path in SITEMAP_PATHS]
+        seen = set()
+        urls: List[str] = []
+        while pending:
+            path, depth = pending.pop(0)
+            if path in seen or depth > SITEMAP_DEPTH:
+                continue
+            seen.add(path)
+            response = await self._get(session, 0, path, result)
+            if response is None or response[0] != 200:
+                continue
+            children, pages = parse_sitemap(response[1])
+            urls.extend(pages)
+            pending.extend((child_path, depth + 1) for child_path in
+                           (to_path(child, self.base_url) for child in children) if child_path)
+            # 找到一個可用的根 sitemap 後不再嘗試其他外掛的路徑
+            if depth == 0 and (children or pages):
+                pending = [item for item in pending if item[1] > 0]
+        return urls
+
+    async def _discover_rest(self, session: aiohttp.ClientSession, result: WarmResult) -> List[str]:
+        urls: List[str] = []
+        for rest_type in REST_TYPES:
+            page = 1
+            while True:
+                path = f"/wp-json/wp/v2/{rest_type}?per_page={REST_PER_PAGE}&page={page}&_fields=link"
+                response = await self._get(session, 0, path, result)
+                if response is None or response[0] != 200:
+                    break
+                try:
+                    items = json.loads(response[1])
+                except ValueError:
+                    break
+                urls.extend(item['link'] for item in items if isinstance(item, dict) and item.get('link'))
+                if len(items) < REST_PER_PAGE or (self.max_urls and len(urls) >= self.max_urls):
+                    break
+                page += 1
+        return urls
+
+    async def discover(self, session: aiohttp.ClientSession, result: WarmResult) -> Dict[str, str]:
+        """回傳 {路徑: 來源}，依發現順序"""
+        discovered: Dict[str, str] = {}
+        for source, urls in (("sitemap", await self._discover_sitemaps(session, result)),
+                             ("rest", await self._discover_rest(session, result))):
+            count = 0
+            for url in urls:
+                path = to_path(url, self.base_url)
+                if path and path not in discovered:
+                    discovered[path] = source
+                    count += 1
+            result.discovered[source] = count
+        result.discovered["access log"] = len(self.popularity)
+        return discovered
+
+    async def _worker(self, sessions: List[aiohttp.ClientSession], queue: deque,
+                      result: WarmResult, start: int, index: int):
+        client = index % len(sessions)
+        while queue:
+            target = queue.popleft()
+            response = await self._get(sessions[client], client, target.path, result)
+            target.warmed_at = elapsed_ms(start) / 1000
+            if response is not None:
+                target.status, _, target.first_ms, target.first_cache = response
+
+    async def run_async(self) -> WarmResult:
+        self.clients.check()
+        sessions = [client_session(self.clients, index, self.timeout, cookies=False)
+                    for index in range(len(self.clients))]
+        try:
+            result = WarmResult(targets=[])
+            discovered = await self.discover(sessions[0], result)
+            result.targets = prioritize(discovered, self.popularity, self.max_urls)
+
+            start = now_ns()
+            queue = deque(result.targets)
+            await asyncio.gather(*(self._worker(sessions, queue, result, start, index)
+                                   for index in range(self.concurrency)))
+            result.elapsed = elapsed_ms(start) / 1000
+
+            # 預熱後再請求最熱門的網址，比較同一批網址的延遲
+            for index, target in enumerate(result.warmed[:self.verify]):
+                client = index % len(sessions)
+                response = await self._get(sessions[client], client, target.path, result)
+                if response is not None:
+                    _, _, target.after_ms, target.after_cache = response
+                    result.verified.append(target)
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+        result.waited_ms = self.pacer.waited_ms
+        return result
+
+    def run(self) -> WarmResult:
+        return asyncio.run(self.run_async())
+
+
+def format_report(result: WarmResult, top: int = 20) -> str:
+    discovered = "，".join(f"{source} {count}" for source, count in result.discovered.items())
+    lines = [
+        f"發現網址（依序去除重複）: {discovered} → 預熱 {len(result.targets)} 個（成功 {len(result.warmed)}）",
+        f"預熱耗時: {result.elapsed:.1f} 秒（最熱門 {min(top, len(result.targets))} 個在 "
+        f"{result.time_to_warm(top):.1f} 秒內完成），各請求累計限流等待 {result.waited_ms / 1000:.1f} 秒，"
+        f"429: {result.throttled}，錯誤: {result.errors}",
+    ]
+    before, after = result.histograms()
+    if before.count:
+        b, a = before.summary(), after.summary()
+        lines.append(f"預熱前（{before.count} 個熱門網址的首次請求）  p50 {b['p50']:.1f}ms  p90 {b['p90']:.1f}ms  "
+                     f"p99 {b['p99']:.1f}ms")
+        lines.append(f"預熱後（同一批網址）                  p50 {a['p50']:.1f}ms  p90 {a['p90']:.1f}ms  "
+                     f"p99 {a['p99']:.1f}ms")
+        if b['p50']:
+            lines.append(f"p50 降低 {(1 - a['p50'] / b['p50']) * 100:.1f}%")
+        caches = Counter(target.after_cache for target in result.verified)
+        lines.append("預熱後 X-Cache: " + "，".join(f"{status} {count}" for status, count in caches.most_common()))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="依熱門程度預熱 nginx 與 WordPress 頁面快取")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="目標網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--access-log", action="append", default=[],
+                        help="用於排序的 access log（可重複，- 為標準輸入，支援 .gz）")
+    parser.add_argument("--max-urls", type=int, default=500, help="最多預熱的網址數（0 為不限）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同時請求數（不超過 limit_conn）")
+    parser.add_argument("--verify", type=int, default=20, help="預熱後重新請求的熱門網址數")
+    parser.add_argument("--clients", type=int, default=1, help="虛擬客戶端數量（需 docker-compose.bench.yml）")
+    parser.add_argument("--client-mode", choices=MODES, default=SOURCE)
+    parser.add_argument("--timeout", type=float, default=30)
+    args = parser.parse_args(argv)
+
+    popularity = popularity_from_log(read_lines(args.access_log)) if args.access_log else Counter()
+    warmer = CacheWarmer(
+        args.base_url, concurrency=args.concurrency, max_urls=args.max_urls or None, verify=args.verify,
+        timeout=args.timeout, clients=ClientPool.create(args.clients, args.client_mode), popularity=popularity,
+    )
+    result = warmer.run()
+    print(format_report(result))
+    return 0 if result.warmed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Virtual Client Addresses
+多來源 IP 負載：每個虛擬客戶端有自己的 limit_req / limit_conn 額度，負載才能到達 PHP-FPM
+
+nginx 以 $binary_remote_addr 計算限流，單一來源的基準測試只會測到限流本身。
+兩種模式：
+  source     每個客戶端綁定不同的本機來源位址。Linux 的 127.0.0.0/8 全部路由到 lo，不需設定別名；
+             macOS 需先執行 sudo ifconfig lo0 alias 127.0.1.N。適用替身伺服器與直接在主機上執行的 nginx。
+  forwarded  每個客戶端送出不同的 X-Forwarded-For，需搭配只用於測試的 config/nginx/bench-realip.conf
+             （docker-compose.bench.yml 掛載），由 nginx 的 realip 模組改寫客戶端位址。
+             經 Docker 發佈的連接埠連線時 nginx 看到的來源都是橋接閘道，只能使用此模式。
+
+環境變數：
+  WP_TEST_CLIENT_MODE  source 或 forwarded（未設定時為單一來源）
+  WP_TEST_CLIENTS      負載測試使用的虛擬客戶端數量（預設 1）
+"""
+
+import ipaddress
+import os
+import re
+import socket
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_REALIP_CONF = os.path.join(REPO_ROOT, "config", "nginx", "bench-realip.conf")
+
+SOURCE = "source"
+FORWARDED = "forwarded"
+MODES = (SOURCE, FORWARDED)
+
+LOOPBACK_START = "127.0.1.1"
+# RFC 2544 保留給網路設備基準測試的位址段，不會與真實客戶端衝突
+FORWARDED_START = "198.18.0.1"
+FORWARDED_HEADER = "X-Forwarded-For"
+
+DIRECTIVE_PATTERN = re.compile(r'^\s*(set_real_ip_from|real_ip_header|real_ip_recursive)\s+([^;]+);', re.M)
+
+
+class ClientAddressError(OSError):
+    """無法使用指定的來源位址"""
+
+
+@dataclass(frozen=True)
+class ClientPool:
+    """
+    一組虛擬客戶端位址
+
+    addresses 為空時代表單一客戶端（使用系統預設的來源位址）。
+    """
+
+    mode: str = SOURCE
+    addresses: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        if self.mode not in MODES:
+            raise ValueError(f"未知的客戶端模式: {self.mode}（可用: {', '.join(MODES)}）")
+
+    @classmethod
+    def create(cls, count: int, mode: str = SOURCE, offset: int = 0) -> "ClientPool":
+        """offset 跳過前面的位址，讓連續的測試使用未被限流狀態影響的新客戶端"""
+        if count < 1:
+            raise ValueError(f"客戶端數量必須至少為 1: {count}")
+        if count == 1 and mode == SOURCE and not offset:
+            return cls()
+        start = ipaddress.ip_address(LOOPBACK_START if mode == SOURCE else FORWARDED_START)
+        return cls(mode, tuple(str(start + offset + i) for i in range(count)))
+
+    @classmethod
+    def from_env(cls, count: Optional[int] = None, offset: int = 0) -> "ClientPool":
+        """依 WP_TEST_CLIENT_MODE / WP_TEST_CLIENTS 建立；count 可覆寫數量"""
+        mode = os.environ.get("WP_TEST_CLIENT_MODE") or SOURCE
+        if count is None:
+            count = int(os.environ.get("WP_TEST_CLIENTS", "1"))
+        return cls.create(count, mode, offset)
+
+    def __len__(self) -> int:
+        return max(len(self.addresses), 1)
+
+    def address(self, index: int) -> Optional[str]:
+        return self.addresses[index % len(self.addresses)] if self.addresses else None
+
+    def connector_kwargs(self, index: int) -> Dict:
+        """aiohttp.TCPConnector 的參數：source 模式綁定來源位址"""
+        if self.mode == SOURCE and self.addresses:
+            return {'local_addr': (self.address(index), 0)}
+        return {}
+
+    def headers(self, index: int) -> Dict[str, str]:
+        """forwarded 模式的 X-Forwarded-For 標頭"""
+        if self.mode == FORWARDED and self.addresses:
+            return {FORWARDED_HEADER: self.address(index)}
+        return {}
+
+    def check(self):
+        """確認 source 模式的每個位址都可以綁定，否則拋出 ClientAddressError 並提示設定方式"""
+        if self.mode != SOURCE:
+            return
+        for address in self.addresses:
+            sock = socket.socket(socket.AF_INET6 if ':' in address else socket.AF_INET, socket.SOCK_STREAM)
+            try:
+                sock.bind((address, 0))
+            except OSError as e:
+                raise ClientAddressError(
+                    f"無法綁定來源位址 {address}: {e}（macOS 需先執行 sudo ifconfig lo0 alias {address}）"
+                ) from e
+            finally:
+                sock.close()
+
+    def describe(self) -> str:
+        if not self.addresses:
+            return "單一來源"
+        label = "來源位址" if self.mode == SOURCE else FORWARDED_HEADER
+        return f"{len(self.addresses)} 個虛擬客戶端（{label} {self.addresses[0]}–{self.addresses[-1]}）"
+
+
+@dataclass
+class RealIpConfig:
+    """
+    nginx realip 模組（set_real_ip_from / real_ip_header / real_ip_recursive）的模型
+
+    連線來源屬於信任網段時，以標頭中的位址作為客戶端位址（即 $binary_remote_addr）；
+    recursive 時由右至左略過信任網段，取第一個不受信任的位址。
+    """
+
+    trusted: List[ipaddress._BaseNetwork] = field(default_factory=list)
+    header: str = FORWARDED_HEADER
+    recursive: bool = False
+
+    @classmethod
+    def parse(cls, text: str) -> "RealIpConfig":
+        config = cls()
+        for directive, value in DIRECTIVE_PATTERN.findall(text):
+            value = value.strip()
+            if directive == "set_real_ip_from":
+                config.trusted.append(ipaddress.ip_network(value, strict=False))
+            elif directive == "real_ip_header":
+                config.header = value
+            else:
+                config.recursive = value == "on"
+        return config
+
+    @classmethod
+    def load(cls, path: str = BENCH_REALIP_CONF) -> "RealIpConfig":
+        with open(path, "r") as f:
+            return cls.parse(f.read())
+
+    def is_trusted(self, address: str) -> bool:
+        try:
+            ip = ipaddress.ip_address(address)
+        except ValueError:
+            return False
+        return any(ip in network for network in self.trusted)
+
+    def client(self, remote: str, header_value: Optional[str]) -> str:
+        """回傳 nginx 用於限流的客戶端位址"""
+        if not header_value or not self.is_trusted(remote):
+            return remote
+        addresses = [part.strip() for part in header_value.split(',') if part.strip()]
+        if not addresses:
+            return remote
+        if not self.recursive:
+            return addresses[-1]
+        for address in reversed(addresses):
+            if not self.is_trusted(address):
+                return address
+        return addresses[0]
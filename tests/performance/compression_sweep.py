@@ -0,0 +1,480 @@
+#!/usr/bin/env python3
+"""
+Compression Level Sweep
+壓縮等級掃描：以網站實際的回應內容（HTML、CSS、JavaScript、/wp-json 的 JSON）計算
+gzip 1–9（以及已安裝時的 brotli、zstd）各等級的壓縮比例與每個回應的 CPU 時間，
+依 docker-compose.yml 中 nginx 的 CPU 上限（cpus: '0.5'）與預期的尖峰流量建議 gzip_comp_level。
+
+內容依 nginx.conf 的 gzip_types / gzip_min_length 篩選（nginx 不會壓縮的回應不列入）；
+各等級在獨立的進程中並行測量，CPU 時間以 process_time 計算，不受其他進程影響，
+但 CPU 降頻或超執行緒仍會造成差異，需要精確數字時以 --jobs 1 執行。
+建議的等級為 CPU 預算內輸出最小者；輸出大小在最小值 1% 以內時選 CPU 較低的等級。
+
+用法：
+    python3 -m tests.performance.compression_sweep
+    python3 -m tests.performance.compression_sweep --rate 300 --save .benchmarks/corpus
+    python3 -m tests.performance.compression_sweep --corpus .benchmarks/corpus --jobs 1
+    docker compose logs --no-log-prefix nginx | python3 -m tests.performance.compression_sweep --access-log -
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from tests import http_session
+from tests.monitor.compose_limits import load_limits
+from tests.monitor.nginx_log import classify_location, parse_lines, read_lines
+from tests.performance.rate_limit import RateLimitConfig, RateLimiterModel
+from tests.performance.static_bench import GzipConfig, find_assets
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - 選用依賴，未安裝時只測 gzip
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - 選用依賴，未安裝時只測 gzip
+    zstandard = None
+
+NGINX_SERVICE = "nginx"
+LEVELS = {
+    'gzip': tuple(range(1, 10)),
+    'brotli': tuple(range(0, 12)),
+    'zstd': (1, 3, 6, 9, 12, 15, 19),
+}
+# 壓縮可使用的 nginx CPU 比例（其餘留給連線處理、TLS 與 access log）
+DEFAULT_CPU_SHARE = 0.5
+# 預期的尖峰每秒可壓縮回應數
+DEFAULT_RATE = 100
+# 輸出大小在最小值的此比例內視為等效
+SIZE_TOLERANCE = 0.01
+# 每個內容至少重複壓縮的 CPU 秒數（讓短內容的時間可量測）
+MIN_TIME = 0.02
+KINDS = ("html", "css", "js", "json", "xml", "svg", "other")
+KIND_EXTENSIONS = {'html': ".html", 'css': ".css", 'js': ".js", 'json': ".json", 'xml': ".xml", 'svg': ".svg",
+                   'other': ".txt"}
+REST_PATHS = ("/wp-json/", "/wp-json/wp/v2/posts", "/wp-json/wp/v2/pages", "/wp-json/wp/v2/categories")
+
+
+@dataclass(frozen=True)
+class Sample:
+    """一個回應內容"""
+
+    name: str
+    kind: str
+    body: bytes
+
+
+def kind_of(content_type: str) -> str:
+    """依 Content-Type 分類"""
+    mime = content_type.split(';')[0].strip().lower()
+    if mime == "text/html":
+        return "html"
+    if mime == "text/css":
+        return "css"
+    if "javascript" in mime:
+        return "js"
+    if "json" in mime:
+        return "json"
+    if mime == "image/svg+xml":
+        return "svg"
+    if "xml" in mime:
+        return "xml"
+    return "other"
+
+
+def kind_of_path(path: str) -> str:
+    """依路徑推測回應類別（access log 沒有 Content-Type）"""
+    location = classify_location(path)
+    if location == "wp-json":
+        return "json"
+    extension = os.path.splitext(urlsplit(path).path)[1].lower()
+    for kind, kind_extension in KIND_EXTENSIONS.items():
+        if extension == kind_extension or (kind == "xml" and extension in (".xml", ".rss")):
+            return kind
+    return "html" if location in ("general", "php") else "other"
+
+
+def available_algorithms() -> List[str]:
+    return ['gzip'] + [name for name, module in (('brotli', brotli), ('zstd', zstandard)) if module is not None]
+
+
+def compress(algorithm: str, level: int, data: bytes) -> bytes:
+    if algorithm == 'gzip':
+        # 與 nginx 相同的 gzip 格式（windowBits 15 + 16 表示加上 gzip 標頭）
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if algorithm == 'brotli' and brotli is not None:
+        return brotli.compress(data, quality=level, mode=brotli.MODE_TEXT)
+    if algorithm == 'zstd' and zstandard is not None:
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    raise ValueError(f"不支援的壓縮演算法: {algorithm}")
+
+
+def decompress(algorithm: str, data: bytes) -> bytes:
+    if algorithm == 'gzip':
+        return zlib.decompress(data, 31)
+    if algorithm == 'brotli':
+        return brotli.decompress(data)
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+@dataclass
+class KindStats:
+    """一個等級對某類內容的累計結果"""
+
+    count: int = 0
+    original: int = 0
+    compressed: int = 0
+    cpu_ns: float = 0.0
+
+
+@dataclass
+class LevelResult:
+    """一個演算法與等級的結果"""
+
+    algorithm: str
+    level: int
+    kinds: Dict[str, KindStats] = field(default_factory=dict)
+
+    @property
+    def label(self) -> str:
+        return f"{self.algorithm}-{self.level}"
+
+    @property
+    def ratio(self) -> float:
+        """壓縮後總大小 / 原始總大小"""
+        original = sum(stats.original for stats in self.kinds.values())
+        return sum(stats.compressed for stats in self.kinds.values()) / original if original else 1.0
+
+    def kind_ratio(self, kind: str) -> Optional[float]:
+        stats = self.kinds.get(kind)
+        return stats.compressed / stats.original if stats and stats.original else None
+
+    def _weighted(self, weights: Dict[str, float], value) -> float:
+        """依各類回應的流量比例加權的每回應平均值"""
+        used = {kind: weight for kind, weight in weights.items() if self.kinds.get(kind) and weight > 0}
+        total = sum(used.values())
+        if not total:
+            return 0.0
+        return sum(weight * value(self.kinds[kind]) / self.kinds[kind].count for kind, weight in used.items()) / total
+
+    def cpu_per_response(self, weights: Dict[str, float]) -> float:
+        """每個回應的平均壓縮 CPU 秒數"""
+        return self._weighted(weights, lambda stats: stats.cpu_ns) / 1e9
+
+    def bytes_per_response(self, weights: Dict[str, float]) -> float:
+        """每個回應的平均壓縮後位元組數"""
+        return self._weighted(weights, lambda stats: stats.compressed)
+
+    def throughput(self) -> float:
+        """單核每秒可壓縮的原始 MB 數"""
+        cpu = sum(stats.cpu_ns for stats in self.kinds.values()) / 1e9
+        return sum(stats.original for stats in self.kinds.values()) / cpu / 1e6 if cpu else 0.0
+
+    def max_rate(self, cpu_budget: float, weights: Dict[str, float]) -> float:
+        """CPU 預算內每秒可壓縮的回應數"""
+        cpu = self.cpu_per_response(weights)
+        return cpu_budget / cpu if cpu else float('inf')
+
+
+_corpus: Sequence[Sample] = ()
+
+
+def _init_worker(samples: Sequence[Sample]):
+    global _corpus
+    _corpus = samples
+
+
+def measure(algorithm: str, level: int, samples: Optional[Sequence[Sample]] = None,
+            min_time: float = MIN_TIME) -> LevelResult:
+    """測量一個等級：每個內容重複壓縮直到累計 min_time 秒 CPU，並驗證可還原"""
+    result = LevelResult(algorithm, level)
+    for sample in samples if samples is not None else _corpus:
+        output = compress(algorithm, level, sample.body)
+        if decompress(algorithm, output) != sample.body:
+            raise AssertionError(f"{algorithm}-{level} 無法還原 {sample.name}")
+        repeats, elapsed = 0, 0
+        start = time.process_time_ns()
+        while elapsed < min_time * 1e9 or repeats == 0:
+            compress(algorithm, level, sample.body)
+            repeats += 1
+            elapsed = time.process_time_ns() - start
+        stats = result.kinds.setdefault(sample.kind, KindStats())
+        stats.count += 1
+        stats.original += len(sample.body)
+        stats.compressed += len(output)
+        stats.cpu_ns += elapsed / repeats
+    return result
+
+
+def _measure_task(task: Tuple[str, int, float]) -> LevelResult:
+    algorithm, level, min_time = task
+    return measure(algorithm, level, min_time=min_time)
+
+
+def sweep(samples: Sequence[Sample], algorithms: Optional[Sequence[str]] = None, jobs: Optional[int] = None,
+          min_time: float = MIN_TIME) -> List[LevelResult]:
+    """以多個進程測量所有演算法與等級（jobs 為 1 時在目前進程依序執行）"""
+    algorithms = algorithms or available_algorithms()
+    tasks = [(algorithm, level, min_time) for algorithm in algorithms for level in LEVELS[algorithm]]
+    if jobs == 1:
+        return [measure(algorithm, level, samples, min_time) for algorithm, level, min_time in tasks]
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(tuple(samples),)) as pool:
+        return list(pool.map(_measure_task, tasks))
+
+
+def corpus_weights(samples: Sequence[Sample]) -> Dict[str, float]:
+    """預設的流量比例：每個內容視為一個回應"""
+    return dict(Counter(sample.kind for sample in samples))
+
+
+def log_weights(lines: Iterable[str], gzip_config: GzipConfig) -> Dict[str, float]:
+    """從 access log 統計會被壓縮的成功回應類別比例（依路徑推測類別，略過 gzip_min_length 以下的回應）"""
+    counts = Counter()
+    for entry in parse_lines(lines):
+        if entry.status != 200 or entry.bytes_sent < gzip_config.min_length:
+            continue
+        counts[kind_of_path(entry.path)] += 1
+    counts.pop("other", None)
+    return dict(counts)
+
+
+@dataclass
+class Recommendation:
+    """建議的壓縮等級"""
+
+    result: LevelResult
+    within_budget: bool
+    # 尖峰流量下佔壓縮 CPU 預算的比例
+    cpu_used: float
+
+
+def recommend(results: Sequence[LevelResult], rate: float, cpu_budget: float, weights: Dict[str, float],
+              algorithm: str = 'gzip', tolerance: float = SIZE_TOLERANCE) -> Optional[Recommendation]:
+    """
+    在 CPU 預算內選擇輸出最小的等級；輸出在最小值 tolerance 比例內時選 CPU 較低者
+
+    所有等級都超出預算時建議 CPU 最低的等級（within_budget 為 False）。
+    """
+    candidates = [result for result in results if result.algorithm == algorithm]
+    if not candidates:
+        return None
+    feasible = [result for result in candidates if result.cpu_per_response(weights) * rate <= cpu_budget]
+    if feasible:
+        smallest = min(result.bytes_per_response(weights) for result in feasible)
+        candidates = [result for result in feasible if result.bytes_per_response(weights) <= smallest * (1 + tolerance)]
+    chosen = min(candidates, key=lambda result: result.cpu_per_response(weights))
+    cpu_used = chosen.cpu_per_response(weights) * rate / cpu_budget if cpu_budget else float('inf')
+    return Recommendation(chosen, bool(feasible), cpu_used)
+
+
+def capture_corpus(base_url: str, gzip_config: Optional[GzipConfig] = None, max_posts: int = 5,
+                   rate_limits: Optional[RateLimitConfig] = None, timeout: float = 30) -> List[Sample]:
+    """
+    從網站擷取會被 nginx 壓縮的回應：首頁、文章頁、REST API 與首頁引用的 CSS / JavaScript
+
+    以 identity 請求取得原始內容，並依 limit_req 模型控制請求間隔，不觸發 429。
+    """
+    base_url = base_url.rstrip('/')
+    gzip_config = gzip_config or GzipConfig.load()
+    limiter = RateLimiterModel(rate_limits or RateLimitConfig.load())
+    samples: List[Sample] = []
+    seen = set()
+
+    def fetch(path: str) -> Optional[requests.Response]:
+        if path in seen:
+            return None
+        seen.add(path)
+        time.sleep(limiter.wait_ms(path, int(time.monotonic() * 1000)) / 1000)
+        limiter.admit(path, int(time.monotonic() * 1000))
+        try:
+            response = http_session.get(f"{base_url}{path}", headers={'Accept-Encoding': "identity"},
+                                        timeout=timeout)
+        except requests.exceptions.RequestException:
+            return None
+        content_type = response.headers.get('Content-Type', "")
+        if response.status_code == 200 and gzip_config.applies(content_type, len(response.content)):
+            samples.append(Sample(path, kind_of(content_type), response.content))
+        return response
+
+    home = fetch("/")
+    for path in REST_PATHS:
+        response = fetch(path)
+        if path == "/wp-json/wp/v2/posts" and response is not None and response.status_code == 200:
+            try:
+                links = [item.get('link') for item in response.json() if isinstance(item, dict)]
+            except ValueError:
+                links = []
+            for link in [link for link in links if link][:max_posts]:
+                parts = urlsplit(link)
+                if parts.netloc == urlsplit(base_url).netloc:
+                    fetch(parts.path + (f"?{parts.query}" if parts.query else ""))
+    if home is not None:
+        for path in find_assets(home.text, base_url):
+            fetch(path)
+    return samples
+
+
+def _slug(name: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', "-", name).strip("-")[:60] or "index"
+
+
+def save_corpus(samples: Sequence[Sample], directory: str):
+    os.makedirs(directory, exist_ok=True)
+    for index, sample in enumerate(samples):
+        filename = f"{index:03d}-{_slug(sample.name)}{KIND_EXTENSIONS[sample.kind]}"
+        with open(os.path.join(directory, filename), "wb") as f:
+            f.write(sample.body)
+
+
+def load_corpus(directory: str) -> List[Sample]:
+    """讀取目錄中的檔案（依副檔名分類）"""
+    by_extension = {extension: kind for kind, extension in KIND_EXTENSIONS.items()}
+    samples = []
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                samples.append(Sample(filename, by_extension.get(os.path.splitext(filename)[1].lower(), "other"),
+                                      f.read()))
+    return samples
+
+
+def nginx_cpu_limit(default: float = 1.0) -> float:
+    """docker-compose.yml 中 nginx 的 CPU 上限"""
+    try:
+        limits = load_limits().get(NGINX_SERVICE)
+    except OSError:
+        return default
+    return limits.cpus if limits and limits.cpus else default
+
+
+def _percent(value: Optional[float]) -> str:
+    return f"{value * 100:.1f}%" if value is not None else "-"
+
+
+def format_report(results: Sequence[LevelResult], weights: Dict[str, float], rate: float, cpu_limit: float,
+                  cpu_share: float, current: Optional[Tuple[str, int]] = None) -> str:
+    cpu_budget = cpu_limit * cpu_share
+    kinds = [kind for kind in KINDS if any(result.kinds.get(kind) for result in results)]
+    recommendation = recommend(results, rate, cpu_budget, weights)
+    total = sum(weights.get(kind, 0) for kind in kinds) or 1
+    mix = "，".join(f"{kind} {weights.get(kind, 0) / total * 100:.0f}%" for kind in kinds if weights.get(kind))
+    lines = [
+        f"CPU 預算: nginx cpus {cpu_limit:g} × 壓縮佔 {cpu_share * 100:.0f}% = {cpu_budget:.3f} CPU，"
+        f"尖峰 {rate:g} 個可壓縮回應/秒（{mix}）",
+        f"  {'等級':<10} {'總比例':>7} " + " ".join(f"{kind:>6}" for kind in kinds)
+        + f" {'µs/回應':>9} {'MB/s':>7} {'預算%':>7} {'可承受 req/s':>12}",
+    ]
+    for result in results:
+        cpu = result.cpu_per_response(weights)
+        marker = "→" if recommendation and result is recommendation.result else (
+            "*" if current == (result.algorithm, result.level) else " ")
+        lines.append(
+            f"{marker} {result.label:<10} {_percent(result.ratio):>7} "
+            + " ".join(f"{_percent(result.kind_ratio(kind)):>6}" for kind in kinds)
+            + f" {cpu * 1e6:>9.1f} {result.throughput():>7.1f} {cpu * rate / cpu_budget * 100:>6.1f}%"
+            f" {result.max_rate(cpu_budget, weights):>12.0f}"
+        )
+    lines.append("（* 目前設定，→ 建議；比例為壓縮後 / 原始大小，預算% 為尖峰流量下佔壓縮 CPU 預算的比例）")
+    if recommendation is None:
+        return "\n".join(lines)
+
+    chosen = recommendation.result
+    if recommendation.within_budget:
+        lines.append(f"建議 gzip_comp_level {chosen.level}：輸出為原始的 {_percent(chosen.ratio)}，"
+                     f"尖峰時使用 {recommendation.cpu_used * 100:.0f}% 的壓縮 CPU 預算")
+    else:
+        lines.append(f"所有 gzip 等級在 {rate:g} req/s 都超出 CPU 預算，建議 gzip_comp_level {chosen.level}"
+                     f"（{recommendation.cpu_used * 100:.0f}% 預算），並考慮預先壓縮（gzip_static）或提高 cpus")
+    current_result = next((result for result in results if current == (result.algorithm, result.level)), None)
+    if current_result is not None and current_result is not chosen:
+        extra_cpu = current_result.cpu_per_response(weights) / chosen.cpu_per_response(weights) - 1
+        saved = 1 - current_result.bytes_per_response(weights) / chosen.bytes_per_response(weights)
+        lines.append(f"目前的 gzip_comp_level {current_result.level} 比建議多用 {extra_cpu * 100:.0f}% CPU，"
+                     f"輸出{'小' if saved >= 0 else '大'} {abs(saved) * 100:.1f}%")
+    for algorithm in [name for name in available_algorithms() if name != 'gzip']:
+        alternative = recommend(results, rate, cpu_budget, weights, algorithm)
+        if alternative is not None and alternative.within_budget:
+            gain = 1 - alternative.result.bytes_per_response(weights) / chosen.bytes_per_response(weights)
+            lines.append(f"{algorithm} 在預算內的最佳為 {alternative.result.label}，輸出比建議的 gzip 小 "
+                         f"{gain * 100:.1f}%（需要 nginx 的 {algorithm} 模組）")
+    return "\n".join(lines)
+
+
+def to_dict(results: Sequence[LevelResult], weights: Dict[str, float], rate: float, cpu_budget: float) -> Dict:
+    recommendation = recommend(results, rate, cpu_budget, weights)
+    return {
+        'weights': weights,
+        'rate': rate,
+        'cpu_budget': cpu_budget,
+        'levels': [{
+            'algorithm': result.algorithm,
+            'level': result.level,
+            'ratio': result.ratio,
+            'kind_ratios': {kind: result.kind_ratio(kind) for kind in result.kinds},
+            'cpu_us_per_response': result.cpu_per_response(weights) * 1e6,
+            'max_rate': result.max_rate(cpu_budget, weights),
+        } for result in results],
+        'recommendation': recommendation and {
+            'level': recommendation.result.level,
+            'within_budget': recommendation.within_budget,
+            'cpu_used': recommendation.cpu_used,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="以網站實際內容掃描 gzip / brotli / zstd 壓縮等級並建議 gzip_comp_level")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="擷取內容的網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--corpus", help="改用目錄中的檔案（依副檔名分類）")
+    parser.add_argument("--save", help="將擷取的內容存到目錄，供之後以 --corpus 重複使用")
+    parser.add_argument("--max-posts", type=int, default=5, help="擷取的文章頁數量")
+    parser.add_argument("--access-log", action="append", default=[],
+                        help="依 access log 的回應類別比例加權（可重複，- 為標準輸入）")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE, help="尖峰每秒可壓縮回應數")
+    parser.add_argument("--cpus", type=float, help="nginx CPU 上限（預設讀取 docker-compose.yml）")
+    parser.add_argument("--cpu-share", type=float, default=DEFAULT_CPU_SHARE, help="CPU 上限中可用於壓縮的比例")
+    parser.add_argument("--algorithm", action="append", choices=sorted(LEVELS), help="只測指定演算法（可重複）")
+    parser.add_argument("--jobs", type=int, help="並行進程數（預設 CPU 核心數，1 為依序執行）")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help="每個內容至少重複壓縮的 CPU 秒數")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    gzip_config = GzipConfig.load()
+    samples = load_corpus(args.corpus) if args.corpus else capture_corpus(args.base_url, gzip_config, args.max_posts)
+    if not samples:
+        print("沒有可壓縮的內容（網站無法連線或回應都不在 gzip_types 內）", file=sys.stderr)
+        return 1
+    if args.save:
+        save_corpus(samples, args.save)
+    algorithms = [name for name in (args.algorithm or available_algorithms()) if name in available_algorithms()]
+    weights = (log_weights(read_lines(args.access_log), gzip_config) if args.access_log else None) \
+        or corpus_weights(samples)
+    cpu_limit = args.cpus or nginx_cpu_limit()
+    results = sweep(samples, algorithms, args.jobs, args.min_time)
+    if args.json:
+        print(json.dumps(to_dict(results, weights, args.rate, cpu_limit * args.cpu_share), ensure_ascii=False,
+                         indent=2))
+    else:
+        print(f"內容: {len(samples)} 個，共 {sum(len(s.body) for s in samples) / 1024:.0f} KB")
+        current = ('gzip', gzip_config.comp_level) if gzip_config.enabled else None
+        print(format_report(results, weights, args.rate, cpu_limit, args.cpu_share, current))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Database Benchmark
+以 MySQL 原生協定直接查詢 db 服務，測量代表性 WordPress 查詢的延遲百分位數與 QPS
+
+需要以 docker-compose.bench.yml 將 db 的 3306 端口發佈到 127.0.0.1：
+    docker compose -f docker-compose.yml -f docker-compose.bench.yml up -d
+    python3 -m tests.performance.db_bench --concurrency 16 --duration 30
+"""
+
+import argparse
+import os
+import queue
+import random
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.timing import now_ns, elapsed_ms
+
+try:
+    import pymysql
+except ImportError:  # pragma: no cover - 依賴未安裝時由呼叫端跳過
+    pymysql = None
+
+
+@dataclass
+class QueryClass:
+    """一類查詢及其在負載中的權重"""
+
+    name: str
+    sql: str
+    weight: int = 1
+
+
+# 與 WordPress 每個頁面請求實際發出的查詢形狀相同
+WORDPRESS_WORKLOAD = [
+    QueryClass('ping', "SELECT 1", weight=1),
+    QueryClass(
+        'options_autoload',
+        "SELECT option_name, option_value FROM {prefix}options "
+        "WHERE autoload IN ('yes', 'on', 'auto-on', 'auto')",
+        weight=3,
+    ),
+    QueryClass(
+        'posts_listing',
+        "SELECT {prefix}posts.ID FROM {prefix}posts "
+        "WHERE {prefix}posts.post_type = 'post' AND {prefix}posts.post_status = 'publish' "
+        "ORDER BY {prefix}posts.post_date DESC LIMIT 0, 10",
+        weight=3,
+    ),
+    QueryClass(
+        'postmeta_join',
+        "SELECT p.ID, m.meta_key, m.meta_value FROM {prefix}posts p "
+        "INNER JOIN {prefix}postmeta m ON m.post_id = p.ID "
+        "WHERE p.post_type = 'post' AND p.post_status = 'publish' "
+        "ORDER BY p.post_date DESC LIMIT 50",
+        weight=2,
+    ),
+    QueryClass(
+        'term_join',
+        "SELECT t.term_id, t.name, tt.taxonomy, tr.object_id FROM {prefix}terms t "
+        "INNER JOIN {prefix}term_taxonomy tt ON tt.term_id = t.term_id "
+        "INNER JOIN {prefix}term_relationships tr ON tr.term_taxonomy_id = tt.term_taxonomy_id "
+        "WHERE tt.taxonomy IN ('category', 'post_tag') LIMIT 50",
+        weight=1,
+    ),
+]
+
+# 用於評估 innodb_buffer_pool_size 與 max_connections 的伺服器狀態變數
+STATUS_VARIABLES = [
+    'Questions',
+    'Threads_connected',
+    'Max_used_connections',
+    'Innodb_buffer_pool_read_requests',
+    'Innodb_buffer_pool_reads',
+]
+
+
+def read_env_file(path: str = ".env") -> Dict[str, str]:
+    """讀取 .env 檔案（不存在時回傳空字典）"""
+    values = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if '=' in line and not line.startswith('#'):
+                    key, value = line.split('=', 1)
+                    values[key.strip()] = value.strip()
+    return values
+
+
+def load_db_config() -> Dict:
+    """從環境變數與 .env 取得連線設定"""
+    env = read_env_file()
+    env.update(os.environ)
+    return {
+        'host': env.get("WP_DB_HOST", "127.0.0.1"),
+        'port': int(env.get("MYSQL_BENCH_PORT", "3306")),
+        'user': env.get("MYSQL_USER", "wordpress"),
+        'password': env.get("MYSQL_PASSWORD", "WordPress_User_Pass_2024_Secure!"),
+        'database': env.get("MYSQL_DATABASE", "wordpress"),
+        'prefix': env.get("WORDPRESS_TABLE_PREFIX", "wp_"),
+    }
+
+
+class ConnectionPool:
+    """
+    固定大小的 MySQL 連線池，連線在整個測試期間重用
+
+    查詢發生 pymysql.Error 的連線（斷線、逾時、協定狀態不明）關閉後丟棄，該位置下次取出時重新連線。
+    connect 為建立連線的函式（預設 pymysql.connect，測試時以假連線取代）。
+    """
+
+    def __init__(self, config: Dict, size: int, connect_timeout: float = 5,
+                 connect: Optional[Callable[[], Any]] = None):
+        if pymysql is None:
+            raise ImportError("需要安裝 PyMySQL（pip3 install -r tests/requirements.txt）")
+        self.size = size
+        self._connect = connect or (lambda: pymysql.connect(
+            host=config['host'],
+            port=config['port'],
+            user=config['user'],
+            password=config['password'],
+            database=config['database'],
+            connect_timeout=connect_timeout,
+            autocommit=True,
+            charset='utf8mb4',
+        ))
+        self._idle = queue.LifoQueue()
+        self._connections = []
+        for _ in range(size):
+            connection = self._connect()
+            self._connections.append(connection)
+            self._idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        # None 為已丟棄的連線位置
+        connection = self._idle.get()
+        try:
+            if connection is None:
+                connection = self._connect()
+                self._connections.append(connection)
+            yield connection
+        except pymysql.Error:
+            if connection is not None:
+                self._discard(connection)
+                connection = None
+            raise
+        finally:
+            self._idle.put(connection)
+
+    def _discard(self, connection):
+        self._connections.remove(connection)
+        try:
+            connection.close()
+        except pymysql.Error:
+            pass
+
+    def close(self):
+        for connection in self._connections:
+            try:
+                connection.close()
+            except pymysql.Error:
+                pass
+
+
+@dataclass
+class QueryStats:
+    """單一查詢類別的結果"""
+
+    count: int = 0
+    errors: int = 0
+    rows: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
+@dataclass
+class DatabaseBenchResult:
+    """資料庫基準測試結果"""
+
+    concurrency: int
+    elapsed: float = 0.0
+    queries: Dict[str, QueryStats] = field(default_factory=dict)
+    status_delta: Dict[str, int] = field(default_factory=dict)
+    status_after: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total_queries(self) -> int:
+        return sum(q.count for q in self.queries.values())
+
+    @property
+    def qps(self) -> float:
+        return self.total_queries / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def buffer_pool_hit_ratio(self) -> Optional[float]:
+        """InnoDB buffer pool 命中率（測試期間），低於 99% 表示 buffer pool 太小"""
+        requests = self.status_delta.get('Innodb_buffer_pool_read_requests', 0)
+        if not requests:
+            return None
+        return 1 - self.status_delta.get('Innodb_buffer_pool_reads', 0) / requests
+
+    def format(self) -> str:
+        lines = [
+            f"並發連線: {self.concurrency}  總查詢: {self.total_queries}  "
+            f"QPS: {self.qps:.1f}  時間: {self.elapsed:.1f}s",
+            f"{'查詢類別':<20}{'次數':>8}{'QPS':>10}{'p50':>10}{'p90':>10}{'p99':>10}{'p99.9':>10}{'錯誤':>6}",
+        ]
+        for name, stats in self.queries.items():
+            s = stats.histogram.summary()
+            qps = stats.count / self.elapsed if self.elapsed > 0 else 0
+            lines.append(
+                f"{name:<20}{stats.count:>8}{qps:>10.1f}{s['p50']:>9.2f}ms{s['p90']:>8.2f}ms"
+                f"{s['p99']:>8.2f}ms{s['p999']:>8.2f}ms{stats.errors:>6}"
+            )
+        if self.buffer_pool_hit_ratio is not None:
+            lines.append(f"Buffer pool 命中率: {self.buffer_pool_hit_ratio * 100:.2f}%")
+        if 'Max_used_connections' in self.status_after:
+            lines.append(f"Max_used_connections: {self.status_after['Max_used_connections']}")
+        return "\n".join(lines)
+
+
+class DatabaseBenchmark:
+    """
+    以連線池並發執行加權 WordPress 查詢負載
+
+    每個 worker 執行緒持有自己的直方圖，結束時合併，避免鎖競爭。
+    """
+
+    def __init__(
+        self,
+        config: Optional[Dict] = None,
+        workload: Optional[List[QueryClass]] = None,
+        concurrency: int = 8,
+        seed: int = 0,
+        connect: Optional[Callable[[], Any]] = None,
+    ):
+        self.config = config or load_db_config()
+        self.workload = workload or WORDPRESS_WORKLOAD
+        self.concurrency = concurrency
+        self.seed = seed
+        self.connect = connect
+
+    def _server_status(self, pool: ConnectionPool) -> Dict[str, int]:
+        with pool.connection() as connection:
+            with connection.cursor() as cursor:
+                placeholders = ", ".join(["%s"] * len(STATUS_VARIABLES))
+                cursor.execute(
+                    f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})",
+                    STATUS_VARIABLES,
+                )
+                return {name: int(value) for name, value in cursor.fetchall()}
+
+    def _worker(self, index: int, pool: ConnectionPool, deadline_ns: int, max_queries: Optional[int],
+                results: List[Dict[str, QueryStats]]):
+        rng = random.Random(self.seed + index)
+        weights = [q.weight for q in self.workload]
+        statements = [q.sql.format(prefix=self.config['prefix']) for q in self.workload]
+        local = {q.name: QueryStats() for q in self.workload}
+        executed = 0
+        while now_ns() < deadline_ns and (max_queries is None or executed < max_queries):
+            position = rng.choices(range(len(self.workload)), weights)[0]
+            stats = local[self.workload[position].name]
+            executed += 1
+            try:
+                # 發生錯誤的連線由連線池丟棄，不交還給其他 worker
+                with pool.connection() as connection:
+                    start = now_ns()
+                    with connection.cursor() as cursor:
+                        cursor.execute(statements[position])
+                        stats.rows += len(cursor.fetchall())
+            except pymysql.Error:
+                stats.errors += 1
+                continue
+            stats.histogram.record(elapsed_ms(start))
+            stats.count += 1
+        results[index] = local
+
+    def run(self, duration: float = 10, queries_per_worker: Optional[int] = None) -> DatabaseBenchResult:
+        """執行基準測試，直到 duration 秒或每個 worker 執行 queries_per_worker 個查詢"""
+        pool = ConnectionPool(self.config, self.concurrency, connect=self.connect)
+        try:
+            before = self._server_status(pool)
+            results: List[Dict[str, QueryStats]] = [{} for _ in range(self.concurrency)]
+            start = now_ns()
+            deadline = start + int(duration * 1e9)
+            threads = [
+                threading.Thread(target=self._worker, args=(i, pool, deadline, queries_per_worker, results))
+                for i in range(self.concurrency)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            result = DatabaseBenchResult(concurrency=self.concurrency, elapsed=elapsed_ms(start) / 1000)
+            after = self._server_status(pool)
+        finally:
+            pool.close()
+
+        for query in self.workload:
+            merged = QueryStats()
+            for local in results:
+                stats = local.get(query.name)
+                if stats:
+                    merged.count += stats.count
+                    merged.errors += stats.errors
+                    merged.rows += stats.rows
+                    merged.histogram.add(stats.histogram)
+            result.queries[query.name] = merged
+        result.status_after = after
+        result.status_delta = {k: after.get(k, 0) - before.get(k, 0) for k in after}
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="WordPress 資料庫查詢基準測試")
+    parser.add_argument("--concurrency", type=int, default=8, help="並發連線數（預設 8）")
+    parser.add_argument("--duration", type=float, default=10, help="測試秒數（預設 10）")
+    args = parser.parse_args()
+
+    if pymysql is None:
+        raise SystemExit("錯誤: 需要安裝 PyMySQL（pip3 install -r tests/requirements.txt）")
+    try:
+        result = DatabaseBenchmark(concurrency=args.concurrency).run(duration=args.duration)
+    except pymysql.Error as e:
+        raise SystemExit(f"錯誤: 無法連接資料庫: {e}")
+    print(result.format())
+
+
+if __name__ == "__main__":
+    main()
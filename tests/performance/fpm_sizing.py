@@ -0,0 +1,599 @@
+#!/usr/bin/env python3
+"""
+PHP-FPM Pool Sizing
+PHP-FPM pool 調校：重播 access log 的流量，掃描 pm.max_children、pm 模式與 pm.max_requests，
+找出吞吐量的轉折點，再依實測的每個 worker 記憶體與容器記憶體上限建議 pool 設定
+
+掃描分三段（座標下降）：先以 pm = static 掃描 max_children（worker 數固定，吞吐量只受 worker 數影響），
+吞吐量達最佳值 95% 的最小 max_children 即為轉折點；轉折點與記憶體上限取較小者後，
+再比較 pm 模式，最後比較 pm.max_requests，吞吐量相近時取 p99 最低者。
+記憶體上限：容器上限的 90% 扣除 master 與共用頁面後，容納一個用到 64M 的請求，其餘 worker 以 p95 峰值 USS 計
+（見 tests/monitor/fpm_memory.py），php.ini 的 memory_limit 不應超過這個請求可用的空間。
+
+compose 服務的設定寫入容器的 php-fpm.d/zz-fpm-sizing.conf（在 zz-custom.conf 之後載入並覆寫 [www]），
+以 SIGUSR2 讓 php-fpm 重新載入，結束時還原。每個 IP 的 limit_req 會擋下重播的流量，
+需以 docker-compose.bench.yml 啟動並搭配 WP_TEST_CLIENT_MODE=forwarded 與 --clients。
+
+用法：
+    python3 -m tests.performance.fpm_sizing --check                        # 只檢查目前設定（不需 Docker）
+    python3 -m tests.performance.fpm_sizing --check --worker-mb 60         # 以假設的 worker 記憶體建議 max_children
+    WP_TEST_CLIENT_MODE=forwarded python3 -m tests.performance.fpm_sizing --clients 200 --access-log access.log
+    python3 -m tests.performance.fpm_sizing --standin --children 1,2,4,8   # 對替身伺服器示範（沒有記憶體數據）
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from tests import http_session
+from tests.monitor.compose_limits import load_limits, parse_memory
+from tests.monitor.docker_api import DockerAPI, DockerAPIError
+from tests.monitor.fpm_memory import CONTAINER, MB, MemorySummary, WorkerMemorySampler
+from tests.monitor.fpm_status import STATUS_PATH, FpmStatusUnavailable, load_pool_config, parse_status
+from tests.monitor.nginx_log import read_lines
+from tests.performance.clients import ClientPool
+from tests.performance.loadgen import raise_open_file_limit
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.replay import (
+    BYPASS_PAGE_CACHE, DEFAULT_PATHS, ReplayStats, capped_concurrency, replay_paths, run_replay,
+)
+from tests.performance.standin import FaultProfile, StandInServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PHP_INI = os.path.join(REPO_ROOT, "config", "php", "php.ini")
+PM_MODES = ("static", "dynamic", "ondemand")
+DEFAULT_CHILDREN = (2, 4, 6, 8, 12, 16, 20)
+DEFAULT_MAX_REQUESTS = (200, 500, 1000)
+# 吞吐量達最佳值的 (1 - KNEE_TOLERANCE) 即視為相同
+KNEE_TOLERANCE = 0.05
+# 容器記憶體保留給核心、頁面快取與 php-fpm 以外進程的比例
+MEMORY_HEADROOM = 0.1
+# memory_limit 建議值的取整單位
+MEMORY_LIMIT_STEP = 16 * MB
+# 保留給單一大請求的記憶體（WordPress 前台預設 WP_MEMORY_LIMIT 40M，常見外掛需要 64M）
+RUNAWAY_MEMORY = 64 * MB
+
+
+def load_php_ini(path: str = PHP_INI) -> Dict[str, str]:
+    """讀取 php.ini 的設定（去除 ; 註解）"""
+    values = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            key, sep, value = line.split(';', 1)[0].partition('=')
+            if sep:
+                values[key.strip()] = value.strip().strip('"')
+    return values
+
+
+def parse_php_size(value: str) -> int:
+    """php.ini 的大小（256M、1G、-1 表示不限制，回傳 0）"""
+    return 0 if value.strip() == "-1" else parse_memory(value)
+
+
+def spare_servers(max_children: int) -> Tuple[int, int, int]:
+    """pm = dynamic 的 start / min_spare / max_spare，比例為 20 → 5 / 3 / 8（php-fpm.conf 的 5 → 1 / 1 / 2）"""
+    min_spare = max(1, round(max_children * 3 / 20))
+    max_spare = max(min_spare, round(max_children * 8 / 20))
+    start = min(max(min_spare, round(max_children * 5 / 20)), max_spare)
+    return start, min_spare, max_spare
+
+
+@dataclass(frozen=True)
+class PoolSettings:
+    """一組 [www] pool 設定"""
+
+    max_children: int
+    pm: str = "static"
+    max_requests: int = 500
+
+    def __post_init__(self):
+        if self.pm not in PM_MODES:
+            raise ValueError(f"未知的 pm 模式: {self.pm}（可用: {', '.join(PM_MODES)}）")
+        if self.max_children < 1:
+            raise ValueError(f"pm.max_children 必須至少為 1: {self.max_children}")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, str]) -> "PoolSettings":
+        return cls(int(config['pm.max_children']), config.get('pm', "dynamic"),
+                   int(config.get('pm.max_requests', 0)))
+
+    @classmethod
+    def load(cls) -> "PoolSettings":
+        """倉庫的 php-fpm.conf（掛載為 zz-custom.conf，在映像的 www.conf 之後載入，即為實際生效的設定）"""
+        return cls.from_config(load_pool_config())
+
+    @property
+    def label(self) -> str:
+        return f"{self.pm} ×{self.max_children} max_requests={self.max_requests}"
+
+    def render(self) -> str:
+        """php-fpm.conf 的 [www] 片段"""
+        lines = ["[www]", f"pm = {self.pm}", f"pm.max_children = {self.max_children}"]
+        if self.pm == "dynamic":
+            start, min_spare, max_spare = spare_servers(self.max_children)
+            lines += [f"pm.start_servers = {start}", f"pm.min_spare_servers = {min_spare}",
+                      f"pm.max_spare_servers = {max_spare}"]
+        lines.append(f"pm.max_requests = {self.max_requests}")
+        return "\n".join(lines) + "\n"
+
+
+@dataclass(frozen=True)
+class MemoryBudget:
+    """WordPress 容器的記憶體上限與 php.ini 的單一請求上限"""
+
+    container: int
+    memory_limit: int
+    # 沒有實測時，master 與共用頁面以 OPcache 共享記憶體估計
+    opcache: int = 0
+    headroom: float = MEMORY_HEADROOM
+
+    @classmethod
+    def load(cls, service: str = "wordpress", php_ini: str = PHP_INI,
+             container: Optional[int] = None) -> "MemoryBudget":
+        ini = load_php_ini(php_ini)
+        if container is None:
+            container = load_limits()[service].memory
+            if container is None:
+                raise ValueError(f"docker-compose.yml 的 {service} 沒有設定 memory 上限")
+        return cls(container, parse_php_size(ini.get('memory_limit', "128M")),
+                   int(ini.get('opcache.memory_consumption', 128)) * MB)
+
+    @property
+    def usable(self) -> int:
+        return int(self.container * (1 - self.headroom))
+
+
+@dataclass
+class SweepPoint(ReplayStats):
+    """一組設定的測量結果"""
+
+    settings: Optional[PoolSettings] = None
+    memory: Optional[MemorySummary] = None
+
+    @property
+    def pool_peak(self) -> Optional[int]:
+        return self.memory.peak_total if self.memory is not None else None
+
+    def to_dict(self) -> Dict:
+        return {
+            **asdict(self.settings), 'throughput': self.throughput, 'requests': self.requests,
+            'throttled': self.throttled, 'errors': self.errors,
+            'p50': self.histogram.percentile(50), 'p99': self.histogram.percentile(99),
+            'memory': self.memory.to_dict() if self.memory is not None else None,
+        }
+
+
+@dataclass
+class SweepResult:
+    """children 為 static 的 max_children 掃描，variants 為選定 max_children 下的 pm 模式與 max_requests"""
+
+    children: List[SweepPoint] = field(default_factory=list)
+    variants: List[SweepPoint] = field(default_factory=list)
+
+    @property
+    def points(self) -> List[SweepPoint]:
+        return self.children + self.variants
+
+    def _measured(self) -> List[MemorySummary]:
+        return [point.memory for point in self.points if point.memory is not None and point.memory.worker_uss_p95]
+
+    def worker_bytes(self) -> Optional[int]:
+        """所有設定中每個 worker 的 p95 峰值 USS 的最大值"""
+        measured = self._measured()
+        return max(memory.worker_uss_p95 for memory in measured) if measured else None
+
+    def base(self) -> Optional[int]:
+        measured = self._measured()
+        return max(memory.base for memory in measured) if measured else None
+
+
+def find_knee(points: Sequence[SweepPoint], tolerance: float = KNEE_TOLERANCE) -> Optional[SweepPoint]:
+    """吞吐量達最佳值 (1 - tolerance) 的最小 max_children"""
+    if not points:
+        return None
+    best = max(point.throughput for point in points)
+    return min((point for point in points if point.throughput >= best * (1 - tolerance)),
+               key=lambda point: point.settings.max_children)
+
+
+def memory_cap(budget: MemoryBudget, worker_bytes: int, base: int) -> int:
+    """容器記憶體可容納的 worker 數：其中一個可用到 RUNAWAY_MEMORY，其餘以 worker_bytes 計"""
+    room = budget.usable - base - max(RUNAWAY_MEMORY, worker_bytes)
+    return int(room // worker_bytes) + 1 if room >= 0 else 0
+
+
+def _children(result: SweepResult, budget: MemoryBudget, worker_bytes: Optional[int],
+              base: int) -> Tuple[Optional[int], Optional[int]]:
+    """(吞吐量轉折點, 記憶體上限)"""
+    knee = find_knee(result.children)
+    cap = memory_cap(budget, worker_bytes, base) if worker_bytes else None
+    return (knee.settings.max_children if knee is not None else None), cap
+
+
+def target_children(result: SweepResult, budget: MemoryBudget, worker_bytes: Optional[int] = None,
+                    base: Optional[int] = None, default: int = 1) -> int:
+    """轉折點與記憶體上限取較小者（至少 1）"""
+    worker_bytes = worker_bytes or result.worker_bytes()
+    base = base if base is not None else (result.base() or budget.opcache)
+    knee, cap = _children(result, budget, worker_bytes, base)
+    candidates = [value for value in (knee, cap) if value is not None]
+    return max(min(candidates), 1) if candidates else default
+
+
+def best_variant(points: Sequence[SweepPoint], budget: Optional[MemoryBudget] = None) -> Optional[SweepPoint]:
+    """吞吐量與最佳值相近且 pool 峰值記憶體在預算內的設定中，p99 最低者"""
+    if budget is not None:
+        fitting = [point for point in points if point.pool_peak is None or point.pool_peak <= budget.usable]
+        points = fitting or points
+    if not points:
+        return None
+    best = max(point.throughput for point in points)
+    close = [point for point in points if point.throughput >= best * (1 - KNEE_TOLERANCE)]
+    return min(close, key=lambda point: point.histogram.percentile(99))
+
+
+@dataclass
+class Recommendation:
+    """建議的 pool 設定與依據"""
+
+    settings: PoolSettings
+    budget: MemoryBudget
+    worker_bytes: Optional[int] = None
+    base: int = 0
+    knee: Optional[int] = None
+    memory_cap: Optional[int] = None
+    measured: bool = False
+    notes: List[str] = field(default_factory=list)
+
+    @property
+    def pool_bytes(self) -> Optional[int]:
+        if not self.worker_bytes:
+            return None
+        return self.base + self.settings.max_children * self.worker_bytes
+
+    @property
+    def safe_memory_limit(self) -> Optional[int]:
+        """一個失控請求用到 memory_limit、其餘 worker 維持 p95 時仍不超過容器上限的 memory_limit"""
+        if not self.worker_bytes:
+            return None
+        room = self.budget.usable - self.base - (self.settings.max_children - 1) * self.worker_bytes
+        return max(room // MEMORY_LIMIT_STEP * MEMORY_LIMIT_STEP, 0)
+
+    def render(self) -> str:
+        text = "; config/php/php-fpm.conf\n" + self.settings.render()
+        limit = self.safe_memory_limit
+        if limit and self.budget.memory_limit > limit:
+            text += f"\n; config/php/php.ini\nmemory_limit = {limit // MB}M\n"
+        return text
+
+    def to_dict(self) -> Dict:
+        return {
+            'settings': asdict(self.settings), 'worker_bytes': self.worker_bytes, 'base': self.base,
+            'knee': self.knee, 'memory_cap': self.memory_cap, 'measured': self.measured,
+            'pool_bytes': self.pool_bytes, 'safe_memory_limit': self.safe_memory_limit,
+            'container_memory': self.budget.container, 'notes': self.notes,
+        }
+
+
+def recommend(result: SweepResult, budget: MemoryBudget, current: Optional[PoolSettings] = None,
+              worker_bytes: Optional[int] = None, base: Optional[int] = None) -> Recommendation:
+    """
+    依掃描結果建議設定；worker_bytes / base 可覆寫實測值（沒有掃描時以 current 的 pm 與 max_requests 為準）
+    """
+    current = current or PoolSettings.load()
+    measured = worker_bytes is None and result.worker_bytes() is not None
+    worker_bytes = worker_bytes or result.worker_bytes()
+    base = base if base is not None else (result.base() or budget.opcache)
+    knee, cap = _children(result, budget, worker_bytes, base)
+    children = target_children(result, budget, worker_bytes, base, default=current.max_children)
+    if not worker_bytes and budget.memory_limit:
+        # 沒有 worker 記憶體數據：與 check_config 的最壞情況相同，假設每個 worker 都用到 memory_limit
+        cap = memory_cap(budget, budget.memory_limit, base)
+        children = max(min(children, cap), 1)
+
+    at_target = [point for point in result.points if point.settings.max_children == children]
+    chosen = best_variant(at_target, budget)
+    settings = chosen.settings if chosen is not None else PoolSettings(children, current.pm, current.max_requests)
+    recommendation = Recommendation(settings, budget, worker_bytes, base, knee, cap, measured)
+
+    notes = recommendation.notes
+    if cap is not None and cap < 1:
+        notes.append(f"容器上限 {budget.container / MB:.0f}MB 連一個 "
+                     f"{(worker_bytes or budget.memory_limit) / MB:.0f}MB 的 worker 都放不下")
+    elif cap is not None and knee is not None and cap < knee:
+        notes.append(f"記憶體先於吞吐量到達上限：轉折點為 {knee} 個 worker，記憶體只容得下 {cap} 個")
+    elif knee is not None:
+        notes.append(f"吞吐量在 {knee} 個 worker 後不再明顯增加（CPU 或資料庫已飽和），更多 worker 只會多用記憶體")
+    limit = recommendation.safe_memory_limit
+    if limit is not None and budget.memory_limit > limit:
+        notes.append(f"php.ini memory_limit {budget.memory_limit // MB}M 超過 {limit // MB}M："
+                     f"一個失控的請求就可能讓容器 OOM")
+    if worker_bytes and not measured:
+        notes.append("worker 記憶體為假設值，未經實測")
+    elif not worker_bytes and budget.memory_limit:
+        notes.append(f"沒有 worker 記憶體數據，以每個 worker 用到 memory_limit {budget.memory_limit // MB}M 估計記憶體上限"
+                     f"（以 --worker-mb 指定或對 compose 服務測量）")
+    elif not worker_bytes:
+        notes.append("沒有 worker 記憶體數據，只依吞吐量建議（以 --worker-mb 指定或對 compose 服務測量）")
+    throttled = sum(point.throttled for point in result.points)
+    total = throttled + sum(point.requests for point in result.points)
+    if total and throttled / total > 0.01:
+        notes.append(f"{throttled} 個請求被 limit_req 拒絕，吞吐量偏低：以 forwarded 模式增加 --clients")
+    return recommendation
+
+
+def check_config(settings: PoolSettings, budget: MemoryBudget, worker_bytes: Optional[int] = None,
+                 base: Optional[int] = None) -> List[str]:
+    """目前設定與記憶體上限的矛盾"""
+    problems = []
+    base = base if base is not None else budget.opcache
+    if budget.memory_limit:
+        worst = base + settings.max_children * budget.memory_limit
+        if worst > budget.container:
+            problems.append(
+                f"最壞情況 {settings.max_children} × memory_limit {budget.memory_limit // MB}M + 共用 {base / MB:.0f}MB "
+                f"= {worst / MB:.0f}MB，超過容器上限 {budget.container / MB:.0f}MB")
+        if base + budget.memory_limit > budget.container:
+            problems.append(f"memory_limit {budget.memory_limit // MB}M 大於容器上限扣除共用記憶體，單一請求即可能 OOM")
+    if worker_bytes:
+        pool = base + settings.max_children * worker_bytes
+        if pool > budget.usable:
+            problems.append(
+                f"{settings.max_children} 個 {worker_bytes / MB:.0f}MB 的 worker 加共用記憶體需 {pool / MB:.0f}MB，"
+                f"超過可用的 {budget.usable / MB:.0f}MB（容器上限的 {(1 - budget.headroom) * 100:.0f}%）")
+    return problems
+
+
+class StandInTarget:
+    """替身伺服器：以 FaultProfile.workers 模擬 max_children（pm 模式與 max_requests 沒有差異、沒有記憶體數據）"""
+
+    def __init__(self, server: StandInServer, latency_ms: float = 20):
+        self.server = server
+        self.latency_ms = latency_ms
+        self._original = server.faults
+
+    @property
+    def base_url(self) -> str:
+        return self.server.base_url
+
+    def apply(self, settings: PoolSettings):
+        self.server.faults = FaultProfile(latency_ms=self.latency_ms, workers=settings.max_children)
+
+    def restore(self):
+        self.server.faults = self._original
+
+    def memory_sampler(self) -> Optional[WorkerMemorySampler]:
+        return None
+
+
+class ComposeTarget:
+    """
+    compose 的 WordPress 容器：設定寫入 php-fpm.d 並以 SIGUSR2 重新載入
+
+    重新載入後讀取 nginx 內部 server 的 /fpm-status（需 docker-compose.bench.yml 發佈），確認 pm 模式與 worker 數
+    已套用才開始測量。
+    """
+
+    DIRECTORY = "/usr/local/etc/php-fpm.d"
+    FILENAME = "zz-fpm-sizing.conf"
+
+    def __init__(self, base_url: str = http_session.BASE_URL, container: str = CONTAINER,
+                 docker: Optional[DockerAPI] = None, reload_timeout: float = 30,
+                 internal_url: str = http_session.INTERNAL_URL):
+        self.base_url = base_url.rstrip('/')
+        self.internal_url = internal_url.rstrip('/')
+        self.container = container
+        self.docker = docker or DockerAPI()
+        self.reload_timeout = reload_timeout
+
+    def _reload(self, content: str):
+        self.docker.put_file(self.container, self.DIRECTORY, self.FILENAME, content.encode())
+        self.docker.kill(self.container, "SIGUSR2")
+
+    def _applied(self, settings: PoolSettings) -> bool:
+        try:
+            response = http_session.get(f"{self.internal_url}{STATUS_PATH}?json", timeout=2)
+            status = parse_status(response.text)
+        except (OSError, ValueError):
+            return False
+        if status.process_manager != settings.pm:
+            return False
+        return settings.pm != "static" or status.total == settings.max_children
+
+    def apply(self, settings: PoolSettings):
+        self._reload(f"; tests.performance.fpm_sizing 測試中的設定（結束時還原）\n{settings.render()}")
+        deadline = time.monotonic() + self.reload_timeout
+        while not self._applied(settings):
+            if time.monotonic() > deadline:
+                raise FpmStatusUnavailable(f"重新載入後 {self.reload_timeout} 秒內 /fpm-status 仍未顯示 {settings.label}")
+            time.sleep(0.5)
+
+    def restore(self):
+        self._reload("; tests.performance.fpm_sizing 已還原，沿用 zz-custom.conf\n")
+
+    def memory_sampler(self) -> Optional[WorkerMemorySampler]:
+        return WorkerMemorySampler(self.container, interval=1.0, docker=self.docker)
+
+
+class PoolSweep:
+    """
+    依序套用設定並以封閉迴路重播流量
+
+    以 replay.py 封閉迴路重播 paths，concurrency 應大於最大的 max_children，pool 才會飽和。
+    每組設定先重播 warmup 秒（新 worker 的 OPcache 與連線），再測量 duration 秒。
+    """
+
+    def __init__(self, target, paths: Sequence[str] = DEFAULT_PATHS, concurrency: int = 32,
+                 duration: float = 20, warmup: float = 5, clients: Optional[ClientPool] = None,
+                 timeout: float = 30, rate_limits: Optional[RateLimitConfig] = None):
+        if not paths:
+            raise ValueError("沒有可重播的網址")
+        self.target = target
+        self.paths = list(paths)
+        self.clients = clients or ClientPool()
+        self.concurrency = capped_concurrency(concurrency, self.clients, rate_limits)
+        self.duration = duration
+        self.warmup = warmup
+        self.timeout = timeout
+
+    def measure(self, settings: PoolSettings) -> SweepPoint:
+        self.target.apply(settings)
+        if self.warmup:
+            run_replay(self.target.base_url, self.paths, self.concurrency, self.warmup, self.clients, self.timeout,
+                       cookies=BYPASS_PAGE_CACHE)
+        point = SweepPoint(settings=settings)
+        sampler = self.target.memory_sampler()
+        if sampler is not None:
+            sampler.start()
+        try:
+            run_replay(self.target.base_url, self.paths, self.concurrency, self.duration, self.clients, self.timeout,
+                       point, BYPASS_PAGE_CACHE)
+        finally:
+            if sampler is not None:
+                sampler.stop()
+                point.memory = sampler.summary()
+        return point
+
+    def run(self, children: Sequence[int] = DEFAULT_CHILDREN, modes: Sequence[str] = PM_MODES,
+            max_requests: Sequence[int] = DEFAULT_MAX_REQUESTS, budget: Optional[MemoryBudget] = None,
+            current: Optional[PoolSettings] = None, worker_bytes: Optional[int] = None,
+            progress=None) -> SweepResult:
+        """依序掃描 max_children、pm 模式、max_requests；progress(point) 在每組設定完成後呼叫"""
+        raise_open_file_limit()
+        self.clients.check()
+        current = current or PoolSettings.load()
+        budget = budget or MemoryBudget.load()
+        result = SweepResult()
+
+        def measure(settings: PoolSettings, stage: List[SweepPoint]) -> SweepPoint:
+            point = self.measure(settings)
+            stage.append(point)
+            if progress is not None:
+                progress(point)
+            return point
+
+        try:
+            for count in sorted(children):
+                measure(PoolSettings(count, "static", current.max_requests), result.children)
+            target = target_children(result, budget, worker_bytes, default=current.max_children)
+            at_target = [point for point in result.children if point.settings.max_children == target]
+            if not at_target:
+                at_target.append(measure(PoolSettings(target, "static", current.max_requests), result.variants))
+            for mode in modes:
+                if mode != "static":
+                    at_target.append(measure(PoolSettings(target, mode, current.max_requests), result.variants))
+            pm = best_variant(at_target, budget).settings.pm
+            for count in max_requests:
+                if count != current.max_requests:
+                    measure(PoolSettings(target, pm, count), result.variants)
+        finally:
+            self.target.restore()
+        return result
+
+
+def _mb(value: Optional[int]) -> str:
+    return f"{value / MB:.0f}MB" if value else "-"
+
+
+def format_point(point: SweepPoint) -> str:
+    memory = point.memory
+    return (f"  {point.settings.label:<36} {point.throughput:>8.1f} {point.histogram.percentile(50):>8.1f} "
+            f"{point.histogram.percentile(99):>9.1f} {point.throttled:>6} {point.errors:>6} "
+            f"{_mb(memory.worker_uss_p95 if memory else None):>9} {_mb(point.pool_peak):>9}")
+
+
+def format_report(result: SweepResult, recommendation: Recommendation, current: PoolSettings,
+                  problems: Sequence[str] = ()) -> str:
+    budget = recommendation.budget
+    lines = [f"目前設定: {current.label}；容器上限 {_mb(budget.container)}，memory_limit {budget.memory_limit // MB}M"]
+    lines += [f"  ⚠️ {problem}" for problem in problems]
+    if result.points:
+        lines.append("")
+        lines.append(f"  {'設定':<34} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>9} {'429':>6} {'錯誤':>5} "
+                     f"{'worker':>9} {'pool 峰值':>7}")
+        lines += [format_point(point) for point in result.points]
+    lines.append("")
+    lines.append(f"吞吐量轉折點: {recommendation.knee or '-'} 個 worker，記憶體上限: "
+                 f"{recommendation.memory_cap if recommendation.memory_cap is not None else '-'} 個 worker"
+                 f"（每個 worker {_mb(recommendation.worker_bytes)}，共用 {_mb(recommendation.base)}）")
+    lines += [f"  {note}" for note in recommendation.notes]
+    lines.append(f"建議設定（pool 峰值約 {_mb(recommendation.pool_bytes)}）:")
+    lines += [f"  {line}" for line in recommendation.render().splitlines()]
+    return "\n".join(lines)
+
+
+def _ints(value: str) -> List[int]:
+    return [int(part) for part in value.split(',') if part.strip()]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="依吞吐量轉折點與 worker 記憶體建議 PHP-FPM pool 設定")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="nginx 網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--internal-url", default=http_session.INTERNAL_URL,
+                        help="nginx 內部 server 的網址，讀取 /fpm-status（預設 WP_TEST_INTERNAL_URL）")
+    parser.add_argument("--container", default=CONTAINER, help="WordPress 容器名稱")
+    parser.add_argument("--standin", action="store_true", help="對本機替身伺服器掃描（示範用，沒有記憶體數據）")
+    parser.add_argument("--standin-latency", type=float, default=20, help="替身伺服器每個請求的處理時間（毫秒）")
+    parser.add_argument("--access-log", action="append", default=[],
+                        help="重播的 access log（可重複，- 為標準輸入，支援 .gz；預設重播幾個代表性網址）")
+    parser.add_argument("--children", type=_ints, default=list(DEFAULT_CHILDREN), help="掃描的 pm.max_children")
+    parser.add_argument("--modes", default=",".join(PM_MODES), help="比較的 pm 模式")
+    parser.add_argument("--max-requests", type=_ints, default=list(DEFAULT_MAX_REQUESTS), help="比較的 pm.max_requests")
+    parser.add_argument("--concurrency", type=int, default=32, help="並行連線數（應大於最大的 max_children）")
+    parser.add_argument("--duration", type=float, default=20, help="每組設定測量的秒數")
+    parser.add_argument("--warmup", type=float, default=5, help="每組設定測量前的暖機秒數")
+    parser.add_argument("--clients", type=int, default=None, help="虛擬客戶端數量（模式依 WP_TEST_CLIENT_MODE）")
+    parser.add_argument("--container-memory", type=parse_memory, default=None,
+                        help="容器記憶體上限（預設讀取 docker-compose.yml，例如 512M）")
+    parser.add_argument("--worker-mb", type=float, default=None, help="每個 worker 的記憶體（MB），覆寫實測值")
+    parser.add_argument("--check", action="store_true", help="只檢查目前設定，不施加負載")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    current = PoolSettings.load()
+    budget = MemoryBudget.load(container=args.container_memory)
+    worker_bytes = int(args.worker_mb * MB) if args.worker_mb else None
+    result = SweepResult()
+    if not args.check:
+        paths = replay_paths(read_lines(args.access_log)) if args.access_log else list(DEFAULT_PATHS)
+        clients = ClientPool.from_env(args.clients)
+        modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+
+        def progress(point: SweepPoint):
+            if not args.json:
+                print(format_point(point), flush=True)
+
+        try:
+            if args.standin:
+                with StandInServer() as server:
+                    sweep = PoolSweep(StandInTarget(server, args.standin_latency), paths, args.concurrency,
+                                      args.duration, args.warmup, clients)
+                    result = sweep.run(args.children, modes, args.max_requests, budget, current, worker_bytes,
+                                       progress)
+            else:
+                target = ComposeTarget(args.base_url, args.container, internal_url=args.internal_url)
+                sweep = PoolSweep(target, paths, args.concurrency, args.duration, args.warmup, clients)
+                result = sweep.run(args.children, modes, args.max_requests, budget, current, worker_bytes, progress)
+        except (DockerAPIError, FpmStatusUnavailable, OSError) as e:
+            print(f"無法掃描 PHP-FPM 設定: {e}", file=sys.stderr)
+            return 1
+
+    recommendation = recommend(result, budget, current, worker_bytes)
+    problems = check_config(current, budget, recommendation.worker_bytes, recommendation.base)
+    if args.json:
+        print(json.dumps({
+            'current': asdict(current), 'problems': problems,
+            'points': [point.to_dict() for point in result.points],
+            'recommendation': recommendation.to_dict(),
+        }, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(result, recommendation, current, problems))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+HDR-Style Latency Histogram
+固定記憶體的對數分桶延遲直方圖（HdrHistogram 演算法）
+"""
+
+import math
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+
+class LatencyHistogram:
+    """
+    延遲直方圖
+
+    以微秒為內部單位、毫秒為對外單位記錄延遲。
+    桶依 2 的冪次分層，每層再細分為固定數量的子桶，
+    在整個量程內維持 significant_digits 位有效數字的精度，
+    記憶體用量只取決於量程與精度，與樣本數無關。
+    """
+
+    UNITS_PER_MS = 1000
+
+    def __init__(self, highest_ms: float = 60_000, significant_digits: int = 3):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError(f"有效位數必須在 1 到 5 之間: {significant_digits}")
+        self.highest_ms = highest_ms
+        self.significant_digits = significant_digits
+        self.highest_trackable = int(highest_ms * self.UNITS_PER_MS)
+
+        largest_single_unit = 2 * 10 ** significant_digits
+        self.sub_bucket_count_magnitude = math.ceil(math.log2(largest_single_unit))
+        self.sub_bucket_half_count_magnitude = self.sub_bucket_count_magnitude - 1
+        self.sub_bucket_count = 1 << self.sub_bucket_count_magnitude
+        self.sub_bucket_half_count = self.sub_bucket_count >> 1
+        self.sub_bucket_mask = self.sub_bucket_count - 1
+
+        smallest_untrackable = self.sub_bucket_count
+        bucket_count = 1
+        while smallest_untrackable <= self.highest_trackable:
+            smallest_untrackable <<= 1
+            bucket_count += 1
+        self.bucket_count = bucket_count
+
+        self.counts = array("q", [0]) * ((bucket_count + 1) * self.sub_bucket_half_count)
+        self.total_count = 0
+        self.total_sum = 0
+        self.min_value = None
+        self.max_value = 0
+
+    def _counts_index(self, value: int) -> int:
+        bucket_index = (value | self.sub_bucket_mask).bit_length() - self.sub_bucket_count_magnitude
+        sub_bucket_index = value >> bucket_index
+        return ((bucket_index + 1) << self.sub_bucket_half_count_magnitude) + (
+            sub_bucket_index - self.sub_bucket_half_count
+        )
+
+    def _highest_equivalent_value(self, index: int) -> int:
+        bucket_index = (index >> self.sub_bucket_half_count_magnitude) - 1
+        sub_bucket_index = (index & (self.sub_bucket_half_count - 1)) + self.sub_bucket_half_count
+        if bucket_index < 0:
+            sub_bucket_index -= self.sub_bucket_half_count
+            bucket_index = 0
+        lowest = sub_bucket_index << bucket_index
+        return lowest + (1 << bucket_index) - 1
+
+    def record(self, value_ms: float, count: int = 1):
+        """記錄一個延遲值（毫秒），超出量程的值以量程上限計"""
+        value = min(max(int(value_ms * self.UNITS_PER_MS), 0), self.highest_trackable)
+        self.counts[self._counts_index(value)] += count
+        self.total_count += count
+        self.total_sum += value * count
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_value:
+            self.max_value = value
+
+    def add(self, other: "LatencyHistogram"):
+        """合併另一個相同配置的直方圖（例如來自其他 worker 的結果）"""
+        if (other.highest_trackable, other.significant_digits) != (
+            self.highest_trackable,
+            self.significant_digits,
+        ):
+            raise ValueError("只能合併量程與精度相同的直方圖")
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        self.total_count += other.total_count
+        self.total_sum += other.total_sum
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_value = max(self.max_value, other.max_value)
+
+    @classmethod
+    def merged(cls, histograms: Iterable["LatencyHistogram"]) -> "LatencyHistogram":
+        """將多個直方圖合併為一個新的直方圖"""
+        histograms = list(histograms)
+        if not histograms:
+            return cls()
+        result = cls(histograms[0].highest_ms, histograms[0].significant_digits)
+        for histogram in histograms:
+            result.add(histogram)
+        return result
+
+    @property
+    def count(self) -> int:
+        return self.total_count
+
+    @property
+    def mean(self) -> float:
+        """平均延遲（毫秒）"""
+        if not self.total_count:
+            return 0.0
+        return self.total_sum / self.total_count / self.UNITS_PER_MS
+
+    @property
+    def min(self) -> float:
+        return (self.min_value or 0) / self.UNITS_PER_MS
+
+    @property
+    def max(self) -> float:
+        return self.max_value / self.UNITS_PER_MS
+
+    def percentile(self, percentile: float) -> float:
+        """取得指定百分位數的延遲（毫秒）"""
+        if not self.total_count:
+            return 0.0
+        count_at_percentile = max(int(percentile / 100 * self.total_count + 0.5), 1)
+        running = 0
+        for index, count in enumerate(self.counts):
+            running += count
+            if running >= count_at_percentile:
+                value = min(self._highest_equivalent_value(index), self.max_value)
+                return value / self.UNITS_PER_MS
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """常用統計值（毫秒）"""
+        return {
+            'count': self.total_count,
+            'avg': self.mean,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+        }
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """非空的桶（代表值毫秒, 次數），由小到大；代表值為桶上限且不超過最大值"""
+        result = []
+        for index, count in enumerate(self.counts):
+            if count:
+                value = min(self._highest_equivalent_value(index), self.max_value)
+                result.append((value / self.UNITS_PER_MS, count))
+        return result
+
+    def encode(self) -> Dict:
+        """序列化為只含非空桶的字典（可 JSON 化，用於保存測試結果）"""
+        return {
+            'highest_ms': self.highest_ms,
+            'significant_digits': self.significant_digits,
+            'sum': self.total_sum,
+            'min': self.min_value,
+            'max': self.max_value,
+            'counts': [[index, count] for index, count in enumerate(self.counts) if count],
+        }
+
+    @classmethod
+    def decode(cls, data: Dict) -> "LatencyHistogram":
+        """由 encode() 的結果還原直方圖"""
+        histogram = cls(data['highest_ms'], data['significant_digits'])
+        for index, count in data['counts']:
+            histogram.counts[index] = count
+            histogram.total_count += count
+        histogram.total_sum = data['sum']
+        histogram.min_value = data['min']
+        histogram.max_value = data['max']
+        return histogram
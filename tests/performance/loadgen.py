@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Open-Loop Load Generator
+開放迴路負載產生器：以固定到達率持續發送請求，不因伺服器變慢而減少流量
+"""
+
+import asyncio
+import resource
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Mapping, Optional
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from tests import http_session
+from tests.performance.clients import ClientPool
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.rate_limit import RateLimitConfig, ThrottlePrediction, ThrottlePredictor, ThrottleReport
+from tests.performance.timing import now_ns, elapsed_ms
+
+# on_response(method, path, status, headers, latency_ms)：每個回應的觀察者，例如快取命中統計
+ResponseHook = Callable[[str, str, int, Mapping[str, str], float], None]
+
+
+@dataclass
+class LoadResult:
+    """負載測試結果"""
+
+    target_rate: float
+    duration: float
+    sent: int = 0
+    completed: int = 0
+    errors: int = 0
+    dropped: int = 0
+    peak_in_flight: int = 0
+    clients: int = 1
+    elapsed: float = 0.0
+    start_ns: int = 0
+    status_counts: Dict[int, int] = field(default_factory=dict)
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    service_histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    throttle_prediction: Optional[ThrottlePrediction] = None
+
+    @property
+    def achieved_rps(self) -> float:
+        """實際完成的每秒請求數"""
+        return self.completed / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def success_rate(self) -> float:
+        """HTTP 200 佔已排程請求的百分比"""
+        scheduled = self.sent + self.dropped
+        if scheduled == 0:
+            return 0.0
+        return self.status_counts.get(200, 0) / scheduled * 100
+
+    def throttle_report(self) -> Optional[ThrottleReport]:
+        """依 nginx 限流模型區分依設計的 429 與負載下的失敗（需以 rate_limits 執行）"""
+        if self.throttle_prediction is None:
+            return None
+        return ThrottleReport.from_counts(self.status_counts, self.errors + self.dropped, self.throttle_prediction)
+
+
+def raise_open_file_limit() -> int:
+    """將檔案描述符軟限制提高到硬限制（數千個同時連線需要）"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        return hard
+    return soft
+
+
+def client_session(clients: ClientPool, index: int, timeout: float, limit: int = 0, limit_per_host: int = 0,
+                   fresh_connections: bool = False, headers: Optional[Dict[str, str]] = None,
+                   cookies: bool = True, auto_decompress: bool = True) -> aiohttp.ClientSession:
+    """建立第 index 個虛擬客戶端的 Session（綁定來源位址或加上 X-Forwarded-For）"""
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        limit_per_host=limit_per_host,
+        force_close=fresh_connections,
+        ttl_dns_cache=300,
+        **clients.connector_kwargs(index),
+    )
+    session_headers = dict(headers or {})
+    session_headers.update(clients.headers(index))
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        headers=session_headers,
+        cookie_jar=None if cookies else aiohttp.DummyCookieJar(),
+        auto_decompress=auto_decompress,
+    )
+
+
+class OpenLoopLoadGenerator:
+    """
+    以固定到達率發送請求的負載產生器
+
+    請求按照 1/rate 的間隔排程，每個請求是獨立的 coroutine，
+    伺服器回應變慢只會讓同時進行中的請求增加，不會降低發送速率。
+    連線預設重用 keep-alive；fresh_connections 預設沿用共用 Session 的設定。
+    提供 rate_limits 時，在每個請求送出時以 nginx 限流模型預測應出現的 429。
+    提供 clients 時請求依序輪流分配給各虛擬客戶端，每個客戶端有獨立的連線池與限流預測。
+    on_response 會收到每個回應的狀態碼、標頭與延遲（從預定發送時間起算）。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        rate: float,
+        duration: float,
+        timeout: float = 30,
+        max_in_flight: int = 10000,
+        method: str = "GET",
+        headers: Optional[Dict[str, str]] = None,
+        limit_per_host: int = 0,
+        fresh_connections: Optional[bool] = None,
+        rate_limits: Optional[RateLimitConfig] = None,
+        clients: Optional[ClientPool] = None,
+        on_response: Optional[ResponseHook] = None,
+    ):
+        if rate <= 0:
+            raise ValueError(f"到達率必須大於 0: {rate}")
+        if duration <= 0:
+            raise ValueError(f"持續時間必須大於 0: {duration}")
+        self.url = url
+        self.rate = rate
+        self.duration = duration
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.method = method
+        self.headers = headers or {}
+        self.limit_per_host = limit_per_host
+        if fresh_connections is None:
+            fresh_connections = http_session.settings()['fresh_connections']
+        self.fresh_connections = fresh_connections
+        self.rate_limits = rate_limits
+        self.clients = clients or ClientPool()
+        self.on_response = on_response
+
+    async def _fire(self, session: aiohttp.ClientSession, result: LoadResult, intended_ns: int, uri: str):
+        """
+        發送單一請求並記錄結果
+
+        histogram 從預定發送時間起算（含 event loop 落後造成的延遲），
+        service_histogram 從實際發送時間起算。
+        """
+        start = now_ns()
+        try:
+            async with session.request(self.method, self.url) as response:
+                await response.read()
+                status = response.status
+                headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            result.errors += 1
+            return
+        end = now_ns()
+        latency = elapsed_ms(intended_ns, end)
+        if self.on_response is not None:
+            self.on_response(self.method, uri, status, headers, latency)
+        result.histogram.record(latency)
+        result.service_histogram.record(elapsed_ms(start, end))
+        result.completed += 1
+        result.status_counts[status] = result.status_counts.get(status, 0) + 1
+
+    async def run_async(self) -> LoadResult:
+        """在目前的 event loop 中執行負載測試"""
+        self.clients.check()
+        count = len(self.clients)
+        result = LoadResult(target_rate=self.rate, duration=self.duration, clients=count)
+        total = int(self.rate * self.duration)
+        interval_ns = int(1e9 / self.rate)
+        in_flight = set()
+        # limit_conn 以客戶端 IP 計算，每個客戶端分別追蹤進行中的請求
+        client_in_flight = [set() for _ in range(count)]
+        predictors = [ThrottlePredictor(self.rate_limits) for _ in range(count)] if self.rate_limits is not None else None
+        parts = urlsplit(self.url)
+        uri = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+
+        sessions = [
+            client_session(self.clients, index, self.timeout, limit_per_host=self.limit_per_host,
+                           fresh_connections=self.fresh_connections, headers=self.headers)
+            for index in range(count)
+        ]
+        try:
+            start = result.start_ns = now_ns()
+            for i in range(total):
+                intended = start + i * interval_ns
+                delay_ns = intended - now_ns()
+                # 落後排程時不休眠，立即補發
+                if delay_ns > 0:
+                    await asyncio.sleep(delay_ns / 1e9)
+                if len(in_flight) >= self.max_in_flight:
+                    result.dropped += 1
+                    continue
+                client = i % count
+                if predictors is not None:
+                    predictors[client].observe(uri, now_ns() // 1_000_000, len(client_in_flight[client]))
+                task = asyncio.create_task(self._fire(sessions[client], result, intended, uri))
+                in_flight.add(task)
+                task.add_done_callback(in_flight.discard)
+                client_in_flight[client].add(task)
+                task.add_done_callback(client_in_flight[client].discard)
+                result.sent += 1
+                result.peak_in_flight = max(result.peak_in_flight, len(in_flight))
+            if in_flight:
+                await asyncio.gather(*in_flight)
+            result.elapsed = elapsed_ms(start) / 1000
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+        if predictors is not None:
+            result.throttle_prediction = ThrottlePrediction.merged(p.prediction for p in predictors)
+        return result
+
+    def run(self) -> LoadResult:
+        """以獨立的 event loop 執行負載測試"""
+        raise_open_file_limit()
+        return asyncio.run(self.run_async())
+
+
+def run_open_loop(url: str, rate: float, duration: float, timeout: float = 30, **kwargs) -> LoadResult:
+    """以固定到達率對 url 執行負載測試"""
+    return OpenLoopLoadGenerator(url, rate, duration, timeout=timeout, **kwargs).run()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Object Cache Benchmark
+物件快取比較：以相同的重播負載分別測量停用與啟用 Redis 物件快取時的吞吐量、延遲，
+以及 MySQL 收到的查詢數（SHOW GLOBAL STATUS 的 Questions 與 Com_select 差值）
+
+啟用方式為以 objectcache profile 啟動 redis，並以 WP_REDIS_HOST=redis 重建 wordpress 容器
+（config/wordpress/object-cache.php 只在設定 WP_REDIS_HOST 時生效），結束時依 .env 的設定還原。
+redis 不持久化，每次啟用前重建即清空，避免停用期間的資料庫變更留下過期的快取。
+只使用本機已有的映像，不需要連網；需要以 docker-compose.bench.yml 將 db 的 3306 端口發佈到本機（見 db_bench）。
+
+用法：
+    docker compose -f docker-compose.yml -f docker-compose.bench.yml up -d
+    python3 -m tests.performance.object_cache_bench --duration 30
+    python3 -m tests.performance.object_cache_bench --access-log logs/nginx/access.log --json
+"""
+
+import argparse
+import json
+import os
+import sys
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence
+
+from tests import http_session
+from tests.monitor.nginx_log import read_lines
+from tests.performance.clients import ClientPool
+from tests.performance.db_bench import load_db_config, read_env_file
+from tests.performance.loadgen import raise_open_file_limit
+from tests.performance.replay import BYPASS_PAGE_CACHE, DEFAULT_PATHS, ReplayStats, replay_paths, run_replay
+from tests.performance.tuning_sweep import COMPOSE_FILES, Benchmark
+from tests.readiness import REPO_ROOT, ServicesNotReady, docker_compose, wait_until_ready
+
+try:
+    import pymysql
+except ImportError:  # pragma: no cover - 依賴未安裝時由呼叫端跳過
+    pymysql = None
+
+PROFILE = "objectcache"
+REDIS_HOST = "redis"
+QUERY_VARIABLES = ("Questions", "Com_select")
+
+
+class ObjectCacheUnavailable(Exception):
+    """無法切換物件快取或讀取資料庫的查詢計數"""
+
+
+class QueryCounter:
+    """讀取 MySQL 的累計查詢數（每次以新的連線查詢，自身只增加一個 Question）"""
+
+    def __init__(self, config: Optional[Dict] = None, connect_timeout: float = 5):
+        if pymysql is None:
+            raise ObjectCacheUnavailable("需要安裝 PyMySQL（pip3 install -r tests/requirements.txt）")
+        self.config = config or load_db_config()
+        self.connect_timeout = connect_timeout
+
+    def snapshot(self) -> Dict[str, int]:
+        try:
+            connection = pymysql.connect(host=self.config['host'], port=self.config['port'],
+                                         user=self.config['user'], password=self.config['password'],
+                                         connect_timeout=self.connect_timeout)
+        except pymysql.Error as e:
+            raise ObjectCacheUnavailable(f"無法連接資料庫: {e}") from e
+        try:
+            with connection.cursor() as cursor:
+                placeholders = ", ".join(["%s"] * len(QUERY_VARIABLES))
+                cursor.execute(f"SHOW GLOBAL STATUS WHERE Variable_name IN ({placeholders})", QUERY_VARIABLES)
+                return {name: int(value) for name, value in cursor.fetchall()}
+        finally:
+            connection.close()
+
+
+def configured_host(root: str = REPO_ROOT) -> str:
+    """.env 與環境變數中的 WP_REDIS_HOST（docker compose 建立容器時使用的值）"""
+    env = read_env_file(os.path.join(root, ".env"))
+    env.update(os.environ)
+    return env.get("WP_REDIS_HOST", "")
+
+
+class ComposeToggle:
+    """以 WP_REDIS_HOST 重建 wordpress 容器來切換物件快取（只重建 wordpress，nginx 與 db 不受影響）"""
+
+    def __init__(self, base_url: str = http_session.BASE_URL, compose_files: Sequence[str] = COMPOSE_FILES,
+                 ready_timeout: float = 180, root: str = REPO_ROOT):
+        self.base_url = base_url.rstrip('/')
+        self.files = [part for path in compose_files for part in ("-f", path)]
+        self.ready_timeout = ready_timeout
+        self.root = root
+        self.original = configured_host(root)
+
+    def _compose(self, args: List[str], host: str):
+        env = dict(os.environ, WP_REDIS_HOST=host)
+        if docker_compose([*self.files, "--profile", PROFILE, *args], self.root, env) != 0:
+            raise ObjectCacheUnavailable(f"docker compose {' '.join(args)} 失敗")
+
+    def apply(self, enabled: bool, host: Optional[str] = None):
+        host = (host or REDIS_HOST) if enabled else ""
+        if enabled:
+            self._compose(["up", "-d", "--force-recreate", "redis"], host)
+        self._compose(["up", "-d", "--no-deps", "--force-recreate", "wordpress"], host)
+        try:
+            wait_until_ready(self.base_url, self.ready_timeout, include_mysql=False)
+        except ServicesNotReady as e:
+            raise ObjectCacheUnavailable(str(e)) from e
+
+    def restore(self):
+        """還原為 .env 的設定；原本未啟用時一併停止 redis"""
+        self.apply(bool(self.original), self.original)
+        if not self.original:
+            self._compose(["stop", "redis"], "")
+
+
+@dataclass
+class ModeResult:
+    """一種模式（停用或啟用物件快取）的重播結果與期間的資料庫查詢數"""
+
+    enabled: bool
+    stats: ReplayStats
+    queries: int
+    selects: int
+
+    @property
+    def db_qps(self) -> float:
+        return self.queries / self.stats.duration if self.stats.duration else 0.0
+
+    @property
+    def queries_per_request(self) -> float:
+        return self.queries / self.stats.requests if self.stats.requests else 0.0
+
+    @property
+    def selects_per_request(self) -> float:
+        return self.selects / self.stats.requests if self.stats.requests else 0.0
+
+    def to_dict(self) -> Dict:
+        histogram = self.stats.histogram
+        return {
+            'object_cache': self.enabled,
+            'requests': self.stats.requests,
+            'errors': self.stats.errors,
+            'throttled': self.stats.throttled,
+            'throughput': round(self.stats.throughput, 1),
+            'p50_ms': round(histogram.percentile(50), 1) if histogram.count else None,
+            'p99_ms': round(histogram.percentile(99), 1) if histogram.count else None,
+            'db_queries': self.queries,
+            'db_selects': self.selects,
+            'db_qps': round(self.db_qps, 1),
+            'queries_per_request': round(self.queries_per_request, 2),
+        }
+
+
+def _change(before: float, after: float) -> Optional[float]:
+    """相對變化（after / before − 1），before 為 0 時無法計算"""
+    return after / before - 1 if before else None
+
+
+@dataclass
+class Comparison:
+    """停用（baseline）與啟用（cached）物件快取的比較"""
+
+    baseline: ModeResult
+    cached: ModeResult
+
+    @property
+    def query_reduction(self) -> Optional[float]:
+        """每個請求的資料庫查詢數減少的比例（吞吐量不同時比 QPS 更能反映快取效果）"""
+        change = _change(self.baseline.queries_per_request, self.cached.queries_per_request)
+        return -change if change is not None else None
+
+    @property
+    def qps_reduction(self) -> Optional[float]:
+        change = _change(self.baseline.db_qps, self.cached.db_qps)
+        return -change if change is not None else None
+
+    def latency_change(self, percentile: float) -> Optional[float]:
+        before, after = self.baseline.stats.histogram, self.cached.stats.histogram
+        if not before.count or not after.count:
+            return None
+        return _change(before.percentile(percentile), after.percentile(percentile))
+
+    @property
+    def throughput_change(self) -> Optional[float]:
+        return _change(self.baseline.stats.throughput, self.cached.stats.throughput)
+
+    def to_dict(self) -> Dict:
+        def rounded(value: Optional[float]) -> Optional[float]:
+            return round(value, 3) if value is not None else None
+
+        return {
+            'baseline': self.baseline.to_dict(),
+            'cached': self.cached.to_dict(),
+            'query_reduction': rounded(self.query_reduction),
+            'qps_reduction': rounded(self.qps_reduction),
+            'p50_change': rounded(self.latency_change(50)),
+            'p99_change': rounded(self.latency_change(99)),
+            'throughput_change': rounded(self.throughput_change),
+        }
+
+
+class ObjectCacheBenchmark:
+    """
+    依序以停用、啟用物件快取執行相同的重播負載
+
+    每種模式先暖機（啟用時同時填滿 Redis），暖機後才讀取查詢計數，只計算測量期間的查詢；
+    結束時（包含失敗）還原原本的設定。
+    """
+
+    def __init__(self, toggle, benchmark: Benchmark, counter: Optional[QueryCounter] = None,
+                 base_url: str = http_session.BASE_URL):
+        self.toggle = toggle
+        self.benchmark = benchmark
+        self.counter = counter or QueryCounter()
+        self.base_url = base_url.rstrip('/')
+
+    def measure(self, enabled: bool, seconds: float) -> ModeResult:
+        self.toggle.apply(enabled)
+        bench = self.benchmark
+        if bench.warmup:
+            run_replay(self.base_url, bench.paths, bench.concurrency, bench.warmup, bench.clients, bench.timeout,
+                       cookies=BYPASS_PAGE_CACHE)
+        before = self.counter.snapshot()
+        stats = run_replay(self.base_url, bench.paths, bench.concurrency, seconds, bench.clients, bench.timeout,
+                           cookies=BYPASS_PAGE_CACHE)
+        after = self.counter.snapshot()
+        delta = {name: after.get(name, 0) - before.get(name, 0) for name in QUERY_VARIABLES}
+        return ModeResult(enabled, stats, delta['Questions'], delta['Com_select'])
+
+    def run(self, seconds: float = 30,
+            progress: Optional[Callable[[ModeResult], None]] = None) -> Comparison:
+        results = []
+        try:
+            for enabled in (False, True):
+                results.append(self.measure(enabled, seconds))
+                if progress:
+                    progress(results[-1])
+        finally:
+            self.toggle.restore()
+        return Comparison(*results)
+
+
+def _percent(value: Optional[float]) -> str:
+    return f"{value:+.1%}" if value is not None else "-"
+
+
+def format_mode(result: ModeResult) -> str:
+    histogram = result.stats.histogram
+    latency = (f"p50 {histogram.percentile(50):>7.1f} ms  p99 {histogram.percentile(99):>7.1f} ms"
+               if histogram.count else "沒有成功的請求")
+    label = "啟用物件快取" if result.enabled else "停用物件快取"
+    return (f"  {label}  {result.stats.throughput:>7.1f} req/s  {latency}  "
+            f"DB {result.db_qps:>7.1f} q/s  每請求 {result.queries_per_request:>5.1f} 個查詢"
+            f"（SELECT {result.selects_per_request:.1f}）  錯誤 {result.stats.errors}")
+
+
+def format_report(comparison: Comparison) -> str:
+    lines = ["物件快取比較（相同的重播負載）:", format_mode(comparison.baseline), format_mode(comparison.cached)]
+    reduction = comparison.query_reduction
+    lines.append(f"  每請求的資料庫查詢減少 {reduction:.1%}，DB QPS 減少 {_percent(comparison.qps_reduction)}"
+                 if reduction is not None else "  停用時沒有記錄到資料庫查詢（確認 db 端口已發佈且負載經過 PHP）")
+    lines.append(f"  延遲變化 p50 {_percent(comparison.latency_change(50))}  p99 {_percent(comparison.latency_change(99))}"
+                 f"  吞吐量變化 {_percent(comparison.throughput_change)}")
+    if comparison.cached.stats.errors > comparison.baseline.stats.errors:
+        lines.append("  ⚠ 啟用後錯誤增加，檢查 wordpress 容器的 error log（object-cache.php 連不上 Redis 時會記錄）")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="比較停用與啟用 Redis 物件快取時的資料庫查詢數與延遲")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="nginx 網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--duration", type=float, default=30, help="每種模式測量的秒數")
+    parser.add_argument("--warmup", type=float, default=10, help="每種模式測量前的暖機秒數")
+    parser.add_argument("--concurrency", type=int, default=16, help="並行連線數")
+    parser.add_argument("--clients", type=int, default=None, help="虛擬客戶端數量（模式依 WP_TEST_CLIENT_MODE）")
+    parser.add_argument("--access-log", action="append", default=[],
+                        help="重播的 access log（可重複，- 為標準輸入，支援 .gz；預設重播幾個代表性網址）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    paths = replay_paths(read_lines(args.access_log)) if args.access_log else list(DEFAULT_PATHS)
+    raise_open_file_limit()
+    try:
+        benchmark = Benchmark(paths, args.concurrency, args.warmup, ClientPool.from_env(args.clients))
+        bench = ObjectCacheBenchmark(ComposeToggle(args.base_url), benchmark, base_url=args.base_url)
+        if not args.json:
+            print(f"重播 {len(benchmark.paths)} 個網址，每種模式 {args.duration:g} 秒（並行 {benchmark.concurrency}）",
+                  flush=True)
+        comparison = bench.run(args.duration, None if args.json else lambda r: print(format_mode(r), flush=True))
+    except (ObjectCacheUnavailable, ValueError, OSError) as e:
+        print(f"無法執行物件快取比較: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(comparison.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(comparison))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Page Cache Throughput Benchmark
+頁面微快取吞吐量測試：以相同的網址與並行數，比較全部略過快取與匿名 / 登入混合流量的吞吐量與延遲
+
+匿名流量佔大多數（預設 95%），由 config/nginx/fastcgi-cache.conf 的 fastcgi_cache 直接回應；
+登入使用者以帶有 wordpress_logged_in_ cookie 的請求模擬，觸發 $skip_cache 由 PHP-FPM 處理
+（cookie 無效，頁面與匿名相同，實際登入使用者的成本更高）。
+基準以 wordpress_no_cache cookie 讓所有請求略過快取，即為沒有頁面快取時的容量。
+只重播會被快取的網址（沒有 query string、不符合 $skip_cache 規則），否則匿名流量也會略過快取。
+nginx 依來源 IP 限流（general 60r/m），需要足夠的虛擬客戶端（WP_TEST_CLIENT_MODE），429 不計入吞吐量。
+
+用法：
+    WP_TEST_CLIENT_MODE=forwarded python3 -m tests.performance.page_cache_bench --clients 2000 --duration 20
+    python3 -m tests.performance.page_cache_bench --access-log logs/nginx/access.log --anonymous-share 0.9 --json
+    python3 -m tests.performance.page_cache_bench --standin     # 對替身伺服器示範
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional, Sequence
+
+from tests import http_session
+from tests.monitor.nginx_log import read_lines
+from tests.performance import results_store
+from tests.performance.cache_bench import CACHE_HEADER, NO_CACHE, SERVED_FROM_CACHE, skip_cache_reason
+from tests.performance.clients import ClientPool
+from tests.performance.loadgen import raise_open_file_limit
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.replay import BYPASS_PAGE_CACHE, ReplayStats, capped_concurrency, replay, replay_paths
+from tests.performance.standin import FaultProfile, StandInServer
+
+# 會被快取的代表性網址（首頁與 REST API 列表，不含 query string）
+DEFAULT_PATHS = ("/", "/wp-json/wp/v2/posts", "/wp-json/wp/v2/pages", "/wp-json/wp/v2/categories")
+ANONYMOUS = "anonymous"
+LOGGED_IN = "logged-in"
+UNCACHED = "uncached"
+SEGMENT_COOKIES = {
+    ANONYMOUS: None,
+    LOGGED_IN: "wordpress_logged_in_bench=bench%7C0%7Cbench",
+    UNCACHED: BYPASS_PAGE_CACHE[0],
+}
+DEFAULT_ANONYMOUS_SHARE = 0.95
+# 流量組合的長度取質數，與網址數量沒有公因數，登入流量平均分布在各網址
+MIX_LENGTH = 997
+
+
+def cacheable_paths(paths: Sequence[str]) -> List[str]:
+    """依 $skip_cache 規則匿名請求會被快取的網址"""
+    return [path for path in paths if skip_cache_reason("GET", path) is None]
+
+
+def traffic_mix(anonymous_share: float, length: int = MIX_LENGTH, seed: int = 0) -> List[str]:
+    """每個請求序號的流量類別：anonymous_share 比例為匿名，其餘為登入（位置固定亂數，重複執行結果相同）"""
+    if not 0 <= anonymous_share <= 1:
+        raise ValueError(f"匿名流量比例必須介於 0 與 1: {anonymous_share}")
+    logged_in = set(random.Random(seed).sample(range(length), round(length * (1 - anonymous_share))))
+    return [LOGGED_IN if index in logged_in else ANONYMOUS for index in range(length)]
+
+
+@dataclass
+class SegmentStats:
+    """一種流量類別的重播結果與 X-Cache 狀態"""
+
+    stats: ReplayStats = field(default_factory=ReplayStats)
+    cache: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def hit_ratio(self) -> float:
+        """由快取回應（HIT / STALE / UPDATING）的比例，不含 429"""
+        total = sum(self.cache.values())
+        return sum(self.cache.get(status, 0) for status in SERVED_FROM_CACHE) / total if total else 0.0
+
+
+@dataclass
+class TrafficResult:
+    """一次重播：整體與各流量類別的結果"""
+
+    name: str
+    overall: ReplayStats = field(default_factory=ReplayStats)
+    segments: Dict[str, SegmentStats] = field(default_factory=dict)
+
+    def observe(self, segment: str, status: Optional[int], headers: Mapping[str, str], latency_ms: float):
+        self.overall.record(status, latency_ms)
+        stats = self.segments.get(segment)
+        if stats is None:
+            stats = self.segments[segment] = SegmentStats()
+        stats.stats.record(status, latency_ms)
+        if status is not None and status != 429:
+            cache_status = (headers.get(CACHE_HEADER) or NO_CACHE).strip().upper()
+            stats.cache[cache_status] = stats.cache.get(cache_status, 0) + 1
+
+    def set_duration(self, seconds: float):
+        self.overall.duration = seconds
+        for segment in self.segments.values():
+            segment.stats.duration = seconds
+
+    @property
+    def cache_enabled(self) -> bool:
+        return any(status != NO_CACHE for segment in self.segments.values() for status in segment.cache)
+
+    def to_dict(self) -> Dict:
+        def describe(stats: ReplayStats) -> Dict:
+            return {'requests': stats.requests, 'throttled': stats.throttled, 'errors': stats.errors,
+                    'throughput': round(stats.throughput, 1), 'latency': stats.histogram.summary()}
+
+        return {
+            'name': self.name,
+            'overall': describe(self.overall),
+            'segments': {name: dict(describe(segment.stats), cache=dict(segment.cache),
+                                    hit_ratio=round(segment.hit_ratio, 4))
+                         for name, segment in sorted(self.segments.items())},
+        }
+
+
+@dataclass
+class PageCacheComparison:
+    """沒有頁面快取（全部略過）與混合流量的比較"""
+
+    uncached: TrafficResult
+    mixed: TrafficResult
+    anonymous_share: float
+
+    @property
+    def speedup(self) -> Optional[float]:
+        baseline = self.uncached.overall.throughput
+        return self.mixed.overall.throughput / baseline if baseline else None
+
+    @property
+    def anonymous(self) -> SegmentStats:
+        return self.mixed.segments.get(ANONYMOUS, SegmentStats())
+
+    def to_dict(self) -> Dict:
+        return {
+            'anonymous_share': self.anonymous_share,
+            'uncached': self.uncached.to_dict(),
+            'mixed': self.mixed.to_dict(),
+            'speedup': round(self.speedup, 2) if self.speedup is not None else None,
+            'anonymous_hit_ratio': round(self.anonymous.hit_ratio, 4),
+        }
+
+    def record(self, prefix: str = "page-cache") -> bool:
+        """將整體與各流量類別的延遲與吞吐量寫入結果庫（runner 以 --record 執行時）"""
+        recorded = False
+        results = [(UNCACHED, self.uncached.overall), ("mixed", self.mixed.overall)]
+        results += [(f"mixed/{name}", segment.stats) for name, segment in sorted(self.mixed.segments.items())]
+        for name, stats in results:
+            if stats.histogram.count:
+                recorded = results_store.record(f"{prefix}/{name}", histogram=stats.histogram,
+                                                throughput=stats.throughput, error_rate=stats.error_rate,
+                                                requests=stats.requests) or recorded
+        return recorded
+
+
+class PageCacheBenchmark:
+    """
+    依序執行：混合流量暖機（填滿頁面快取與 OPcache）、全部略過快取、混合流量
+
+    兩次測量使用相同的網址、並行數與虛擬客戶端，差異只有 cookie。
+    """
+
+    def __init__(self, base_url: str = http_session.BASE_URL, paths: Sequence[str] = DEFAULT_PATHS,
+                 concurrency: int = 32, warmup: float = 5, anonymous_share: float = DEFAULT_ANONYMOUS_SHARE,
+                 clients: Optional[ClientPool] = None, timeout: float = 30,
+                 rate_limits: Optional[RateLimitConfig] = None, seed: int = 0):
+        self.paths = cacheable_paths(paths)
+        if not self.paths:
+            raise ValueError("沒有會被快取的網址（有 query string 或符合 $skip_cache 規則）")
+        self.base_url = base_url.rstrip('/')
+        self.clients = clients or ClientPool()
+        self.concurrency = capped_concurrency(concurrency, self.clients, rate_limits)
+        self.warmup = warmup
+        self.anonymous_share = anonymous_share
+        self.mix = traffic_mix(anonymous_share, seed=seed)
+        self.timeout = timeout
+
+    def run_traffic(self, name: str, segments: Sequence[str], seconds: float) -> TrafficResult:
+        """segments 依請求序號輪流決定每個請求的流量類別（cookie）"""
+        result = TrafficResult(name)
+        cookies = [SEGMENT_COOKIES[segment] for segment in segments]
+
+        def observe(index: int, status: Optional[int], headers: Mapping[str, str], latency_ms: float):
+            result.observe(segments[index % len(segments)], status, headers, latency_ms)
+
+        result.set_duration(asyncio.run(replay(self.base_url, self.paths, self.concurrency, seconds, self.clients,
+                                               self.timeout, cookies=cookies, observe=observe)))
+        return result
+
+    def run(self, seconds: float = 20) -> PageCacheComparison:
+        if self.warmup:
+            self.run_traffic("warmup", self.mix, self.warmup)
+        uncached = self.run_traffic(UNCACHED, [UNCACHED], seconds)
+        mixed = self.run_traffic("mixed", self.mix, seconds)
+        return PageCacheComparison(uncached, mixed, self.anonymous_share)
+
+
+def _latency(stats: ReplayStats) -> str:
+    if not stats.histogram.count:
+        return "沒有成功的請求"
+    return f"p50 {stats.histogram.percentile(50):>7.1f} ms  p99 {stats.histogram.percentile(99):>7.1f} ms"
+
+
+def format_report(comparison: PageCacheComparison) -> str:
+    uncached, mixed = comparison.uncached.overall, comparison.mixed.overall
+    lines = [f"頁面快取吞吐量（匿名流量 {comparison.anonymous_share:.0%}）:"]
+    if not comparison.mixed.cache_enabled:
+        lines.append(f"  ⚠ 回應沒有 {CACHE_HEADER} 標頭：fastcgi_cache 未啟用，兩次測量都由 PHP-FPM 處理")
+    # 標籤以全形字寬對齊
+    lines.append(f"  全部略過快取{uncached.throughput:>9.1f} req/s  {_latency(uncached)}")
+    lines.append(f"  混合流量    {mixed.throughput:>9.1f} req/s  {_latency(mixed)}")
+    for name, label in ((ANONYMOUS, "  匿名      "), (LOGGED_IN, "  登入      ")):
+        segment = comparison.mixed.segments.get(name)
+        if segment is not None:
+            lines.append(f"  {label}{segment.stats.throughput:>9.1f} req/s  {_latency(segment.stats)}"
+                         f"  快取回應 {segment.hit_ratio:.1%}")
+    if comparison.speedup is not None:
+        lines.append(f"  吞吐量為沒有頁面快取時的 {comparison.speedup:.1f} 倍")
+    throttled = uncached.throttled + mixed.throttled
+    if throttled:
+        lines.append(f"  ⚠ {throttled} 個請求被限流（429），吞吐量可能受 limit_req 限制，增加 --clients")
+    leaked = comparison.mixed.segments.get(LOGGED_IN, SegmentStats()).hit_ratio
+    if leaked:
+        lines.append(f"  ⚠ 登入流量有 {leaked:.1%} 由快取回應，$skip_cache 的 cookie 規則沒有生效")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="比較沒有頁面快取與匿名 / 登入混合流量的吞吐量")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="nginx 網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--standin", action="store_true", help="對本機替身伺服器測試（示範用）")
+    parser.add_argument("--standin-latency", type=float, default=20, help="替身伺服器每個 PHP 請求的處理時間（毫秒）")
+    parser.add_argument("--duration", type=float, default=20, help="每次測量的秒數")
+    parser.add_argument("--warmup", type=float, default=5, help="測量前的暖機秒數")
+    parser.add_argument("--concurrency", type=int, default=32, help="並行連線數")
+    parser.add_argument("--clients", type=int, default=None, help="虛擬客戶端數量（模式依 WP_TEST_CLIENT_MODE）")
+    parser.add_argument("--anonymous-share", type=float, default=DEFAULT_ANONYMOUS_SHARE, help="匿名流量比例")
+    parser.add_argument("--access-log", action="append", default=[],
+                        help="重播的 access log（可重複，- 為標準輸入，支援 .gz；只取會被快取的網址）")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    paths = replay_paths(read_lines(args.access_log)) if args.access_log else list(DEFAULT_PATHS)
+    raise_open_file_limit()
+    try:
+        if args.standin:
+            with StandInServer(FaultProfile(latency_ms=args.standin_latency, workers=20),
+                               page_cache_ttl=60) as server:
+                comparison = PageCacheBenchmark(server.base_url, paths, args.concurrency, args.warmup,
+                                                args.anonymous_share).run(args.duration)
+        else:
+            comparison = PageCacheBenchmark(args.base_url, paths, args.concurrency, args.warmup, args.anonymous_share,
+                                            ClientPool.from_env(args.clients)).run(args.duration)
+    except (ValueError, OSError) as e:
+        print(f"無法執行頁面快取測試: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(comparison.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(comparison))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
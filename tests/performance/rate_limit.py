@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+Nginx Rate Limit Model
+在客戶端重現 nginx limit_req / limit_conn 的判定，預測負載測試中應出現的 429，
+用來區分「依設計被限流」與「負載下失敗」
+
+設定直接讀取 config/nginx/rate-limiting.conf（limit_req_zone、limit_conn）
+與 default.conf（各 location 的 limit_req burst/nodelay），location 比對規則與 nginx 相同。
+漏桶演算法依 ngx_http_limit_req_module 的整數運算實作：
+速率以每秒千分之一請求為單位（60r/m = 1000，5r/m = 83），時間以毫秒計。
+"""
+
+import math
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+NGINX_CONF_DIR = os.path.join(REPO_ROOT, "config", "nginx")
+
+ZONE_PATTERN = re.compile(r'limit_req_zone\s+\S+\s+zone=(?P<name>\w+):\S+\s+rate=(?P<rate>\d+)r/(?P<unit>[sm])\s*;')
+LIMIT_REQ_PATTERN = re.compile(
+    r'limit_req\s+zone=(?P<zone>\w+)(?:\s+burst=(?P<burst>\d+))?(?P<nodelay>\s+nodelay)?(?:\s+delay=(?P<delay>\d+))?\s*;'
+)
+LIMIT_CONN_PATTERN = re.compile(r'^\s*limit_conn\s+(?P<zone>\w+)\s+(?P<limit>\d+)\s*;', re.M)
+STATUS_PATTERN = re.compile(r'^\s*limit_(?P<kind>req|conn)_status\s+(?P<status>\d+)\s*;', re.M)
+LOCATION_PATTERN = re.compile(r'location\s+(?:(?P<modifier>=|~\*|~|\^~)\s*)?(?P<pattern>[^\s{]+)\s*\{')
+COMMENT_PATTERN = re.compile(r'(?:^|(?<=\s))#.*$', re.M)
+
+# nginx 未設定 limit_req_status / limit_conn_status 時的預設值
+DEFAULT_STATUS = 503
+# nodelay：任何 excess 都不延遲
+NO_DELAY = 1 << 62
+
+
+@dataclass
+class LimitReq:
+    """location 中的一條 limit_req"""
+
+    zone: str
+    burst: int = 0
+    nodelay: bool = False
+    delay: int = 0
+
+
+@dataclass
+class Location:
+    """default.conf 中的一個 location 區塊"""
+
+    modifier: str
+    pattern: str
+    limit_req: List[LimitReq] = field(default_factory=list)
+    limit_req_status: Optional[int] = None
+    regex: Optional["re.Pattern"] = None
+
+    def __post_init__(self):
+        if self.modifier in ("~", "~*"):
+            self.regex = re.compile(self.pattern, re.I if self.modifier == "~*" else 0)
+
+    @property
+    def name(self) -> str:
+        return f"{self.modifier} {self.pattern}".strip()
+
+
+def _strip_comments(text: str) -> str:
+    return COMMENT_PATTERN.sub("", text)
+
+
+def _location_blocks(text: str) -> Iterable[Tuple[re.Match, str]]:
+    """逐一回傳 location 標頭與區塊內容（支援巢狀大括號）"""
+    for match in LOCATION_PATTERN.finditer(text):
+        depth, position = 1, match.end()
+        while depth and position < len(text):
+            if text[position] == '{':
+                depth += 1
+            elif text[position] == '}':
+                depth -= 1
+            position += 1
+        yield match, text[match.end():position - 1]
+
+
+@dataclass
+class RateLimitConfig:
+    """解析後的速率限制設定"""
+
+    zones: Dict[str, int]
+    locations: List[Location]
+    limit_req_status: int = DEFAULT_STATUS
+    conn_limit: Optional[int] = None
+    conn_status: int = DEFAULT_STATUS
+
+    @classmethod
+    def parse(cls, rate_limiting_conf: str, server_conf: str) -> "RateLimitConfig":
+        http = _strip_comments(rate_limiting_conf)
+        zones = {}
+        for match in ZONE_PATTERN.finditer(http):
+            scale = 60 if match.group('unit') == 'm' else 1
+            # 與 nginx 相同的整數除法：5r/m -> 83
+            zones[match.group('name')] = int(match.group('rate')) * 1000 // scale
+        statuses = {m.group('kind'): int(m.group('status')) for m in STATUS_PATTERN.finditer(http)}
+        conn = LIMIT_CONN_PATTERN.search(http)
+
+        locations = []
+        for header, body in _location_blocks(_strip_comments(server_conf)):
+            location = Location(header.group('modifier') or "", header.group('pattern'))
+            for limit in LIMIT_REQ_PATTERN.finditer(body):
+                location.limit_req.append(LimitReq(
+                    zone=limit.group('zone'),
+                    burst=int(limit.group('burst') or 0),
+                    nodelay=bool(limit.group('nodelay')),
+                    delay=int(limit.group('delay') or 0),
+                ))
+            status = STATUS_PATTERN.search(body)
+            if status and status.group('kind') == 'req':
+                location.limit_req_status = int(status.group('status'))
+            locations.append(location)
+
+        return cls(
+            zones=zones,
+            locations=locations,
+            limit_req_status=statuses.get('req', DEFAULT_STATUS),
+            conn_limit=int(conn.group('limit')) if conn else None,
+            conn_status=statuses.get('conn', DEFAULT_STATUS),
+        )
+
+    @classmethod
+    def load(cls, conf_dir: str = NGINX_CONF_DIR) -> "RateLimitConfig":
+        """讀取 config/nginx 中的 rate-limiting.conf 與 default.conf"""
+        with open(os.path.join(conf_dir, "rate-limiting.conf")) as f:
+            rate_limiting = f.read()
+        with open(os.path.join(conf_dir, "default.conf")) as f:
+            server = f.read()
+        return cls.parse(rate_limiting, server)
+
+    def match(self, uri: str) -> Optional[Location]:
+        """
+        依 nginx 規則選擇 location：精確比對優先；其次找最長前綴，
+        若為 ^~ 則直接使用；否則依序比對正規表示式，都不符合才使用最長前綴
+        """
+        path = uri.split('?', 1)[0]
+        longest = None
+        for location in self.locations:
+            if location.modifier == "=" and location.pattern == path:
+                return location
+            if location.modifier in ("", "^~") and path.startswith(location.pattern):
+                if longest is None or len(location.pattern) > len(longest.pattern):
+                    longest = location
+        if longest is not None and longest.modifier == "^~":
+            return longest
+        for location in self.locations:
+            if location.regex is not None and location.regex.search(path):
+                return location
+        return longest
+
+
+class LeakyBucket:
+    """單一 zone、單一客戶端鍵（$binary_remote_addr）的漏桶狀態；burst 與延遲由各 location 的 limit_req 決定"""
+
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.excess: Optional[int] = None
+        self.last = 0
+
+    def fill(self, limit: LimitReq, now_ms: int):
+        """假設桶已滿（例如先前的測試已用完 burst）"""
+        self.excess, self.last = limit.burst * 1000, now_ms
+
+    def offer(self, limit: LimitReq, now_ms: int) -> Optional[int]:
+        """判定一個請求：拒絕時回傳 None，否則回傳需延遲的毫秒數"""
+        if self.excess is None:
+            self.excess, self.last = 0, now_ms
+            return 0
+        ms = now_ms - self.last
+        if ms < -60000:
+            ms = 1
+        elif ms < 0:
+            ms = 0
+        excess = max(self.excess - self.rate * ms // 1000 + 1000, 0)
+        if excess > limit.burst * 1000:
+            return None
+        self.excess = excess
+        # 與 nginx 相同：ms 為 0 時不更新 last；更新時不足 1 單位的漏出量被捨去
+        if ms:
+            self.last = now_ms
+        delay = NO_DELAY if limit.nodelay else limit.delay * 1000
+        if excess <= delay:
+            return 0
+        return (excess - delay) * 1000 // self.rate
+
+    def wait_ms(self, limit: LimitReq, now_ms: int, headroom: int = 0) -> int:
+        """距離下一個請求會被放行還要等待的毫秒數（不改變狀態），headroom 為保留不用的 burst 名額"""
+        if self.excess is None:
+            return 0
+        # 需要漏出的量：excess - rate * ms / 1000 + 1000 <= (burst - headroom) * 1000
+        need = self.excess + 1000 - max(limit.burst - headroom, 0) * 1000
+        if need <= 0:
+            return 0
+        elapsed_needed = -(-need * 1000 // self.rate)
+        return max(self.last + elapsed_needed - now_ms, 0)
+
+
+@dataclass
+class Decision:
+    """一個請求的預測結果"""
+
+    status: Optional[int] = None
+    reason: Optional[str] = None
+    delay_ms: int = 0
+
+    @property
+    def throttled(self) -> bool:
+        return self.status is not None
+
+
+class RateLimiterModel:
+    """
+    單一客戶端 IP 的限流模型
+
+    full 為 True 時各 zone 的桶從已滿開始（先前請求用完 burst 的最壞情況）。
+    """
+
+    def __init__(self, config: RateLimitConfig, full: bool = False):
+        self.config = config
+        self.full = full
+        self.buckets: Dict[str, LeakyBucket] = {}
+
+    def _bucket(self, limit: LimitReq, now_ms: int) -> LeakyBucket:
+        bucket = self.buckets.get(limit.zone)
+        if bucket is None:
+            bucket = self.buckets[limit.zone] = LeakyBucket(self.config.zones[limit.zone])
+            if self.full:
+                bucket.fill(limit, now_ms)
+        return bucket
+
+    def wait_ms(self, uri: str, now_ms: int, headroom: int = 0) -> int:
+        """
+        uri 的請求在多少毫秒後才不會被 limit_req 拒絕（不含 limit_conn）
+
+        headroom 保留部分 burst 名額，吸收請求到達 nginx 時的網路與排程抖動。
+        """
+        location = self.config.match(uri)
+        if location is None:
+            return 0
+        return max((self._bucket(limit, now_ms).wait_ms(limit, now_ms, headroom) for limit in location.limit_req),
+                   default=0)
+
+    def saturate(self, uri: str, now_ms: int):
+        """將 uri 所在 location 的桶視為已滿（收到模型未預測的 429 時，同一 IP 還有其他流量）"""
+        location = self.config.match(uri)
+        if location is not None:
+            for limit in location.limit_req:
+                self._bucket(limit, now_ms).fill(limit, now_ms)
+
+    def admit(self, uri: str, now_ms: int, in_flight: int = 0) -> Decision:
+        """
+        判定請求：in_flight 為送出此請求時同一 IP 已在處理中的請求數（limit_conn）
+        """
+        location = self.config.match(uri)
+        delay = 0
+        if location is not None:
+            for limit in location.limit_req:
+                result = self._bucket(limit, now_ms).offer(limit, now_ms)
+                if result is None:
+                    status = location.limit_req_status or self.config.limit_req_status
+                    return Decision(status, f"limit_req:{limit.zone}")
+                delay = max(delay, result)
+        if self.config.conn_limit is not None and in_flight >= self.config.conn_limit:
+            return Decision(self.config.conn_status, "limit_conn")
+        return Decision(delay_ms=delay)
+
+
+@dataclass
+class ThrottlePrediction:
+    """
+    預期被限流的請求數範圍
+
+    low 假設各桶一開始為空，high 假設一開始已滿且計入 limit_conn
+    （客戶端看到的同時請求數不少於伺服器端，因此只用於上限）。
+    """
+
+    low: int = 0
+    high: int = 0
+    requests: int = 0
+    by_reason: Dict[str, int] = field(default_factory=dict)
+
+    @classmethod
+    def merged(cls, predictions: Iterable["ThrottlePrediction"]) -> "ThrottlePrediction":
+        """合併多個客戶端（各自的漏桶）的預測"""
+        total = cls()
+        for prediction in predictions:
+            total.low += prediction.low
+            total.high += prediction.high
+            total.requests += prediction.requests
+            for reason, count in prediction.by_reason.items():
+                total.by_reason[reason] = total.by_reason.get(reason, 0) + count
+        return total
+
+
+class ThrottlePredictor:
+    """在送出每個請求時呼叫 observe()，同時累計最佳與最壞情況的預測"""
+
+    def __init__(self, config: Optional[RateLimitConfig] = None):
+        self.config = config or RateLimitConfig.load()
+        self._empty = RateLimiterModel(self.config)
+        self._full = RateLimiterModel(self.config, full=True)
+        self.prediction = ThrottlePrediction()
+
+    def observe(self, uri: str, now_ms: int, in_flight: int = 0) -> Decision:
+        self.prediction.requests += 1
+        decision = self._empty.admit(uri, now_ms)
+        if decision.throttled:
+            self.prediction.low += 1
+            reasons = self.prediction.by_reason
+            reasons[decision.reason] = reasons.get(decision.reason, 0) + 1
+        if self._full.admit(uri, now_ms, in_flight).throttled:
+            self.prediction.high += 1
+        return decision
+
+    def wait_ms(self, uri: str, now_ms: int, requests: int = 1) -> int:
+        """
+        最壞情況（桶在 now_ms 已滿）下需等待的毫秒數，之後連續 requests 個 uri 的請求都不會被 limit_req 拒絕
+
+        在 observe() 之前呼叫；等待後送出的請求，最佳與最壞情況的 limit_req 預測相同。
+        """
+        return self._full.wait_ms(uri, now_ms, headroom=requests - 1)
+
+
+def predict_schedule(uri: str, rate: float, duration: float,
+                     config: Optional[RateLimitConfig] = None) -> ThrottlePrediction:
+    """預測以固定到達率對 uri 發送 rate * duration 個請求時的限流數量（不含 limit_conn）"""
+    predictor = ThrottlePredictor(config)
+    for i in range(int(rate * duration)):
+        predictor.observe(uri, int(i * 1000 / rate))
+    return predictor.prediction
+
+
+def clients_needed(uri: str, rate: float, duration: float,
+                   config: Optional[RateLimitConfig] = None, headroom: float = 0.1) -> int:
+    """
+    將 rate 平均分給多少個客戶端 IP，才不會有請求被 limit_req 拒絕（各桶從空開始，不含 limit_conn）
+
+    剛好足夠的數量在實際發送時間的毫秒誤差下仍會偶爾被拒絕，因此多加 headroom 比例的客戶端。
+    """
+    config = config or RateLimitConfig.load()
+    low, high = 1, max(int(rate * duration), 1)
+    while low < high:
+        count = (low + high) // 2
+        if predict_schedule(uri, rate / count, duration, config).low:
+            low = count + 1
+        else:
+            high = count
+    return math.ceil(low * (1 + headroom))
+
+
+@dataclass
+class ThrottleReport:
+    """將實際結果分為成功、依設計限流與負載下失敗"""
+
+    succeeded: int
+    throttled: int
+    failed: int
+    prediction: ThrottlePrediction
+    tolerance: int = 0
+
+    @classmethod
+    def from_counts(cls, status_counts: Dict[int, int], errors: int, prediction: ThrottlePrediction,
+                    throttle_status: int = 429) -> "ThrottleReport":
+        succeeded = sum(count for status, count in status_counts.items() if 200 <= status < 400)
+        throttled = status_counts.get(throttle_status, 0)
+        failed = errors + sum(status_counts.values()) - succeeded - throttled
+        # 客戶端與 nginx 的時鐘與網路延遲不同，邊界上的請求可能差一兩個
+        tolerance = max(2, int(prediction.requests * 0.02))
+        return cls(succeeded, throttled, failed, prediction, tolerance)
+
+    @property
+    def admitted(self) -> int:
+        """實際被放行（沒有收到 429）的請求數：成功加上負載下失敗"""
+        return self.succeeded + self.failed
+
+    @property
+    def failure_rate(self) -> float:
+        """負載下失敗佔被放行請求的百分比（不含 429；全部失敗時為 100%）"""
+        return self.failed / self.admitted * 100 if self.admitted else 0.0
+
+    @property
+    def as_designed(self) -> bool:
+        """429 數量落在預測範圍內"""
+        return self.prediction.low - self.tolerance <= self.throttled <= self.prediction.high + self.tolerance
+
+    @property
+    def limiter_verdict(self) -> str:
+        if self.throttled < self.prediction.low - self.tolerance:
+            return "限流比設定寬鬆（limit_req 可能未生效）"
+        if self.throttled > self.prediction.high + self.tolerance:
+            return "限流比設定嚴格"
+        return "符合設定"
+
+    def format(self, indent: str = "") -> str:
+        return "\n".join([
+            f"{indent}成功: {self.succeeded}  依設計限流 (429): {self.throttled}"
+            f"（預測 {self.prediction.low}–{self.prediction.high}，{self.limiter_verdict}）",
+            f"{indent}負載下失敗: {self.failed}（佔被放行請求 {self.failure_rate:.1f}%）",
+        ])
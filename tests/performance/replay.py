@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Closed-Loop Replay
+封閉迴路重播：concurrency 個連線各自依序請求一組網址（通常取自 access log），持續固定秒數，
+用於比較不同設定下的最大吞吐量與延遲（fpm_sizing、tuning_sweep）
+
+封閉迴路的吞吐量即為伺服器在此並行數下的處理能力；延遲從送出起算，不含排程落後。
+請求依序輪流分配給各虛擬客戶端，單一客戶端的並行數不超過 limit_conn。
+"""
+
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, List, Mapping, Optional, Sequence
+
+import aiohttp
+
+from tests.monitor.nginx_log import classify_location, parse_lines
+from tests.performance.clients import ClientPool
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.loadgen import client_session
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.timing import elapsed_ms, now_ns
+
+# 沒有 access log 時重播的網址（帶上 BYPASS_PAGE_CACHE 時都會經過 PHP-FPM）
+DEFAULT_PATHS = ("/", "/?s=wordpress", "/wp-json/wp/v2/posts?per_page=10", "/feed/", "/?p=1")
+# 略過 nginx 頁面微快取（fastcgi-cache.conf 的 $skip_cache_cookie）：測量 PHP-FPM / MySQL 的工具帶上此 cookie，
+# 否則首頁與 access log 中的固定網址由 nginx 直接回應
+BYPASS_PAGE_CACHE = ("wordpress_no_cache=1",)
+REPLAY_LOCATIONS = {"general", "php", "wp-json"}
+THROTTLE_STATUS = 429
+
+# record(status, latency_ms)：連線錯誤或逾時的 status 為 None
+RecordHook = Callable[[Optional[int], float], None]
+# observe(index, status, headers, latency_ms)：index 為請求序號（網址為 paths[index % len(paths)]），
+# 連線錯誤或逾時時 status 為 None、headers 為空
+ObserveHook = Callable[[int, Optional[int], Mapping[str, str], float], None]
+
+
+def replay_paths(lines: Iterable[str], limit: int = 10000) -> List[str]:
+    """從 access log 依序取出經過 PHP-FPM 的成功 GET（保留原本的順序與比例）"""
+    paths = []
+    for entry in parse_lines(lines):
+        if entry.method == "GET" and entry.status < 400 and classify_location(entry.path) in REPLAY_LOCATIONS:
+            paths.append(entry.path)
+            if len(paths) >= limit:
+                break
+    return paths
+
+
+def capped_concurrency(concurrency: int, clients: ClientPool, rate_limits: Optional[RateLimitConfig] = None) -> int:
+    """單一客戶端的並行數不超過 limit_conn"""
+    rate_limits = rate_limits or RateLimitConfig.load()
+    if rate_limits.conn_limit is None:
+        return concurrency
+    return min(concurrency, rate_limits.conn_limit * len(clients))
+
+
+@dataclass
+class ReplayStats:
+    """重播結果：429 與錯誤（連線失敗、5xx）分開計算，不計入吞吐量與延遲"""
+
+    duration: float = 0.0
+    requests: int = 0
+    throttled: int = 0
+    errors: int = 0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def record(self, status: Optional[int], latency_ms: float):
+        if status == THROTTLE_STATUS:
+            self.throttled += 1
+        elif status is None or status >= 500:
+            self.errors += 1
+        else:
+            self.requests += 1
+            self.histogram.record(latency_ms)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        total = self.requests + self.errors
+        return self.errors / total if total else 0.0
+
+
+async def replay(base_url: str, paths: Sequence[str], concurrency: int, seconds: float,
+                 clients: Optional[ClientPool] = None, timeout: float = 30,
+                 record: Optional[RecordHook] = None, cookies: Sequence[Optional[str]] = (),
+                 observe: Optional[ObserveHook] = None) -> float:
+    """
+    重播 seconds 秒，回傳實際經過的秒數
+
+    cookies 不為空時依請求序號輪流作為 Cookie 標頭（None 為不帶 cookie），用來混合匿名與登入的流量。
+    """
+    clients = clients or ClientPool()
+    count = len(clients)
+    sessions = [client_session(clients, index, timeout, limit=-(-concurrency // count), cookies=False)
+                for index in range(count)]
+    order = itertools.count()
+    deadline = now_ns() + int(seconds * 1e9)
+
+    async def worker():
+        while now_ns() < deadline:
+            index = next(order)
+            cookie = cookies[index % len(cookies)] if cookies else None
+            start = now_ns()
+            headers: Mapping[str, str] = {}
+            try:
+                async with sessions[index % count].get(f"{base_url}{paths[index % len(paths)]}",
+                                                       headers={'Cookie': cookie} if cookie else None) as response:
+                    await response.read()
+                    status = response.status
+                    headers = response.headers
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                status = None
+            latency_ms = elapsed_ms(start)
+            if record is not None:
+                record(status, latency_ms)
+            if observe is not None:
+                observe(index, status, headers, latency_ms)
+
+    try:
+        start = now_ns()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return elapsed_ms(start) / 1000
+    finally:
+        await asyncio.gather(*(session.close() for session in sessions))
+
+
+def run_replay(base_url: str, paths: Sequence[str], concurrency: int, seconds: float,
+               clients: Optional[ClientPool] = None, timeout: float = 30,
+               stats: Optional[ReplayStats] = None, cookies: Sequence[Optional[str]] = ()) -> ReplayStats:
+    """以獨立的 event loop 重播，結果累計到 stats"""
+    stats = stats if stats is not None else ReplayStats()
+    stats.duration += asyncio.run(replay(base_url, paths, concurrency, seconds, clients, timeout, stats.record,
+                                         cookies))
+    return stats
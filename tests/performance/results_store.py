@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Benchmark Results Store
+性能測試結果庫：每次執行的指標附加寫入本機 SQLite，以 git commit 與設定檔雜湊標記，
+並以統計檢定（bootstrap 信賴區間、Mann-Whitney U）比較目前結果與基準
+
+延遲以 LatencyHistogram 的非空桶保存，不需要保存每個請求的數據。
+
+用法：
+    python3 -m tests.runner --suite performance-comparison --record --label before
+    python3 -m tests.runner --suite performance-comparison --baseline label:before
+    python3 -m tests.performance.results_store runs
+    python3 -m tests.performance.results_store compare --baseline commit:1a2b3c --current latest
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence
+
+from tests import http_session
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.stats import as_weighted, bootstrap_ci, mann_whitney_u, weighted_mean, weighted_percentile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_DB_PATH = os.environ.get("WP_BENCH_DB", os.path.join(REPO_ROOT, ".benchmarks", "results.sqlite"))
+# runner 建立執行記錄後以此環境變數傳給各測試進程
+RUN_ID_ENV = "WP_BENCH_RUN_ID"
+
+# 影響性能的設定檔；內容改變即視為不同的設定
+CONFIG_PATHS = ["config", "docker-compose.yml", "docker-compose.bench.yml"]
+
+# 預設門檻：p99 增加或吞吐量下降超過 10%，且統計上顯著，即判定為退步
+P99_THRESHOLD = 0.10
+THROUGHPUT_THRESHOLD = 0.10
+SIGNIFICANCE = 0.05
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    git_commit TEXT,
+    git_dirty INTEGER NOT NULL DEFAULT 0,
+    config_hash TEXT NOT NULL,
+    label TEXT,
+    base_url TEXT,
+    host TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    benchmark TEXT NOT NULL,
+    recorded_at REAL NOT NULL,
+    requests INTEGER,
+    throughput REAL,
+    error_rate REAL,
+    histogram TEXT
+);
+CREATE INDEX IF NOT EXISTS results_run ON results(run_id, benchmark);
+"""
+
+
+def config_hash(paths: Sequence[str] = CONFIG_PATHS, root: str = REPO_ROOT) -> str:
+    """設定檔內容的雜湊（含相對路徑，檔案順序固定）"""
+    digest = hashlib.sha256()
+    files = []
+    for path in paths:
+        full = os.path.join(root, path)
+        if os.path.isdir(full):
+            for directory, _, names in os.walk(full):
+                files.extend(os.path.join(directory, name) for name in names)
+        elif os.path.exists(full):
+            files.append(full)
+    for full in sorted(files):
+        digest.update(os.path.relpath(full, root).encode())
+        with open(full, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def git_revision(root: str = REPO_ROOT):
+    """回傳 (commit, 工作目錄是否有未提交的修改)；不是 git 倉庫時為 (None, False)"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                                capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status.strip())
+
+
+@dataclass
+class Run:
+    id: int
+    created_at: float
+    git_commit: Optional[str]
+    git_dirty: bool
+    config_hash: str
+    label: Optional[str]
+    base_url: Optional[str]
+    host: Optional[str]
+
+    def describe(self) -> str:
+        commit = (self.git_commit or "-")[:10] + ("*" if self.git_dirty else "")
+        created = time.strftime("%Y-%m-%d %H:%M", time.localtime(self.created_at))
+        return f"#{self.id:<5}{created}  {commit:<12}{self.config_hash}  {self.label or ''}"
+
+
+@dataclass
+class BenchmarkData:
+    """一個 benchmark 在一或多次執行中的結果（延遲合併，吞吐量每次一個值）"""
+
+    histogram: Optional[LatencyHistogram] = None
+    throughputs: List[float] = field(default_factory=list)
+    error_rates: List[float] = field(default_factory=list)
+
+
+class ResultStore:
+    """只附加寫入的結果庫（不提供更新或刪除）"""
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(path, timeout=30)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def create_run(self, label: Optional[str] = None, base_url: Optional[str] = None,
+                   commit: Optional[str] = None, dirty: Optional[bool] = None,
+                   config: Optional[str] = None) -> int:
+        """新增一次執行記錄，未指定的 commit 與設定雜湊取自目前的工作目錄"""
+        if commit is None:
+            commit, detected_dirty = git_revision()
+            dirty = detected_dirty if dirty is None else dirty
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO runs (created_at, git_commit, git_dirty, config_hash, label, base_url, host) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (time.time(), commit, int(bool(dirty)), config or config_hash(), label,
+                 base_url or http_session.BASE_URL, platform.node()),
+            )
+        return cursor.lastrowid
+
+    def add_result(self, run_id: int, benchmark: str, histogram: Optional[LatencyHistogram] = None,
+                   throughput: Optional[float] = None, error_rate: Optional[float] = None,
+                   requests: Optional[int] = None):
+        encoded = json.dumps(histogram.encode(), separators=(",", ":")) if histogram is not None else None
+        if requests is None and histogram is not None:
+            requests = histogram.count
+        with self.connection:
+            self.connection.execute(
+                "INSERT INTO results (run_id, benchmark, recorded_at, requests, throughput, error_rate, histogram) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (run_id, benchmark, time.time(), requests, throughput, error_rate, encoded),
+            )
+
+    def runs(self, limit: Optional[int] = None) -> List[Run]:
+        """由新到舊列出執行記錄"""
+        query = "SELECT * FROM runs ORDER BY id DESC"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        return [Run(*row) for row in self.connection.execute(query)]
+
+    def select(self, selector: str, exclude: Sequence[int] = ()) -> List[int]:
+        """
+        依選擇器找出執行記錄 ID（同一選擇器的多次執行會合併比較）
+
+        選擇器：<id>、latest、latest~N（往前第 N 次）、label:<名稱>、
+        commit:<前綴>、config:<雜湊前綴>
+        """
+        ids = [run.id for run in self.runs() if run.id not in exclude]
+        if selector.isdigit():
+            return [int(selector)] if int(selector) in ids else []
+        if selector == "latest" or selector.startswith("latest~"):
+            offset = int(selector.partition("~")[2] or 0)
+            return ids[offset:offset + 1]
+        kind, _, value = selector.partition(":")
+        column = {'label': "label = ?", 'commit': "git_commit LIKE ?", 'config': "config_hash LIKE ?"}.get(kind)
+        if column is None or not value:
+            raise ValueError(f"無法解析的選擇器: {selector}")
+        argument = value if kind == "label" else value + "%"
+        rows = self.connection.execute(f"SELECT id FROM runs WHERE {column} ORDER BY id", (argument,))
+        return [row[0] for row in rows if row[0] not in exclude]
+
+    def load(self, run_ids: Sequence[int]) -> Dict[str, BenchmarkData]:
+        """讀取多次執行的結果，依 benchmark 名稱合併"""
+        data: Dict[str, BenchmarkData] = {}
+        if not run_ids:
+            return data
+        placeholders = ", ".join("?" * len(run_ids))
+        rows = self.connection.execute(
+            f"SELECT benchmark, throughput, error_rate, histogram FROM results "
+            f"WHERE run_id IN ({placeholders}) ORDER BY run_id",
+            list(run_ids),
+        )
+        for benchmark, throughput, error_rate, encoded in rows:
+            entry = data.setdefault(benchmark, BenchmarkData())
+            if encoded:
+                histogram = LatencyHistogram.decode(json.loads(encoded))
+                if entry.histogram is None:
+                    entry.histogram = histogram
+                else:
+                    entry.histogram.add(histogram)
+            if throughput is not None:
+                entry.throughputs.append(throughput)
+            if error_rate is not None:
+                entry.error_rates.append(error_rate)
+        return data
+
+
+def record(benchmark: str, histogram: Optional[LatencyHistogram] = None, throughput: Optional[float] = None,
+           error_rate: Optional[float] = None, requests: Optional[int] = None) -> bool:
+    """
+    測試中呼叫：若 runner 以 --record 建立了執行記錄（WP_BENCH_RUN_ID），寫入一筆結果
+
+    未設定時不做任何事，直接以 pytest 執行測試不會產生記錄。
+    """
+    run_id = os.environ.get(RUN_ID_ENV)
+    if not run_id:
+        return False
+    with ResultStore() as store:
+        store.add_result(int(run_id), benchmark, histogram, throughput, error_rate, requests)
+    return True
+
+
+@dataclass
+class Comparison:
+    """一個指標的比較結果（change 為相對變化）"""
+
+    benchmark: str
+    metric: str
+    baseline: float
+    current: float
+    change: float
+    ci_low: Optional[float] = None
+    ci_high: Optional[float] = None
+    p_value: Optional[float] = None
+    regressed: bool = False
+    improved: bool = False
+
+    @property
+    def verdict(self) -> str:
+        if self.regressed:
+            return "退步"
+        if self.improved:
+            return "改善"
+        return "無顯著差異"
+
+
+def _compare_p99(benchmark: str, baseline: LatencyHistogram, current: LatencyHistogram,
+                 threshold: float, alpha: float, iterations: int) -> Comparison:
+    base_sample, current_sample = baseline.buckets(), current.buckets()
+    p99 = lambda sample: weighted_percentile(sample, 99)  # noqa: E731
+    change, low, high = bootstrap_ci(base_sample, current_sample, p99, iterations=iterations)
+    _, p_greater = mann_whitney_u(base_sample, current_sample, "greater")
+    _, p_less = mann_whitney_u(base_sample, current_sample, "less")
+    # 延遲增加：超過門檻、信賴區間不含 0，且整體分佈顯著右移
+    regressed = change > threshold and low > 0 and p_greater < alpha
+    improved = change < -threshold and high < 0 and p_less < alpha
+    return Comparison(benchmark, "p99", baseline.percentile(99), current.percentile(99), change,
+                      low, high, p_greater if change >= 0 else p_less, regressed, improved)
+
+
+def _compare_throughput(benchmark: str, baseline: List[float], current: List[float],
+                        threshold: float, alpha: float, iterations: int) -> Comparison:
+    base_mean, current_mean = sum(baseline) / len(baseline), sum(current) / len(current)
+    change = (current_mean - base_mean) / base_mean if base_mean else 0.0
+    comparison = Comparison(benchmark, "throughput", base_mean, current_mean, change)
+    if len(baseline) >= 2 and len(current) >= 2:
+        # 每次執行只有一個吞吐量值，兩邊都有多次執行時才做檢定
+        base_sample, current_sample = as_weighted(baseline), as_weighted(current)
+        _, comparison.ci_low, comparison.ci_high = bootstrap_ci(
+            base_sample, current_sample, weighted_mean, iterations=iterations)
+        _, p_less = mann_whitney_u(base_sample, current_sample, "less")
+        _, p_greater = mann_whitney_u(base_sample, current_sample, "greater")
+        comparison.p_value = p_less if change <= 0 else p_greater
+        comparison.regressed = change < -threshold and comparison.ci_high < 0 and p_less < alpha
+        comparison.improved = change > threshold and comparison.ci_low > 0 and p_greater < alpha
+    else:
+        comparison.regressed = change < -threshold
+        comparison.improved = change > threshold
+    return comparison
+
+
+def compare(
+    baseline: Dict[str, BenchmarkData],
+    current: Dict[str, BenchmarkData],
+    p99_threshold: float = P99_THRESHOLD,
+    throughput_threshold: float = THROUGHPUT_THRESHOLD,
+    alpha: float = SIGNIFICANCE,
+    iterations: int = 1000,
+) -> List[Comparison]:
+    """比較兩邊都有的 benchmark：延遲看 p99，吞吐量看平均值"""
+    comparisons = []
+    for benchmark in sorted(set(baseline) & set(current)):
+        base, cur = baseline[benchmark], current[benchmark]
+        if base.histogram is not None and cur.histogram is not None and base.histogram.count and cur.histogram.count:
+            comparisons.append(_compare_p99(benchmark, base.histogram, cur.histogram,
+                                            p99_threshold, alpha, iterations))
+        if base.throughputs and cur.throughputs:
+            comparisons.append(_compare_throughput(benchmark, base.throughputs, cur.throughputs,
+                                                   throughput_threshold, alpha, iterations))
+    return comparisons
+
+
+def format_comparisons(comparisons: List[Comparison]) -> str:
+    lines = [f"{'benchmark':<32}{'指標':<12}{'基準':>10}{'目前':>10}{'變化':>9}{'95% CI':>20}{'p 值':>9}  判定"]
+    for c in comparisons:
+        ci = f"[{c.ci_low * 100:+.1f}%, {c.ci_high * 100:+.1f}%]" if c.ci_low is not None else "-"
+        p_value = f"{c.p_value:.3f}" if c.p_value is not None else "-"
+        lines.append(
+            f"{c.benchmark[:32]:<32}{c.metric:<12}{c.baseline:>10.2f}{c.current:>10.2f}{c.change * 100:>+8.1f}%"
+            f"{ci:>20}{p_value:>9}  {c.verdict}"
+        )
+    return "\n".join(lines)
+
+
+def compare_selectors(store: ResultStore, baseline: str, current: str = "latest", **kwargs) -> List[Comparison]:
+    """以選擇器比較兩組執行記錄；基準選擇器不會包含目前的執行"""
+    current_ids = store.select(current)
+    baseline_ids = store.select(baseline, exclude=current_ids)
+    if not current_ids:
+        raise ValueError(f"找不到目前的執行記錄: {current}")
+    if not baseline_ids:
+        raise ValueError(f"找不到基準執行記錄: {baseline}")
+    return compare(store.load(baseline_ids), store.load(current_ids), **kwargs)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="性能測試結果庫")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="結果庫路徑")
+    commands = parser.add_subparsers(dest="command", required=True)
+    runs_parser = commands.add_parser("runs", help="列出執行記錄")
+    runs_parser.add_argument("--limit", type=int, default=20)
+    compare_parser = commands.add_parser("compare", help="比較兩組執行記錄，退步時退出碼為 1")
+    compare_parser.add_argument("--baseline", required=True, help="基準選擇器，例如 label:before、commit:1a2b")
+    compare_parser.add_argument("--current", default="latest", help="目前選擇器（預設 latest）")
+    compare_parser.add_argument("--p99-threshold", type=float, default=P99_THRESHOLD)
+    compare_parser.add_argument("--throughput-threshold", type=float, default=THROUGHPUT_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    with ResultStore(args.db) as store:
+        if args.command == "runs":
+            for run in store.runs(args.limit):
+                print(run.describe())
+            return 0
+        try:
+            comparisons = compare_selectors(store, args.baseline, args.current,
+                                            p99_threshold=args.p99_threshold,
+                                            throughput_threshold=args.throughput_threshold)
+        except ValueError as e:
+            print(f"錯誤: {e}")
+            return 2
+    print(format_comparisons(comparisons))
+    return 1 if any(c.regressed for c in comparisons) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Scenario Load Testing
+情境式負載測試：依權重混合的使用者旅程（首頁 → 文章 → 搜尋、REST API 分頁、登入頁、admin-ajax），
+每個虛擬使用者是一個 coroutine，單一進程可模擬數萬名使用者，各步驟的延遲分開統計
+
+虛擬使用者以固定到達率開始旅程（開放迴路），步驟之間依 think time 的指數分佈停頓，
+每個步驟的延遲從思考結束、預定發送的時間起算。單一網址的基準測試會把慢的步驟（例如搜尋）
+平均掉，分步驟的直方圖才看得出來。
+
+用法：
+    python3 -m tests.performance.scenarios --users 2000 --arrival-rate 50
+    python3 -m tests.performance.scenarios --journey browse --users 200 --think-scale 0
+    python3 -m tests.performance.scenarios --clients 20 --client-mode source --base-url http://127.0.0.1:8080
+"""
+
+import argparse
+import asyncio
+import random
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from tests import http_session
+from tests.performance import results_store
+from tests.performance.clients import MODES, SOURCE, ClientPool
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.loadgen import ResponseHook, client_session, raise_open_file_limit
+from tests.performance.rate_limit import RateLimitConfig, ThrottlePrediction, ThrottlePredictor, ThrottleReport
+from tests.performance.timing import elapsed_ms, now_ns
+
+THROTTLE_STATUS = 429
+# 每個虛擬客戶端的連線上限；思考中的使用者不佔連線，超出時請求在客戶端排隊（計入延遲）
+DEFAULT_CONNECTIONS_PER_CLIENT = 100
+
+
+@dataclass(frozen=True)
+class Step:
+    """
+    旅程中的一個請求
+
+    path 中的 {名稱} 從 params 對應的候選值隨機選取；think_time 為送出前的平均停頓秒數，
+    expect 為視為成功的狀態碼（429 另計為限流）。
+    """
+
+    name: str
+    path: str
+    method: str = "GET"
+    data: Optional[Dict[str, str]] = None
+    think_time: float = 0.0
+    params: Dict[str, Sequence] = field(default_factory=dict)
+    expect: Tuple[int, ...] = (200,)
+
+    def render(self, rng: random.Random) -> str:
+        if not self.params:
+            return self.path
+        return self.path.format(**{name: rng.choice(values) for name, values in self.params.items()})
+
+
+@dataclass(frozen=True)
+class Journey:
+    """一種使用者旅程，weight 為在流量中的相對比例"""
+
+    name: str
+    weight: float
+    steps: Tuple[Step, ...]
+
+
+SEARCH_TERMS = ("wordpress", "hello", "docker", "nginx", "performance", "theme", "plugin")
+
+DEFAULT_JOURNEYS = (
+    Journey("browse", 60, (
+        Step("home", "/"),
+        Step("post", "/?p={post}", think_time=5, params={'post': (1,)}),
+        Step("search", "/?s={term}", think_time=8, params={'term': SEARCH_TERMS}),
+    )),
+    # 超出總頁數時 WordPress 回應 400 rest_post_invalid_page_number
+    Journey("rest-api", 20, (
+        Step("posts", "/wp-json/wp/v2/posts?per_page=10&page=1"),
+        Step("posts-next", "/wp-json/wp/v2/posts?per_page=10&page={page}", think_time=2,
+             params={'page': (2, 3)}, expect=(200, 400)),
+    )),
+    Journey("login", 10, (
+        Step("login-form", "/wp-login.php"),
+    )),
+    # 前台主題與外掛的 AJAX 輪詢（未登入時 heartbeat 走 wp_ajax_nopriv_heartbeat）
+    Journey("admin-ajax", 10, (
+        Step("heartbeat", "/wp-admin/admin-ajax.php", method="POST", data={'action': 'heartbeat'},
+             think_time=1, expect=(200, 400)),
+        Step("heartbeat-again", "/wp-admin/admin-ajax.php", method="POST", data={'action': 'heartbeat'},
+             think_time=15, expect=(200, 400)),
+    )),
+)
+
+
+@dataclass
+class StepStats:
+    """單一步驟的統計（延遲只記錄後端處理的回應，429 在 nginx 就被拒絕，計入會掩蓋後端的延遲）"""
+
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    status_counts: Dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+    unexpected: int = 0
+
+    @property
+    def requests(self) -> int:
+        return sum(self.status_counts.values()) + self.errors
+
+    @property
+    def throttled(self) -> int:
+        return self.status_counts.get(THROTTLE_STATUS, 0)
+
+    @property
+    def failures(self) -> int:
+        return self.errors + self.unexpected
+
+
+@dataclass
+class ScenarioResult:
+    """情境負載測試結果"""
+
+    users: int
+    arrival_rate: float
+    clients: int = 1
+    started_journeys: Dict[str, int] = field(default_factory=dict)
+    completed_journeys: Dict[str, int] = field(default_factory=dict)
+    steps: Dict[Tuple[str, str], StepStats] = field(default_factory=dict)
+    peak_active_users: int = 0
+    elapsed: float = 0.0
+    start_ns: int = 0
+    throttle_prediction: Optional[ThrottlePrediction] = None
+
+    def step(self, journey: str, step: str) -> StepStats:
+        key = (journey, step)
+        stats = self.steps.get(key)
+        if stats is None:
+            stats = self.steps[key] = StepStats()
+        return stats
+
+    @property
+    def requests(self) -> int:
+        return sum(stats.requests for stats in self.steps.values())
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.elapsed if self.elapsed > 0 else 0.0
+
+    def throttle_report(self) -> Optional[ThrottleReport]:
+        """
+        依 nginx 限流模型區分依設計的 429 與負載下的失敗（需以 rate_limits 執行）
+
+        旅程中預期的 4xx（例如超出分頁範圍的 400）視為成功，不計入失敗。
+        """
+        if self.throttle_prediction is None:
+            return None
+        throttled = sum(stats.throttled for stats in self.steps.values())
+        failed = sum(stats.failures for stats in self.steps.values())
+        succeeded = self.requests - throttled - failed
+        return ThrottleReport.from_counts({200: succeeded, THROTTLE_STATUS: throttled}, failed,
+                                          self.throttle_prediction)
+
+
+class ScenarioRunner:
+    """
+    以 coroutine 模擬虛擬使用者的情境負載產生器
+
+    使用者 i 在 i / arrival_rate 秒開始旅程，依權重選擇旅程後逐步執行；
+    think_scale 縮放所有 think time（0 為不停頓）。每個使用者固定屬於一個虛擬客戶端
+    （i % len(clients)），限流預測與 limit_conn 都以客戶端計算。不保存 cookie，使用者之間不共用狀態。
+    on_response 會收到每個回應（含 429）的狀態碼、標頭與延遲。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        journeys: Sequence[Journey] = DEFAULT_JOURNEYS,
+        users: int = 1000,
+        arrival_rate: float = 50,
+        think_scale: float = 1.0,
+        timeout: float = 30,
+        seed: Optional[int] = 0,
+        clients: Optional[ClientPool] = None,
+        rate_limits: Optional[RateLimitConfig] = None,
+        connections_per_client: int = DEFAULT_CONNECTIONS_PER_CLIENT,
+        on_response: Optional[ResponseHook] = None,
+    ):
+        if not journeys:
+            raise ValueError("至少需要一種旅程")
+        if users < 1:
+            raise ValueError(f"使用者數量必須至少為 1: {users}")
+        if arrival_rate <= 0:
+            raise ValueError(f"到達率必須大於 0: {arrival_rate}")
+        self.base_url = base_url.rstrip('/')
+        self.journeys = list(journeys)
+        self.weights = [journey.weight for journey in self.journeys]
+        self.users = users
+        self.arrival_rate = arrival_rate
+        self.think_scale = think_scale
+        self.timeout = timeout
+        self.rng = random.Random(seed)
+        self.clients = clients or ClientPool()
+        self.rate_limits = rate_limits
+        self.connections_per_client = connections_per_client
+        self.on_response = on_response
+
+    def choose(self) -> Journey:
+        return self.rng.choices(self.journeys, weights=self.weights)[0]
+
+    def think(self, step: Step) -> float:
+        if not step.think_time or not self.think_scale:
+            return 0.0
+        return self.rng.expovariate(1 / (step.think_time * self.think_scale))
+
+    async def _request(self, session: aiohttp.ClientSession, step: Step, path: str, stats: StepStats):
+        intended = now_ns()
+        try:
+            async with session.request(step.method, f"{self.base_url}{path}", data=step.data) as response:
+                await response.read()
+                status = response.status
+                headers = response.headers
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            stats.errors += 1
+            return
+        latency = elapsed_ms(intended)
+        if self.on_response is not None:
+            self.on_response(step.method, path, status, headers, latency)
+        stats.status_counts[status] = stats.status_counts.get(status, 0) + 1
+        if status == THROTTLE_STATUS:
+            return
+        stats.histogram.record(latency)
+        if status not in step.expect:
+            stats.unexpected += 1
+
+    async def _user(self, session: aiohttp.ClientSession, journey: Journey, result: ScenarioResult,
+                    predictor: Optional[ThrottlePredictor], in_flight: List[int], client: int):
+        for step in journey.steps:
+            pause = self.think(step)
+            if pause:
+                await asyncio.sleep(pause)
+            path = step.render(self.rng)
+            if predictor is not None:
+                predictor.observe(path, now_ns() // 1_000_000, in_flight[client])
+            in_flight[client] += 1
+            try:
+                await self._request(session, step, path, result.step(journey.name, step.name))
+            finally:
+                in_flight[client] -= 1
+        result.completed_journeys[journey.name] = result.completed_journeys.get(journey.name, 0) + 1
+
+    async def run_async(self) -> ScenarioResult:
+        """在目前的 event loop 中執行情境負載"""
+        self.clients.check()
+        count = len(self.clients)
+        result = ScenarioResult(users=self.users, arrival_rate=self.arrival_rate, clients=count)
+        # 依旅程定義的順序建立步驟，報表順序固定
+        for journey in self.journeys:
+            for step in journey.steps:
+                result.step(journey.name, step.name)
+        predictors = [ThrottlePredictor(self.rate_limits) for _ in range(count)] if self.rate_limits is not None else None
+        in_flight = [0] * count
+        active = set()
+        interval_ns = int(1e9 / self.arrival_rate)
+
+        sessions = [
+            client_session(self.clients, index, self.timeout, limit=self.connections_per_client, cookies=False)
+            for index in range(count)
+        ]
+        try:
+            start = result.start_ns = now_ns()
+            for i in range(self.users):
+                delay_ns = start + i * interval_ns - now_ns()
+                if delay_ns > 0:
+                    await asyncio.sleep(delay_ns / 1e9)
+                journey = self.choose()
+                client = i % count
+                result.started_journeys[journey.name] = result.started_journeys.get(journey.name, 0) + 1
+                task = asyncio.create_task(self._user(
+                    sessions[client], journey, result,
+                    predictors[client] if predictors is not None else None, in_flight, client,
+                ))
+                active.add(task)
+                task.add_done_callback(active.discard)
+                result.peak_active_users = max(result.peak_active_users, len(active))
+            if active:
+                await asyncio.gather(*active)
+            result.elapsed = elapsed_ms(start) / 1000
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+        if predictors is not None:
+            result.throttle_prediction = ThrottlePrediction.merged(p.prediction for p in predictors)
+        return result
+
+    def run(self) -> ScenarioResult:
+        """以獨立的 event loop 執行情境負載"""
+        raise_open_file_limit()
+        return asyncio.run(self.run_async())
+
+
+def format_report(result: ScenarioResult) -> str:
+    """各步驟的請求數、延遲百分位數、429 與失敗數"""
+    lines = [
+        f"虛擬使用者: {result.users}（到達率 {result.arrival_rate:g}/s，同時最多 {result.peak_active_users} 名，"
+        f"{result.clients} 個客戶端位址）",
+        f"完成旅程: {sum(result.completed_journeys.values())}/{sum(result.started_journeys.values())}  "
+        f"請求: {result.requests}  吞吐量: {result.throughput:.1f} req/s  耗時: {result.elapsed:.1f} 秒",
+        "",
+        f"{'旅程/步驟':<28}{'請求':>7}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}{'429':>6}{'失敗':>6}",
+    ]
+    for (journey, step), stats in result.steps.items():
+        summary = stats.histogram.summary()
+        lines.append(
+            f"{journey + '/' + step:<28}{stats.requests:>7}{summary['p50']:>10.1f}{summary['p90']:>10.1f}"
+            f"{summary['p99']:>10.1f}{summary['max']:>10.1f}{stats.throttled:>6}{stats.failures:>6}"
+        )
+    return "\n".join(lines)
+
+
+def record_results(result: ScenarioResult, prefix: str = "scenario") -> bool:
+    """將各步驟寫入結果庫（runner 以 --record 執行時）"""
+    recorded = False
+    for (journey, step), stats in result.steps.items():
+        if not stats.requests:
+            continue
+        recorded = results_store.record(
+            f"{prefix}/{journey}/{step}",
+            histogram=stats.histogram,
+            throughput=stats.requests / result.elapsed if result.elapsed else None,
+            error_rate=stats.failures / stats.requests,
+            requests=stats.requests,
+        ) or recorded
+    return recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="情境式使用者旅程負載測試")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="目標網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--users", type=int, default=1000, help="虛擬使用者總數")
+    parser.add_argument("--arrival-rate", type=float, default=50, help="每秒開始旅程的使用者數")
+    parser.add_argument("--think-scale", type=float, default=1.0, help="think time 倍率（0 為不停頓）")
+    parser.add_argument("--journey", action="append", choices=[j.name for j in DEFAULT_JOURNEYS],
+                        help="只執行指定旅程（可重複）")
+    parser.add_argument("--clients", type=int, default=1, help="虛擬客戶端位址數量")
+    parser.add_argument("--client-mode", choices=MODES, default=SOURCE)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    journeys = [j for j in DEFAULT_JOURNEYS if not args.journey or j.name in args.journey]
+    runner = ScenarioRunner(
+        args.base_url, journeys, users=args.users, arrival_rate=args.arrival_rate,
+        think_scale=args.think_scale, timeout=args.timeout, seed=args.seed,
+        clients=ClientPool.create(args.clients, args.client_mode), rate_limits=RateLimitConfig.load(),
+    )
+    result = runner.run()
+    print(format_report(result))
+    print()
+    print(result.throttle_report().format())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,749 @@
+#!/usr/bin/env python3
+"""
+In-Process Stand-In Server
+模擬 config/nginx/default.conf 路由的本機替身伺服器，不需要 Docker 即可執行性能測試，
+並可注入延遲、錯誤與 429，用來驗證測試工具本身與校正客戶端開銷
+
+伺服器在背景執行緒的 event loop 中執行，回應內容預先產生，可承受高吞吐量。
+
+用法：
+    with StandInServer(FaultProfile(latency_ms=20)) as server:
+        run_open_loop(server.base_url, rate=500, duration=5)
+
+    python3 -m tests.performance.standin --port 8080 --latency-ms 50 --error-rate 0.01
+    python3 -m tests.performance.standin --calibrate --latency-ms 20 --rate 500
+    python3 -m tests.runner --standin        # 以替身伺服器執行性能測試套件
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import mimetypes
+import os
+import random
+import re
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence
+
+from aiohttp import web
+from multidict import CIMultiDict
+
+from tests.monitor.nginx_log import classify_location
+from tests.monitor.opcache_status import key_slots
+from tests.performance.cache_bench import skip_cache_reason
+from tests.performance.clients import RealIpConfig
+from tests.performance.rate_limit import RateLimitConfig, RateLimiterModel
+from tests.performance.static_bench import GzipConfig
+from tests.performance.timing import now_ns
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SECURITY_HEADERS_CONF = os.path.join(REPO_ROOT, "config", "nginx", "security-headers.conf")
+
+ADD_HEADER_PATTERN = re.compile(r'^\s*add_header\s+(?P<name>[\w-]+)\s+"(?P<value>[^"]*)"')
+# 靜態檔案 location：expires 1y + Cache-Control "public, immutable"
+STATIC_MAX_AGE = 365 * 24 * 3600
+# 轉發到 PHP-FPM 的 location（其餘由 nginx 直接回應）
+UPSTREAM_LOCATIONS = {"general", "php", "wp-json", "wp-login", "xmlrpc"}
+# 只在 internal.conf 的內部 server 提供的狀態頁（公開 server 落到 location /，由 WordPress 回應）
+INTERNAL_LOCATIONS = {"/fpm-status": "fpm-status", "/opcache-status": "opcache-status"}
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+# 首頁引用的靜態檔案（與 WordPress 佈景主題相同帶有 ?ver=）
+PAGE_ASSETS = (
+    '<link rel="stylesheet" href="/wp-content/themes/twentytwentyfour/style.css?ver=1.0">',
+    '<link rel="stylesheet" href="/wp-includes/css/dist/block-library/style.min.css?ver=6.4">',
+    '<script src="/wp-includes/js/jquery/jquery.min.js?ver=3.7.1"></script>',
+    '<img src="/wp-content/uploads/2024/01/header.jpg" alt="">',
+)
+# 文字檔案的詞彙（讓 gzip 壓縮比例接近真實的 CSS / JavaScript）
+ASSET_WORDS = (
+    "function", "return", "var", "const", "this", "document", "window", "null", "true", "false", "length",
+    "margin", "padding", "display", "flex", "color", "background", "border", "font-size", "width", "height",
+    "wp-block", "is-layout", "has-text", "jQuery", "prototype", "addEventListener", "querySelector",
+    "{", "}", "(", ")", ";", ":", ",", "=", ".", "0", "1", "2", "px", "em", "rem", "%", "#fff", "#000",
+)
+
+
+@dataclass
+class FaultProfile:
+    """
+    注入的故障（機率以 0 到 1 表示）
+
+    errors 回應 502（模擬 PHP-FPM 無回應），throttled 回應 429（模擬 limit_req），
+    locations 為 None 時套用於所有 location，否則只套用於列出的 location 名稱。
+    workers 大於 0 時模擬 pm.max_children：轉發到 PHP-FPM 的請求需等待空閒 worker，
+    注入的延遲即為 worker 的處理時間，容量上限約為 workers / latency。
+    """
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    workers: int = 0
+    locations: Optional[Sequence[str]] = None
+
+    def applies_to(self, location: str) -> bool:
+        return self.locations is None or location in self.locations
+
+
+def load_security_headers(path: str = SECURITY_HEADERS_CONF) -> Dict[str, str]:
+    """讀取 security-headers.conf 中啟用的 add_header（略過註解行）"""
+    headers = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                match = ADD_HEADER_PATTERN.match(line)
+                if match:
+                    headers[match.group('name')] = match.group('value')
+    except OSError:
+        pass
+    return headers
+
+
+def _asset_body(path: str, size: int, content_type: str) -> bytes:
+    """依路徑產生可重現的靜態檔案內容：文字檔為隨機排列的詞彙，其他為隨機位元組（不可壓縮）"""
+    rng = random.Random(path)
+    if not content_type.startswith("text/") and not content_type.endswith(("javascript", "+xml")):
+        return rng.randbytes(size)
+    prefix = b"@font-face{src:url(fonts/inter.woff2)}\n" if content_type == "text/css" else b""
+    words = []
+    length = len(prefix)
+    while length < size:
+        word = rng.choice(ASSET_WORDS) + (" " if rng.random() < 0.7 else "\n")
+        words.append(word)
+        length += len(word)
+    return (prefix + "".join(words).encode())[:size]
+
+
+def _skip_cache(request: web.Request) -> bool:
+    return bool(skip_cache_reason(request.method, request.path_qs, request.headers.get('Cookie', ""),
+                                  request.headers.get('Authorization', "")))
+
+
+def _cache_key(request: web.Request) -> str:
+    """與 fastcgi_cache_key "$scheme$request_method$host$request_uri" 相同（替身伺服器只有 HTTP），方法不同分開快取"""
+    return f"{request.method} {request.path_qs}"
+
+
+def _filler(size: int, prefix: bytes = b"") -> bytes:
+    """固定內容的回應主體（可重現，方便比較壓縮與傳輸大小）"""
+    line = b"Lorem ipsum dolor sit amet, consectetur adipiscing elit. 0123456789\n"
+    body = prefix + line * (max(size - len(prefix), 0) // len(line) + 1)
+    return body[:size]
+
+
+def _not_modified(request: web.Request, etag: str, last_modified: str) -> bool:
+    """與 nginx 的 not_modified filter 相同：If-None-Match 以弱比較，其次 If-Modified-Since 需完全相符"""
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None:
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(',')]
+        return "*" in tags or etag in tags
+    if_modified_since = request.headers.get('If-Modified-Since')
+    if if_modified_since is None:
+        return False
+    try:
+        return parsedate_to_datetime(if_modified_since) == parsedate_to_datetime(last_modified)
+    except (TypeError, ValueError):
+        return False
+
+
+def _parse_range(value: str, size: int) -> Optional[tuple]:
+    """解析單一 bytes 範圍，回傳 (first, last)；無法滿足時回傳 None（多重範圍只取第一個）"""
+    match = re.match(r'bytes=(\d*)-(\d*)', value)
+    if not (match.group(1) or match.group(2)):
+        return None
+    if not match.group(1):
+        length = int(match.group(2))
+        return (max(size - length, 0), size - 1) if length else None
+    first = int(match.group(1))
+    last = min(int(match.group(2)), size - 1) if match.group(2) else size - 1
+    return (first, last) if first <= last else None
+
+
+class FpmPool:
+    """
+    PHP-FPM pool 的模擬（pm.max_children 與 pm.status_path 的計數）
+
+    max_children 為 0 時不限制 worker 數量。與 PHP-FPM 相同，worker 全忙時請求在 listen queue 等待，
+    max children reached 在每秒的 pool 維護中最多增加一次；處理時間超過 slow_ms 計為 slow request。
+    """
+
+    def __init__(self, slow_ms: float = 5000):
+        self.slow_ms = slow_ms
+        self.started = time.time()
+        self.accepted = 0
+        self.active = 0
+        self.max_active = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.max_children_reached = 0
+        self.slow_requests = 0
+        self._last_reached = 0.0
+        self._semaphore: Optional[tuple] = None
+
+    def _pool(self, size: int) -> asyncio.Semaphore:
+        """worker 池（max_children 改變時重建）"""
+        if self._semaphore is None or self._semaphore[0] != size:
+            self._semaphore = (size, asyncio.Semaphore(size))
+        return self._semaphore[1]
+
+    async def run(self, max_children: int, work: Callable[[], Awaitable[web.Response]]) -> web.Response:
+        self.accepted += 1
+        pool = self._pool(max_children) if max_children else None
+        if pool is not None and pool.locked():
+            now = time.monotonic()
+            if now - self._last_reached >= 1:
+                self.max_children_reached += 1
+                self._last_reached = now
+            self.queued += 1
+            self.max_queued = max(self.max_queued, self.queued)
+            try:
+                await pool.acquire()
+            finally:
+                self.queued -= 1
+        elif pool is not None:
+            await pool.acquire()
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        start = time.monotonic()
+        try:
+            return await work()
+        finally:
+            self.active -= 1
+            if pool is not None:
+                pool.release()
+            if (time.monotonic() - start) * 1000 >= self.slow_ms:
+                self.slow_requests += 1
+
+    def status(self, max_children: int = 0) -> Dict:
+        """與 /fpm-status?json 相同的欄位"""
+        total = max(max_children, self.active)
+        return {
+            'pool': "www",
+            'process manager': "static" if max_children else "ondemand",
+            'start time': int(self.started),
+            'start since': int(time.time() - self.started),
+            'accepted conn': self.accepted,
+            'listen queue': self.queued,
+            'max listen queue': self.max_queued,
+            'listen queue len': 511,
+            'idle processes': total - self.active,
+            'active processes': self.active,
+            'total processes': total,
+            'max active processes': self.max_active,
+            'max children reached': self.max_children_reached,
+            'slow requests': self.slow_requests,
+        }
+
+
+class OpcacheModel:
+    """
+    OPcache 的模擬（/opcache-status 的計數，欄位與 config/php/opcache-status.php 相同）
+
+    每個轉發到 PHP-FPM 的請求執行 WordPress 核心與該 location 的腳本，第一次為 miss、之後為 hit；
+    .php 網址另外執行該檔案本身。已快取的腳本用完 max_files 進位後的 key slot 時與 PHP 相同設為 cache_full，
+    之後的新腳本每次都是 miss（不模擬重啟）；php_files 為 ?files=1 回報的 WordPress 目錄檔案數。
+    """
+
+    ROOT = "/var/www/html"
+    CORE = ("wp-settings.php", "wp-includes/plugin.php", "wp-includes/functions.php", "wp-includes/class-wp-query.php",
+            "wp-includes/formatting.php", "wp-content/themes/twentytwentyfour/functions.php")
+    ROUTES = {
+        "wp-json": ("wp-includes/rest-api/class-wp-rest-server.php",
+                    "wp-includes/rest-api/endpoints/class-wp-rest-posts-controller.php"),
+        "wp-login": ("wp-login.php", "wp-includes/pluggable.php"),
+        "xmlrpc": ("xmlrpc.php", "wp-includes/class-wp-xmlrpc-server.php"),
+        "general": ("wp-includes/template-loader.php", "wp-content/themes/twentytwentyfour/templates/index.html.php"),
+    }
+    SCRIPT_BYTES = 48 * 1024
+
+    def __init__(self, max_files: int = 10000, memory_consumption: int = 128 * 1024 ** 2, php_files: int = 1800):
+        self.max_files = max_files
+        self.php_files = php_files
+        self.memory_consumption = memory_consumption
+        self.started = int(time.time())
+        self.hits = 0
+        self.misses = 0
+        self.cache_full = False
+        self.scripts: Dict[str, Dict[str, int]] = {}
+
+    def execute(self, location: str, path: str):
+        names = self.CORE + self.ROUTES.get(location, ())
+        if location == "php" and path.endswith(".php"):
+            names += (path.lstrip("/"),)
+        for name in names:
+            script = self.scripts.get(f"{self.ROOT}/{name}")
+            if script is not None:
+                script['hits'] += 1
+                script['last_used_timestamp'] = int(time.time())
+                self.hits += 1
+                continue
+            self.misses += 1
+            if len(self.scripts) >= key_slots(self.max_files):
+                self.cache_full = True
+                continue
+            self.scripts[f"{self.ROOT}/{name}"] = {'hits': 0, 'memory_consumption': self.SCRIPT_BYTES,
+                                                   'last_used_timestamp': int(time.time())}
+
+    def status(self, scripts: bool = False) -> Dict:
+        """與 /opcache-status 相同的欄位"""
+        used = len(self.scripts) * self.SCRIPT_BYTES
+        status = {
+            'opcache_enabled': True,
+            'cache_full': self.cache_full,
+            'restart_pending': False,
+            'restart_in_progress': False,
+            'memory_usage': {'used_memory': used, 'free_memory': self.memory_consumption - used,
+                             'wasted_memory': 0, 'current_wasted_percentage': 0.0},
+            'interned_strings_usage': {'buffer_size': 8 * 1024 ** 2, 'used_memory': 1024 ** 2,
+                                       'free_memory': 7 * 1024 ** 2, 'number_of_strings': 10000},
+            'opcache_statistics': {
+                'num_cached_scripts': len(self.scripts), 'num_cached_keys': len(self.scripts),
+                'max_cached_keys': key_slots(self.max_files), 'hits': self.hits, 'misses': self.misses,
+                'start_time': self.started, 'last_restart_time': 0,
+                'oom_restarts': 0, 'hash_restarts': 0, 'manual_restarts': 0,
+            },
+            'directives': {'opcache.memory_consumption': self.memory_consumption,
+                           'opcache.max_accelerated_files': self.max_files,
+                           'opcache.max_wasted_percentage': 0.05, 'opcache.interned_strings_buffer': 8},
+        }
+        if scripts:
+            status['scripts'] = {path: dict(script) for path, script in self.scripts.items()}
+        return status
+
+
+class StandInServer:
+    """
+    模擬 nginx + WordPress 的替身伺服器
+
+    路由與 default.conf 的 location 一致（分類規則與 tests/monitor/nginx_log.py 共用），
+    所有回應都加上 security-headers.conf 的標頭（與 nginx 的 always 相同）。
+    提供 rate_limits 時依 nginx 的 limit_req / limit_conn 模型按來源 IP 限流；
+    提供 real_ip 時與 bench-realip.conf 相同，信任來源的 X-Forwarded-For 視為客戶端位址。
+    靜態檔案依 nginx.conf 的 gzip 設定壓縮，並支援 If-None-Match / If-Modified-Since（304）與單一 Range（206）。
+    page_cache_ttl 不為 None 時模擬 fastcgi-cache.conf：轉發到 PHP-FPM 的回應依 $skip_cache 規則快取，
+    並加上 X-Cache（HIT / MISS / STALE / UPDATING / BYPASS），命中時不經過 worker 也沒有注入的延遲；
+    過期的項目先回應舊內容並在背景更新。internal_url 為 internal.conf 的內部 server：不限流，
+    一律略過快取讀取並寫入快取（mu-plugin 重新產生快取的路徑）；內部 server 的 /fpm-status 與 /opcache-status
+    回應 FpmPool 與 OpcacheModel 的計數。
+    faults 可在執行期間替換；stats 記錄各 location 的請求、錯誤與 429 數量。
+    """
+
+    def __init__(
+        self,
+        faults: Optional[FaultProfile] = None,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        internal_port: int = 0,
+        seed: int = 0,
+        page_bytes: int = 24 * 1024,
+        static_bytes: int = 32 * 1024,
+        rate_limits: Optional[RateLimitConfig] = None,
+        real_ip: Optional[RealIpConfig] = None,
+        page_cache_ttl: Optional[float] = None,
+        posts: int = 30,
+        gzip_config: Optional[GzipConfig] = None,
+    ):
+        self.faults = faults or FaultProfile()
+        self.host = host
+        self.port = port
+        self.internal_port = internal_port
+        self.page_bytes = page_bytes
+        self.static_bytes = static_bytes
+        self.security_headers = load_security_headers()
+        self.rate_limits = rate_limits
+        self._limiters: Dict[str, RateLimiterModel] = {}
+        self._in_flight: Dict[str, int] = {}
+        self.real_ip = real_ip
+        self.fpm = FpmPool()
+        self.opcache = OpcacheModel()
+        self.page_cache_ttl = page_cache_ttl
+        self._page_cache: Dict[str, tuple] = {}
+        self._page_cache_updates: Dict[str, asyncio.Future] = {}
+        self.posts = posts
+        self.gzip = gzip_config or GzipConfig.load()
+        self.stats: Dict[str, Dict[str, int]] = {}
+        self._rng = random.Random(seed)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._runners: List[web.AppRunner] = []
+        self._thread: Optional[threading.Thread] = None
+        self._ready = threading.Event()
+        self._startup_error: Optional[BaseException] = None
+        self._static_cache: Dict[str, tuple] = {}
+        self._page = _filler(page_bytes, b"<!DOCTYPE html>\n<html><head><title>WordPress</title>\n"
+                                         + "\n".join(PAGE_ASSETS).encode() + b"\n</head><body>\n")
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def internal_url(self) -> str:
+        return f"http://{self.host}:{self.internal_port}"
+
+    def reset_stats(self):
+        self.stats = {}
+
+    def reset_rate_limits(self):
+        """清空各來源 IP 的漏桶狀態"""
+        self._limiters = {}
+
+    def purge_page_cache(self):
+        self._page_cache = {}
+
+    def _count(self, location: str, key: str):
+        counters = self.stats.setdefault(location, {'requests': 0, 'errors': 0, 'throttled': 0})
+        counters[key] += 1
+
+    def _headers(self, extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+        headers = {'Server': 'nginx'}
+        headers.update(self.security_headers)
+        headers.update(extra or {})
+        return headers
+
+    def _text(self, status: int, text: str, content_type: str = "text/html") -> web.Response:
+        return web.Response(status=status, text=text, content_type=content_type, headers=self._headers())
+
+    def _static(self, request: web.Request) -> web.Response:
+        path = request.path
+        cached = self._static_cache.get(path)
+        if cached is None:
+            content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+            body = _asset_body(path, self.static_bytes, content_type)
+            compressed = (gzip.compress(body, self.gzip.comp_level, mtime=0)
+                          if self.gzip.applies(content_type, len(body)) else None)
+            # 與 nginx 相同的 ETag 格式（"mtime-size" 十六進位）；固定的修改時間
+            mtime = 1_700_000_000
+            cached = self._static_cache[path] = (body, compressed, content_type, f'"{mtime:x}-{len(body):x}"',
+                                                 formatdate(mtime, usegmt=True))
+        body, compressed, content_type, etag, last_modified = cached
+        headers = CIMultiDict(self._headers({
+            'Expires': formatdate(time.time() + STATIC_MAX_AGE, usegmt=True),
+            'Cache-Control': f"max-age={STATIC_MAX_AGE}",
+        }))
+        # 與 nginx 相同：expires 與 add_header 各送出一個 Cache-Control
+        headers.add('Cache-Control', "public, immutable")
+        if compressed is not None and self.gzip.vary:
+            headers['Vary'] = "Accept-Encoding"
+        use_gzip = compressed is not None and "gzip" in request.headers.get('Accept-Encoding', "")
+        # gzip 回應的 ETag 為弱驗證器，且不支援 Range（nginx 的 gzip filter 清除 Accept-Ranges）
+        headers['ETag'] = f"W/{etag}" if use_gzip else etag
+        headers['Last-Modified'] = last_modified
+        if _not_modified(request, etag, last_modified):
+            return web.Response(status=304, headers=headers)
+        if use_gzip:
+            headers['Content-Encoding'] = "gzip"
+            return web.Response(body=compressed, content_type=content_type, headers=headers)
+        headers['Accept-Ranges'] = "bytes"
+        byte_range = request.headers.get('Range', "")
+        # 語法錯誤的 Range 與 nginx 相同忽略，回應完整內容
+        if re.match(r'bytes=\d*-\d*', byte_range):
+            span = _parse_range(byte_range, len(body))
+            if span is None:
+                headers['Content-Range'] = f"bytes */{len(body)}"
+                return web.Response(status=416, headers=headers)
+            first, last = span
+            headers['Content-Range'] = f"bytes {first}-{last}/{len(body)}"
+            return web.Response(status=206, body=body[first:last + 1], content_type=content_type, headers=headers)
+        return web.Response(body=body, content_type=content_type, headers=headers)
+
+    def _sitemap(self, request: web.Request, root: str, item: str, paths: Sequence[str]) -> web.Response:
+        """WordPress 核心 sitemap（/wp-sitemap.xml）的索引或網址清單"""
+        origin = f"{request.scheme}://{request.host}"
+        entries = "".join(f"<{item}><loc>{origin}{path}</loc></{item}>" for path in paths)
+        body = f'<?xml version="1.0" encoding="UTF-8"?>\n<{root} xmlns="{SITEMAP_NS}">{entries}</{root}>'
+        return web.Response(text=body, content_type="application/xml", headers=self._headers())
+
+    def _rest(self, request: web.Request) -> web.Response:
+        """REST API：索引與分頁的文章清單（超出頁數時與 WordPress 相同回應 400）"""
+        path = request.path.rstrip('/')
+        headers = self._headers()
+        status = 200
+        if path in ("/wp-json", "/wp-json/wp/v2"):
+            body = {'name': 'WordPress', 'namespaces': ['oembed/1.0', 'wp/v2']}
+        elif path == "/wp-json/wp/v2/posts":
+            per_page = max(min(int(request.query.get('per_page', "10") or 10), 100), 1)
+            page = max(int(request.query.get('page', "1") or 1), 1)
+            total_pages = max((self.posts + per_page - 1) // per_page, 1)
+            headers.update({'X-WP-Total': str(self.posts), 'X-WP-TotalPages': str(total_pages)})
+            if page > total_pages:
+                status = 400
+                body = {'code': 'rest_post_invalid_page_number', 'data': {'status': 400}}
+            else:
+                origin = f"{request.scheme}://{request.host}"
+                first = (page - 1) * per_page + 1
+                body = [{'id': i, 'link': f"{origin}/post-{i}/"}
+                        for i in range(first, min(first + per_page, self.posts + 1))]
+        else:
+            body = []
+        return web.Response(status=status, text=json.dumps(body), content_type="application/json", headers=headers)
+
+    def _respond(self, request: web.Request, location: str) -> web.Response:
+        path = request.path
+        if location == "health":
+            return self._text(200, "healthy\n", "text/plain")
+        if location == "fpm-status":
+            status = self.fpm.status(self.faults.workers)
+            if "json" in request.query:
+                return web.Response(text=json.dumps(status), content_type="application/json", headers=self._headers())
+            return self._text(200, "".join(f"{key}:{' ' * max(21 - len(key), 1)}{value}\n"
+                                           for key, value in status.items()), "text/plain")
+        if location == "opcache-status":
+            status = self.opcache.status(scripts="scripts" in request.query)
+            if "files" in request.query:
+                status['php_files'] = self.opcache.php_files
+            return web.Response(text=json.dumps(status), content_type="application/json", headers=self._headers())
+        if location == "denied":
+            return self._text(403, "<html><body><h1>403 Forbidden</h1></body></html>")
+        if location == "static":
+            return self._static(request)
+        if location == "xmlrpc" and request.method != "POST":
+            return self._text(405, "XML-RPC server accepts POST requests only.", "text/plain")
+        if location == "wp-json":
+            return self._rest(request)
+        if path == "/wp-sitemap.xml":
+            return self._sitemap(request, "sitemapindex", "sitemap", ["/wp-sitemap-posts-post-1.xml"])
+        if path == "/wp-sitemap-posts-post-1.xml":
+            return self._sitemap(request, "urlset", "url", [f"/post-{i}/" for i in range(1, self.posts + 1)])
+        if path == "/wp-admin/admin-ajax.php":
+            # 視 POST 為未登入的 heartbeat（回應 JSON），未帶 action 的 GET 與 WordPress 相同回應 400 與 "0"
+            if request.method == "POST":
+                body = {'server_time': int(time.time())}
+                return web.Response(text=json.dumps(body), content_type="application/json", headers=self._headers())
+            return self._text(400, "0", "text/plain")
+        if location == "wp-login":
+            return self._text(200, "<html><body><form id=\"loginform\" method=\"post\">"
+                                   "<input name=\"log\"><input name=\"pwd\"></form></body></html>")
+        return web.Response(body=self._page, content_type="text/html", headers=self._headers())
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        location = classify_location(request.path_qs)
+        self._count(location, 'requests')
+        if self.rate_limits is None:
+            return await self._handle_admitted(request, location)
+
+        client = request.remote or ""
+        if self.real_ip is not None:
+            client = self.real_ip.client(client, request.headers.get(self.real_ip.header))
+        limiter = self._limiters.get(client)
+        if limiter is None:
+            limiter = self._limiters[client] = RateLimiterModel(self.rate_limits)
+        decision = limiter.admit(request.path_qs, now_ns() // 1_000_000, self._in_flight.get(client, 0))
+        if decision.throttled:
+            self._count(location, 'throttled')
+            return self._text(decision.status, "<html><body><h1>429 Too Many Requests</h1></body></html>")
+        self._in_flight[client] = self._in_flight.get(client, 0) + 1
+        try:
+            if decision.delay_ms:
+                await asyncio.sleep(decision.delay_ms / 1000)
+            return await self._handle_admitted(request, location)
+        finally:
+            self._in_flight[client] -= 1
+
+    async def _handle_admitted(self, request: web.Request, location: str) -> web.Response:
+        if self.page_cache_ttl is None or location not in UPSTREAM_LOCATIONS:
+            return await self._origin(request, location)
+        if _skip_cache(request):
+            return self._cache_status(await self._origin(request, location), "BYPASS")
+        key = _cache_key(request)
+        cached = self._page_cache.get(key)
+        if cached is None:
+            return self._cache_status(await self._fill_page_cache(request, location, key), "MISS")
+        expires, status, body, content_type = cached
+        if expires > time.monotonic():
+            cache_status = "HIT"
+        elif key in self._page_cache_updates:
+            cache_status = "UPDATING"
+        else:
+            # fastcgi_cache_use_stale updating + fastcgi_cache_background_update：回應過期內容，背景更新
+            cache_status = "STALE"
+            self._page_cache_updates[key] = asyncio.ensure_future(self._update_page_cache(request, location, key))
+        return self._cache_status(
+            web.Response(status=status, body=body, content_type=content_type, headers=self._headers()), cache_status
+        )
+
+    async def _handle_internal(self, request: web.Request) -> web.Response:
+        """internal.conf 的內部 server：只接受 GET / HEAD，不限流，略過快取讀取、回應照常寫入快取"""
+        if request.method not in ("GET", "HEAD"):
+            return self._text(405, "<html><body><h1>405 Not Allowed</h1></body></html>")
+        location = INTERNAL_LOCATIONS.get(request.path) or classify_location(request.path_qs)
+        self._count(location, 'requests')
+        if self.page_cache_ttl is None or location not in UPSTREAM_LOCATIONS:
+            return await self._origin(request, location)
+        if _skip_cache(request):
+            return self._cache_status(await self._origin(request, location), "BYPASS")
+        return self._cache_status(await self._fill_page_cache(request, location, _cache_key(request)), "BYPASS")
+
+    async def _fill_page_cache(self, request: web.Request, location: str, key: str) -> web.Response:
+        response = await self._origin(request, location)
+        if response.status == 200:
+            self._page_cache[key] = (time.monotonic() + self.page_cache_ttl, response.status, response.body,
+                                     response.content_type)
+        return response
+
+    async def _update_page_cache(self, request: web.Request, location: str, key: str):
+        try:
+            await self._fill_page_cache(request, location, key)
+        finally:
+            del self._page_cache_updates[key]
+
+    @staticmethod
+    def _cache_status(response: web.Response, status: str) -> web.Response:
+        response.headers['X-Cache'] = status
+        return response
+
+    async def _origin(self, request: web.Request, location: str) -> web.Response:
+        if location in UPSTREAM_LOCATIONS:
+            self.opcache.execute(location, request.path)
+        faults = self.faults
+        if not faults.applies_to(location):
+            if location in UPSTREAM_LOCATIONS:
+                return await self.fpm.run(0, lambda: self._respond_async(request, location))
+            return self._respond(request, location)
+        # limit_req 在轉發到上游之前就拒絕，429 不含注入的延遲
+        if faults.throttle_rate and self._rng.random() < faults.throttle_rate:
+            self._count(location, 'throttled')
+            return self._text(429, "<html><body><h1>429 Too Many Requests</h1></body></html>")
+        if location in UPSTREAM_LOCATIONS:
+            return await self.fpm.run(faults.workers, lambda: self._upstream(request, location, faults))
+        return await self._upstream(request, location, faults)
+
+    async def _respond_async(self, request: web.Request, location: str) -> web.Response:
+        return self._respond(request, location)
+
+    async def _upstream(self, request: web.Request, location: str, faults: FaultProfile) -> web.Response:
+        delay = faults.latency_ms
+        if faults.jitter_ms:
+            delay += self._rng.uniform(-faults.jitter_ms, faults.jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if faults.error_rate and self._rng.random() < faults.error_rate:
+            self._count(location, 'errors')
+            return self._text(502, "<html><body><h1>502 Bad Gateway</h1></body></html>")
+        return self._respond(request, location)
+
+    async def _start(self, sockets: Sequence[socket.socket]):
+        for handler, sock in zip((self._handle, self._handle_internal), sockets):
+            app = web.Application()
+            app.router.add_route("*", "/{tail:.*}", handler)
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            await web.SockSite(runner, sock).start()
+            self._runners.append(runner)
+
+    async def _cleanup(self):
+        for runner in self._runners:
+            await runner.cleanup()
+
+    def _serve(self, sockets: Sequence[socket.socket]):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._start(sockets))
+        except BaseException as e:
+            self._startup_error = e
+            self._ready.set()
+            return
+        self._ready.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.run_until_complete(self._cleanup())
+            self._loop.close()
+
+    def start(self) -> "StandInServer":
+        """在背景執行緒啟動伺服器（公開與內部 server 各一個埠），返回時已可接受連線"""
+        sockets = []
+        for port in (self.port, self.internal_port):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self.host, port))
+            sock.listen(1024)
+            sockets.append(sock)
+        self.port, self.internal_port = (sock.getsockname()[1] for sock in sockets)
+        self._thread = threading.Thread(target=self._serve, args=(sockets,), name="standin-server", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._startup_error is not None:
+            raise self._startup_error
+        return self
+
+    def stop(self):
+        """停止伺服器"""
+        if self._loop is not None and self._thread is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def measure_client_overhead(latency_ms: float = 20, rate: float = 200, duration: float = 5,
+                            path: str = "/health") -> Dict[str, float]:
+    """
+    對已知延遲的替身伺服器執行開放迴路負載，測得延遲減去注入延遲即為客戶端與迴路開銷
+    """
+    from tests.performance.loadgen import run_open_loop
+
+    with StandInServer(FaultProfile(latency_ms=latency_ms)) as server:
+        result = run_open_loop(f"{server.base_url}{path}", rate, duration)
+    summary = result.histogram.summary()
+    return {
+        'injected_ms': latency_ms,
+        'achieved_rps': result.achieved_rps,
+        'p50': summary['p50'],
+        'p99': summary['p99'],
+        'overhead_p50': summary['p50'] - latency_ms,
+        'overhead_p99': summary['p99'] - latency_ms,
+        'errors': result.errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="模擬 nginx + WordPress 路由的替身伺服器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--internal-port", type=int, default=8081, help="內部 server 的埠（internal.conf）")
+    parser.add_argument("--latency-ms", type=float, default=0, help="注入的延遲（毫秒）")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="延遲抖動範圍（毫秒）")
+    parser.add_argument("--error-rate", type=float, default=0, help="回應 502 的機率")
+    parser.add_argument("--throttle-rate", type=float, default=0, help="回應 429 的機率")
+    parser.add_argument("--workers", type=int, default=0, help="模擬 pm.max_children（0 為不限）")
+    parser.add_argument("--page-cache-ttl", type=float, help="模擬 fastcgi_cache 的有效秒數（預設不快取）")
+    parser.add_argument("--location", action="append", help="只對指定 location 注入故障（可重複）")
+    parser.add_argument("--calibrate", action="store_true", help="測量負載產生器的客戶端開銷後結束")
+    parser.add_argument("--rate", type=float, default=200, help="校正時的到達率（預設 200）")
+    parser.add_argument("--duration", type=float, default=5, help="校正時的持續秒數（預設 5）")
+    args = parser.parse_args()
+
+    if args.calibrate:
+        result = measure_client_overhead(args.latency_ms, args.rate, args.duration)
+        print(f"注入延遲 {result['injected_ms']:.1f}ms  實際吞吐量 {result['achieved_rps']:.1f} req/s")
+        print(f"測得 p50 {result['p50']:.2f}ms / p99 {result['p99']:.2f}ms")
+        print(f"客戶端開銷 p50 {result['overhead_p50']:.2f}ms / p99 {result['overhead_p99']:.2f}ms")
+        return
+
+    faults = FaultProfile(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate,
+                          args.workers, args.location)
+    server = StandInServer(faults, host=args.host, port=args.port, internal_port=args.internal_port,
+                           page_cache_ttl=args.page_cache_ttl).start()
+    print(f"替身伺服器: {server.base_url}，內部 server: {server.internal_url}（Ctrl+C 結束）")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
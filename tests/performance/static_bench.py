@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+Static Asset Benchmark
+靜態檔案傳輸測試：從首頁與 CSS 找出佈景主題、外掛與 wp-includes 的靜態檔案，
+驗證 default.conf 靜態 location 的標頭（expires 1y、Cache-Control immutable、驗證器）與 nginx.conf 的 gzip 設定，
+測量 304 重新驗證與 Range 請求的延遲，並以固定並行數比較 gzip 與 identity 的吞吐量與延遲。
+
+並行測試為封閉迴路（每個連線完成後立即送出下一個請求），測量的是飽和吞吐量；
+高並行的 sendfile 測試以 identity 請求最大的檔案（gzip 需經過壓縮，不走 sendfile）。
+每個 IP 的並行數受 limit_conn 限制，超過時需以 --clients 分散到多個虛擬客戶端。
+
+用法：
+    python3 -m tests.performance.static_bench
+    python3 -m tests.performance.static_bench --concurrency 32 --duration 10
+    python3 -m tests.performance.static_bench --sendfile-concurrency 256 --clients 32 --client-mode source
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urljoin, urlsplit
+
+import aiohttp
+from multidict import CIMultiDictProxy
+
+from tests import http_session
+from tests.monitor.nginx_log import classify_location
+from tests.performance import results_store
+from tests.performance.clients import MODES, SOURCE, ClientPool
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.loadgen import client_session, raise_open_file_limit
+from tests.performance.rate_limit import NGINX_CONF_DIR, RateLimitConfig
+from tests.performance.timing import elapsed_ms, now_ns
+
+# 一定會檢查的 WordPress 核心檔案（首頁沒有引用時仍可測試）
+DEFAULT_ASSETS = (
+    "/wp-includes/js/jquery/jquery.min.js",
+    "/wp-includes/css/dist/block-library/style.min.css",
+    "/wp-includes/css/dashicons.min.css",
+    "/wp-content/themes/twentytwentyfour/style.css",
+)
+ASSET_PATTERN = re.compile(r'''(?:href|src)\s*=\s*["']([^"'#]+)["']''', re.IGNORECASE)
+CSS_URL_PATTERN = re.compile(r'''url\(\s*["']?([^"')]+?)["']?\s*\)''')
+# expires 1y（容許測試執行期間與時鐘誤差）
+MIN_MAX_AGE = 365 * 24 * 3600
+MIN_EXPIRES = MIN_MAX_AGE - 24 * 3600
+RANGE_BYTES = 1024
+ENCODINGS = ("gzip", "identity")
+SAMPLES = 5
+
+
+@dataclass(frozen=True)
+class GzipConfig:
+    """nginx.conf 的 gzip 設定"""
+
+    enabled: bool = False
+    comp_level: int = 1
+    min_length: int = 20
+    types: Tuple[str, ...] = ()
+    vary: bool = False
+
+    @classmethod
+    def parse(cls, nginx_conf: str) -> "GzipConfig":
+        text = re.sub(r'#[^\n]*', "", nginx_conf)
+
+        def value(name: str) -> Optional[str]:
+            match = re.search(rf'\b{name}\s+([^;]+);', text)
+            return match.group(1).strip() if match else None
+
+        return cls(
+            enabled=value("gzip") == "on",
+            comp_level=int(value("gzip_comp_level") or 1),
+            min_length=int(value("gzip_min_length") or 20),
+            types=tuple(sorted(set((value("gzip_types") or "").split()))),
+            vary=value("gzip_vary") == "on",
+        )
+
+    @classmethod
+    def load(cls, conf_dir: str = NGINX_CONF_DIR) -> "GzipConfig":
+        with open(os.path.join(conf_dir, "nginx.conf"), encoding="utf-8") as f:
+            return cls.parse(f.read())
+
+    def applies(self, content_type: str, length: int) -> bool:
+        """回應是否會被 gzip（text/html 永遠在 gzip_types 內）"""
+        mime = content_type.split(';')[0].strip().lower()
+        return self.enabled and length >= self.min_length and (mime == "text/html" or mime in self.types)
+
+
+def is_asset(path: str) -> bool:
+    """路徑是否由 default.conf 的靜態檔案 location 處理"""
+    return classify_location(urlsplit(path).path) == "static"
+
+
+def find_assets(html: str, base_url: str, page_url: Optional[str] = None) -> List[str]:
+    """從 HTML 的 href / src 或 CSS 的 url() 找出同一主機的靜態檔案路徑（依出現順序、去除重複）"""
+    page_url = page_url or base_url + "/"
+    host = urlsplit(base_url).netloc
+    found: Dict[str, None] = {}
+    for pattern in (ASSET_PATTERN, CSS_URL_PATTERN):
+        for ref in pattern.findall(html):
+            if ref.startswith("data:"):
+                continue
+            parts = urlsplit(urljoin(page_url, ref.strip()))
+            if parts.netloc != host:
+                continue
+            path = parts.path + (f"?{parts.query}" if parts.query else "")
+            if is_asset(path):
+                found.setdefault(path)
+    return list(found)
+
+
+def _max_age(cache_control: str) -> Optional[int]:
+    match = re.search(r'max-age=(\d+)', cache_control)
+    return int(match.group(1)) if match else None
+
+
+@dataclass
+class AssetCheck:
+    """單一檔案的標頭與協定檢查"""
+
+    path: str
+    status: int = 0
+    content_type: str = ""
+    size: int = 0
+    gzip_size: Optional[int] = None
+    problems: List[str] = field(default_factory=list)
+
+    @property
+    def ratio(self) -> Optional[float]:
+        """gzip 壓縮後佔原始大小的比例"""
+        return self.gzip_size / self.size if self.gzip_size is not None and self.size else None
+
+
+def check_cache_headers(headers, now: Optional[float] = None) -> List[str]:
+    """檢查 expires 1y 與 Cache-Control "public, immutable"，回傳問題清單"""
+    problems = []
+    # nginx 的 expires 與 add_header 各送出一個 Cache-Control
+    cache_control = ", ".join(headers.getall('Cache-Control', []))
+    max_age = _max_age(cache_control)
+    if max_age is None or max_age < MIN_MAX_AGE:
+        problems.append(f"Cache-Control max-age 不足一年: {cache_control or '（無）'}")
+    if "immutable" not in cache_control:
+        problems.append("Cache-Control 缺少 immutable")
+    expires = headers.get('Expires')
+    try:
+        remaining = parsedate_to_datetime(expires).timestamp() - (now or time.time()) if expires else None
+    except (TypeError, ValueError):
+        remaining = None
+    if remaining is None or remaining < MIN_EXPIRES:
+        problems.append(f"Expires 不足一年: {expires or '（無）'}")
+    if not headers.get('ETag') and not headers.get('Last-Modified'):
+        problems.append("沒有 ETag 或 Last-Modified，無法重新驗證")
+    return problems
+
+
+@dataclass
+class LoadStats:
+    """一次並行測試的結果"""
+
+    name: str
+    encoding: str
+    concurrency: int
+    duration: float = 0.0
+    requests: int = 0
+    errors: int = 0
+    wire_bytes: int = 0
+    status_counts: Dict[int, int] = field(default_factory=dict)
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    @property
+    def throughput(self) -> float:
+        return self.requests / self.duration if self.duration else 0.0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        return self.wire_bytes / self.duration / 1e6 if self.duration else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        total = self.requests + self.errors
+        failed = self.errors + sum(count for status, count in self.status_counts.items() if status >= 400)
+        return failed / total if total else 0.0
+
+
+@dataclass
+class StaticReport:
+    """靜態檔案測試結果"""
+
+    gzip: GzipConfig
+    checks: List[AssetCheck] = field(default_factory=list)
+    # 各請求類型（gzip、identity、304、range）的逐一請求延遲
+    timings: Dict[str, LatencyHistogram] = field(default_factory=dict)
+    loads: List[LoadStats] = field(default_factory=list)
+
+    @property
+    def assets(self) -> List[AssetCheck]:
+        return [check for check in self.checks if check.status == 200]
+
+    @property
+    def problems(self) -> List[Tuple[str, str]]:
+        return [(check.path, problem) for check in self.assets for problem in check.problems]
+
+    def compression_ratio(self) -> Optional[float]:
+        """壓縮後總大小 / 原始總大小（只計入被 gzip 的檔案）"""
+        compressed = [check for check in self.assets if check.gzip_size is not None]
+        total = sum(check.size for check in compressed)
+        return sum(check.gzip_size for check in compressed) / total if total else None
+
+    def load(self, name: str) -> Optional[LoadStats]:
+        return next((stats for stats in self.loads if stats.name == name), None)
+
+    def record(self, prefix: str = "static") -> bool:
+        """將逐一請求與並行測試的延遲寫入結果庫（runner 以 --record 執行時）"""
+        recorded = False
+        for kind, histogram in self.timings.items():
+            if histogram.count:
+                recorded = results_store.record(f"{prefix}/{kind}", histogram=histogram,
+                                                requests=histogram.count) or recorded
+        for stats in self.loads:
+            recorded = results_store.record(
+                f"{prefix}/load/{stats.name}", histogram=stats.histogram, throughput=stats.throughput,
+                error_rate=stats.error_rate, requests=stats.requests,
+            ) or recorded
+        return recorded
+
+    def to_dict(self) -> Dict:
+        return {
+            'gzip_comp_level': self.gzip.comp_level,
+            'assets': [{'path': c.path, 'size': c.size, 'gzip_size': c.gzip_size, 'problems': c.problems}
+                       for c in self.checks],
+            'compression_ratio': self.compression_ratio(),
+            'timings': {kind: histogram.summary() for kind, histogram in self.timings.items()},
+            'loads': [{
+                'name': s.name, 'encoding': s.encoding, 'concurrency': s.concurrency, 'requests': s.requests,
+                'throughput': s.throughput, 'mb_per_second': s.megabytes_per_second, 'error_rate': s.error_rate,
+                'status_counts': s.status_counts, 'latency': s.histogram.summary(),
+            } for s in self.loads],
+        }
+
+
+class StaticBenchmark:
+    """
+    靜態檔案測試
+
+    assets 未提供時從首頁與其引用的 CSS 找出靜態檔案，再加上 DEFAULT_ASSETS；回應 404 的檔案略過。
+    concurrency 為 gzip / identity 比較的並行數，sendfile_concurrency 為大型檔案測試的並行數（0 為不執行）。
+    每個客戶端的並行數不超過 limit_conn。
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        assets: Optional[Sequence[str]] = None,
+        concurrency: int = 8,
+        sendfile_concurrency: int = 0,
+        duration: float = 5,
+        timeout: float = 30,
+        clients: Optional[ClientPool] = None,
+        gzip: Optional[GzipConfig] = None,
+        rate_limits: Optional[RateLimitConfig] = None,
+        max_assets: int = 50,
+        samples: int = SAMPLES,
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.assets = list(assets) if assets else None
+        self.clients = clients or ClientPool()
+        rate_limits = rate_limits or RateLimitConfig.load()
+        self.max_concurrency = (rate_limits.conn_limit or 10 ** 6) * len(self.clients)
+        self.concurrency = min(concurrency, self.max_concurrency)
+        self.sendfile_concurrency = min(sendfile_concurrency, self.max_concurrency)
+        self.duration = duration
+        self.timeout = timeout
+        self.gzip = gzip or GzipConfig.load()
+        self.max_assets = max_assets
+        self.samples = samples
+
+    def _session(self, index: int = 0, **kwargs) -> aiohttp.ClientSession:
+        # 不自動解壓縮，才能取得實際傳輸的位元組數
+        return client_session(self.clients, index, self.timeout, cookies=False, auto_decompress=False, **kwargs)
+
+    async def discover(self, session: aiohttp.ClientSession) -> List[str]:
+        """從首頁與首頁引用的 CSS 找出靜態檔案"""
+        assets: Dict[str, None] = {}
+        try:
+            async with session.get(f"{self.base_url}/", headers={'Accept-Encoding': "identity"}) as response:
+                html = await response.text(errors="replace")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            html = ""
+        for path in find_assets(html, self.base_url):
+            assets.setdefault(path)
+        for path in [path for path in assets if urlsplit(path).path.endswith(".css")]:
+            try:
+                async with session.get(f"{self.base_url}{path}", headers={'Accept-Encoding': "identity"}) as response:
+                    css = await response.text(errors="replace") if response.status == 200 else ""
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                continue
+            for ref in find_assets(css, self.base_url, f"{self.base_url}{path}"):
+                assets.setdefault(ref)
+        for path in DEFAULT_ASSETS:
+            assets.setdefault(path)
+        return list(assets)[:self.max_assets]
+
+    async def _timed(self, session: aiohttp.ClientSession, path: str, headers: Dict[str, str],
+                     kind: str, report: StaticReport) -> Tuple[int, CIMultiDictProxy, bytes]:
+        start = now_ns()
+        async with session.get(f"{self.base_url}{path}", headers=headers) as response:
+            body = await response.read()
+            latency = elapsed_ms(start)
+            status, response_headers = response.status, response.headers
+        report.timings.setdefault(kind, LatencyHistogram()).record(latency)
+        return status, response_headers, body
+
+    async def check(self, session: aiohttp.ClientSession, path: str, report: StaticReport) -> AssetCheck:
+        """以 identity、gzip、條件式請求與 Range 請求檢查單一檔案"""
+        check = AssetCheck(path)
+        status, headers, body = await self._timed(session, path, {'Accept-Encoding': "identity"}, "identity", report)
+        check.status = status
+        if status != 200:
+            return check
+        check.content_type = headers.get('Content-Type', "")
+        check.size = len(body)
+        check.problems.extend(check_cache_headers(headers))
+        if headers.get('Content-Encoding'):
+            check.problems.append(f"要求 identity 卻回應 Content-Encoding: {headers['Content-Encoding']}")
+
+        status, gzip_headers, gzip_body = await self._timed(session, path, {'Accept-Encoding': "gzip"}, "gzip", report)
+        compressible = self.gzip.applies(check.content_type, check.size)
+        if gzip_headers.get('Content-Encoding') == "gzip":
+            check.gzip_size = len(gzip_body)
+        elif compressible:
+            check.problems.append("依 gzip_types 應壓縮卻未回應 gzip")
+        if compressible and self.gzip.vary and "accept-encoding" not in gzip_headers.get('Vary', "").lower():
+            check.problems.append("gzip 回應缺少 Vary: Accept-Encoding")
+
+        # 條件式請求：瀏覽器重新整理時以 If-None-Match / If-Modified-Since 重新驗證
+        for validator, header in (('ETag', 'If-None-Match'), ('Last-Modified', 'If-Modified-Since')):
+            value = headers.get(validator)
+            if not value:
+                continue
+            status, _, revalidated = await self._timed(
+                session, path, {'Accept-Encoding': "identity", header: value}, "304", report)
+            if status != 304 or revalidated:
+                check.problems.append(f"{header} 未回應 304（{status}，{len(revalidated)} bytes）")
+
+        # Range 請求（影片、字型與下載續傳）；gzip 回應不支援 Range，以 identity 請求
+        if check.size > RANGE_BYTES:
+            status, range_headers, part = await self._timed(
+                session, path, {'Accept-Encoding': "identity", 'Range': f"bytes=0-{RANGE_BYTES - 1}"}, "range", report)
+            expected = f"bytes 0-{RANGE_BYTES - 1}/{check.size}"
+            if status != 206 or range_headers.get('Content-Range') != expected or part != body[:RANGE_BYTES]:
+                check.problems.append(f"Range 請求未回應正確的 206（{status}，"
+                                      f"Content-Range: {range_headers.get('Content-Range')}）")
+        return check
+
+    async def _load_worker(self, session: aiohttp.ClientSession, paths: Sequence[str], offset: int,
+                           encoding: str, stats: LoadStats, deadline: int):
+        i = offset
+        while now_ns() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            start = now_ns()
+            try:
+                async with session.get(f"{self.base_url}{path}", headers={'Accept-Encoding': encoding}) as response:
+                    body = await response.read()
+                    status = response.status
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.errors += 1
+                continue
+            stats.histogram.record(elapsed_ms(start))
+            stats.requests += 1
+            stats.wire_bytes += len(body)
+            stats.status_counts[status] = stats.status_counts.get(status, 0) + 1
+
+    async def run_load(self, name: str, paths: Sequence[str], encoding: str, concurrency: int) -> LoadStats:
+        """封閉迴路並行測試：concurrency 個連線各自依序請求 paths，持續 duration 秒"""
+        stats = LoadStats(name, encoding, concurrency)
+        count = min(len(self.clients), concurrency)
+        per_client = -(-concurrency // count)
+        sessions = [self._session(index, limit=per_client) for index in range(count)]
+        try:
+            start = now_ns()
+            deadline = start + int(self.duration * 1e9)
+            await asyncio.gather(*(
+                self._load_worker(sessions[worker % count], paths, worker, encoding, stats, deadline)
+                for worker in range(concurrency)
+            ))
+            stats.duration = elapsed_ms(start) / 1000
+        finally:
+            await asyncio.gather(*(session.close() for session in sessions))
+        return stats
+
+    async def run_async(self) -> StaticReport:
+        self.clients.check()
+        report = StaticReport(self.gzip)
+        session = self._session()
+        try:
+            paths = self.assets or await self.discover(session)
+            for path in paths:
+                check = AssetCheck(path)
+                try:
+                    for _ in range(self.samples):
+                        check = await self.check(session, path, report)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    check.problems.append(f"請求失敗: {e}")
+                report.checks.append(check)
+        finally:
+            await session.close()
+
+        assets = [check.path for check in report.assets]
+        if not assets:
+            return report
+        if self.concurrency:
+            for encoding in ENCODINGS:
+                report.loads.append(await self.run_load(encoding, assets, encoding, self.concurrency))
+        if self.sendfile_concurrency:
+            largest = max(report.assets, key=lambda check: check.size).path
+            report.loads.append(await self.run_load("sendfile", [largest], "identity", self.sendfile_concurrency))
+        return report
+
+    def run(self) -> StaticReport:
+        raise_open_file_limit()
+        return asyncio.run(self.run_async())
+
+
+def _kb(size: Optional[int]) -> str:
+    return f"{size / 1024:.1f}K" if size is not None else "-"
+
+
+def format_report(report: StaticReport, top: int = 20) -> str:
+    assets = report.assets
+    missing = len(report.checks) - len(assets)
+    lines = [f"靜態檔案: {len(assets)} 個（略過 {missing} 個無法取得的檔案），gzip_comp_level {report.gzip.comp_level}"]
+    if not assets:
+        return "\n".join(lines)
+    lines.append(f"  {'檔案':<56} {'原始':>8} {'gzip':>8} {'比例':>6}")
+    for check in sorted(assets, key=lambda c: -c.size)[:top]:
+        ratio = f"{check.ratio * 100:.0f}%" if check.ratio is not None else "-"
+        lines.append(f"  {check.path[:56]:<56} {_kb(check.size):>8} {_kb(check.gzip_size):>8} {ratio:>6}")
+    ratio = report.compression_ratio()
+    if ratio is not None:
+        lines.append(f"gzip 後總大小為原始的 {ratio * 100:.1f}%")
+
+    lines.append("逐一請求延遲:")
+    for kind, histogram in report.timings.items():
+        s = histogram.summary()
+        lines.append(f"  {kind:<9} {histogram.count:>5} 次  p50 {s['p50']:.1f}ms  p90 {s['p90']:.1f}ms  "
+                     f"p99 {s['p99']:.1f}ms")
+
+    if report.loads:
+        lines.append(f"並行測試:\n  {'測試':<9} {'並行':>5} {'req/s':>9} {'MB/s':>8} {'p50':>8} {'p99':>8} {'錯誤率':>7}")
+        for stats in report.loads:
+            s = stats.histogram.summary()
+            lines.append(f"  {stats.name:<9} {stats.concurrency:>5} {stats.throughput:>9.1f} "
+                         f"{stats.megabytes_per_second:>8.2f} {s['p50']:>7.1f}ms {s['p99']:>7.1f}ms "
+                         f"{stats.error_rate * 100:>6.1f}%")
+        gzip_load, identity_load = report.load("gzip"), report.load("identity")
+        if gzip_load and identity_load and identity_load.throughput:
+            lines.append(f"gzip 吞吐量為 identity 的 {gzip_load.throughput / identity_load.throughput * 100:.0f}%，"
+                         f"傳輸量為 {gzip_load.wire_bytes / max(identity_load.wire_bytes, 1) * 100:.0f}%"
+                         f"（每請求 {_kb(gzip_load.wire_bytes // max(gzip_load.requests, 1))} vs "
+                         f"{_kb(identity_load.wire_bytes // max(identity_load.requests, 1))}）")
+
+    problems = report.problems
+    lines.append(f"標頭與協定問題: {len(problems)}")
+    lines.extend(f"  {path}: {problem}" for path, problem in problems)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="靜態檔案的快取標頭、gzip、304、Range 與並行傳輸測試")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="目標網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--asset", action="append", help="指定檔案路徑（可重複，預設從首頁找出）")
+    parser.add_argument("--concurrency", type=int, default=8, help="gzip / identity 比較的並行數")
+    parser.add_argument("--sendfile-concurrency", type=int, default=0, help="大型檔案並行測試的並行數（0 為不執行）")
+    parser.add_argument("--duration", type=float, default=10, help="每個並行測試的秒數")
+    parser.add_argument("--clients", type=int, default=1, help="虛擬客戶端位址數量（每個受 limit_conn 限制）")
+    parser.add_argument("--client-mode", choices=MODES, default=SOURCE)
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args()
+
+    report = StaticBenchmark(
+        args.base_url, assets=args.asset, concurrency=args.concurrency,
+        sendfile_concurrency=args.sendfile_concurrency, duration=args.duration,
+        clients=ClientPool.create(args.clients, args.client_mode),
+    ).run()
+    if args.json:
+        print(json.dumps(report.to_dict(), ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
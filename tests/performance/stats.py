@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Benchmark Statistics
+比較兩組測試結果的統計檢定（純 Python，不依賴 numpy/scipy）
+
+樣本以 (值, 次數) 的加權形式表示，可直接使用 LatencyHistogram.buckets()，
+不需要保存每一個請求的延遲。
+"""
+
+import math
+import random
+from bisect import bisect_left
+from itertools import accumulate
+from typing import Callable, List, Optional, Sequence, Tuple
+
+WeightedSample = Sequence[Tuple[float, int]]
+
+
+def as_weighted(values: Sequence[float]) -> List[Tuple[float, int]]:
+    """將原始樣本轉為 (值, 次數)"""
+    counts = {}
+    for value in values:
+        counts[value] = counts.get(value, 0) + 1
+    return sorted(counts.items())
+
+
+def weighted_percentile(sample: WeightedSample, percentile: float) -> float:
+    """加權樣本的百分位數（與 LatencyHistogram.percentile 相同的最近排名法）"""
+    ordered = sorted(sample)
+    total = sum(count for _, count in ordered)
+    if not total:
+        return 0.0
+    target = max(int(percentile / 100 * total + 0.5), 1)
+    running = 0
+    for value, count in ordered:
+        running += count
+        if running >= target:
+            return value
+    return ordered[-1][0]
+
+
+def weighted_mean(sample: WeightedSample) -> float:
+    total = sum(count for _, count in sample)
+    return sum(value * count for value, count in sample) / total if total else 0.0
+
+
+def mann_whitney_u(baseline: WeightedSample, current: WeightedSample,
+                   alternative: str = "two-sided") -> Tuple[float, float]:
+    """
+    Mann-Whitney U 檢定（常態近似，含同值校正與連續性校正）
+
+    回傳 (U, p 值)，U 為 current 的統計量；alternative 為 "greater" 時
+    檢定 current 是否傾向大於 baseline（例如延遲變長）。
+    """
+    if alternative not in ("two-sided", "greater", "less"):
+        raise ValueError(f"未知的對立假設: {alternative}")
+    n1 = sum(count for _, count in baseline)
+    n2 = sum(count for _, count in current)
+    if not n1 or not n2:
+        return 0.0, 1.0
+
+    merged = {}
+    for value, count in baseline:
+        merged.setdefault(value, [0, 0])[0] += count
+    for value, count in current:
+        merged.setdefault(value, [0, 0])[1] += count
+
+    rank = 0
+    rank_sum = 0.0
+    tie_term = 0
+    for value in sorted(merged):
+        in_baseline, in_current = merged[value]
+        tied = in_baseline + in_current
+        average_rank = rank + (tied + 1) / 2
+        rank_sum += in_current * average_rank
+        tie_term += tied ** 3 - tied
+        rank += tied
+
+    n = n1 + n2
+    u = rank_sum - n2 * (n2 + 1) / 2
+    mean = n1 * n2 / 2
+    variance = n1 * n2 / 12 * ((n + 1) - tie_term / (n * (n - 1))) if n > 1 else 0
+    if variance <= 0:
+        return u, 1.0
+    sigma = math.sqrt(variance)
+
+    if alternative == "greater":
+        z = (u - mean - 0.5) / sigma
+        p = 0.5 * math.erfc(z / math.sqrt(2))
+    elif alternative == "less":
+        z = (u - mean + 0.5) / sigma
+        p = 0.5 * math.erfc(-z / math.sqrt(2))
+    else:
+        z = (abs(u - mean) - 0.5) / sigma
+        p = min(math.erfc(max(z, 0) / math.sqrt(2)), 1.0)
+    return u, p
+
+
+class _Resampler:
+    """從加權樣本中有放回抽樣"""
+
+    def __init__(self, sample: WeightedSample, rng: random.Random):
+        ordered = sorted(sample)
+        self.values = [value for value, _ in ordered]
+        self.cumulative = list(accumulate(count for _, count in ordered))
+        self.total = self.cumulative[-1] if self.cumulative else 0
+        self.rng = rng
+
+    def draw(self, size: int) -> List[Tuple[float, int]]:
+        counts = [0] * len(self.values)
+        total, cumulative, randbelow = self.total, self.cumulative, self.rng.randrange
+        for _ in range(size):
+            counts[bisect_left(cumulative, randbelow(total) + 1)] += 1
+        return [(value, count) for value, count in zip(self.values, counts) if count]
+
+
+def bootstrap_ci(
+    baseline: WeightedSample,
+    current: WeightedSample,
+    statistic: Callable[[WeightedSample], float],
+    iterations: int = 1000,
+    confidence: float = 0.95,
+    max_samples: int = 2000,
+    relative: bool = True,
+    seed: Optional[int] = 0,
+) -> Tuple[float, float, float]:
+    """
+    以 bootstrap 估計 statistic 變化的信賴區間
+
+    回傳 (點估計, 下界, 上界)；relative 為 True 時為相對變化（0.1 = 增加 10%），
+    否則為差值。每次重抽樣最多 max_samples 個樣本，樣本數更多時區間偏保守（較寬）。
+    """
+    rng = random.Random(seed)
+    base_resampler = _Resampler(baseline, rng)
+    current_resampler = _Resampler(current, rng)
+    if not base_resampler.total or not current_resampler.total:
+        return 0.0, 0.0, 0.0
+
+    def change(a: float, b: float) -> float:
+        if relative:
+            return (b - a) / a if a else 0.0
+        return b - a
+
+    point = change(statistic(baseline), statistic(current))
+    base_size = min(base_resampler.total, max_samples)
+    current_size = min(current_resampler.total, max_samples)
+    estimates = sorted(
+        change(statistic(base_resampler.draw(base_size)), statistic(current_resampler.draw(current_size)))
+        for _ in range(iterations)
+    )
+    alpha = (1 - confidence) / 2
+    lower = estimates[int(alpha * (iterations - 1))]
+    upper = estimates[int(math.ceil((1 - alpha) * (iterations - 1)))]
+    return point, lower, upper
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Cache Benchmark Tests
+快取效益測試：skip_cache 規則、網址分類、暖機擬合，以及對模擬 fastcgi_cache 的替身伺服器統計命中率
+"""
+
+import math
+import unittest
+
+from tests.performance.cache_bench import (
+    CacheBenchmark, fit_warmup, format_report, skip_cache_reason, url_class,
+)
+from tests.performance.scenarios import Journey, ScenarioRunner, Step
+from tests.performance.standin import FaultProfile, StandInServer
+
+
+class TestCacheRules(unittest.TestCase):
+    """skip_cache 規則與分類測試類"""
+
+    def test_skip_cache_reason(self):
+        """測試 POST、查詢字串、後台路徑、登入 cookie 與 Authorization 標頭略過快取"""
+        self.assertIsNone(skip_cache_reason("GET", "/hello-world/"))
+        self.assertEqual(skip_cache_reason("POST", "/"), "POST")
+        self.assertEqual(skip_cache_reason("GET", "/?s=nginx"), "query string")
+        self.assertEqual(skip_cache_reason("GET", "/wp-login.php"), "uri")
+        self.assertEqual(skip_cache_reason("GET", "/feed/"), "uri")
+        self.assertEqual(skip_cache_reason("GET", "/", "wordpress_logged_in_abc=1"), "cookie")
+        self.assertEqual(skip_cache_reason("GET", "/wp-json/wp/v2/users/me", "", "Basic YWRtaW46eA=="), "authorization")
+
+    def test_url_class(self):
+        """測試網址類別"""
+        self.assertEqual(url_class("/"), "home")
+        self.assertEqual(url_class("/?s=nginx"), "search")
+        self.assertEqual(url_class("/?p=1"), "query")
+        self.assertEqual(url_class("/hello-world/"), "page")
+        self.assertEqual(url_class("/wp-json/wp/v2/posts?page=2"), "wp-json")
+        self.assertEqual(url_class("/wp-admin/admin-ajax.php"), "admin")
+        self.assertEqual(url_class("/wp-includes/css/style.css"), "static")
+
+
+class TestWarmup(unittest.TestCase):
+    """暖機擬合測試類"""
+
+    def test_fit_recovers_time_constant(self):
+        """測試從指數暖機曲線擬合出時間常數"""
+        points = [(t, 0.8 * (1 - math.exp(-t / 4))) for t in range(1, 40)]
+        fit = fit_warmup(points)
+        self.assertAlmostEqual(fit.steady, 0.8, delta=0.01)
+        self.assertAlmostEqual(fit.tau, 4, delta=0.3)
+        self.assertAlmostEqual(fit.t90, 4 * math.log(10), delta=1)
+
+    def test_flat_timeline(self):
+        """測試沒有暖機過程時不擬合時間常數"""
+        fit = fit_warmup([(1, 0.9), (2, 0.9), (3, 0.9)])
+        self.assertIsNone(fit.tau)
+        self.assertAlmostEqual(fit.steady, 0.9)
+
+
+class TestCacheBenchmark(unittest.TestCase):
+    """快取命中統計測試類"""
+
+    def test_missing_header_reported_as_none(self):
+        """測試沒有 X-Cache 時記為 NONE 並提示快取未啟用"""
+        bench = CacheBenchmark()
+        bench.observe("GET", "/", 200, {}, 50, t=0.1)
+        self.assertFalse(bench.cache_enabled)
+        self.assertEqual(bench.classes["home"].statuses, {"NONE": 1})
+        self.assertIn("未啟用", format_report(bench))
+
+    def test_throttled_responses_ignored(self):
+        """測試 429 不列入快取統計"""
+        bench = CacheBenchmark()
+        bench.observe("GET", "/", 429, {}, 1, t=0.1)
+        self.assertEqual(bench.classes, {})
+
+    def test_unexpected_bypass_flagged(self):
+        """測試依規則應被快取卻回應 BYPASS 的類別被標示，預期的 BYPASS 不標示"""
+        bench = CacheBenchmark()
+        for i in range(20):
+            bench.observe("GET", f"/post-{i}/", 200, {'X-Cache': "BYPASS"}, 80, t=i / 10)
+            bench.observe("GET", "/?s=term", 200, {'X-Cache': "BYPASS"}, 80, t=i / 10)
+        self.assertEqual(bench.excessive_bypass(), ["page"])
+
+    def test_standin_page_cache(self):
+        """測試對模擬 fastcgi_cache 的替身伺服器：首頁命中且較快，搜尋依規則略過"""
+        journeys = [Journey("browse", 1, (Step("home", "/"), Step("search", "/?s=nginx")))]
+        bench = CacheBenchmark(window=0.5)
+        with StandInServer(FaultProfile(latency_ms=30), page_cache_ttl=60) as server:
+            ScenarioRunner(server.base_url, journeys, users=40, arrival_rate=40, think_scale=0,
+                           on_response=bench).run()
+        home, search = bench.classes["home"], bench.classes["search"]
+        self.assertTrue(bench.cache_enabled)
+        self.assertGreater(home.hit_ratio, 0.9)
+        self.assertEqual(search.statuses, {"BYPASS": 40})
+        self.assertEqual(bench.excessive_bypass(), [])
+        self.assertGreater(home.latency_reduction, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Cache Warmer Tests
+快取預熱測試：sitemap 解析、熱門程度排序、依漏桶模型安排發送時間，以及對替身伺服器的完整預熱
+"""
+
+import unittest
+from collections import Counter
+
+from tests.performance.cache_warmer import CacheWarmer, format_report, parse_sitemap, prioritize, to_path
+from tests.performance.rate_limit import RateLimitConfig, RateLimiterModel
+from tests.performance.standin import FaultProfile, StandInServer
+
+
+class TestDiscovery(unittest.TestCase):
+    """網址發現與排序測試類"""
+
+    def test_parse_sitemap(self):
+        """測試區分 sitemap 索引與網址清單"""
+        ns = 'xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"'
+        index = f'<sitemapindex {ns}><sitemap><loc>http://a/wp-sitemap-posts-post-1.xml</loc></sitemap></sitemapindex>'
+        urlset = f'<urlset {ns}><url><loc>http://a/hello/</loc></url><url><loc>http://a/about/</loc></url></urlset>'
+        self.assertEqual(parse_sitemap(index), (["http://a/wp-sitemap-posts-post-1.xml"], []))
+        self.assertEqual(parse_sitemap(urlset), ([], ["http://a/hello/", "http://a/about/"]))
+        self.assertEqual(parse_sitemap("<html>not xml"), ([], []))
+
+    def test_to_path(self):
+        """測試只保留同一主機的網址"""
+        self.assertEqual(to_path("http://localhost/hello/?lang=zh", "http://localhost"), "/hello/?lang=zh")
+        self.assertEqual(to_path("/about/", "http://localhost"), "/about/")
+        self.assertIsNone(to_path("https://cdn.example.com/x/", "http://localhost"))
+
+    def test_prioritize(self):
+        """測試首頁最先、依 access log 次數排序，並略過不會被快取的網址"""
+        discovered = {"/a/": "sitemap", "/b/": "sitemap", "/?s=x": "rest", "/wp-login.php": "rest"}
+        targets = prioritize(discovered, Counter({"/b/": 9, "/category/news/": 3}))
+        self.assertEqual([target.path for target in targets], ["/", "/b/", "/category/news/", "/a/"])
+        self.assertEqual(len(prioritize(discovered, Counter(), max_urls=2)), 2)
+
+
+class TestPacing(unittest.TestCase):
+    """發送時機測試類"""
+
+    def test_wait_ms_never_throttled(self):
+        """測試依 wait_ms 排程的請求都會被放行：general（1r/s burst=20）用完 burst 後每秒一個"""
+        model = RateLimiterModel(RateLimitConfig.load())
+        now, sent = 0, []
+        for _ in range(24):
+            now += model.wait_ms("/", now)
+            self.assertFalse(model.admit("/", now).throttled)
+            sent.append(now)
+        self.assertEqual(sent[:21], [0] * 21)
+        self.assertEqual(sent[21:], [1000, 2000, 3000])
+        self.assertTrue(model.admit("/", now).throttled)
+
+    def test_headroom(self):
+        """測試保留一個 burst 名額時提早 1 秒開始等待，之後每個請求到達時桶內仍有一個空位"""
+        model = RateLimiterModel(RateLimitConfig.load())
+        now, sent = 0, []
+        for _ in range(22):
+            now += model.wait_ms("/", now, headroom=1)
+            self.assertFalse(model.admit("/", now).throttled)
+            sent.append(now)
+        self.assertEqual(sent[20:], [1000, 2000])
+        self.assertFalse(model.admit("/", now).throttled)
+
+
+class TestCacheWarmer(unittest.TestCase):
+    """對替身伺服器預熱的測試類"""
+
+    def test_standin_warmup(self):
+        """測試預熱不觸發 429、網址皆被發現，且預熱後的延遲低於首次請求"""
+        limits = RateLimitConfig.load()
+        with StandInServer(FaultProfile(latency_ms=40), rate_limits=limits, page_cache_ttl=60, posts=24) as server:
+            result = CacheWarmer(server.base_url, concurrency=4, verify=10, rate_limits=limits).run()
+        self.assertEqual(result.throttled, 0, format_report(result))
+        self.assertEqual(result.discovered, {"sitemap": 24, "rest": 0, "access log": 0})
+        self.assertEqual(len(result.warmed), 25)
+        # 發現階段用掉 2 個 burst，其餘依 1r/s 放行
+        self.assertGreater(result.waited_ms, 0)
+        before, after = result.histograms()
+        self.assertEqual(after.count, 10)
+        self.assertLess(after.percentile(50), before.percentile(50) / 2)
+        self.assertEqual({target.after_cache for target in result.verified}, {"HIT"})
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
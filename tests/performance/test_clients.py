@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Virtual Client Tests
+多來源 IP 負載測試：位址分配、realip 模型，以及對限流替身伺服器的多客戶端負載
+"""
+
+import unittest
+
+from tests.performance.clients import FORWARDED, SOURCE, ClientPool, RealIpConfig
+from tests.performance.loadgen import run_open_loop
+from tests.performance.rate_limit import RateLimitConfig, clients_needed
+from tests.performance.standin import FaultProfile, StandInServer
+
+
+class TestClientPool(unittest.TestCase):
+    """虛擬客戶端位址測試類"""
+
+    def test_single_client_uses_default_address(self):
+        """測試單一來源不綁定位址也不加標頭"""
+        pool = ClientPool.create(1)
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.connector_kwargs(0), {})
+        self.assertEqual(pool.headers(0), {})
+
+    def test_source_addresses(self):
+        """測試 source 模式依序分配迴環位址並輪流使用"""
+        pool = ClientPool.create(3, SOURCE)
+        self.assertEqual(pool.addresses, ("127.0.1.1", "127.0.1.2", "127.0.1.3"))
+        self.assertEqual(pool.connector_kwargs(4), {'local_addr': ("127.0.1.2", 0)})
+        self.assertEqual(pool.headers(0), {})
+        self.assertEqual(ClientPool.create(2, SOURCE, offset=3).addresses, ("127.0.1.4", "127.0.1.5"))
+
+    def test_forwarded_addresses(self):
+        """測試 forwarded 模式使用基準測試保留位址段"""
+        pool = ClientPool.create(2, FORWARDED)
+        self.assertEqual(pool.headers(1), {'X-Forwarded-For': "198.18.0.2"})
+        self.assertEqual(pool.connector_kwargs(1), {})
+
+    def test_invalid_mode(self):
+        """測試未知模式被拒絕"""
+        with self.assertRaises(ValueError):
+            ClientPool.create(2, "spoofed")
+
+
+class TestRealIp(unittest.TestCase):
+    """realip 模型測試類"""
+
+    def setUp(self):
+        self.config = RealIpConfig.load()
+
+    def test_bench_config(self):
+        """測試 bench-realip.conf 的解析結果"""
+        self.assertEqual(self.config.header, "X-Forwarded-For")
+        self.assertTrue(self.config.recursive)
+        self.assertTrue(self.config.is_trusted("172.18.0.1"))
+        self.assertFalse(self.config.is_trusted("203.0.113.5"))
+
+    def test_untrusted_source_keeps_remote(self):
+        """測試不受信任的來源不能偽造位址"""
+        self.assertEqual(self.config.client("203.0.113.5", "198.18.0.9"), "203.0.113.5")
+
+    def test_recursive_skips_trusted_hops(self):
+        """測試由右至左略過信任的代理"""
+        self.assertEqual(self.config.client("127.0.0.1", "198.18.0.9, 172.18.0.1"), "198.18.0.9")
+        self.assertEqual(self.config.client("127.0.0.1", None), "127.0.0.1")
+
+
+class TestMultiClientLoad(unittest.TestCase):
+    """多客戶端負載測試類"""
+
+    RATE = 20
+    DURATION = 3
+
+    def setUp(self):
+        self.config = RateLimitConfig.load()
+
+    def run_against(self, clients: ClientPool, **server_kwargs):
+        with StandInServer(rate_limits=self.config, **server_kwargs) as server:
+            return run_open_loop(server.base_url, self.RATE, self.DURATION,
+                                 rate_limits=self.config, clients=clients)
+
+    def test_clients_needed(self):
+        """測試所需客戶端數量足以避開 limit_req"""
+        count = clients_needed("/", self.RATE, self.DURATION, self.config)
+        self.assertGreater(count, 1)
+        # 持續時間越長，每個客戶端的 burst 佔比越小，需要的客戶端越接近 rate / 每 IP 速率
+        self.assertLess(clients_needed("/", self.RATE, self.DURATION * 10, self.config), self.RATE)
+
+    def test_source_mode_avoids_throttling(self):
+        """測試多個來源位址各自計算限流，負載到達後端"""
+        count = clients_needed("/", self.RATE, self.DURATION, self.config)
+        result = self.run_against(ClientPool.create(count, SOURCE))
+        report = result.throttle_report()
+        self.assertEqual(result.clients, count)
+        self.assertEqual(report.prediction.low, 0)
+        self.assertTrue(report.as_designed, report.format())
+        self.assertEqual(report.throttled, 0)
+
+    def test_forwarded_mode_requires_realip(self):
+        """測試 forwarded 模式只有在信任 X-Forwarded-For 時才分開計算"""
+        count = clients_needed("/", self.RATE, self.DURATION, self.config)
+        clients = ClientPool.create(count, FORWARDED)
+        trusted = self.run_against(clients, real_ip=RealIpConfig.load()).throttle_report()
+        self.assertEqual(trusted.throttled, 0)
+        # 未掛載 bench-realip.conf：所有請求都算同一個 IP，429 超出多客戶端的預測
+        untrusted = self.run_against(clients).throttle_report()
+        self.assertGreater(untrusted.throttled, untrusted.prediction.low + untrusted.tolerance)
+
+    def test_worker_pool_limits_capacity(self):
+        """測試模擬的 pm.max_children 讓請求排隊"""
+        faults = FaultProfile(latency_ms=100, workers=1)
+        result = self.run_against(ClientPool.create(5, SOURCE), faults=faults)
+        # 單一 worker 每秒最多處理 10 個請求，到達率 20 時排隊時間持續增加
+        self.assertGreater(result.histogram.percentile(99), 1000)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Compression Sweep Tests
+壓縮等級掃描測試：內容分類、各等級測量、CPU 預算下的建議，以及從替身伺服器擷取內容
+"""
+
+import random
+import unittest
+
+from tests.performance.compression_sweep import (
+    KindStats, LevelResult, Sample, capture_corpus, corpus_weights, format_report, kind_of, kind_of_path,
+    recommend, sweep,
+)
+from tests.performance.standin import StandInServer
+
+
+def _text(seed: int, size: int) -> bytes:
+    rng = random.Random(seed)
+    words = ["wp-block", "margin", "function", "return", "{", "}", "color", "0", "px", ";", "display"]
+    return " ".join(rng.choice(words) for _ in range(size // 5)).encode()[:size]
+
+
+def _level(level: int, cpu_us: float, compressed: int) -> LevelResult:
+    return LevelResult('gzip', level, {'html': KindStats(1, 10000, compressed, cpu_us * 1000)})
+
+
+class TestClassification(unittest.TestCase):
+    """內容分類測試類"""
+
+    def test_kind_of(self):
+        """測試依 Content-Type 與路徑分類"""
+        self.assertEqual(kind_of("text/html; charset=UTF-8"), "html")
+        self.assertEqual(kind_of("application/javascript"), "js")
+        self.assertEqual(kind_of("application/json; charset=UTF-8"), "json")
+        self.assertEqual(kind_of("application/rss+xml"), "xml")
+        self.assertEqual(kind_of_path("/wp-json/wp/v2/posts?page=2"), "json")
+        self.assertEqual(kind_of_path("/wp-includes/js/jquery/jquery.min.js?ver=3.7.1"), "js")
+        self.assertEqual(kind_of_path("/hello-world/"), "html")
+
+
+class TestSweep(unittest.TestCase):
+    """等級測量與建議測試類"""
+
+    def test_sweep_levels(self):
+        """測試 gzip 1–9 皆可還原，level 9 的輸出不大於 level 1"""
+        samples = [Sample("a.css", "css", _text(1, 20000)), Sample("b.js", "js", _text(2, 30000))]
+        results = sweep(samples, ['gzip'], jobs=2, min_time=0.001)
+        self.assertEqual([result.level for result in results], list(range(1, 10)))
+        self.assertLessEqual(results[-1].ratio, results[0].ratio)
+        self.assertTrue(all(result.cpu_per_response(corpus_weights(samples)) > 0 for result in results))
+
+    def test_recommend_within_budget(self):
+        """測試預算內選輸出最小者，輸出相差 1% 以內時選 CPU 較低者"""
+        results = [_level(1, 100, 3000), _level(6, 300, 2500), _level(9, 900, 2490)]
+        weights = {'html': 1}
+        self.assertEqual(recommend(results, rate=100, cpu_budget=0.25, weights=weights).result.level, 6)
+        # 預算只夠 level 1
+        tight = recommend(results, rate=100, cpu_budget=0.02, weights=weights)
+        self.assertEqual((tight.result.level, tight.within_budget), (1, True))
+        # 全部超出預算
+        over = recommend(results, rate=1000, cpu_budget=0.05, weights=weights)
+        self.assertEqual((over.result.level, over.within_budget), (1, False))
+        self.assertAlmostEqual(over.cpu_used, 2.0)
+
+    def test_report_compares_current_level(self):
+        """測試報告比較目前設定與建議等級"""
+        results = [_level(1, 100, 3000), _level(4, 150, 2510), _level(6, 300, 2500)]
+        report = format_report(results, {'html': 1}, rate=100, cpu_limit=0.5, cpu_share=0.5, current=('gzip', 6))
+        self.assertIn("建議 gzip_comp_level 4", report)
+        self.assertIn("目前的 gzip_comp_level 6 比建議多用 100% CPU", report)
+
+
+class TestCapture(unittest.TestCase):
+    """內容擷取測試類"""
+
+    def test_capture_from_standin(self):
+        """測試擷取首頁、文章頁與會被 gzip 的 CSS / JavaScript（圖片不列入）"""
+        with StandInServer(posts=3) as server:
+            samples = capture_corpus(server.base_url, max_posts=2)
+        names = [sample.name for sample in samples]
+        self.assertEqual(names[:3], ["/", "/post-1/", "/post-2/"])
+        self.assertEqual({sample.kind for sample in samples}, {"html", "css", "js"})
+        self.assertFalse(any(name.endswith(".jpg") for name in names))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Database Benchmark Tests
+資料庫基準測試：以假連線測試連線池（重用、丟棄發生錯誤的連線）、加權查詢選擇與伺服器狀態差值
+"""
+
+import threading
+import unittest
+
+import pymysql
+
+from tests.performance.db_bench import WORDPRESS_WORKLOAD, ConnectionPool, DatabaseBenchmark, QueryClass
+
+CONFIG = {'prefix': "wp_"}
+
+
+class FakeServer:
+    """記錄連線與查詢的假 MySQL 伺服器；SHOW GLOBAL STATUS 回傳累計的計數"""
+
+    def __init__(self, fail: str = ""):
+        self.fail = fail
+        self.lock = threading.Lock()
+        self.connections = []
+        self.statements = []
+        self.used_after_close = 0
+        self.status = {'Questions': 0, 'Threads_connected': 0, 'Max_used_connections': 0,
+                       'Innodb_buffer_pool_read_requests': 0, 'Innodb_buffer_pool_reads': 0}
+
+    def connect(self) -> "FakeConnection":
+        with self.lock:
+            connection = FakeConnection(self)
+            self.connections.append(connection)
+            self.status['Max_used_connections'] = len(self.connections)
+            return connection
+
+
+class FakeConnection:
+    def __init__(self, server: FakeServer):
+        self.server = server
+        self.closed = False
+
+    def cursor(self) -> "FakeCursor":
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __init__(self, connection: FakeConnection):
+        self.connection = connection
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql: str, args=None):
+        server = self.connection.server
+        with server.lock:
+            if self.connection.closed:
+                server.used_after_close += 1
+            server.status['Questions'] += 1
+            if sql.startswith("SHOW GLOBAL STATUS"):
+                self.rows = [(name, str(value)) for name, value in server.status.items() if name in args]
+                return
+            server.statements.append(sql)
+            server.status['Innodb_buffer_pool_read_requests'] += 100
+            server.status['Innodb_buffer_pool_reads'] += 1
+        if server.fail and server.fail in sql:
+            raise pymysql.err.OperationalError(2013, "Lost connection to MySQL server during query")
+        self.rows = [(1,)]
+
+    def fetchall(self):
+        return self.rows
+
+
+class TestConnectionPool(unittest.TestCase):
+    """連線池測試類"""
+
+    def test_reuse_and_discard(self):
+        """測試正常的連線交還後重用，發生 pymysql.Error 的連線關閉丟棄，下次取出時重新連線"""
+        server = FakeServer()
+        pool = ConnectionPool(CONFIG, 2, connect=server.connect)
+        self.assertEqual(len(server.connections), 2)
+        with pool.connection() as first:
+            pass
+        with pool.connection() as again:
+            self.assertIs(again, first)
+
+        with self.assertRaises(pymysql.err.OperationalError):
+            with pool.connection() as broken:
+                raise pymysql.err.OperationalError(2006, "MySQL server has gone away")
+        self.assertTrue(broken.closed)
+        seen = set()
+        for _ in range(2):
+            with pool.connection() as connection:
+                seen.add(id(connection))
+                self.assertIsNot(connection, broken)
+                with pool.connection() as other:
+                    seen.add(id(other))
+        self.assertEqual(len(server.connections), 3)
+        self.assertEqual(len(seen), 2)
+
+        pool.close()
+        self.assertTrue(all(c.closed for c in server.connections))
+
+
+class TestDatabaseBenchmark(unittest.TestCase):
+    """加權負載與狀態差值測試類"""
+
+    def test_weighted_workload(self):
+        """測試各查詢類別依權重選擇，表名套用前綴"""
+        server = FakeServer()
+        result = DatabaseBenchmark(CONFIG, concurrency=2, connect=server.connect).run(
+            duration=30, queries_per_worker=1000)
+        self.assertEqual(result.total_queries, 2000)
+        total_weight = sum(q.weight for q in WORDPRESS_WORKLOAD)
+        for query in WORDPRESS_WORKLOAD:
+            expected = 2000 * query.weight / total_weight
+            self.assertAlmostEqual(result.queries[query.name].count, expected, delta=expected * 0.2, msg=query.name)
+        self.assertTrue(any("wp_options" in sql for sql in server.statements))
+        self.assertFalse(any("{prefix}" in sql for sql in server.statements))
+
+    def test_status_delta(self):
+        """測試狀態差值只計算測試期間（含結束時的 SHOW 查詢）與 buffer pool 命中率"""
+        server = FakeServer()
+        server.status['Questions'] = 5000
+        result = DatabaseBenchmark(CONFIG, concurrency=3, connect=server.connect).run(
+            duration=30, queries_per_worker=50)
+        self.assertEqual(result.status_delta['Questions'], 150 + 1)
+        self.assertEqual(result.status_delta['Innodb_buffer_pool_read_requests'], 150 * 100)
+        self.assertAlmostEqual(result.buffer_pool_hit_ratio, 0.99)
+        self.assertEqual(result.status_after['Max_used_connections'], 3)
+        self.assertIn("Buffer pool 命中率: 99.00%", result.format())
+
+    def test_errors_discard_connections(self):
+        """測試查詢錯誤計入 errors，發生錯誤的連線不再被任何 worker 使用"""
+        server = FakeServer(fail="broken")
+        workload = [QueryClass('ok', "SELECT 1", weight=1), QueryClass('broken', "SELECT broken", weight=1)]
+        result = DatabaseBenchmark(CONFIG, workload, concurrency=2, connect=server.connect).run(
+            duration=30, queries_per_worker=100)
+        broken = result.queries['broken']
+        self.assertGreater(broken.errors, 0)
+        self.assertEqual(broken.count, 0)
+        self.assertEqual(result.queries['ok'].errors, 0)
+        self.assertEqual(server.used_after_close, 0)
+        self.assertEqual(len(server.connections), 2 + broken.errors)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+PHP-FPM Pool Sizing Tests
+PHP-FPM pool 調校測試：設定解析與產生、轉折點、記憶體上限與建議，以及對替身伺服器的掃描
+"""
+
+import contextlib
+import io
+import os
+import unittest
+
+from tests.monitor.compose_limits import load_mounts
+from tests.monitor.fpm_memory import MB, MemorySummary
+from tests.performance.fpm_sizing import (
+    ComposeTarget, MemoryBudget, PoolSettings, PoolSweep, StandInTarget, SweepPoint, SweepResult, check_config,
+    find_knee, main, recommend, replay_paths, spare_servers,
+)
+from tests.performance.standin import StandInServer
+
+ACCESS_LOG = "\n".join(
+    f'172.18.0.1 - - [17/Oct/2026:10:00:0{i} +0800] "GET {path} HTTP/1.1" {status} 512 "-" "curl" "-" '
+    f'rt=0.010 urt="0.010"'
+    for i, (path, status) in enumerate([
+        ("/", 200), ("/wp-content/themes/t/style.css", 200), ("/hello-world/", 200),
+        ("/wp-json/wp/v2/posts", 200), ("/missing/", 404), ("/health", 200),
+    ])
+)
+
+
+def point(children: int, throughput: float, p99: float = 100, pm: str = "static", worker_mb: int = 0,
+          max_requests: int = 500) -> SweepPoint:
+    result = SweepPoint(settings=PoolSettings(children, pm, max_requests), duration=1.0, requests=int(throughput))
+    for _ in range(100):
+        result.histogram.record(p99)
+    if worker_mb:
+        result.memory = MemorySummary(1, "smaps", worker_uss_p95=worker_mb * MB, base=100 * MB,
+                                      peak_total=100 * MB + children * worker_mb * MB)
+    return result
+
+
+class TestPoolSettings(unittest.TestCase):
+    """pool 設定測試類"""
+
+    def test_repo_config(self):
+        """測試讀取 php-fpm.conf 的 [www] 設定"""
+        self.assertEqual(PoolSettings.load(), PoolSettings(5, "dynamic", 500))
+
+    def test_mount_order(self):
+        """測試 php-fpm.conf 在映像的 www.conf 之後、測試中的 zz-fpm-sizing.conf 之前載入（依檔名排序）"""
+        directory, name = os.path.split(load_mounts()['config/php/php-fpm.conf'][1])
+        self.assertEqual(directory, ComposeTarget.DIRECTORY)
+        self.assertLess("www.conf", name)
+        self.assertLess(name, ComposeTarget.FILENAME)
+
+    def test_render_dynamic(self):
+        """測試 dynamic 的 spare servers 沿用原比例且符合 php-fpm 的限制"""
+        self.assertEqual(spare_servers(20), (5, 3, 8))
+        for children in range(1, 41):
+            start, min_spare, max_spare = spare_servers(children)
+            self.assertTrue(1 <= min_spare <= start <= max_spare <= children, children)
+        text = PoolSettings(8, "dynamic", 200).render()
+        self.assertIn("pm.start_servers = 2\n", text)
+        self.assertNotIn("spare", PoolSettings(8, "ondemand").render())
+
+    def test_replay_paths(self):
+        """測試只重播經過 PHP-FPM 的成功 GET"""
+        self.assertEqual(replay_paths(ACCESS_LOG.splitlines()), ["/", "/hello-world/", "/wp-json/wp/v2/posts"])
+
+
+class TestRecommendation(unittest.TestCase):
+    """轉折點與建議測試類"""
+
+    budget = MemoryBudget(container=512 * MB, memory_limit=256 * MB, opcache=128 * MB)
+
+    def test_find_knee(self):
+        """測試取吞吐量達最佳值 95% 的最小 max_children"""
+        points = [point(2, 100), point(4, 190), point(8, 290), point(12, 300), point(16, 295)]
+        self.assertEqual(find_knee(points).settings.max_children, 8)
+
+    def test_throughput_bound(self):
+        """測試記憶體足夠時取轉折點，並在轉折點的變體中取 p99 最低者"""
+        result = SweepResult(
+            children=[point(2, 100, worker_mb=30), point(4, 200, worker_mb=30), point(8, 205, worker_mb=30)],
+            variants=[point(4, 198, p99=80, pm="dynamic", worker_mb=30), point(4, 120, p99=50, pm="ondemand")],
+        )
+        recommendation = recommend(result, self.budget)
+        self.assertEqual((recommendation.knee, recommendation.memory_cap), (4, 10))
+        self.assertEqual(recommendation.settings, PoolSettings(4, "dynamic", 500))
+        self.assertTrue(recommendation.measured)
+
+    def test_memory_bound(self):
+        """測試記憶體先到上限時以記憶體為準，並建議降低 memory_limit"""
+        result = SweepResult(children=[point(4, 100, worker_mb=60), point(8, 200, worker_mb=60),
+                                       point(16, 400, worker_mb=60)])
+        recommendation = recommend(result, self.budget)
+        # (512M × 90% − 100M − 64M) ÷ 60M + 1
+        self.assertEqual((recommendation.knee, recommendation.memory_cap), (16, 5))
+        self.assertEqual(recommendation.settings.max_children, 5)
+        self.assertEqual(recommendation.safe_memory_limit, 112 * MB)
+        self.assertIn("memory_limit = 112M", recommendation.render())
+        self.assertTrue(any("記憶體先於吞吐量" in note for note in recommendation.notes))
+
+    def test_check_config(self):
+        """測試 20 個 worker × 256M 與 512M 容器上限互相矛盾"""
+        problems = check_config(PoolSettings(20, "dynamic"), self.budget, worker_bytes=45 * MB)
+        self.assertEqual(len(problems), 2)
+        self.assertIn("5248MB", problems[0])
+
+    def test_unmeasured_cap(self):
+        """測試沒有 worker 記憶體數據時以 memory_limit 估計上限，不沿用超出預算的目前設定"""
+        recommendation = recommend(SweepResult(), self.budget, PoolSettings(20, "dynamic", 500))
+        # 512M × 90% − 128M − 256M 容不下第二個 256M 的 worker
+        self.assertEqual(recommendation.memory_cap, 1)
+        self.assertEqual(recommendation.settings, PoolSettings(1, "dynamic", 500))
+        self.assertTrue(any("memory_limit 256M 估計" in note for note in recommendation.notes))
+
+    def test_check_exit_status(self):
+        """測試 --check 發現問題時結束碼為 1（make fpm-sizing 失敗）"""
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            self.assertEqual(main(["--check"]), 0)
+            self.assertEqual(main(["--check", "--container-memory", "256M"]), 1)
+        self.assertIn("超過容器上限 256MB", out.getvalue())
+        self.assertNotIn("pm.max_children = 5\n", out.getvalue().split("超過容器上限 256MB")[1])
+
+    def test_check_repo_config(self):
+        """測試倉庫的 pool 設定與 memory_limit 在容器上限內（php-fpm.conf 掛載後即為實際生效的設定）"""
+        self.assertEqual(check_config(PoolSettings.load(), MemoryBudget.load(), worker_bytes=45 * MB), [])
+
+
+class TestPoolSweep(unittest.TestCase):
+    """對替身伺服器的掃描測試類"""
+
+    def test_standin_sweep(self):
+        """測試吞吐量隨 worker 數增加，到並行數上限後停止，並比較 pm 模式與 max_requests"""
+        with StandInServer() as server:
+            sweep = PoolSweep(StandInTarget(server, latency_ms=20), concurrency=4, duration=0.6, warmup=0.1)
+            result = sweep.run(children=[1, 2, 4, 8], modes=["static", "dynamic"], max_requests=[200],
+                               budget=TestRecommendation.budget, current=PoolSettings(20, "dynamic", 500))
+            self.assertEqual(server.faults.workers, 0)
+        throughput = [p.throughput for p in result.children]
+        self.assertGreater(throughput[1], throughput[0] * 1.6)
+        self.assertEqual(find_knee(result.children).settings.max_children, 4)
+        self.assertEqual([p.settings for p in result.variants],
+                         [PoolSettings(4, "dynamic", 500), PoolSettings(4, result.variants[1].settings.pm, 200)])
+        self.assertEqual(sum(p.errors + p.throttled for p in result.points), 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Latency Histogram Tests
+延遲直方圖測試：百分位數精度、合併與固定記憶體
+"""
+
+import json
+import random
+import unittest
+
+from tests.performance.histogram import LatencyHistogram
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """延遲直方圖測試類"""
+
+    def test_percentile_precision(self):
+        """測試百分位數誤差在 0.1% 以內（3 位有效數字）"""
+        rng = random.Random(42)
+        samples = sorted(rng.lognormvariate(3, 1) for _ in range(50000))
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(sample)
+
+        for percentile in [50, 90, 99, 99.9]:
+            exact = samples[int(percentile / 100 * len(samples)) - 1]
+            self.assertAlmostEqual(
+                histogram.percentile(percentile),
+                exact,
+                delta=exact * 0.001 + 0.001,
+                msg=f"p{percentile} 誤差過大"
+            )
+
+    def test_merge_matches_single_histogram(self):
+        """測試合併多個 worker 的直方圖與單一直方圖結果一致"""
+        rng = random.Random(7)
+        combined = LatencyHistogram()
+        workers = [LatencyHistogram() for _ in range(4)]
+        for i in range(20000):
+            value = rng.expovariate(1 / 50)
+            combined.record(value)
+            workers[i % 4].record(value)
+
+        merged = LatencyHistogram.merged(workers)
+        self.assertEqual(merged.count, combined.count)
+        self.assertEqual(merged.summary(), combined.summary())
+
+    def test_fixed_memory(self):
+        """測試記憶體用量不隨樣本數增加"""
+        histogram = LatencyHistogram()
+        size = len(histogram.counts)
+        for i in range(100000):
+            histogram.record(i % 5000)
+        self.assertEqual(len(histogram.counts), size)
+
+    def test_out_of_range_values_clamped(self):
+        """測試超出量程的值以上限記錄"""
+        histogram = LatencyHistogram(highest_ms=1000)
+        histogram.record(5000)
+        self.assertEqual(histogram.max, 1000)
+        self.assertEqual(histogram.count, 1)
+
+    def test_merge_rejects_different_layout(self):
+        """測試不同配置的直方圖不可合併"""
+        with self.assertRaises(ValueError):
+            LatencyHistogram(highest_ms=1000).add(LatencyHistogram(highest_ms=2000))
+
+    def test_empty_histogram(self):
+        """測試空直方圖回傳 0"""
+        summary = LatencyHistogram().summary()
+        self.assertEqual(summary['p99'], 0)
+        self.assertEqual(summary['avg'], 0)
+
+    def test_encode_roundtrip(self):
+        """測試序列化後還原的統計值不變"""
+        histogram = LatencyHistogram()
+        for value in [1.5, 2.5, 2.5, 40, 900]:
+            histogram.record(value)
+        restored = LatencyHistogram.decode(json.loads(json.dumps(histogram.encode())))
+        self.assertEqual(restored.summary(), histogram.summary())
+        self.assertEqual(sum(count for _, count in restored.buckets()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
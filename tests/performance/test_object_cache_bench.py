@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Object Cache Benchmark Tests
+物件快取比較測試：查詢數與延遲的比較計算、compose profile 與 drop-in 的設定，以及對替身伺服器的執行流程
+"""
+
+import os
+import re
+import unittest
+
+from tests.monitor.compose_limits import load_limits, load_mounts
+from tests.performance.object_cache_bench import Comparison, ModeResult, ObjectCacheBenchmark, format_report
+from tests.performance.replay import ReplayStats
+from tests.performance.standin import StandInServer
+from tests.performance.tuning_sweep import Benchmark
+from tests.readiness import REPO_ROOT
+
+DROP_IN = os.path.join(REPO_ROOT, "config", "wordpress", "object-cache.php")
+COMPOSE = os.path.join(REPO_ROOT, "docker-compose.yml")
+
+
+def mode(enabled: bool, requests: int, queries: int, latency_ms: float, duration: float = 10) -> ModeResult:
+    stats = ReplayStats(duration=duration, requests=requests)
+    for _ in range(requests):
+        stats.histogram.record(latency_ms)
+    return ModeResult(enabled, stats, queries, queries * 3 // 4)
+
+
+class TestComparison(unittest.TestCase):
+    """比較計算測試類"""
+
+    def test_reduction(self):
+        """測試每請求查詢數與 DB QPS 分開計算（吞吐量提高時 QPS 的降幅較小）"""
+        comparison = Comparison(mode(False, 1000, 30000, 40), mode(True, 2000, 6000, 20))
+        self.assertAlmostEqual(comparison.baseline.queries_per_request, 30)
+        self.assertAlmostEqual(comparison.cached.queries_per_request, 3)
+        self.assertAlmostEqual(comparison.query_reduction, 0.9)
+        self.assertAlmostEqual(comparison.qps_reduction, 0.8)
+        self.assertAlmostEqual(comparison.throughput_change, 1.0)
+        self.assertAlmostEqual(comparison.latency_change(50), -0.5, places=2)
+        self.assertEqual(comparison.to_dict()['cached']['db_qps'], 600)
+        self.assertIn("每請求的資料庫查詢減少 90.0%", format_report(comparison))
+
+    def test_no_queries(self):
+        """測試停用時沒有查詢（db 端口未發佈）時不計算減少比例"""
+        comparison = Comparison(mode(False, 100, 0, 10), mode(True, 0, 0, 10))
+        self.assertIsNone(comparison.query_reduction)
+        self.assertIsNone(comparison.latency_change(99))
+        self.assertIn("沒有記錄到資料庫查詢", format_report(comparison))
+
+
+class TestComposeProfile(unittest.TestCase):
+    """compose profile 與 drop-in 設定測試類"""
+
+    def test_redis_profile(self):
+        """測試 redis 只在 objectcache profile 中啟動，並有資源上限"""
+        with open(COMPOSE, encoding="utf-8") as f:
+            compose = f.read()
+        self.assertRegex(compose, r'\n  redis:\n(    .*\n)*?    profiles: \["objectcache"\]\n')
+        self.assertEqual(load_limits()['redis'].memory, 96 * 1024 ** 2)
+        self.assertEqual(load_mounts()['config/wordpress/object-cache.php'],
+                         ('wordpress', '/var/www/html/wp-content/object-cache.php'))
+
+    def test_drop_in_inert_without_host(self):
+        """測試 drop-in 的宣告都在 WP_REDIS_HOST 條件內（PHP 會提前宣告頂層函式），並實作 WordPress 需要的函式"""
+        with open(DROP_IN, encoding="utf-8") as f:
+            source = f.read()
+        code = re.sub(r"/\*.*?\*/|//[^\n]*", "", source, flags=re.S)
+        self.assertRegex(code, r"^<\?php\s*if \(getenv\('WP_REDIS_HOST'\)\) \{\n")
+        self.assertTrue(code.rstrip().endswith("\n}"))
+        self.assertIsNone(re.search(r"^(function|class) ", code, re.M))
+        defined = set(re.findall(r"^    function (wp_cache_\w+)\(", code, re.M))
+        for name in ("init", "add", "set", "get", "get_multiple", "delete", "incr", "flush", "flush_runtime",
+                     "close", "add_global_groups", "add_non_persistent_groups", "switch_to_blog"):
+            self.assertIn(f"wp_cache_{name}", defined)
+
+
+class FakeToggle:
+    def __init__(self):
+        self.calls = []
+
+    def apply(self, enabled: bool):
+        self.calls.append(enabled)
+
+    def restore(self):
+        self.calls.append("restore")
+
+
+class FakeCounter:
+    """每次讀取時依目前模式增加查詢數（停用時 20 個、啟用時 2 個，模擬替身伺服器每次測量的查詢）"""
+
+    def __init__(self, toggle: FakeToggle):
+        self.toggle = toggle
+        self.questions = 0
+
+    def snapshot(self):
+        self.questions += 2 if self.toggle.calls[-1] is True else 20
+        return {'Questions': self.questions, 'Com_select': self.questions // 2}
+
+
+class TestObjectCacheBenchmark(unittest.TestCase):
+    """執行流程測試類"""
+
+    def test_standin_run(self):
+        """測試依序停用、啟用後還原，並只計算測量期間（暖機後）的查詢"""
+        toggle = FakeToggle()
+        with StandInServer() as server:
+            bench = ObjectCacheBenchmark(toggle, Benchmark(concurrency=2, warmup=0.1), FakeCounter(toggle),
+                                         base_url=server.base_url)
+            comparison = bench.run(seconds=0.3)
+        self.assertEqual(toggle.calls, [False, True, "restore"])
+        self.assertEqual((comparison.baseline.queries, comparison.cached.queries), (20, 2))
+        self.assertFalse(comparison.baseline.enabled)
+        self.assertGreater(comparison.cached.stats.requests, 0)
+        self.assertGreater(comparison.query_reduction, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
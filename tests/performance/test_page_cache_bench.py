@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Page Cache Benchmark Tests
+頁面微快取測試：nginx 設定與 skip_cache_reason() 規則一致、流量組合、替身伺服器的過期回應與重新產生，以及吞吐量比較
+"""
+
+import os
+import re
+import time
+import unittest
+
+import requests
+
+from tests.monitor.compose_limits import load_lists, load_mounts
+from tests.performance.cache_bench import SKIP_CACHE_COOKIE, SKIP_CACHE_URI
+from tests.performance.page_cache_bench import (
+    ANONYMOUS, LOGGED_IN, PageCacheBenchmark, cacheable_paths, format_report, traffic_mix,
+)
+from tests.performance.standin import FaultProfile, StandInServer
+from tests.readiness import REPO_ROOT
+
+NGINX_DIR = os.path.join(REPO_ROOT, "config", "nginx")
+
+
+def read_conf(name: str) -> str:
+    with open(os.path.join(NGINX_DIR, name), encoding="utf-8") as f:
+        return re.sub(r"#[^\n]*", "", f.read())
+
+
+def map_pattern(conf: str, variable: str) -> str:
+    match = re.search(r'map \S+ \$%s \{\s*"~([^"]+)" 1;' % variable, conf)
+    return match.group(1) if match else ""
+
+
+class TestNginxConfig(unittest.TestCase):
+    """nginx 快取設定測試類"""
+
+    def test_skip_cache_rules_match(self):
+        """測試 fastcgi-cache.conf 的 $skip_cache 規則與 skip_cache_reason() 相同（替身伺服器與報告依此判斷）"""
+        conf = read_conf("fastcgi-cache.conf")
+        self.assertEqual(map_pattern(conf, "skip_cache_uri"), SKIP_CACHE_URI.pattern)
+        self.assertEqual(map_pattern(conf, "skip_cache_cookie"), SKIP_CACHE_COOKIE.pattern)
+        self.assertIn("fastcgi_cache_use_stale updating", conf)
+        self.assertIn("fastcgi_cache_background_update on;", conf)
+        self.assertIn("$skip_cache_authorization\" $skip_cache", conf)
+        # HTTP 與 HTTPS 產生的頁面資源網址不同，分開快取
+        self.assertIn('fastcgi_cache_key "$scheme', conf)
+        # 不忽略 Cache-Control / Set-Cookie：WordPress 標示為不可快取的回應不會寫入
+        self.assertNotIn("fastcgi_ignore_headers", conf)
+
+    def test_refresh_internal_only(self):
+        """測試重新產生快取只經由未發佈的內部 server，公開 server 沒有略過快取或限流的請求標頭"""
+        self.assertIn("limit_req_zone $binary_remote_addr zone=general:", read_conf("rate-limiting.conf"))
+        for name in ("fastcgi-cache.conf", "rate-limiting.conf", "default.conf", "default-ssl.conf"):
+            self.assertNotRegex(read_conf(name), r"\$http_x_(?!forwarded_for)", name)
+        internal = read_conf("internal.conf")
+        self.assertIn("listen 8081;", internal)
+        self.assertIn("fastcgi_cache_bypass 1;", internal)
+        self.assertIn("fastcgi_no_cache $skip_cache;", internal)
+        self.assertNotIn("limit_req", internal)
+        self.assertEqual(load_mounts()['config/nginx/internal.conf'][0], "nginx")
+        self.assertFalse([port for port in load_lists("ports")['nginx'] if "8081" in port])
+
+    def test_php_location_caches(self):
+        """測試只有 PHP location 啟用快取，並在 add_header X-Cache 時重新包含安全標頭"""
+        for name in ("default.conf", "default-ssl.conf"):
+            conf = read_conf(name)
+            php = re.search(r"location ~ \\\.php\$ \{(.*?)\n    \}", conf, re.S).group(1)
+            self.assertIn("fastcgi_cache WORDPRESS;", php, name)
+            self.assertIn("fastcgi_cache_bypass $skip_cache;", php, name)
+            self.assertIn("fastcgi_no_cache $skip_cache;", php, name)
+            self.assertIn("include /etc/nginx/conf.d/security-headers.conf;", php, name)
+            self.assertEqual(conf.count("fastcgi_cache WORDPRESS;"), 1, name)
+
+
+class TestTrafficMix(unittest.TestCase):
+    """流量組合測試類"""
+
+    def test_mix(self):
+        """測試匿名比例、固定亂數與只保留會被快取的網址"""
+        mix = traffic_mix(0.95)
+        self.assertEqual(mix.count(LOGGED_IN), round(len(mix) * 0.05))
+        self.assertEqual(mix, traffic_mix(0.95))
+        self.assertEqual(traffic_mix(1.0).count(ANONYMOUS), len(mix))
+        self.assertEqual(cacheable_paths(["/", "/?s=a", "/wp-admin/", "/feed/", "/about/"]), ["/", "/about/"])
+        with self.assertRaises(ValueError):
+            traffic_mix(1.5)
+
+
+class TestStandInPageCache(unittest.TestCase):
+    """替身伺服器的頁面快取測試類"""
+
+    def test_stale_and_refresh(self):
+        """測試過期時先回應舊內容並在背景更新，內部 server 略過讀取並寫入快取，公開的埠不接受重新產生"""
+        with StandInServer(page_cache_ttl=0.2) as server:
+            url = f"{server.base_url}/about/"
+            self.assertEqual(requests.get(url, timeout=5).headers['X-Cache'], "MISS")
+            self.assertEqual(requests.get(url, timeout=5).headers['X-Cache'], "HIT")
+            time.sleep(0.3)
+            self.assertEqual(requests.get(url, timeout=5).headers['X-Cache'], "STALE")
+            time.sleep(0.05)
+            self.assertEqual(requests.get(url, timeout=5).headers['X-Cache'], "HIT")
+            self.assertEqual(requests.get(url, headers={'X-Cache-Purge': "1"}, timeout=5).headers['X-Cache'], "HIT")
+            refresh = requests.get(f"{server.internal_url}/about/", timeout=5)
+            self.assertEqual(refresh.headers['X-Cache'], "BYPASS")
+            self.assertEqual(requests.post(f"{server.internal_url}/about/", timeout=5).status_code, 405)
+            self.assertEqual(requests.get(url, timeout=5).headers['X-Cache'], "HIT")
+            cookie = {'Cookie': "wordpress_logged_in_abc=admin"}
+            self.assertEqual(requests.get(url, headers=cookie, timeout=5).headers['X-Cache'], "BYPASS")
+
+
+class TestPageCacheBenchmark(unittest.TestCase):
+    """吞吐量比較測試類"""
+
+    def test_standin_speedup(self):
+        """測試匿名流量由快取回應、登入流量從不由快取回應，混合流量的吞吐量高於全部略過快取"""
+        with StandInServer(FaultProfile(latency_ms=20, workers=4), page_cache_ttl=60) as server:
+            bench = PageCacheBenchmark(server.base_url, concurrency=8, warmup=0.2, anonymous_share=0.9)
+            comparison = bench.run(seconds=0.5)
+        self.assertEqual(comparison.uncached.segments['uncached'].hit_ratio, 0)
+        self.assertEqual(comparison.mixed.segments[LOGGED_IN].hit_ratio, 0)
+        self.assertGreater(comparison.anonymous.hit_ratio, 0.99)
+        self.assertGreater(comparison.speedup, 2)
+        self.assertIn("吞吐量為沒有頁面快取時的", format_report(comparison))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
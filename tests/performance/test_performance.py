@@ -4,36 +4,45 @@ Performance Tests for WordPress Docker Environment
 性能測試：響應時間、資源使用、並發處理能力
 """
 
+import statistics
+import subprocess
 import unittest
 import requests
 import time
-import subprocess
-import statistics
 from typing import List, Dict
 
+from tests import http_session
+from tests.monitor.docker_api import DockerAPIError
+from tests.monitor.resource_sampler import ResourceSampler, format_summary
+from tests.performance import results_store
+from tests.performance.db_bench import DatabaseBenchmark, load_db_config, pymysql
+from tests.performance.rate_limit import ThrottlePredictor, ThrottleReport
+from tests.performance.timing import PacedTimer, elapsed_ms, now_ns
+
 
 class TestPerformance(unittest.TestCase):
     """性能測試類"""
 
-    BASE_URL = "http://localhost"
+    BASE_URL = http_session.BASE_URL
     TIMEOUT = 30
+    # 預定發送速率（req/s），伺服器停頓造成的排隊時間會計入延遲
+    PACE_RATE = 1
+    STATIC_PACE_RATE = 4
 
     def test_homepage_response_time(self):
-        """測試首頁響應時間 < 2 秒"""
-        response_times = []
+        """測試首頁響應時間 < 2 秒（從預定發送時間起算）"""
+        timer = PacedTimer(rate=self.PACE_RATE)
         for i in range(5):
-            start_time = time.time()
             try:
-                response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
-                end_time = time.time()
-                response_time = end_time - start_time
-                response_times.append(response_time)
+                with timer.request():
+                    response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
                 self.assertEqual(response.status_code, 200, "首頁無法訪問")
             except requests.exceptions.RequestException as e:
                 self.fail(f"首頁訪問失敗: {e}")
 
-        avg_time = statistics.mean(response_times)
-        max_time = max(response_times)
+        response_times = timer.response_times
+        avg_time = response_times.mean / 1000
+        max_time = response_times.max / 1000
         
         self.assertLess(
             avg_time,
@@ -45,38 +54,36 @@ class TestPerformance(unittest.TestCase):
             3.0,
             f"首頁最大響應時間過長: {max_time:.2f} 秒（目標: < 3 秒）"
         )
-        print(f"\n首頁響應時間統計:")
+        print(f"\n首頁響應時間統計（已校正協調遺漏）:")
         print(f"  平均: {avg_time:.2f} 秒")
         print(f"  最大: {max_time:.2f} 秒")
-        print(f"  最小: {min(response_times):.2f} 秒")
+        print(f"  最小: {response_times.min / 1000:.2f} 秒")
+        print(f"  服務時間平均: {timer.service_times.mean / 1000:.2f} 秒")
 
     def test_static_files_response_time(self):
-        """測試靜態檔案響應時間 < 500ms"""
+        """測試靜態檔案響應時間 < 500ms（從預定發送時間起算）"""
         static_files = [
             "/wp-includes/js/jquery/jquery.min.js",
             "/wp-content/themes/twentytwentyfour/style.css"
         ]
         
         for static_file in static_files:
-            response_times = []
+            timer = PacedTimer(rate=self.STATIC_PACE_RATE)
             for i in range(3):
                 try:
-                    start_time = time.time()
-                    response = requests.get(
-                        f"{self.BASE_URL}{static_file}",
-                        timeout=self.TIMEOUT
-                    )
-                    end_time = time.time()
-                    response_time = end_time - start_time
-                    response_times.append(response_time)
+                    with timer.request():
+                        response = http_session.get(
+                            f"{self.BASE_URL}{static_file}",
+                            timeout=self.TIMEOUT
+                        )
                     # 允許 404（檔案可能不存在）
                     if response.status_code == 404:
                         break
                 except requests.exceptions.RequestException:
                     break
 
-            if response_times:
-                avg_time = statistics.mean(response_times)
+            if timer.response_times.count:
+                avg_time = timer.response_times.mean / 1000
                 self.assertLess(
                     avg_time,
                     0.5,
@@ -84,94 +91,127 @@ class TestPerformance(unittest.TestCase):
                 )
 
     def test_concurrent_requests(self):
-        """測試並發請求處理能力（至少 10 個並發）"""
+        """測試並發請求處理能力（至少 10 個並發），依設計被限流的 429 與失敗分開計算"""
         import concurrent.futures
         
         def make_request():
             try:
-                response = requests.get(self.BASE_URL, timeout=10)
-                return response.status_code in [200, 302]  # 允許重定向
-            except:
-                return False
+                return http_session.get(self.BASE_URL, timeout=10).status_code
+            except requests.exceptions.RequestException:
+                return None
+
+        # 同時送出 10 個請求：預測 limit_req（general zone）與 limit_conn 應產生的 429。
+        # 先前的測試可能已用完同一 IP 的 burst，先等到最壞情況下也有 10 個名額，預測範圍才是單一值
+        predictor = ThrottlePredictor()
+        time.sleep(predictor.wait_ms("/", now_ns() // 1_000_000, requests=10) / 1000)
+        send_ms = now_ns() // 1_000_000
+        for i in range(10):
+            predictor.observe("/", send_ms, in_flight=i)
 
         # 發送 10 個並發請求
         with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
             futures = [executor.submit(make_request) for _ in range(10)]
-            results = [f.result() for f in concurrent.futures.as_completed(futures)]
-
-        success_count = sum(results)
-        # 考慮速率限制，降低標準到至少 50% 成功
-        self.assertGreaterEqual(
-            success_count,
-            5,  # 至少 50% 成功（考慮速率限制）
-            f"並發請求處理能力不足: {success_count}/10 成功（目標: >= 5）"
+            statuses = [f.result() for f in concurrent.futures.as_completed(futures)]
+
+        status_counts = {}
+        for status in statuses:
+            if status is not None:
+                status_counts[status] = status_counts.get(status, 0) + 1
+        report = ThrottleReport.from_counts(status_counts, statuses.count(None), predictor.prediction)
+
+        print(f"\n並發請求測試: {report.succeeded}/10 成功")
+        print(report.format("  "))
+        self.assertEqual(
+            report.failed,
+            0,
+            f"並發請求處理能力不足: {report.failed}/10 失敗（不含依設計限流的 429）"
         )
-        print(f"\n並發請求測試: {success_count}/10 成功")
+        self.assertEqual(predictor.prediction.low, predictor.prediction.high)
+        self.assertEqual(report.throttled, predictor.prediction.low, f"429 數量不符合限流設定: {report.limiter_verdict}")
 
     def test_container_resource_usage(self):
-        """測試容器資源使用情況"""
-        containers = ["wordpress_db", "wordpress_app", "wordpress_nginx"]
-        
-        for container in containers:
-            try:
-                result = subprocess.run(
-                    ["docker", "stats", "--no-stream", "--format", "{{.MemUsage}}", container],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0 and result.stdout.strip():
-                    # 解析記憶體使用（格式: "50MiB / 2GiB"）
-                    mem_usage = result.stdout.strip()
-                    print(f"\n{container} 記憶體使用: {mem_usage}")
-                    # 這裡只檢查是否能夠獲取資源資訊，不設定具體限制
-                    self.assertIsNotNone(mem_usage, f"無法獲取 {container} 資源使用情況")
-            except subprocess.TimeoutExpired:
-                self.skipTest(f"獲取 {container} 資源使用超時")
-            except subprocess.CalledProcessError:
-                self.skipTest(f"無法獲取 {container} 資源使用情況")
+        """測試容器資源使用情況（背景採樣）"""
+        try:
+            with ResourceSampler(interval=0.5) as sampler:
+                time.sleep(2)
+        except DockerAPIError as e:
+            self.skipTest(f"無法獲取容器資源使用情況: {e}")
+
+        summary = sampler.summary()
+        print("\n" + format_summary(summary))
+        for container in sampler.containers:
+            # 這裡只檢查是否能夠獲取資源資訊，不設定具體限制
+            self.assertIn(container, summary, f"無法獲取 {container} 資源使用情況: {sampler.errors.get(container)}")
 
 
 class TestDatabasePerformance(unittest.TestCase):
     """資料庫性能測試類"""
 
+    CONCURRENCY = 8
+    DURATION = 5
+    # 原生協定直接查詢，不含 docker exec 與客戶端登入開銷
+    QUERY_P99_TARGET_MS = 50
+    # 預設的 docker-compose.yml 不發佈 3306 時改以 docker exec 查詢（包含 docker exec 與客戶端登入開銷）
+    DB_CONTAINER = "wordpress_db"
+    DOCKER_EXEC_TARGET_MS = 200
+
     def test_database_query_response_time(self):
-        """測試資料庫查詢響應時間 < 200ms（包含 Docker exec 開銷）"""
+        """測試代表性 WordPress 查詢的 p99 響應時間 < 50ms（連線池、並發）"""
         try:
-            # 執行多次查詢取平均值
-            response_times = []
-            for i in range(5):
-                start_time = time.time()
-                result = subprocess.run(
-                    [
-                        "docker", "exec", "wordpress_db",
-                        "mysql", "-u", "wordpress", "-pWordPress_User_Pass_2024_Secure!",
-                        "-e", "SELECT 1"
-                    ],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
+            result = DatabaseBenchmark(concurrency=self.CONCURRENCY).run(duration=self.DURATION)
+        except ImportError as e:
+            self.skipTest(str(e))
+        except pymysql.err.OperationalError as e:
+            # db 端口未發佈（需 docker-compose.bench.yml），例如 make test 啟動的預設 stack
+            print(f"\n無法以原生協定連接資料庫（{e}），改用 docker exec")
+            self.check_docker_exec_query()
+            return
+
+        print(f"\n資料庫查詢基準測試:")
+        print(result.format())
+
+        for name, stats in result.queries.items():
+            results_store.record(f"db/{name}", histogram=stats.histogram,
+                                 throughput=stats.count / result.elapsed if result.elapsed else 0)
+        for name, stats in result.queries.items():
+            self.assertEqual(stats.errors, 0, f"查詢 {name} 發生錯誤")
+            if stats.count:
+                p99 = stats.histogram.percentile(99)
+                self.assertLess(
+                    p99,
+                    self.QUERY_P99_TARGET_MS,
+                    f"查詢 {name} p99 響應時間過長: {p99:.2f}ms（目標: < {self.QUERY_P99_TARGET_MS}ms）"
                 )
-                end_time = time.time()
-                response_time = (end_time - start_time) * 1000  # 轉換為毫秒
-                response_times.append(response_time)
-                self.assertEqual(result.returncode, 0, "資料庫查詢失敗")
-
-            avg_time = statistics.mean(response_times)
-            # 考慮 Docker exec 的開銷，設定為 200ms
-            self.assertLess(
-                avg_time,
-                200,  # 200ms（包含 Docker exec 開銷）
-                f"資料庫查詢平均響應時間過長: {avg_time:.2f}ms（目標: < 200ms）"
-            )
-            print(f"\n資料庫查詢響應時間統計:")
-            print(f"  平均: {avg_time:.2f}ms")
-            print(f"  最大: {max(response_times):.2f}ms")
-            print(f"  最小: {min(response_times):.2f}ms")
-        except subprocess.CalledProcessError as e:
-            self.skipTest(f"資料庫查詢測試失敗: {e.stderr}")
-        except subprocess.TimeoutExpired:
-            self.fail("資料庫查詢超時")
+
+    def check_docker_exec_query(self):
+        """以 docker exec 執行 SELECT 1 五次，平均響應時間 < 200ms"""
+        config = load_db_config()
+        command = ["docker", "exec", "-e", f"MYSQL_PWD={config['password']}", self.DB_CONTAINER,
+                   "mysql", "-u", config['user'], config['database'], "-e", "SELECT 1"]
+        response_times = []
+        for _ in range(5):
+            start_ns = now_ns()
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=5)
+            except FileNotFoundError:
+                self.skipTest("找不到 docker 指令")
+            except subprocess.TimeoutExpired:
+                self.fail("資料庫查詢超時")
+            response_times.append(elapsed_ms(start_ns))
+            if "No such container" in result.stderr:
+                self.skipTest(f"{self.DB_CONTAINER} 容器未運行")
+            self.assertEqual(result.returncode, 0, f"資料庫查詢失敗: {result.stderr}")
+
+        avg_time = statistics.mean(response_times)
+        print(f"\n資料庫查詢響應時間統計（docker exec）:")
+        print(f"  平均: {avg_time:.2f}ms")
+        print(f"  最大: {max(response_times):.2f}ms")
+        print(f"  最小: {min(response_times):.2f}ms")
+        self.assertLess(
+            avg_time,
+            self.DOCKER_EXEC_TARGET_MS,
+            f"資料庫查詢平均響應時間過長: {avg_time:.2f}ms（目標: < {self.DOCKER_EXEC_TARGET_MS}ms）"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Nginx Rate Limit Model Tests
+限流模型測試：設定解析、location 比對、漏桶整數運算與 429 分類
+"""
+
+import unittest
+
+from tests.performance.loadgen import run_open_loop
+from tests.performance.rate_limit import (
+    LimitReq,
+    RateLimitConfig,
+    RateLimiterModel,
+    ThrottlePredictor,
+    ThrottleReport,
+    predict_schedule,
+)
+from tests.performance.standin import FaultProfile, StandInServer
+
+
+class TestRateLimitConfig(unittest.TestCase):
+    """設定解析與 location 比對測試類"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.config = RateLimitConfig.load()
+
+    def test_zones_use_nginx_integer_rates(self):
+        """測試 zone 速率與 nginx 相同（每秒千分之一請求，整數除法）"""
+        self.assertEqual(self.config.zones, {'general': 1000, 'login': 83, 'xmlrpc': 166, 'api': 500})
+        self.assertEqual(self.config.conn_limit, 10)
+        self.assertEqual(self.config.conn_status, 429)
+
+    def test_location_matching(self):
+        """測試 location 選擇順序與 nginx 一致"""
+        cases = {
+            "/": ("general", 20),
+            "/sample-page/?s=x": ("general", 20),
+            "/wp-login.php": ("login", 3),
+            "/xmlrpc.php": ("xmlrpc", 5),
+            "/wp-json/wp/v2/posts": ("api", 10),
+        }
+        for uri, (zone, burst) in cases.items():
+            limits = self.config.match(uri).limit_req
+            self.assertEqual([(l.zone, l.burst, l.nodelay) for l in limits], [(zone, burst, True)], uri)
+        for uri in ["/health", "/wp-includes/js/jquery/jquery.min.js", "/index.php"]:
+            self.assertEqual(self.config.match(uri).limit_req, [], uri)
+
+
+class TestLeakyBucket(unittest.TestCase):
+    """漏桶模型測試類"""
+
+    def setUp(self):
+        self.config = RateLimitConfig.load()
+
+    def test_burst_allows_one_plus_burst(self):
+        """測試 burst=3 時同一瞬間可通過 4 個請求"""
+        model = RateLimiterModel(self.config)
+        decisions = [model.admit("/wp-login.php", 1000).throttled for _ in range(6)]
+        self.assertEqual(decisions, [False, False, False, False, True, True])
+
+    def test_bucket_drains_at_zone_rate(self):
+        """測試 60r/m 每秒漏出一個請求"""
+        model = RateLimiterModel(self.config)
+        for _ in range(21):
+            self.assertFalse(model.admit("/", 0).throttled)
+        self.assertTrue(model.admit("/", 500).throttled)
+        self.assertFalse(model.admit("/", 1000).throttled)
+        self.assertTrue(model.admit("/", 1000).throttled)
+
+    def test_login_zone_drains_slowly(self):
+        """測試 5r/m 約 12 秒才漏出一個請求（83 * ms / 1000 取整），2 秒內只放行 1 + burst 個"""
+        model = RateLimiterModel(self.config)
+        results = [model.admit("/wp-login.php", t).throttled for t in range(0, 2000, 10)]
+        self.assertEqual(results.count(False), 4)
+        self.assertTrue(model.admit("/wp-login.php", 12000).throttled)
+        self.assertFalse(model.admit("/wp-login.php", 12100).throttled)
+
+    def test_full_bucket_and_limit_conn(self):
+        """測試已滿的桶立即拒絕，以及同時請求數達到 limit_conn"""
+        full = RateLimiterModel(self.config, full=True)
+        self.assertEqual(full.admit("/", 0).reason, "limit_req:general")
+        model = RateLimiterModel(self.config)
+        decision = model.admit("/health", 0, in_flight=10)
+        self.assertEqual((decision.status, decision.reason), (429, "limit_conn"))
+
+    def test_delay_without_nodelay(self):
+        """測試未設定 nodelay 時 excess 轉為延遲"""
+        model = RateLimiterModel(self.config)
+        bucket = model._bucket(LimitReq("general", burst=5), 0)
+        self.assertEqual(bucket.offer(LimitReq("general", burst=5), 0), 0)
+        self.assertEqual(bucket.offer(LimitReq("general", burst=5), 0), 1000)
+
+
+class TestThrottleReport(unittest.TestCase):
+    """限流分類測試類"""
+
+    def test_predict_schedule(self):
+        """測試固定到達率下預測的 429 範圍"""
+        prediction = predict_schedule("/", rate=10, duration=5)
+        self.assertEqual(prediction.requests, 50)
+        self.assertEqual(prediction.low, 25)
+        self.assertGreater(prediction.high, prediction.low)
+
+    def test_separate_throttled_from_failed(self):
+        """測試 429 與負載下失敗分開計算"""
+        prediction = predict_schedule("/", rate=10, duration=5)
+        report = ThrottleReport.from_counts({200: 22, 429: 26, 502: 2}, errors=0, prediction=prediction)
+        self.assertEqual((report.succeeded, report.throttled, report.failed), (22, 26, 2))
+        self.assertTrue(report.as_designed)
+        self.assertAlmostEqual(report.failure_rate, 2 / 24 * 100)
+
+        loose = ThrottleReport.from_counts({200: 50}, errors=0, prediction=prediction)
+        self.assertFalse(loose.as_designed)
+        self.assertIn("寬鬆", loose.limiter_verdict)
+
+    def test_failure_rate_bounded(self):
+        """測試失敗多於預測放行數（限流比預測少、其餘都失敗）時失敗率以實際放行的請求計算，不超過 100%"""
+        prediction = predict_schedule("/", rate=10, duration=5)
+        outage = ThrottleReport.from_counts({429: 10, 502: 30}, errors=10, prediction=prediction)
+        self.assertGreater(outage.failed, prediction.requests - prediction.low)
+        self.assertEqual(outage.admitted, 40)
+        self.assertAlmostEqual(outage.failure_rate, 100.0)
+        self.assertIn("佔被放行請求 100.0%", outage.format())
+        self.assertEqual(ThrottleReport.from_counts({429: 50}, errors=0, prediction=prediction).failure_rate, 0.0)
+
+    def test_wait_for_known_state(self):
+        """測試等待最壞情況的桶漏出足夠名額後，預測範圍收斂為單一值"""
+        predictor = ThrottlePredictor()
+        # general：1r/s、burst 20，已滿的桶漏出 10 個名額需要 10 秒
+        self.assertEqual(predictor.wait_ms("/", 0, requests=10), 10000)
+        for _ in range(11):
+            predictor.observe("/", 10000)
+        self.assertEqual((predictor.prediction.low, predictor.prediction.high), (0, 1))
+
+        unknown = ThrottlePredictor()
+        for _ in range(10):
+            unknown.observe("/", 0)
+        self.assertEqual((unknown.prediction.low, unknown.prediction.high), (0, 10))
+
+    def test_open_loop_against_limited_standin(self):
+        """測試替身伺服器依模型限流時，開放迴路負載的 429 落在預測範圍內"""
+        config = RateLimitConfig.load()
+        with StandInServer(FaultProfile(error_rate=0.0), rate_limits=config) as server:
+            result = run_open_loop(f"{server.base_url}/wp-json/wp/v2/posts", rate=50, duration=1,
+                                   rate_limits=config)
+        report = result.throttle_report()
+        self.assertEqual(report.failed, 0)
+        self.assertTrue(report.as_designed, report.format())
+        self.assertGreaterEqual(report.throttled, 35)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark Results Store Tests
+結果庫測試：附加寫入、選擇器、統計檢定與退步判定
+"""
+
+import os
+import random
+import tempfile
+import unittest
+
+from tests.performance.histogram import LatencyHistogram
+from tests.performance.results_store import ResultStore, compare_selectors
+from tests.performance.stats import as_weighted, bootstrap_ci, mann_whitney_u, weighted_percentile
+
+
+def make_histogram(mean_ms: float, count: int = 2000, seed: int = 0) -> LatencyHistogram:
+    rng = random.Random(seed)
+    histogram = LatencyHistogram()
+    for _ in range(count):
+        histogram.record(rng.expovariate(1 / mean_ms))
+    return histogram
+
+
+class TestStatistics(unittest.TestCase):
+    """統計檢定測試類"""
+
+    def test_mann_whitney_u(self):
+        """測試 U 統計量與單尾 p 值"""
+        baseline = as_weighted([1, 2, 3, 4, 5, 6, 7, 8])
+        current = as_weighted([5, 6, 7, 8, 9, 10, 11, 12])
+        u, p_greater = mann_whitney_u(baseline, current, "greater")
+        # current 的秩和為 92（同值取平均秩），U = 92 - 8 * 9 / 2 = 56
+        self.assertEqual(u, 56)
+        self.assertLess(p_greater, 0.01)
+        _, p_less = mann_whitney_u(baseline, current, "less")
+        self.assertGreater(p_less, 0.9)
+        _, p_same = mann_whitney_u(baseline, baseline)
+        self.assertGreater(p_same, 0.9)
+
+    def test_bootstrap_ci_contains_true_change(self):
+        """測試 p99 相對變化的信賴區間包含真實變化（延遲加倍約 +100%）"""
+        baseline = make_histogram(10, seed=1).buckets()
+        current = make_histogram(20, seed=2).buckets()
+        p99 = lambda sample: weighted_percentile(sample, 99)  # noqa: E731
+        change, low, high = bootstrap_ci(baseline, current, p99, iterations=300)
+        self.assertLess(low, change)
+        self.assertLess(change, high)
+        self.assertGreater(low, 0.3)
+        self.assertLess(low, 1.0)
+
+
+class TestResultStore(unittest.TestCase):
+    """結果庫測試類"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = ResultStore(os.path.join(self.directory.name, "results.sqlite"))
+
+    def tearDown(self):
+        self.store.close()
+        self.directory.cleanup()
+
+    def add_run(self, label: str, mean_ms: float, throughput: float, seed: int) -> int:
+        run_id = self.store.create_run(label=label, base_url="http://test", commit="abc123", dirty=False,
+                                       config="cfg")
+        self.store.add_result(run_id, "open-loop@20rps", make_histogram(mean_ms, seed=seed), throughput=throughput)
+        return run_id
+
+    def test_selectors(self):
+        """測試 id、latest、label 選擇器"""
+        first = self.add_run("before", 10, 20, 1)
+        second = self.add_run("after", 10, 20, 2)
+        self.assertEqual(self.store.select("latest"), [second])
+        self.assertEqual(self.store.select("latest~1"), [first])
+        self.assertEqual(self.store.select("label:before"), [first])
+        self.assertEqual(self.store.select("commit:abc"), [first, second])
+        self.assertEqual(self.store.select("latest", exclude=[second]), [first])
+        with self.assertRaises(ValueError):
+            self.store.select("unknown:x")
+
+    def test_regression_detected(self):
+        """測試 p99 明顯變差時判定為退步，相同分佈時不判定"""
+        self.add_run("before", 10, 20, 1)
+        self.add_run("same", 10, 20, 2)
+        same = compare_selectors(self.store, "label:before", "label:same", iterations=200)
+        self.assertFalse(any(c.regressed for c in same))
+
+        self.add_run("slow", 25, 15, 3)
+        slow = {c.metric: c for c in compare_selectors(self.store, "label:before", "label:slow", iterations=200)}
+        self.assertTrue(slow['p99'].regressed)
+        # 單次執行的吞吐量只依門檻判定
+        self.assertTrue(slow['throughput'].regressed)
+        self.assertAlmostEqual(slow['throughput'].change, -0.25)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
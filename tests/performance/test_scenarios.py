@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Scenario Load Tests
+情境式負載測試：旅程權重、步驟路徑，以及對替身伺服器的分步驟延遲統計
+"""
+
+import random
+import unittest
+
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.scenarios import (
+    DEFAULT_JOURNEYS, Journey, ScenarioRunner, Step, format_report,
+)
+from tests.performance.standin import FaultProfile, StandInServer
+
+
+class TestScenarioDefinitions(unittest.TestCase):
+    """旅程定義測試類"""
+
+    def test_render_params(self):
+        """測試路徑中的參數從候選值選取"""
+        step = Step("search", "/?s={term}", params={'term': ("a", "b")})
+        rng = random.Random(1)
+        self.assertEqual({step.render(rng) for _ in range(50)}, {"/?s=a", "/?s=b"})
+        self.assertEqual(Step("home", "/").render(rng), "/")
+
+    def test_weighted_choice(self):
+        """測試旅程依權重分配"""
+        runner = ScenarioRunner("http://localhost", users=1, seed=3)
+        counts = {}
+        for _ in range(10000):
+            name = runner.choose().name
+            counts[name] = counts.get(name, 0) + 1
+        total_weight = sum(journey.weight for journey in DEFAULT_JOURNEYS)
+        for journey in DEFAULT_JOURNEYS:
+            self.assertAlmostEqual(counts[journey.name] / 10000, journey.weight / total_weight, delta=0.02)
+
+    def test_think_scale_zero(self):
+        """測試 think_scale 為 0 時不停頓"""
+        runner = ScenarioRunner("http://localhost", think_scale=0)
+        self.assertEqual(runner.think(Step("post", "/", think_time=5)), 0.0)
+
+
+class TestScenarioRun(unittest.TestCase):
+    """對替身伺服器執行情境負載測試類"""
+
+    def test_every_step_recorded(self):
+        """測試每個完成的旅程的每個步驟都有記錄，預期的 400 不算失敗"""
+        with StandInServer() as server:
+            result = ScenarioRunner(server.base_url, users=60, arrival_rate=60, think_scale=0).run()
+        self.assertEqual(sum(result.completed_journeys.values()), 60)
+        for journey in DEFAULT_JOURNEYS:
+            started = result.started_journeys.get(journey.name, 0)
+            for step in journey.steps:
+                stats = result.steps[(journey.name, step.name)]
+                self.assertEqual(stats.requests, started, f"{journey.name}/{step.name}")
+                self.assertEqual(stats.failures, 0, f"{journey.name}/{step.name}")
+        self.assertIn("browse/search", format_report(result))
+
+    def test_slow_location_isolated_per_step(self):
+        """測試只有變慢的 location 反映在對應步驟的延遲"""
+        journeys = [Journey("mixed", 1, (
+            Step("home", "/"),
+            Step("api", "/wp-json/wp/v2/posts"),
+        ))]
+        with StandInServer(FaultProfile(latency_ms=60, locations=["wp-json"])) as server:
+            result = ScenarioRunner(server.base_url, journeys, users=30, arrival_rate=30, think_scale=0).run()
+        self.assertGreaterEqual(result.steps[("mixed", "api")].histogram.percentile(50), 60)
+        self.assertLess(result.steps[("mixed", "home")].histogram.percentile(50), 60)
+
+    def test_throttle_prediction_across_steps(self):
+        """測試混合路徑的 429 落在各 location 限流模型的預測範圍內"""
+        config = RateLimitConfig.load()
+        journeys = [Journey("login", 1, (Step("login-form", "/wp-login.php"),))]
+        with StandInServer(rate_limits=config) as server:
+            result = ScenarioRunner(server.base_url, journeys, users=20, arrival_rate=20, think_scale=0,
+                                    rate_limits=config).run()
+        report = result.throttle_report()
+        # login zone：5r/m、burst=3，一秒內只放行 burst + 1 個
+        self.assertEqual(report.prediction.low, 16)
+        self.assertTrue(report.as_designed, report.format())
+        self.assertEqual(report.failed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Stand-In Server Tests
+替身伺服器測試：路由與標頭模擬、故障注入，以及負載產生器對已知延遲的測量
+"""
+
+import unittest
+
+import requests
+
+from tests.performance.loadgen import run_open_loop
+from tests.performance.standin import FaultProfile, StandInServer
+
+
+class TestStandInRoutes(unittest.TestCase):
+    """路由與標頭模擬測試類"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = StandInServer().start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.stop()
+
+    def get(self, path: str) -> requests.Response:
+        return requests.get(f"{self.server.base_url}{path}", timeout=5)
+
+    def test_health(self):
+        """測試 /health 與 nginx 回應一致"""
+        response = self.get("/health")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.text, "healthy\n")
+
+    def test_static_cache_headers(self):
+        """測試靜態檔案帶有 expires 與 Cache-Control: public, immutable"""
+        response = self.get("/wp-includes/js/jquery/jquery.min.js")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public, immutable", response.headers['Cache-Control'])
+        self.assertIn("max-age=31536000", response.headers['Cache-Control'])
+        self.assertIn("Expires", response.headers)
+
+    def test_security_headers_from_config(self):
+        """測試所有回應都帶有 security-headers.conf 的標頭"""
+        for path in ["/", "/health", "/wp-config.php"]:
+            response = self.get(path)
+            self.assertEqual(response.headers.get('X-Frame-Options'), "SAMEORIGIN", path)
+            self.assertIn("default-src 'self'", response.headers.get('Content-Security-Policy', ""), path)
+
+    def test_locations(self):
+        """測試各 location 的狀態碼"""
+        self.assertEqual(self.get("/wp-config.php").status_code, 403)
+        self.assertEqual(self.get("/xmlrpc.php").status_code, 405)
+        self.assertEqual(self.get("/wp-login.php").status_code, 200)
+        self.assertIn("wp/v2", self.get("/wp-json/").json()['namespaces'])
+
+
+class TestStandInFaults(unittest.TestCase):
+    """故障注入測試類"""
+
+    def test_throttle_and_errors(self):
+        """測試注入 429 與 502，且只套用於指定 location"""
+        faults = FaultProfile(throttle_rate=1.0, locations=["wp-login"])
+        with StandInServer(faults) as server:
+            self.assertEqual(requests.get(f"{server.base_url}/wp-login.php", timeout=5).status_code, 429)
+            self.assertEqual(requests.get(f"{server.base_url}/", timeout=5).status_code, 200)
+            server.faults = FaultProfile(error_rate=1.0)
+            self.assertEqual(requests.get(f"{server.base_url}/", timeout=5).status_code, 502)
+        self.assertEqual(server.stats['wp-login']['throttled'], 1)
+        self.assertEqual(server.stats['general']['errors'], 1)
+
+    def test_open_loop_measures_injected_latency(self):
+        """測試開放迴路負載測得的延遲不低於注入延遲，且客戶端開銷有限"""
+        with StandInServer(FaultProfile(latency_ms=20)) as server:
+            result = run_open_loop(f"{server.base_url}/health", rate=200, duration=2)
+
+        self.assertEqual(result.errors, 0)
+        self.assertEqual(result.status_counts.get(200), 400)
+        self.assertGreaterEqual(result.histogram.percentile(50), 20)
+        self.assertLess(result.histogram.percentile(50), 120)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Static Asset Benchmark Tests
+靜態檔案測試：gzip 設定解析、靜態檔案發現、快取標頭檢查，以及對替身伺服器的 304、Range 與並行測試
+"""
+
+import time
+import unittest
+from email.utils import formatdate
+
+from multidict import CIMultiDict
+
+from tests.performance.standin import StandInServer
+from tests.performance.static_bench import (
+    GzipConfig, StaticBenchmark, check_cache_headers, find_assets, format_report,
+)
+
+
+class TestGzipConfig(unittest.TestCase):
+    """gzip 設定解析測試類"""
+
+    def test_repo_config(self):
+        """測試讀取 nginx.conf 的 gzip 設定（略過註解中的 brotli）"""
+        config = GzipConfig.load()
+        self.assertTrue(config.enabled)
+        self.assertEqual((config.comp_level, config.min_length), (6, 1000))
+        self.assertIn("application/javascript", config.types)
+        self.assertTrue(config.vary)
+
+    def test_applies(self):
+        """測試依類型與 gzip_min_length 判斷是否壓縮，text/html 永遠壓縮"""
+        config = GzipConfig(enabled=True, comp_level=6, min_length=1000, types=("text/css",))
+        self.assertTrue(config.applies("text/css; charset=utf-8", 5000))
+        self.assertTrue(config.applies("text/html", 5000))
+        self.assertFalse(config.applies("text/css", 999))
+        self.assertFalse(config.applies("image/jpeg", 5000))
+        self.assertFalse(GzipConfig().applies("text/html", 5000))
+
+
+class TestAssetChecks(unittest.TestCase):
+    """靜態檔案發現與標頭檢查測試類"""
+
+    def test_find_assets(self):
+        """測試只保留同一主機由靜態 location 處理的檔案，並解析 CSS 的相對 url()"""
+        html = ('<link href="/wp-content/themes/t/style.css?ver=1"><script src="http://localhost/wp-includes/a.js">'
+                '<script src="https://cdn.example.com/x.js"><a href="/about/"><img src="data:image/png;base64,AA">')
+        self.assertEqual(find_assets(html, "http://localhost"),
+                         ["/wp-content/themes/t/style.css?ver=1", "/wp-includes/a.js"])
+        css = "@font-face{src:url('fonts/a.woff2')} .x{background:url(../img/b.png)}"
+        self.assertEqual(find_assets(css, "http://localhost", "http://localhost/wp-content/themes/t/style.css"),
+                         ["/wp-content/themes/t/fonts/a.woff2", "/wp-content/themes/img/b.png"])
+
+    def test_check_cache_headers(self):
+        """測試 expires 1y 與 immutable 的檢查"""
+        headers = CIMultiDict({'Expires': formatdate(time.time() + 365 * 24 * 3600, usegmt=True), 'ETag': '"1-2"'})
+        headers.add('Cache-Control', "max-age=31536000")
+        headers.add('Cache-Control', "public, immutable")
+        self.assertEqual(check_cache_headers(headers), [])
+        stale = CIMultiDict({'Cache-Control': "max-age=3600", 'Expires': formatdate(time.time() + 3600, usegmt=True)})
+        self.assertEqual(len(check_cache_headers(stale)), 4)
+
+
+class TestStaticBenchmark(unittest.TestCase):
+    """對替身伺服器的靜態檔案測試類"""
+
+    def test_standin_assets(self):
+        """測試從首頁找出檔案、標頭與協定無誤，並完成 gzip / identity / sendfile 並行測試"""
+        with StandInServer() as server:
+            report = StaticBenchmark(server.base_url, concurrency=4, sendfile_concurrency=10, duration=0.5,
+                                     samples=1).run()
+        self.assertEqual(report.problems, [], format_report(report))
+        paths = [check.path for check in report.assets]
+        self.assertIn("/wp-includes/js/jquery/jquery.min.js?ver=3.7.1", paths)
+        self.assertIn("/wp-content/themes/twentytwentyfour/fonts/inter.woff2", paths)
+        self.assertLess(report.compression_ratio(), 0.5)
+        self.assertEqual(set(report.timings), {"identity", "gzip", "304", "range"})
+        self.assertEqual([stats.name for stats in report.loads], ["gzip", "identity", "sendfile"])
+        gzip_load, identity_load = report.load("gzip"), report.load("identity")
+        self.assertLess(gzip_load.wire_bytes / gzip_load.requests, identity_load.wire_bytes / identity_load.requests)
+        self.assertEqual(sum(stats.error_rate for stats in report.loads), 0)
+
+    def test_concurrency_capped_by_limit_conn(self):
+        """測試單一客戶端的並行數不超過 limit_conn"""
+        bench = StaticBenchmark("http://localhost", concurrency=64, sendfile_concurrency=256)
+        self.assertEqual((bench.concurrency, bench.sendfile_concurrency), (10, 10))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Paced Timer Tests
+協調遺漏校正計時測試
+"""
+
+import time
+import unittest
+
+from tests.performance.timing import PacedTimer
+
+
+class TestPacedTimer(unittest.TestCase):
+    """排程計時器測試類"""
+
+    def test_stall_counted_for_queued_requests(self):
+        """測試伺服器停頓時，排在後面的請求也計入排隊時間"""
+        timer = PacedTimer(rate=100)  # 每 10ms 一個請求
+        for i in range(10):
+            with timer.request():
+                if i == 2:
+                    time.sleep(0.1)  # 模擬 100ms 停頓
+
+        # 只有一個請求的服務時間超過 50ms
+        self.assertEqual(timer.service_times.count, 10)
+        self.assertLess(timer.service_times.percentile(80), 50)
+        # 停頓期間應發送的後續請求都被延遲
+        self.assertGreaterEqual(timer.response_times.percentile(50), 20)
+        self.assertGreater(timer.response_times.mean, timer.service_times.mean * 2)
+
+    def test_requests_wait_for_intended_time(self):
+        """測試請求不會早於預定時間發送"""
+        timer = PacedTimer(rate=50)
+        start = time.perf_counter()
+        for i in range(5):
+            with timer.request():
+                pass
+        self.assertGreaterEqual(time.perf_counter() - start, 4 / 50 * 0.95)
+
+    def test_unpaced_timer_matches_service_time(self):
+        """測試未設定速率時兩種延遲相同"""
+        timer = PacedTimer()
+        for i in range(3):
+            with timer.request():
+                time.sleep(0.005)
+        self.assertEqual(timer.response_times.summary(), timer.service_times.summary())
+
+    def test_invalid_rate(self):
+        """測試無效速率"""
+        with self.assertRaises(ValueError):
+            PacedTimer(rate=0)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Configuration Tuning Sweep Tests
+設定調校掃描測試：調校項目的讀取與替換、變體產生、連續減半，以及對替身伺服器的搜尋
+"""
+
+import os
+import tempfile
+import unittest
+
+from tests.performance.replay import ReplayStats
+from tests.performance.standin import StandInServer
+from tests.performance.tuning_sweep import (
+    KNOBS, KNOBS_BY_NAME, Benchmark, ComposeBackend, StandInBackend, TrialFailed, TuningSweep, Variant, defaults,
+    ranking, successive_halving, variants,
+)
+
+
+def stats(throughput: float, p99: float = 100, errors: int = 0) -> ReplayStats:
+    result = ReplayStats(duration=1.0, requests=int(throughput), errors=errors)
+    for _ in range(100):
+        result.histogram.record(p99)
+    return result
+
+
+class TestKnobs(unittest.TestCase):
+    """調校項目測試類"""
+
+    def test_repo_defaults(self):
+        """測試每個調校項目都能在倉庫設定檔中找到目前的值"""
+        current = defaults(KNOBS)
+        self.assertEqual(current['nginx.upstream_keepalive'], "32")
+        self.assertEqual(current['nginx.fastcgi_buffers'], "4 256k")
+        self.assertEqual(current['php.pm.max_children'], "5")
+        self.assertEqual(current['mysql.innodb_buffer_pool_size'], "256M")
+
+    def test_render(self):
+        """測試只替換指定的指令，max_children 一併調整 spare servers"""
+        rendered = Variant({'php.pm.max_children': "8", 'nginx.fastcgi_buffer_size': "16k"}).render()
+        self.assertEqual(sorted(rendered), ["config/nginx/default.conf", "config/php/php-fpm.conf"])
+        nginx = rendered["config/nginx/default.conf"]
+        self.assertIn("fastcgi_buffer_size 16k;", nginx)
+        self.assertIn("fastcgi_buffers 4 256k;", nginx)
+        self.assertIn("fastcgi_busy_buffers_size 256k;", nginx)
+        fpm = rendered["config/php/php-fpm.conf"]
+        self.assertIn("pm.max_children = 8\n", fpm)
+        self.assertIn("pm.start_servers = 2\n", fpm)
+        self.assertIn("pm.max_spare_servers = 3\n", fpm)
+
+    def test_variants(self):
+        """測試組合的第一個為目前設定，超過上限時抽樣並保留目前設定"""
+        knobs = [KNOBS_BY_NAME['nginx.upstream_keepalive'], KNOBS_BY_NAME['php.pm.max_requests']]
+        grid = variants(knobs)
+        self.assertEqual(len(grid), 9)
+        self.assertEqual(grid[0], Variant())
+        self.assertIn(Variant({'nginx.upstream_keepalive': "8", 'php.pm.max_requests': "1000"}), grid)
+        sample = variants(knobs, max_variants=4, seed=1)
+        self.assertEqual((len(sample), sample[0]), (4, Variant()))
+        self.assertEqual(sample, variants(knobs, max_variants=4, seed=1))
+
+    def test_compose_override(self):
+        """測試產生的設定以覆蓋檔掛載到原本的容器路徑"""
+        with tempfile.TemporaryDirectory() as work_dir:
+            backend = ComposeBackend(work_dir=work_dir)
+            override, services = backend.write(Variant({'nginx.worker_connections': "4096"}), "trial")
+            with open(override) as f:
+                text = f.read()
+            path = os.path.join(work_dir, "trial", "config", "nginx", "nginx.conf")
+            with open(path) as f:
+                self.assertIn("worker_connections 4096;", f.read())
+        self.assertEqual(services, ["nginx"])
+        self.assertIn(f'- "{path}:/etc/nginx/nginx.conf:ro"', text)
+
+    def test_fpm_override_loads_after_image_pool(self):
+        """測試 php.pm.* 的變體掛載到 www.conf 之後載入的檔案，掛載在其之前時拒絕（設定會被映像覆寫）"""
+        with tempfile.TemporaryDirectory() as work_dir:
+            backend = ComposeBackend(work_dir=work_dir)
+            override, services = backend.write(Variant({'php.pm.max_children': "10"}), "trial")
+            with open(override) as f:
+                self.assertIn(":/usr/local/etc/php-fpm.d/zz-custom.conf:ro", f.read())
+            backend.mounts['config/php/php-fpm.conf'] = ('wordpress', '/usr/local/etc/php-fpm.d/custom.conf')
+            with self.assertRaises(TrialFailed):
+                backend.write(Variant({'php.pm.max_children': "10"}), "early")
+        self.assertEqual(services, ["wordpress"])
+
+
+class TestSuccessiveHalving(unittest.TestCase):
+    """連續減半測試類"""
+
+    def test_budget_and_ranking(self):
+        """測試每輪保留 1/eta、測量時間乘以 eta，失敗的變體與 p99 超標的變體排在後面"""
+        throughput = {str(i): 100 + i * 10 for i in range(9)}
+        candidates = [Variant({'nginx.upstream_keepalive': key}) for key in throughput]
+        calls = []
+
+        def evaluate(variant, seconds):
+            key = variant.changes['nginx.upstream_keepalive']
+            calls.append((key, seconds))
+            if key == "8":
+                raise TrialFailed("nginx 無法啟動")
+            return stats(throughput[key], p99=1000 if key == "7" else 100)
+
+        trials = successive_halving(candidates, evaluate, eta=3, min_duration=1, max_duration=9, p99_target=500)
+        self.assertEqual([seconds for _, seconds in calls], [1] * 9 + [3] * 3)
+        self.assertEqual([key for key, seconds in calls if seconds == 3], ["6", "5", "4"])
+        ranked = ranking(trials, 500)
+        self.assertEqual(ranked[0].variant.changes['nginx.upstream_keepalive'], "6")
+        self.assertEqual(ranked[0].rung, 1)
+        self.assertFalse(ranked[-1].ok)
+        self.assertEqual(ranked[-1].error, "nginx 無法啟動")
+
+
+class TestStandInSweep(unittest.TestCase):
+    """對替身伺服器的搜尋測試類"""
+
+    def test_standin_sweep(self):
+        """測試 worker 數不足的變體在第一輪被淘汰，結束時還原替身伺服器"""
+        knob = KNOBS_BY_NAME['php.pm.max_children']
+        candidates = [Variant(), Variant({knob.name: "1"}), Variant({knob.name: "2"})]
+        with StandInServer() as server:
+            sweep = TuningSweep(StandInBackend(server, latency_ms=20), Benchmark(concurrency=4, warmup=0.1),
+                                eta=3, min_duration=0.5, max_duration=1)
+            trials = sweep.run(candidates)
+            self.assertEqual(server.faults.workers, 0)
+        ranked = ranking(trials)
+        self.assertEqual(ranked[0].variant, Variant())
+        self.assertEqual(ranked[-1].variant.changes, {knob.name: "1"})
+        self.assertGreater(ranked[0].stats.throughput, ranked[-1].stats.throughput * 2.5)
+        self.assertEqual(sum(t.stats.errors + t.stats.throttled for t in trials), 0)
+
+    def test_benchmark_bypasses_page_cache(self):
+        """測試基準測試帶上 wordpress_no_cache，啟用頁面快取時每個請求仍轉發到 PHP-FPM"""
+        with StandInServer(page_cache_ttl=60) as server:
+            stats = Benchmark(paths=["/"], concurrency=2, warmup=0).run(server.base_url, 0.3)
+            self.assertGreater(stats.requests, 0)
+            self.assertEqual(server.fpm.accepted, stats.requests)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
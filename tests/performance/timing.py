@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Coordinated-Omission-Corrected Timing
+按預定發送時間排程請求，從預定時間起算延遲，避免協調遺漏（coordinated omission）
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from tests.performance.histogram import LatencyHistogram
+
+now_ns = time.perf_counter_ns
+
+NS_PER_MS = 1_000_000
+
+
+def elapsed_ms(start_ns: int, end_ns: Optional[int] = None) -> float:
+    """計算兩個 perf_counter_ns 時間點之間的毫秒數"""
+    return ((end_ns if end_ns is not None else now_ns()) - start_ns) / NS_PER_MS
+
+
+class PacedTimer:
+    """
+    依固定速率排程的計時器
+
+    第 i 個請求的預定發送時間為 start + i / rate。
+    伺服器停頓時，後續請求會晚於預定時間才發出；
+    response_times 從預定時間起算，把這段排隊時間計入延遲，
+    service_times 則只計算實際發送到完成的時間。
+    rate 為 None 時退化為背靠背發送，兩者相同。
+    """
+
+    def __init__(self, rate: Optional[float] = None, highest_ms: float = 60_000):
+        if rate is not None and rate <= 0:
+            raise ValueError(f"速率必須大於 0: {rate}")
+        self.rate = rate
+        self.interval_ns = int(1e9 / rate) if rate else 0
+        self.response_times = LatencyHistogram(highest_ms)
+        self.service_times = LatencyHistogram(highest_ms)
+        self.start_ns = None
+        self.sent = 0
+        self.last_ms = 0.0
+
+    def intended_ns(self, index: int) -> int:
+        """第 index 個請求的預定發送時間"""
+        return self.start_ns + index * self.interval_ns
+
+    @contextmanager
+    def request(self):
+        """計時一個請求：先等待至預定發送時間，結束時記錄延遲"""
+        if self.start_ns is None:
+            self.start_ns = now_ns()
+        intended = self.intended_ns(self.sent)
+        wait_ns = intended - now_ns()
+        if wait_ns > 0:
+            time.sleep(wait_ns / 1e9)
+        actual = now_ns()
+        if not self.interval_ns:
+            intended = actual
+        self.sent += 1
+        try:
+            yield
+        finally:
+            end = now_ns()
+            self.last_ms = elapsed_ms(intended, end)
+            self.response_times.record(self.last_ms)
+            self.service_times.record(elapsed_ms(actual, end))
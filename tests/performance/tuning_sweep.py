@@ -0,0 +1,519 @@
+#!/usr/bin/env python3
+"""
+Configuration Tuning Sweep
+設定調校掃描：以倉庫內的 nginx、PHP-FPM、MySQL 設定檔為模板產生設定變體，逐一啟動並執行固定的基準測試，
+以連續減半（successive halving）搜尋設定空間，輸出依分數排名的吞吐量與 p99
+
+每個調校項目（Knob）以正規表示式替換設定檔中的一個指令，未列出的設定維持原樣；變體只記錄與目前設定不同的項目。
+基準測試為封閉迴路重播（replay.py）：先暖機，再測量吞吐量與延遲。
+分數 = 吞吐量 × min(1, p99 目標 ÷ p99) × (1 − 錯誤率)，p99 超過目標的變體依比例扣分。
+
+連續減半：第一輪所有變體各測 min_duration 秒，保留分數最高的 1/eta，下一輪測量時間乘以 eta，
+直到只剩一個變體或測量時間達 max_duration；較差的變體只花最短的時間，預算集中在有希望的變體。
+
+compose 服務：產生的設定寫入 .benchmarks/tuning/，以覆蓋檔掛載到與 docker-compose.yml 相同的容器路徑，
+重建受影響的服務並等待就緒；無法啟動的變體記為失敗，結束時以原本的設定重建。
+需以 docker-compose.bench.yml 啟動並搭配 WP_TEST_CLIENT_MODE=forwarded 與 --clients，避免 limit_req 擋下重播的流量。
+
+用法：
+    python3 -m tests.performance.tuning_sweep --list                       # 列出調校項目與目前的值
+    WP_TEST_CLIENT_MODE=forwarded python3 -m tests.performance.tuning_sweep --clients 200 --max-variants 27
+    python3 -m tests.performance.tuning_sweep --knobs php.pm.max_children,nginx.upstream_keepalive
+    python3 -m tests.performance.tuning_sweep --knob "php.pm.max_children=4,8,16" --access-log access.log
+    python3 -m tests.performance.tuning_sweep --standin --knobs php.pm.max_children   # 對替身伺服器示範
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from tests import http_session
+from tests.monitor.compose_limits import load_mounts
+from tests.monitor.nginx_log import read_lines
+from tests.performance.clients import ClientPool
+from tests.performance.fpm_sizing import ComposeTarget, spare_servers
+from tests.performance.loadgen import raise_open_file_limit
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.replay import (
+    BYPASS_PAGE_CACHE, DEFAULT_PATHS, ReplayStats, capped_concurrency, replay_paths, run_replay,
+)
+from tests.performance.standin import FaultProfile, StandInServer
+from tests.readiness import REPO_ROOT, ServicesNotReady, docker_compose, wait_until_ready
+
+NGINX = "nginx"
+INI = "ini"
+WORK_DIR = os.path.join(REPO_ROOT, ".benchmarks", "tuning")
+COMPOSE_FILES = ("docker-compose.yml", "docker-compose.bench.yml")
+DEFAULT_ETA = 3
+DEFAULT_P99_TARGET = 500.0
+
+
+class TrialFailed(Exception):
+    """變體無法套用或服務無法啟動"""
+
+
+@dataclass
+class Knob:
+    """
+    一個調校項目：file 中 directive 的值
+
+    syntax 為 NGINX（directive value;）或 INI（directive = value），同一檔案出現多次時全部替換。
+    fixup(text, value) 在替換後修正相依的設定（例如 spare servers 不可超過 max_children）。
+    """
+
+    name: str
+    file: str
+    directive: str
+    values: Tuple[str, ...]
+    syntax: str = NGINX
+    fixup: Optional[Callable[[str, str], str]] = None
+
+    @property
+    def pattern(self) -> "re.Pattern":
+        directive = re.escape(self.directive)
+        if self.syntax == NGINX:
+            return re.compile(rf"^(\s*{directive}\s+)([^;]+)(;)", re.MULTILINE)
+        return re.compile(rf"^(\s*{directive}\s*=\s*)([^\s;#]+)()", re.MULTILINE)
+
+    def default(self, text: str) -> str:
+        match = self.pattern.search(text)
+        if match is None:
+            raise ValueError(f"{self.file} 找不到 {self.directive}")
+        return match.group(2).strip()
+
+    def render(self, text: str, value: str) -> str:
+        text, count = self.pattern.subn(lambda m: f"{m.group(1)}{value}{m.group(3)}", text)
+        if not count:
+            raise ValueError(f"{self.file} 找不到 {self.directive}")
+        return self.fixup(text, value) if self.fixup else text
+
+
+def _fpm_spare_servers(text: str, value: str) -> str:
+    """pm = dynamic 時 spare servers 依 max_children 等比例調整（超過 max_children 時 php-fpm 無法啟動）"""
+    for directive, count in zip(("pm.start_servers", "pm.min_spare_servers", "pm.max_spare_servers"),
+                                spare_servers(int(value))):
+        text = Knob("", "", directive, (), INI).render(text, str(count))
+    return text
+
+
+KNOBS = (
+    Knob("nginx.worker_connections", "config/nginx/nginx.conf", "worker_connections", ("512", "1024", "4096")),
+    Knob("nginx.upstream_keepalive", "config/nginx/default.conf", "keepalive", ("8", "32", "64")),
+    Knob("nginx.fastcgi_buffer_size", "config/nginx/default.conf", "fastcgi_buffer_size", ("16k", "32k", "128k")),
+    Knob("nginx.fastcgi_buffers", "config/nginx/default.conf", "fastcgi_buffers", ("4 256k", "8 128k", "16 64k")),
+    Knob("php.pm.max_children", "config/php/php-fpm.conf", "pm.max_children", ("5", "10", "20"), INI,
+         _fpm_spare_servers),
+    Knob("php.pm.max_requests", "config/php/php-fpm.conf", "pm.max_requests", ("200", "500", "1000"), INI),
+    Knob("mysql.innodb_buffer_pool_size", "config/mysql/my.cnf", "innodb_buffer_pool_size",
+         ("128M", "256M", "512M"), INI),
+    Knob("mysql.innodb_flush_log_at_trx_commit", "config/mysql/my.cnf", "innodb_flush_log_at_trx_commit",
+         ("1", "2"), INI),
+)
+KNOBS_BY_NAME = {knob.name: knob for knob in KNOBS}
+
+# php-fpm.d 依檔名順序載入，php.pm.* 的變體須在映像的 www.conf 之後載入才會生效
+FPM_POOL_DIR = ComposeTarget.DIRECTORY
+FPM_IMAGE_POOL = "www.conf"
+
+
+def _read(file: str, root: str = REPO_ROOT) -> str:
+    with open(os.path.join(root, file), encoding="utf-8") as f:
+        return f.read()
+
+
+def defaults(knobs: Sequence[Knob], root: str = REPO_ROOT) -> Dict[str, str]:
+    """各調校項目在倉庫設定檔中的目前值"""
+    return {knob.name: knob.default(_read(knob.file, root)) for knob in knobs}
+
+
+@dataclass
+class Variant:
+    """一組設定變體：只記錄與目前設定不同的項目（空的即為目前設定）"""
+
+    changes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def label(self) -> str:
+        return " ".join(f"{name}={value}" for name, value in self.changes.items()) or "目前設定"
+
+    def files(self) -> List[str]:
+        return sorted({KNOBS_BY_NAME[name].file for name in self.changes})
+
+    def render(self, root: str = REPO_ROOT) -> Dict[str, str]:
+        """回傳 {設定檔: 替換後的內容}（只包含有變更的設定檔）"""
+        rendered = {file: _read(file, root) for file in self.files()}
+        for name, value in self.changes.items():
+            knob = KNOBS_BY_NAME[name]
+            rendered[knob.file] = knob.render(rendered[knob.file], value)
+        return rendered
+
+
+def variants(knobs: Sequence[Knob], max_variants: Optional[int] = None, seed: int = 0,
+             root: str = REPO_ROOT) -> List[Variant]:
+    """
+    所有調校項目的組合，第一個為目前設定
+
+    組合數超過 max_variants 時以固定的亂數種子抽樣（目前設定一定保留）。
+    """
+    current = defaults(knobs, root)
+    choices = [[current[knob.name]] + [value for value in knob.values if value != current[knob.name]]
+               for knob in knobs]
+    grid = [Variant({knob.name: value for knob, value in zip(knobs, combination) if value != current[knob.name]})
+            for combination in itertools.product(*choices)]
+    if max_variants is not None and len(grid) > max_variants:
+        grid = grid[:1] + random.Random(seed).sample(grid[1:], max(max_variants - 1, 0))
+    return grid
+
+
+@dataclass
+class Trial:
+    """一個變體在某一輪的測量結果（error 不為 None 表示無法套用或啟動）"""
+
+    variant: Variant
+    rung: int
+    seconds: float
+    stats: ReplayStats = field(default_factory=ReplayStats)
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.stats.requests > 0
+
+    @property
+    def p99(self) -> float:
+        return self.stats.histogram.percentile(99)
+
+    def score(self, p99_target: float = DEFAULT_P99_TARGET) -> float:
+        if not self.ok:
+            return 0.0
+        return self.stats.throughput * min(1.0, p99_target / max(self.p99, 1e-9)) * (1 - self.stats.error_rate)
+
+    def to_dict(self, p99_target: float = DEFAULT_P99_TARGET) -> Dict:
+        stats = self.stats
+        return {
+            'changes': self.variant.changes, 'rung': self.rung, 'seconds': self.seconds, 'error': self.error,
+            'throughput': round(stats.throughput, 2), 'requests': stats.requests, 'throttled': stats.throttled,
+            'errors': stats.errors, 'error_rate': round(stats.error_rate, 4),
+            'p50_ms': round(stats.histogram.percentile(50), 2), 'p99_ms': round(self.p99, 2),
+            'score': round(self.score(p99_target), 2),
+        }
+
+
+def successive_halving(candidates: Sequence[Variant], evaluate: Callable[[Variant, float], ReplayStats],
+                       eta: int = DEFAULT_ETA, min_duration: float = 10, max_duration: float = 90,
+                       p99_target: float = DEFAULT_P99_TARGET,
+                       progress: Optional[Callable[[Trial], None]] = None) -> List[Trial]:
+    """
+    連續減半：回傳所有測量結果
+
+    evaluate(variant, seconds) 測量一個變體，無法套用時拋出 TrialFailed。
+    """
+    if eta < 2:
+        raise ValueError("eta 至少為 2")
+    trials: List[Trial] = []
+    survivors = list(candidates)
+    rung = 0
+    while survivors:
+        seconds = min(min_duration * eta ** rung, max_duration)
+        measured = []
+        for variant in survivors:
+            trial = Trial(variant, rung, seconds)
+            try:
+                trial.stats = evaluate(variant, seconds)
+            except TrialFailed as e:
+                trial.error = str(e)
+            measured.append(trial)
+            trials.append(trial)
+            if progress is not None:
+                progress(trial)
+        keep = math.ceil(len(survivors) / eta)
+        if keep <= 1 or seconds >= max_duration:
+            break
+        ranked = sorted((trial for trial in measured if trial.ok), key=lambda t: t.score(p99_target), reverse=True)
+        survivors = [trial.variant for trial in ranked[:keep]]
+        rung += 1
+    return trials
+
+
+def ranking(trials: Sequence[Trial], p99_target: float = DEFAULT_P99_TARGET) -> List[Trial]:
+    """每個變體取最後一輪的結果，進入越後面輪次的排越前面，同一輪依分數排序"""
+    latest: Dict[str, Trial] = {}
+    for trial in trials:
+        latest[trial.variant.label] = trial
+    return sorted(latest.values(), key=lambda t: (t.ok, t.rung, t.score(p99_target)), reverse=True)
+
+
+class Benchmark:
+    """固定的基準測試：暖機後以封閉迴路重播 paths"""
+
+    def __init__(self, paths: Sequence[str] = DEFAULT_PATHS, concurrency: int = 32, warmup: float = 5,
+                 clients: Optional[ClientPool] = None, timeout: float = 30,
+                 rate_limits: Optional[RateLimitConfig] = None):
+        if not paths:
+            raise ValueError("沒有可重播的網址")
+        self.paths = list(paths)
+        self.clients = clients or ClientPool()
+        self.concurrency = capped_concurrency(concurrency, self.clients, rate_limits)
+        self.warmup = warmup
+        self.timeout = timeout
+
+    def run(self, base_url: str, seconds: float) -> ReplayStats:
+        if self.warmup:
+            run_replay(base_url, self.paths, self.concurrency, self.warmup, self.clients, self.timeout,
+                       cookies=BYPASS_PAGE_CACHE)
+        return run_replay(base_url, self.paths, self.concurrency, seconds, self.clients, self.timeout,
+                          cookies=BYPASS_PAGE_CACHE)
+
+
+class StandInBackend:
+    """替身伺服器：只有 php.pm.max_children 對應到 FaultProfile.workers，其他項目沒有效果"""
+
+    EFFECTIVE = ("php.pm.max_children",)
+
+    def __init__(self, server: StandInServer, latency_ms: float = 20, root: str = REPO_ROOT):
+        self.server = server
+        self.latency_ms = latency_ms
+        self.children = int(defaults([KNOBS_BY_NAME["php.pm.max_children"]], root)["php.pm.max_children"])
+        self._original = server.faults
+
+    @property
+    def base_url(self) -> str:
+        return self.server.base_url
+
+    def apply(self, variant: Variant):
+        children = int(variant.changes.get("php.pm.max_children", self.children))
+        self.server.faults = FaultProfile(latency_ms=self.latency_ms, workers=children)
+
+    def restore(self):
+        self.server.faults = self._original
+
+
+class ComposeBackend:
+    """
+    compose 服務：產生的設定以覆蓋檔掛載到原本的容器路徑，重建受影響的服務
+
+    只重建有變更的服務（--no-deps），MySQL 的資料在 volume 中，重建不影響資料。
+    """
+
+    def __init__(self, base_url: str = http_session.BASE_URL, work_dir: str = WORK_DIR,
+                 compose_files: Sequence[str] = COMPOSE_FILES, ready_timeout: float = 180, root: str = REPO_ROOT):
+        self.base_url = base_url.rstrip('/')
+        self.work_dir = work_dir
+        self.compose_files = list(compose_files)
+        self.ready_timeout = ready_timeout
+        self.root = root
+        self.mounts = load_mounts(os.path.join(root, compose_files[0]))
+        self._touched: set = set()
+        self._applied: set = set()
+
+    def _up(self, services: Sequence[str], override: Optional[str] = None):
+        files = self.compose_files + ([override] if override else [])
+        args = [part for path in files for part in ("-f", path)]
+        if docker_compose([*args, "up", "-d", "--no-deps", "--force-recreate", *sorted(services)], self.root) != 0:
+            raise TrialFailed(f"docker compose up 失敗: {', '.join(sorted(services))}")
+        try:
+            wait_until_ready(self.base_url, self.ready_timeout, include_mysql="db" in services)
+        except ServicesNotReady as e:
+            raise TrialFailed(str(e)) from e
+
+    def write(self, variant: Variant, name: str) -> Tuple[str, List[str]]:
+        """寫出變體的設定與覆蓋檔，回傳 (覆蓋檔路徑, 受影響的服務)"""
+        directory = os.path.join(self.work_dir, name)
+        volumes: Dict[str, List[str]] = {}
+        for file, text in variant.render(self.root).items():
+            if file not in self.mounts:
+                raise TrialFailed(f"docker-compose.yml 沒有掛載 {file}")
+            service, target = self.mounts[file]
+            if os.path.dirname(target) == FPM_POOL_DIR and os.path.basename(target) <= FPM_IMAGE_POOL:
+                raise TrialFailed(f"{target} 在映像的 {FPM_IMAGE_POOL} 之前載入，[www] 的設定會被覆寫")
+            path = os.path.join(directory, file)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+            volumes.setdefault(service, []).append(f"{os.path.abspath(path)}:{target}:ro")
+        override = os.path.join(directory, "docker-compose.tuning.yml")
+        lines = [f"# tests.performance.tuning_sweep: {variant.label}", "services:"]
+        for service, mounts in sorted(volumes.items()):
+            lines += [f"  {service}:", "    volumes:"] + [f'      - "{mount}"' for mount in mounts]
+        with open(override, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        return override, sorted(volumes)
+
+    def apply(self, variant: Variant):
+        os.makedirs(self.work_dir, exist_ok=True)
+        name = re.sub(r"[^\w.=-]+", "_", variant.label) if variant.changes else "current"
+        override, services = self.write(variant, name)
+        # 上一個變體改過、這個變體沒改的服務也要恢復原本的設定
+        recreate = set(services) | self._applied
+        self._touched |= recreate
+        self._applied = set(services)
+        if recreate:
+            self._up(recreate, override if services else None)
+
+    def restore(self):
+        if self._touched:
+            self._up(self._touched)
+            self._touched = set()
+            self._applied = set()
+
+
+class TuningSweep:
+    """以 backend 套用變體並執行基準測試，再以連續減半搜尋"""
+
+    def __init__(self, backend, benchmark: Benchmark, eta: int = DEFAULT_ETA, min_duration: float = 10,
+                 max_duration: float = 90, p99_target: float = DEFAULT_P99_TARGET):
+        self.backend = backend
+        self.benchmark = benchmark
+        self.eta = eta
+        self.min_duration = min_duration
+        self.max_duration = max_duration
+        self.p99_target = p99_target
+
+    def evaluate(self, variant: Variant, seconds: float) -> ReplayStats:
+        try:
+            self.backend.apply(variant)
+        except ValueError as e:
+            raise TrialFailed(str(e)) from e
+        return self.benchmark.run(self.backend.base_url, seconds)
+
+    def run(self, candidates: Sequence[Variant], progress: Optional[Callable[[Trial], None]] = None) -> List[Trial]:
+        raise_open_file_limit()
+        self.benchmark.clients.check()
+        try:
+            return successive_halving(candidates, self.evaluate, self.eta, self.min_duration, self.max_duration,
+                                      self.p99_target, progress)
+        finally:
+            self.backend.restore()
+
+
+def format_trial(trial: Trial, p99_target: float = DEFAULT_P99_TARGET) -> str:
+    if not trial.ok:
+        return f"  第 {trial.rung} 輪 {trial.seconds:>5.1f}s  失敗: {trial.error or '沒有成功的請求'}  {trial.variant.label}"
+    stats = trial.stats
+    return (f"  第 {trial.rung} 輪 {trial.seconds:>5.1f}s {stats.throughput:>8.1f} req/s  p99 {trial.p99:>8.1f}ms  "
+            f"錯誤 {stats.error_rate:>6.2%}  分數 {trial.score(p99_target):>8.1f}  {trial.variant.label}")
+
+
+def format_report(trials: Sequence[Trial], p99_target: float = DEFAULT_P99_TARGET) -> str:
+    ranked = ranking(trials, p99_target)
+    lines = [f"{len(ranked)} 個變體，{len(trials)} 次測量（分數 = req/s × min(1, {p99_target:.0f}ms ÷ p99) × (1 − 錯誤率)）",
+             "",
+             f"  {'排名':<3} {'輪次':>3} {'req/s':>8} {'p99 ms':>9} {'錯誤率':>6} {'分數':>7}  與目前設定不同的項目"]
+    for rank, trial in enumerate(ranked, 1):
+        if trial.ok:
+            stats = trial.stats
+            lines.append(f"  {rank:<5} {trial.rung:>4} {stats.throughput:>8.1f} {trial.p99:>9.1f} "
+                         f"{stats.error_rate:>8.2%} {trial.score(p99_target):>9.1f}  {trial.variant.label}")
+        else:
+            lines.append(f"  {rank:<5} {trial.rung:>4} {'失敗':>8} {'':>9} {'':>8} {'':>9}  {trial.variant.label}"
+                         f"（{trial.error or '沒有成功的請求'}）")
+    baseline = next((t for t in ranked if not t.variant.changes), None)
+    if ranked and ranked[0].ok and baseline is not None and baseline.ok and ranked[0] is not baseline:
+        best = ranked[0]
+        lines.append("")
+        lines.append(f"最佳變體的分數為目前設定的 {best.score(p99_target) / max(baseline.score(p99_target), 1e-9):.2f} 倍"
+                     + ("" if best.rung == baseline.rung else f"（目前設定只測到第 {baseline.rung} 輪）"))
+    return "\n".join(lines)
+
+
+def _knob_values(text: str) -> Tuple[str, Tuple[str, ...]]:
+    name, sep, values = text.partition('=')
+    if not sep or name not in KNOBS_BY_NAME:
+        raise argparse.ArgumentTypeError(f"格式應為 <調校項目>=<值>,<值>，可用的項目: {', '.join(KNOBS_BY_NAME)}")
+    return name, tuple(value.strip() for value in values.split(',') if value.strip())
+
+
+def _select(names: Optional[str], overrides: Sequence[Tuple[str, Tuple[str, ...]]]) -> List[Knob]:
+    selected = [name.strip() for name in names.split(',') if name.strip()] if names else list(KNOBS_BY_NAME)
+    unknown = [name for name in selected if name not in KNOBS_BY_NAME]
+    if unknown:
+        raise ValueError(f"未知的調校項目: {', '.join(unknown)}")
+    knobs = {name: KNOBS_BY_NAME[name] for name in selected}
+    for name, values in overrides:
+        original = KNOBS_BY_NAME[name]
+        knobs[name] = Knob(original.name, original.file, original.directive, values, original.syntax, original.fixup)
+    return list(knobs.values())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="以連續減半搜尋 nginx / PHP-FPM / MySQL 設定")
+    parser.add_argument("--base-url", default=http_session.BASE_URL, help="nginx 網址（預設 WP_TEST_BASE_URL）")
+    parser.add_argument("--standin", action="store_true", help="對本機替身伺服器搜尋（示範用，只有 pm.max_children 有效果）")
+    parser.add_argument("--standin-latency", type=float, default=20, help="替身伺服器每個請求的處理時間（毫秒）")
+    parser.add_argument("--knobs", default=None, help="搜尋的調校項目（逗號分隔，預設全部）")
+    parser.add_argument("--knob", type=_knob_values, action="append", default=[],
+                        help="覆寫調校項目的候選值，例如 php.pm.max_children=4,8,16（可重複）")
+    parser.add_argument("--max-variants", type=int, default=27, help="最多搜尋的變體數（超過時抽樣）")
+    parser.add_argument("--seed", type=int, default=0, help="抽樣的亂數種子")
+    parser.add_argument("--eta", type=int, default=DEFAULT_ETA, help="每輪保留 1/eta 的變體")
+    parser.add_argument("--min-duration", type=float, default=10, help="第一輪每個變體測量的秒數")
+    parser.add_argument("--max-duration", type=float, default=90, help="每個變體最長測量的秒數")
+    parser.add_argument("--warmup", type=float, default=5, help="每次測量前的暖機秒數")
+    parser.add_argument("--concurrency", type=int, default=32, help="並行連線數")
+    parser.add_argument("--clients", type=int, default=None, help="虛擬客戶端數量（模式依 WP_TEST_CLIENT_MODE）")
+    parser.add_argument("--p99-target", type=float, default=DEFAULT_P99_TARGET, help="p99 目標（毫秒），超過時扣分")
+    parser.add_argument("--access-log", action="append", default=[],
+                        help="重播的 access log（可重複，- 為標準輸入，支援 .gz；預設重播幾個代表性網址）")
+    parser.add_argument("--list", action="store_true", help="列出調校項目與目前的值")
+    parser.add_argument("--json", action="store_true", help="以 JSON 輸出")
+    args = parser.parse_args(argv)
+
+    try:
+        knobs = _select(args.knobs, args.knob)
+        current = defaults(knobs)
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    if args.list:
+        for knob in knobs:
+            print(f"  {knob.name:<38} {current[knob.name]:>8}  候選 {', '.join(knob.values)}  ({knob.file})")
+        return 0
+
+    candidates = variants(knobs, args.max_variants, args.seed)
+    paths = replay_paths(read_lines(args.access_log)) if args.access_log else list(DEFAULT_PATHS)
+    benchmark = Benchmark(paths, args.concurrency, args.warmup, ClientPool.from_env(args.clients))
+    if not args.json:
+        print(f"搜尋 {len(candidates)} 個變體（{len(knobs)} 個調校項目，eta = {args.eta}）", flush=True)
+
+    def progress(trial: Trial):
+        if not args.json:
+            print(format_trial(trial, args.p99_target), flush=True)
+
+    try:
+        if args.standin:
+            with StandInServer() as server:
+                ignored = [knob.name for knob in knobs if knob.name not in StandInBackend.EFFECTIVE]
+                if ignored and not args.json:
+                    print(f"  替身伺服器不受這些項目影響: {', '.join(ignored)}")
+                sweep = TuningSweep(StandInBackend(server, args.standin_latency), benchmark, args.eta,
+                                    args.min_duration, args.max_duration, args.p99_target)
+                trials = sweep.run(candidates, progress)
+        else:
+            sweep = TuningSweep(ComposeBackend(args.base_url), benchmark, args.eta, args.min_duration,
+                                args.max_duration, args.p99_target)
+            trials = sweep.run(candidates, progress)
+    except (TrialFailed, OSError) as e:
+        print(f"無法執行設定搜尋: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps({
+            'knobs': {knob.name: {'current': current[knob.name], 'values': list(knob.values)} for knob in knobs},
+            'ranking': [trial.to_dict(args.p99_target) for trial in ranking(trials, args.p99_target)],
+            'trials': [trial.to_dict(args.p99_target) for trial in trials],
+        }, ensure_ascii=False, indent=2))
+    else:
+        print()
+        print(format_report(trials, args.p99_target))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Service Readiness Probing
+並行探測 nginx、PHP-FPM、MySQL 是否就緒（指數退避加抖動），
+全部就緒即返回，並記錄每個服務的就緒時間（冷啟動基準）
+
+用法：
+    python3 -m tests.readiness                 # 等待已啟動的服務
+    python3 -m tests.readiness --start-stack   # 從 docker compose up 起計時
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+
+from tests.monitor.docker_api import DockerAPI, DockerAPIError
+from tests.performance.timing import now_ns, elapsed_ms
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_URL = "http://localhost"
+DB_CONTAINER = "wordpress_db"
+# 經過 PHP-FPM 並啟動 WordPress（需要連接資料庫），且不受速率限制
+PHP_PROBE_PATH = "/wp-admin/install.php"
+
+CheckResult = Tuple[bool, str]
+
+
+class ServicesNotReady(Exception):
+    """等待逾時仍有服務未就緒"""
+
+    def __init__(self, results: Dict[str, "ProbeResult"]):
+        self.results = results
+        pending = [f"{r.name}（{r.detail}）" for r in results.values() if not r.ready]
+        super().__init__(f"服務啟動超時: {', '.join(pending)}")
+
+
+@dataclass
+class Probe:
+    """一個就緒探測：check 回傳 (是否就緒, 說明)"""
+
+    name: str
+    check: Callable[[], Awaitable[CheckResult]]
+
+
+@dataclass
+class ProbeResult:
+    name: str
+    ready: bool = False
+    attempts: int = 0
+    time_to_ready: Optional[float] = None
+    detail: str = "尚未探測"
+
+
+def http_probe(name: str, url: str, session: aiohttp.ClientSession, ready_statuses=(200,),
+               body_contains: Optional[str] = None) -> Probe:
+    """HTTP 探測：狀態碼在 ready_statuses 內（且內容包含 body_contains）即就緒"""
+
+    async def check() -> CheckResult:
+        try:
+            async with session.get(url, allow_redirects=False) as response:
+                body = await response.text()
+                ready = response.status in ready_statuses
+                if ready and body_contains is not None:
+                    ready = body_contains in body.lower()
+                return ready, f"HTTP {response.status}"
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            return False, type(e).__name__
+
+    return Probe(name, check)
+
+
+def mysql_probe(container: str = DB_CONTAINER, docker: Optional[DockerAPI] = None) -> Probe:
+    """MySQL 探測：讀取 docker-compose healthcheck（mysqladmin ping）的結果"""
+    docker = docker or DockerAPI(timeout=5)
+
+    async def check() -> CheckResult:
+        try:
+            info = await asyncio.to_thread(docker.inspect, container)
+        except DockerAPIError as e:
+            return False, str(e)
+        health = ((info.get('State') or {}).get('Health') or {}).get('Status', 'none')
+        return health == 'healthy', f"health={health}"
+
+    return Probe("mysql", check)
+
+
+def backoff_delays(initial: float = 0.25, factor: float = 2.0, maximum: float = 5.0, rng=random):
+    """指數退避序列，每次在 [delay/2, delay] 之間加入抖動"""
+    delay = initial
+    while True:
+        yield rng.uniform(delay / 2, delay)
+        delay = min(delay * factor, maximum)
+
+
+async def _run_probe(probe: Probe, result: ProbeResult, origin_ns: int, deadline_ns: int):
+    delays = backoff_delays()
+    while True:
+        result.attempts += 1
+        ready, result.detail = await probe.check()
+        if ready:
+            result.ready = True
+            result.time_to_ready = elapsed_ms(origin_ns) / 1000
+            return
+        delay = next(delays)
+        remaining = (deadline_ns - now_ns()) / 1e9
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(delay, remaining))
+
+
+async def wait_for_probes(probes: List[Probe], timeout: float = 120,
+                          origin_ns: Optional[int] = None) -> Dict[str, ProbeResult]:
+    """並行執行所有探測，全部就緒即返回；逾時拋出 ServicesNotReady"""
+    origin_ns = origin_ns or now_ns()
+    deadline_ns = now_ns() + int(timeout * 1e9)
+    results = {probe.name: ProbeResult(probe.name) for probe in probes}
+    await asyncio.gather(*(_run_probe(p, results[p.name], origin_ns, deadline_ns) for p in probes))
+    if not all(r.ready for r in results.values()):
+        raise ServicesNotReady(results)
+    return results
+
+
+async def _wait_async(base_url: str, timeout: float, include_mysql: bool,
+                      origin_ns: Optional[int]) -> Dict[str, ProbeResult]:
+    client_timeout = aiohttp.ClientTimeout(total=5)
+    async with aiohttp.ClientSession(timeout=client_timeout) as session:
+        probes = [
+            http_probe("nginx", f"{base_url}/health", session, body_contains="healthy"),
+            http_probe("php-fpm", f"{base_url}{PHP_PROBE_PATH}", session, ready_statuses=(200, 302)),
+        ]
+        if include_mysql:
+            probes.append(mysql_probe())
+        return await wait_for_probes(probes, timeout, origin_ns)
+
+
+def wait_until_ready(base_url: str = BASE_URL, timeout: float = 120, include_mysql: bool = True,
+                     origin_ns: Optional[int] = None) -> Dict[str, ProbeResult]:
+    """
+    等待 nginx、PHP-FPM（與 MySQL）就緒
+
+    origin_ns 為計時起點（例如 docker compose up 之前），預設為呼叫當下。
+    """
+    return asyncio.run(_wait_async(base_url, timeout, include_mysql, origin_ns))
+
+
+def docker_compose(args: Sequence[str], cwd: str = REPO_ROOT, env: Optional[Dict[str, str]] = None) -> int:
+    """執行 docker compose（失敗或沒有 compose 外掛時改用 docker-compose），回傳結束碼"""
+    for command in (["docker", "compose"], ["docker-compose"]):
+        try:
+            returncode = subprocess.run([*command, *args], cwd=cwd, env=env).returncode
+        except FileNotFoundError:
+            returncode = 127
+        if returncode == 0:
+            return 0
+    return returncode
+
+
+def start_stack_and_wait(base_url: str = BASE_URL, timeout: float = 180) -> Dict[str, ProbeResult]:
+    """執行 docker compose up -d 並等待所有服務就緒，就緒時間從 up 之前起算"""
+    origin_ns = now_ns()
+    returncode = docker_compose(["up", "-d"])
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, "docker compose up -d")
+    return wait_until_ready(base_url, timeout, origin_ns=origin_ns)
+
+
+def format_results(results: Dict[str, ProbeResult]) -> str:
+    lines = []
+    for r in results.values():
+        ready = f"{r.time_to_ready:.2f} 秒" if r.ready else "未就緒"
+        lines.append(f"  {r.name:<10}{ready:>12}  探測 {r.attempts} 次  ({r.detail})")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="等待服務就緒並記錄就緒時間")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--timeout", type=float, default=180)
+    parser.add_argument("--start-stack", action="store_true", help="先執行 docker compose up -d（冷啟動基準）")
+    parser.add_argument("--no-mysql", action="store_true", help="不探測 MySQL healthcheck")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.start_stack:
+            results = start_stack_and_wait(args.base_url, args.timeout)
+        else:
+            results = wait_until_ready(args.base_url, args.timeout, include_mysql=not args.no_mysql)
+    except ServicesNotReady as e:
+        print(str(e))
+        print(format_results(e.results))
+        return 1
+    print("服務就緒時間:")
+    print(format_results(results))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
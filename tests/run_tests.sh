@@ -25,37 +25,10 @@ if ! command -v docker-compose &> /dev/null && ! docker compose version &> /dev/
     exit 1
 fi
 
-# 啟動服務
-echo -e "${YELLOW}啟動 Docker 服務...${NC}"
-docker-compose up -d || docker compose up -d
-
-# 等待服務啟動
-echo -e "${YELLOW}等待服務啟動（30秒）...${NC}"
-sleep 30
-
-# 檢查服務狀態
-echo -e "${YELLOW}檢查服務狀態...${NC}"
-docker-compose ps || docker compose ps
-
-# 運行 Unit Tests
-echo -e "${YELLOW}運行 Unit Tests...${NC}"
-if [ -f "tests/unit/test_containers.py" ]; then
-    python3 -m pytest tests/unit/test_containers.py -v || python3 -m unittest tests.unit.test_containers
-else
-    echo -e "${RED}Unit Test 檔案不存在${NC}"
-fi
-
-# 運行 E2E Tests
-echo -e "${YELLOW}運行 E2E Tests...${NC}"
-if [ -f "tests/e2e/test_wordpress.py" ]; then
-    # 安裝依賴
-    if [ -f "tests/requirements.txt" ]; then
-        pip3 install -r tests/requirements.txt --quiet
-    fi
-    
-    python3 -m pytest tests/e2e/test_wordpress.py -v || python3 -m unittest tests.e2e.test_wordpress
-else
-    echo -e "${RED}E2E Test 檔案不存在${NC}"
+# 安裝依賴
+if [ -f "tests/requirements.txt" ]; then
+    pip3 install -r tests/requirements.txt --quiet
 fi
 
-echo -e "${GREEN}測試完成！${NC}"
+# 啟動服務並執行所有套件（獨立套件並行，性能套件單獨執行）
+exec python3 -m tests.runner --start-stack "$@"
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Parallel Test Runner
+測試協調器：獨立的測試套件在各自的 worker 進程中並行執行，
+性能與破壞性套件在並行階段結束後逐一單獨執行，避免互相干擾測量結果
+
+用法：
+    python3 -m tests.runner                  # 全部套件
+    python3 -m tests.runner --start-stack    # 先啟動 docker compose
+    python3 -m tests.runner --suite e2e --suite security
+    python3 -m tests.runner --skip-isolated  # 只跑並行階段
+    python3 -m tests.runner --standin        # 不需 Docker，以替身伺服器執行性能套件
+    python3 -m tests.runner --suite performance-comparison --baseline label:before  # 與基準比較
+    python3 -m tests.runner --standin --clients 20 --client-mode source  # 多來源 IP，負載不被單一 IP 的限流擋下
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from tests.performance.clients import FORWARDED, MODES, SOURCE, ClientAddressError, ClientPool, RealIpConfig
+from tests.performance.rate_limit import RateLimitConfig
+from tests.performance.results_store import (
+    P99_THRESHOLD, RUN_ID_ENV, THROUGHPUT_THRESHOLD, ResultStore, compare_selectors, format_comparisons,
+)
+from tests.performance.standin import StandInServer
+from tests.readiness import ServicesNotReady, format_results, start_stack_and_wait
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# pytest 沒有收集到任何測試時的退出碼
+PYTEST_NO_TESTS = 5
+
+GREEN = '\033[0;32m'
+RED = '\033[0;31m'
+YELLOW = '\033[1;33m'
+NC = '\033[0m'
+
+
+@dataclass
+class Suite:
+    """一個測試分片：一組 pytest 參數，在獨立進程中執行"""
+
+    name: str
+    args: List[str]
+    # 性能測量與會重啟容器、耗盡速率限制的測試必須單獨執行
+    isolated: bool = False
+
+
+# 可以對替身伺服器執行的套件（目標網址取自 WP_TEST_BASE_URL）
+STANDIN_SUITES = ['performance', 'performance-comparison']
+
+NEGATIVE_FILES = [
+    "tests/unit/test_negative_cases.py",
+    "tests/unit/test_negative_unit.py",
+    "tests/e2e/test_negative_cases.py",
+    "tests/e2e/test_negative_e2e.py",
+]
+
+SUITES = [
+    Suite('unit', ["tests/unit/test_containers.py"]),
+    Suite('e2e', ["tests/e2e/test_wordpress.py"]),
+    Suite('security', ["tests/security/test_security_headers.py::TestSecurityHeaders"]),
+    Suite('negative', NEGATIVE_FILES + ["-k", "not TestErrorHandling"]),
+    # 測試工具本身的離線單元測試（不連線到服務）
+    Suite('harness', [
+        "tests/test_readiness.py", "tests/test_http_session.py", "tests/performance", "tests/monitor",
+        "--ignore=tests/performance/test_performance.py",
+        "--ignore=tests/performance/test_performance_comparison.py",
+    ]),
+    # 以下單獨執行：耗盡 IP 速率限制、重啟 nginx、性能測量
+    Suite('rate-limiting', ["tests/security/test_security_headers.py::TestRateLimiting"], isolated=True),
+    Suite('error-handling', NEGATIVE_FILES + ["-k", "TestErrorHandling"], isolated=True),
+    Suite('performance', ["tests/performance/test_performance.py"], isolated=True),
+    Suite('performance-comparison', ["tests/performance/test_performance_comparison.py"], isolated=True),
+]
+
+
+@dataclass
+class SuiteResult:
+    suite: Suite
+    returncode: int
+    duration: float
+    output: str = field(repr=False, default="")
+
+    @property
+    def passed(self) -> bool:
+        return self.returncode in (0, PYTEST_NO_TESTS)
+
+
+def run_suite(suite: Suite, pytest_args: Optional[List[str]] = None) -> SuiteResult:
+    """在獨立的 pytest 進程中執行一個套件"""
+    command = [sys.executable, "-m", "pytest", "-v", "-p", "no:cacheprovider"] + suite.args + (pytest_args or [])
+    start = time.perf_counter()
+    completed = subprocess.run(
+        command,
+        cwd=REPO_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+    )
+    return SuiteResult(suite, completed.returncode, time.perf_counter() - start, completed.stdout)
+
+
+def report(result: SuiteResult, verbose: bool = True):
+    status = f"{GREEN}通過{NC}" if result.passed else f"{RED}失敗{NC}"
+    print(f"{YELLOW}=== {result.suite.name}（{result.duration:.1f} 秒）: {status} ==={NC}")
+    if verbose or not result.passed:
+        print(result.output)
+    sys.stdout.flush()
+
+
+def start_stack():
+    """啟動 docker compose 服務並等待 nginx、PHP-FPM、MySQL 就緒"""
+    print(f"{YELLOW}啟動 Docker 服務並等待就緒...{NC}")
+    results = start_stack_and_wait()
+    print("服務就緒時間:")
+    print(format_results(results))
+
+
+def compare_with_baseline(run_id: int, baseline: str, p99_threshold: float, throughput_threshold: float) -> bool:
+    """比較本次執行與基準，回傳是否有指標退步"""
+    print("=" * 60)
+    print(f"與基準 {baseline} 比較:")
+    with ResultStore() as store:
+        try:
+            comparisons = compare_selectors(store, baseline, str(run_id), p99_threshold=p99_threshold,
+                                            throughput_threshold=throughput_threshold)
+        except ValueError as e:
+            print(f"{RED}{e}{NC}")
+            return True
+    print(format_comparisons(comparisons))
+    regressed = [c for c in comparisons if c.regressed]
+    for c in regressed:
+        print(f"{RED}退步: {c.benchmark} {c.metric} {c.change * 100:+.1f}%{NC}")
+    return bool(regressed)
+
+
+def run_all(suites: List[Suite], jobs: int, pytest_args: List[str], quiet: bool) -> List[SuiteResult]:
+    """並行執行非隔離套件，然後逐一執行隔離套件"""
+    parallel = [s for s in suites if not s.isolated]
+    isolated = [s for s in suites if s.isolated]
+    results = []
+
+    if parallel:
+        print(f"{YELLOW}並行執行 {len(parallel)} 個套件（{jobs} 個 worker）...{NC}")
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(run_suite, suite, pytest_args) for suite in parallel]
+            for future in as_completed(futures):
+                result = future.result()
+                report(result, verbose=not quiet)
+                results.append(result)
+
+    for suite in isolated:
+        print(f"{YELLOW}單獨執行 {suite.name}...{NC}")
+        result = run_suite(suite, pytest_args)
+        report(result, verbose=not quiet)
+        results.append(result)
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="並行測試協調器")
+    parser.add_argument("--suite", action="append", choices=[s.name for s in SUITES],
+                        help="只執行指定套件（可重複）")
+    parser.add_argument("--jobs", type=int, default=len(SUITES), help="並行 worker 數")
+    parser.add_argument("--skip-isolated", action="store_true", help="跳過需要單獨執行的套件")
+    parser.add_argument("--start-stack", action="store_true", help="先執行 docker compose up -d")
+    parser.add_argument("--standin", action="store_true",
+                        help="啟動替身伺服器取代 Docker 服務（預設只執行性能套件）")
+    parser.add_argument("--clients", type=int, help="性能套件使用的虛擬客戶端數量（WP_TEST_CLIENTS）")
+    parser.add_argument("--client-mode", choices=MODES,
+                        help="虛擬客戶端的位址來源（forwarded 需以 docker-compose.bench.yml 啟動）")
+    parser.add_argument("--record", action="store_true", help="將性能指標寫入結果庫（.benchmarks/）")
+    parser.add_argument("--label", help="執行記錄的標籤（搭配 --record）")
+    parser.add_argument("--baseline", help="與基準比較（隱含 --record），例如 label:before、commit:1a2b、latest")
+    parser.add_argument("--p99-threshold", type=float, default=P99_THRESHOLD, help="p99 增加的容許比例")
+    parser.add_argument("--throughput-threshold", type=float, default=THROUGHPUT_THRESHOLD,
+                        help="吞吐量下降的容許比例")
+    parser.add_argument("--quiet", action="store_true", help="只輸出失敗套件的詳細結果")
+    parser.add_argument("--list", action="store_true", help="列出所有套件")
+    args, pytest_args = parser.parse_known_args(argv)
+
+    if args.list:
+        for suite in SUITES:
+            print(f"{suite.name:<24}{'單獨' if suite.isolated else '並行'}  {' '.join(suite.args)}")
+        return 0
+
+    selected = args.suite or (STANDIN_SUITES if args.standin else None)
+    suites = [s for s in SUITES if not selected or s.name in selected]
+    if args.skip_isolated:
+        suites = [s for s in suites if not s.isolated]
+
+    if args.start_stack:
+        try:
+            start_stack()
+        except ServicesNotReady as e:
+            print(f"{RED}{e}{NC}")
+            print(format_results(e.results))
+            return 1
+
+    if args.clients or args.client_mode:
+        mode = args.client_mode or os.environ.get("WP_TEST_CLIENT_MODE") or SOURCE
+        pool = ClientPool.create(args.clients or 1, mode)
+        try:
+            pool.check()
+        except ClientAddressError as e:
+            print(f"{RED}{e}{NC}")
+            return 1
+        os.environ["WP_TEST_CLIENTS"] = str(len(pool))
+        os.environ["WP_TEST_CLIENT_MODE"] = pool.mode
+        print(f"{YELLOW}虛擬客戶端: {pool.describe()}{NC}")
+
+    standin = None
+    if args.standin:
+        real_ip = RealIpConfig.load() if os.environ.get("WP_TEST_CLIENT_MODE") == FORWARDED else None
+        standin = StandInServer(rate_limits=RateLimitConfig.load(), real_ip=real_ip).start()
+        # worker 進程繼承環境變數
+        os.environ["WP_TEST_BASE_URL"] = standin.base_url
+        os.environ["WP_TEST_INTERNAL_URL"] = standin.internal_url
+        print(f"{YELLOW}替身伺服器: {standin.base_url}{NC}")
+
+    run_id = None
+    if args.record or args.baseline or args.label:
+        with ResultStore() as store:
+            run_id = store.create_run(label=args.label, base_url=os.environ.get("WP_TEST_BASE_URL"))
+        os.environ[RUN_ID_ENV] = str(run_id)
+        print(f"{YELLOW}記錄性能指標: 執行 #{run_id}{NC}")
+
+    start = time.perf_counter()
+    try:
+        results = run_all(suites, max(args.jobs, 1), pytest_args, args.quiet)
+    finally:
+        if standin is not None:
+            standin.stop()
+
+    regressed = False
+    if args.baseline:
+        regressed = compare_with_baseline(run_id, args.baseline, args.p99_threshold, args.throughput_threshold)
+
+    print("=" * 60)
+    for result in results:
+        mark = f"{GREEN}✓{NC}" if result.passed else f"{RED}✗{NC}"
+        print(f"  {mark} {result.suite.name:<24}{result.duration:>8.1f} 秒")
+    print(f"總耗時: {time.perf_counter() - start:.1f} 秒")
+    return 0 if all(r.passed for r in results) and not regressed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
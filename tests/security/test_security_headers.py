@@ -4,10 +4,15 @@ Security Headers Test
 測試安全標頭配置
 """
 
+import time
 import unittest
 import requests
 from typing import Dict
 
+from tests import http_session
+from tests.performance.rate_limit import ThrottlePredictor, ThrottleReport
+from tests.performance.timing import now_ns
+
 
 class TestSecurityHeaders(unittest.TestCase):
     """安全標頭測試類"""
@@ -17,7 +22,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_csp_header(self):
         """測試 Content-Security-Policy 標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         # 檢查 CSP 標頭是否存在
@@ -30,7 +35,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_referrer_policy_header(self):
         """測試 Referrer-Policy 標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         self.assertIn(
@@ -42,7 +47,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_permissions_policy_header(self):
         """測試 Permissions-Policy 標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         self.assertIn(
@@ -54,7 +59,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_x_frame_options_header(self):
         """測試 X-Frame-Options 標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         self.assertIn(
@@ -71,7 +76,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_x_content_type_options_header(self):
         """測試 X-Content-Type-Options 標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         self.assertIn(
@@ -88,7 +93,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_x_xss_protection_header(self):
         """測試 X-XSS-Protection 標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         self.assertIn(
@@ -100,7 +105,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_server_header_hidden(self):
         """測試 Server 標頭是否隱藏"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         # Server 標頭應該被移除或隱藏版本資訊
@@ -116,7 +121,7 @@ class TestSecurityHeaders(unittest.TestCase):
 
     def test_all_security_headers(self):
         """測試所有安全標頭"""
-        response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+        response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
         headers = response.headers
         
         required_headers = [
@@ -160,7 +165,7 @@ class TestRateLimiting(unittest.TestCase):
         rate_limited = False
         for i in range(10):
             try:
-                response = requests.get(
+                response = http_session.get(
                     f"{self.BASE_URL}/wp-login.php",
                     timeout=self.TIMEOUT
                 )
@@ -175,27 +180,34 @@ class TestRateLimiting(unittest.TestCase):
         print(f"速率限制測試: {'通過' if rate_limited else '未觸發（可能需要更多請求）'}")
 
     def test_general_rate_limiting(self):
-        """測試一般請求速率限制"""
+        """測試一般請求速率限制（429 數量與 rate-limiting.conf 的漏桶模型一致）"""
         # 發送大量請求
-        rate_limited_count = 0
+        predictor = ThrottlePredictor()
+        status_counts = {}
+        errors = 0
         total_requests = 70  # 超過 60 req/min 限制
         
         for i in range(total_requests):
+            # 以送出時間預測 general zone（60r/m，burst=20 nodelay）是否應拒絕
+            predictor.observe("/", now_ns() // 1_000_000)
             try:
-                response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
-                if response.status_code == 429:
-                    rate_limited_count += 1
+                response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
+                status_counts[response.status_code] = status_counts.get(response.status_code, 0) + 1
             except requests.exceptions.RequestException:
-                pass
+                errors += 1
             # 稍微延遲以避免太快
             if i % 10 == 0:
-                import time
                 time.sleep(0.1)
         
+        report = ThrottleReport.from_counts(status_counts, errors, predictor.prediction)
         print(f"\n一般請求速率限制測試:")
         print(f"  總請求數: {total_requests}")
-        print(f"  被限制: {rate_limited_count}")
-        print(f"  狀態: {'通過' if rate_limited_count > 0 else '未觸發（可能需要調整測試）'}")
+        print(report.format("  "))
+        self.assertTrue(
+            report.as_designed,
+            f"被限制 {report.throttled} 個，預測 {report.prediction.low}–{report.prediction.high}: "
+            f"{report.limiter_verdict}"
+        )
 
 
 if __name__ == "__main__":
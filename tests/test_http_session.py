@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP Session Tests
+共用 HTTP 連線池測試：連線池大小、Connection: close、依主機掛載的連線池，以及共用 Session 的設定與重建
+"""
+
+import unittest
+
+import requests
+
+from tests import http_session
+
+
+def pool_maxsize(session: requests.Session, url: str) -> int:
+    """url 實際使用的 adapter 的連線池大小"""
+    return session.get_adapter(url).poolmanager.connection_pool_kw['maxsize']
+
+
+class TestCreateSession(unittest.TestCase):
+    """建立 Session 測試類"""
+
+    def test_defaults(self):
+        """測試 http 與 https 共用同一個 adapter，預設使用 keep-alive，不保存伺服器設定的 cookie"""
+        session = http_session.create_session(pool_maxsize=7)
+        self.addCleanup(session.close)
+        self.assertIs(session.get_adapter("http://localhost/"), session.get_adapter("https://localhost/"))
+        self.assertEqual(pool_maxsize(session, "http://localhost/"), 7)
+        self.assertFalse(session.get_adapter("http://localhost/").poolmanager.connection_pool_kw['block'])
+        self.assertNotEqual(session.headers.get('Connection'), "close")
+        self.assertEqual(list(session.cookies.get_policy().allowed_domains()), [])
+
+    def test_fresh_connections(self):
+        """測試 fresh_connections 送出 Connection: close"""
+        session = http_session.create_session(fresh_connections=True)
+        self.addCleanup(session.close)
+        self.assertEqual(session.headers['Connection'], "close")
+
+    def test_host_pool_sizes(self):
+        """測試依 origin（scheme://host:port）掛載個別的連線池，路徑不影響，其他主機沿用預設"""
+        session = http_session.create_session(pool_maxsize=4, host_pool_sizes={
+            "http://localhost:8080/wp-json/": 50,
+            "https://example.test": 20,
+        })
+        self.addCleanup(session.close)
+        self.assertIn("http://localhost:8080", session.adapters)
+        self.assertEqual(pool_maxsize(session, "http://localhost:8080/"), 50)
+        self.assertEqual(pool_maxsize(session, "https://example.test/page/"), 20)
+        self.assertEqual(pool_maxsize(session, "http://localhost/"), 4)
+        self.assertEqual(pool_maxsize(session, "http://example.test/"), 4)
+
+
+class TestSharedSession(unittest.TestCase):
+    """共用 Session 測試類"""
+
+    def setUp(self):
+        saved = http_session.settings()
+        self.addCleanup(http_session.configure, **saved)
+
+    def test_reused_until_configured(self):
+        """測試共用 Session 重複使用，configure() 後下一次取得時依新設定重建"""
+        first = http_session.get_session()
+        self.assertIs(http_session.get_session(), first)
+
+        http_session.configure(pool_maxsize=3, fresh_connections=True, host_pool_sizes={"http://localhost:81": 9})
+        self.assertEqual(http_session.settings(), {
+            'pool_maxsize': 3, 'fresh_connections': True, 'host_pool_sizes': {"http://localhost:81": 9},
+        })
+        second = http_session.get_session()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.headers['Connection'], "close")
+        self.assertEqual(pool_maxsize(second, "http://localhost/"), 3)
+        self.assertEqual(pool_maxsize(second, "http://localhost:81/"), 9)
+
+    def test_partial_configure(self):
+        """測試只更新指定的設定，其餘沿用"""
+        http_session.configure(pool_maxsize=5, fresh_connections=False)
+        http_session.configure(pool_maxsize=12)
+        self.assertEqual(http_session.settings()['pool_maxsize'], 12)
+        self.assertFalse(http_session.settings()['fresh_connections'])
+        self.assertEqual(pool_maxsize(http_session.get_session(), "http://localhost/"), 12)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
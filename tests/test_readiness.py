@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Readiness Probing Tests
+就緒探測測試：並行探測、退避與就緒時間記錄
+"""
+
+import asyncio
+import random
+import unittest
+
+from tests.readiness import Probe, ServicesNotReady, backoff_delays, wait_for_probes
+
+
+def probe_ready_after(name: str, attempts: int) -> Probe:
+    """第 attempts 次探測時就緒的假探測"""
+    state = {'calls': 0}
+
+    async def check():
+        state['calls'] += 1
+        return state['calls'] >= attempts, f"call {state['calls']}"
+
+    return Probe(name, check)
+
+
+class TestReadiness(unittest.TestCase):
+    """就緒探測測試類"""
+
+    def test_returns_when_all_ready(self):
+        """測試所有服務就緒即返回，並記錄每個服務的就緒時間"""
+        probes = [probe_ready_after("nginx", 1), probe_ready_after("php-fpm", 3)]
+        results = asyncio.run(wait_for_probes(probes, timeout=10))
+
+        self.assertTrue(all(r.ready for r in results.values()))
+        self.assertEqual(results["nginx"].attempts, 1)
+        self.assertEqual(results["php-fpm"].attempts, 3)
+        self.assertLess(results["nginx"].time_to_ready, results["php-fpm"].time_to_ready)
+
+    def test_timeout_raises(self):
+        """測試逾時拋出 ServicesNotReady 並包含未就緒服務"""
+        probes = [probe_ready_after("nginx", 1), probe_ready_after("mysql", 1000)]
+        with self.assertRaises(ServicesNotReady) as context:
+            asyncio.run(wait_for_probes(probes, timeout=0.5))
+        self.assertTrue(context.exception.results["nginx"].ready)
+        self.assertFalse(context.exception.results["mysql"].ready)
+        self.assertIn("mysql", str(context.exception))
+
+    def test_backoff_grows_with_jitter(self):
+        """測試退避時間指數成長、有上限並帶抖動"""
+        delays = backoff_delays(initial=0.25, factor=2, maximum=2, rng=random.Random(1))
+        values = [next(delays) for _ in range(8)]
+        bounds = [0.25, 0.5, 1, 2, 2, 2, 2, 2]
+        for value, bound in zip(values, bounds):
+            self.assertGreaterEqual(value, bound / 2)
+            self.assertLessEqual(value, bound)
+        self.assertGreater(len(set(values)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -10,6 +10,8 @@ import os
 import requests
 from typing import Dict, List
 
+from tests import http_session
+
 
 class TestNegativeCases(unittest.TestCase):
     """負面測試類"""
@@ -20,7 +22,7 @@ class TestNegativeCases(unittest.TestCase):
     def test_invalid_endpoint(self):
         """測試無效端點返回 404"""
         try:
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/nonexistent-page-12345",
                 timeout=self.TIMEOUT,
                 allow_redirects=False
@@ -38,7 +40,7 @@ class TestNegativeCases(unittest.TestCase):
         """測試格式錯誤的請求"""
         try:
             # 測試無效的 HTTP 方法
-            response = requests.request(
+            response = http_session.request(
                 "INVALID_METHOD",
                 self.BASE_URL,
                 timeout=self.TIMEOUT
@@ -58,7 +60,7 @@ class TestNegativeCases(unittest.TestCase):
         try:
             # 創建一個超過 client_max_body_size 的請求
             large_data = "x" * (65 * 1024 * 1024)  # 65MB，超過 64MB 限制
-            response = requests.post(
+            response = http_session.post(
                 f"{self.BASE_URL}/wp-admin/admin-ajax.php",
                 data={"data": large_data},
                 timeout=self.TIMEOUT
@@ -78,7 +80,7 @@ class TestNegativeCases(unittest.TestCase):
         try:
             # 嘗試 SQL 注入
             payload = "1' OR '1'='1"
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/?s={payload}",
                 timeout=self.TIMEOUT
             )
@@ -102,7 +104,7 @@ class TestNegativeCases(unittest.TestCase):
         try:
             # 嘗試 XSS 攻擊
             payload = "<script>alert('XSS')</script>"
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}/?s={payload}",
                 timeout=self.TIMEOUT
             )
@@ -129,7 +131,7 @@ class TestNegativeCases(unittest.TestCase):
             ]
             
             for payload in payloads:
-                response = requests.get(
+                response = http_session.get(
                     f"{self.BASE_URL}/{payload}",
                     timeout=self.TIMEOUT,
                     allow_redirects=False
@@ -155,7 +157,7 @@ class TestNegativeCases(unittest.TestCase):
             # 快速發送超過限制的請求
             rate_limited = False
             for i in range(10):
-                response = requests.get(
+                response = http_session.get(
                     f"{self.BASE_URL}/wp-login.php",
                     timeout=5
                 )
@@ -187,7 +189,7 @@ class TestNegativeCases(unittest.TestCase):
         
         for file_path in sensitive_files:
             try:
-                response = requests.get(
+                response = http_session.get(
                     f"{self.BASE_URL}{file_path}",
                     timeout=self.TIMEOUT,
                     allow_redirects=False
@@ -207,7 +209,7 @@ class TestNegativeCases(unittest.TestCase):
         
         for method in invalid_methods:
             try:
-                response = requests.request(
+                response = http_session.request(
                     method,
                     self.BASE_URL,
                     timeout=self.TIMEOUT
@@ -225,7 +227,7 @@ class TestNegativeCases(unittest.TestCase):
         """測試格式錯誤的標頭"""
         try:
             # 測試缺少必要的標頭
-            response = requests.get(
+            response = http_session.get(
                 self.BASE_URL,
                 timeout=self.TIMEOUT,
                 headers={"Host": ""}  # 空的 Host 標頭
@@ -307,7 +309,7 @@ class TestEdgeCases(unittest.TestCase):
     def test_empty_request(self):
         """測試空請求"""
         try:
-            response = requests.get(self.BASE_URL, timeout=self.TIMEOUT)
+            response = http_session.get(self.BASE_URL, timeout=self.TIMEOUT)
             # 應該正常處理
             self.assertIn(
                 response.status_code,
@@ -321,7 +323,7 @@ class TestEdgeCases(unittest.TestCase):
         """測試超長 URL"""
         try:
             long_path = "/" + "a" * 2000  # 2000 字符的路徑
-            response = requests.get(
+            response = http_session.get(
                 f"{self.BASE_URL}{long_path}",
                 timeout=self.TIMEOUT
             )
@@ -340,7 +342,7 @@ class TestEdgeCases(unittest.TestCase):
         
         for char in special_chars:
             try:
-                response = requests.get(
+                response = http_session.get(
                     f"{self.BASE_URL}/test{char}param=value",
                     timeout=self.TIMEOUT
                 )
@@ -359,7 +361,7 @@ class TestEdgeCases(unittest.TestCase):
         
         def make_request():
             try:
-                response = requests.get(self.BASE_URL, timeout=10)
+                response = http_session.get(self.BASE_URL, timeout=10)
                 return response.status_code in [200, 302]
             except:
                 return False